@@ -8,6 +8,7 @@ import logging
 from Tribler import LIBRARYNAME
 from Tribler.Category.init_category import getCategoryInfo
 from Tribler.Category.FamilyFilter import XXXFilter
+from Tribler.Core.Search.Tokenizer import tokenizer
 
 CATEGORY_CONFIG_FILE = "category.conf"
 
@@ -111,16 +112,12 @@ class Category:
     def judge(self, category, files_list, display_name=''):
 
         # judge file keywords
-        display_name = display_name.lower()
         factor = 1.0
-        fileKeywords = self._getWords(display_name)
+        fileKeywords = self._getNameWords(display_name)
 
         for ikeywords in category['keywords'].keys():
-            try:
-                fileKeywords.index(ikeywords)
+            if ikeywords in fileKeywords:
                 factor *= 1 - category['keywords'][ikeywords]
-            except:
-                pass
         if (1 - factor) > 0.5:
             if 'strength' in category:
                 return (True, category['strength'])
@@ -149,15 +146,11 @@ class Category:
 
             # judge file keywords
             factor = 1.0
-            fileKeywords = self._getWords(name.lower())
+            fileKeywords = set(self._getWords(name.lower()))
 
             for ikeywords in category['keywords'].keys():
-                try:
-                    fileKeywords.index(ikeywords)
-                    # print ikeywords
+                if ikeywords in fileKeywords:
                     factor *= 1 - category['keywords'][ikeywords]
-                except:
-                    pass
             if factor < 0.5:
                 matchSize += length
 
@@ -175,6 +168,13 @@ class Category:
     def _getWords(self, string):
         return self.WORDS_REGEXP.findall(string)
 
+    def _getNameWords(self, display_name):
+        # the display name is judged against every category, its words are stored in the shared token record
+        record = tokenizer.get_record(display_name)
+        if record.words is None:
+            record.words = frozenset(self._getWords(display_name.lower()))
+        return record.words
+
     def family_filter_enabled(self):
         """
         Return is xxx filtering is enabled in this client
@@ -164,7 +164,15 @@ class TriblerLaunchMany(Thread):
             self.ltmgr = None
             self.torrent_checking = None
 
+            self.reactor_monitor = None
+            if self.session.get_reactor_monitor():
+                from Tribler.Core.Statistics.ReactorMonitor import ReactorMonitor
+                self.reactor_monitor = ReactorMonitor()
+
     def init(self):
+        if self.reactor_monitor:
+            self.reactor_monitor.start()
+
         if self.dispersy:
             from Tribler.dispersy.community import HardKilledCommunity
 
@@ -700,6 +708,9 @@ class TriblerLaunchMany(Thread):
             from Tribler.Core.DecentralizedTracking import mainlineDHT
             mainlineDHT.deinit(self.mainline_dht)
 
+        if self.reactor_monitor:
+            self.reactor_monitor.stop()
+
     def network_shutdown(self):
         try:
             self._logger.info("tlm: network_shutdown")
@@ -16,7 +16,7 @@ from traceback import print_exc
 from types import LongType
 
 from Tribler.Core.Utilities.bencode import bencode
-from Tribler.Core.Merkle.merkle import MerkleTree
+from Tribler.Core.Merkle.merkle import MerkleTree, EMPTY_HASH
 from Tribler.Core.Utilities.unicode import bin2unicode
 from Tribler.Core.APIImplementation.miscutils import parse_playtime_to_secs, offset2piece
 from Tribler.Core.osutils import fix_filebasename
@@ -200,6 +200,11 @@ def makeinfo(input, userabortflag, userprogresscallback):
     else:
         piece_length = input['piece length']
 
+    # The Merkle hash tree is built while the pieces are hashed
+    merkletree = None
+    if input['createmerkletorrent'] and 'live' not in input:
+        merkletree = MerkleTree(piece_length, totalsize)
+
     # 4. Read files and calc hashes, if not live
     if 'live' not in input:
         for p, f, size in subs:
@@ -247,6 +252,8 @@ def makeinfo(input, userabortflag, userprogresscallback):
 
                 if done == piece_length:
                     pieces.append(sh.digest())
+                    if merkletree is not None:
+                        merkletree.append_piece_hash(pieces[-1])
                     done = 0
                     sh = sha()
 
@@ -277,6 +284,8 @@ def makeinfo(input, userabortflag, userprogresscallback):
 
         if done > 0:
             pieces.append(sh.digest())
+            if merkletree is not None:
+                merkletree.append_piece_hash(pieces[-1])
 
     # 5. Create info dict
     if len(subs) == 1:
@@ -301,8 +310,10 @@ def makeinfo(input, userabortflag, userprogresscallback):
     if 'live' not in input:
 
         if input['createmerkletorrent']:
-            merkletree = MerkleTree(piece_length, totalsize, None, pieces)
             root_hash = merkletree.get_root_hash()
+            if root_hash is None:
+                # no pieces to hash
+                root_hash = EMPTY_HASH
             infodict.update({'root hash': root_hash})
         else:
             infodict.update({'pieces': ''.join(pieces)})
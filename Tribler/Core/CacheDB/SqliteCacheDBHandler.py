@@ -26,6 +26,8 @@ from Tribler.Category.Category import Category
 from Tribler.Core.CacheDB.sqlitecachedb import SQLiteCacheDB, bin2str, str2bin
 from Tribler.Core.RemoteTorrentHandler import RemoteTorrentHandler
 from Tribler.Core.Search.SearchManager import split_into_keywords, filter_keywords
+from Tribler.Core.Search.TermIndex import TermIndex
+from Tribler.Core.Search.Tokenizer import tokenizer
 from Tribler.Core.TorrentDef import TorrentDef
 from Tribler.Core.Utilities.unicode import dunno2unicode
 from Tribler.Core.simpledefs import (INFOHASH_LENGTH, NTFY_PEERS, NTFY_UPDATE, NTFY_INSERT, NTFY_DELETE, NTFY_CREATE,
@@ -50,6 +52,17 @@ SHOW_ERROR = False
 
 VOTECAST_FLUSH_DB_INTERVAL = 15
 
+# FullTextIndex rows are queued and written in batches, at least every FTS_FLUSH_INTERVAL seconds or as soon as
+# FTS_BATCH_SIZE torrents are queued.  The FTS segments are merged after every FTS_OPTIMIZE_ROWS written rows.
+FTS_FLUSH_INTERVAL = 5
+FTS_BATCH_SIZE = 1000
+FTS_OPTIMIZE_ROWS = 100000
+
+# The autocompletion and suggestion TermIndex is built from the names of the known torrents, TERM_INDEX_BUILD_ROWS
+# torrents every TERM_INDEX_BUILD_INTERVAL seconds, and is kept up to date by flushIndex afterwards.
+TERM_INDEX_BUILD_INTERVAL = 0.5
+TERM_INDEX_BUILD_ROWS = 5000
+
 MAX_KEYWORDS_STORED = 5
 MAX_KEYWORD_LENGTH = 50
 
@@ -281,8 +294,12 @@ class MetadataDBHandler(BasicDBHandler):
         self._db.executemany(sql, value_tuple_list)
 
     def deleteMetadataMessage(self, dispersy_id):
-        sql = "DELETE FROM MetadataMessage WHERE dispersy_id = ?"
-        self._db.execute_write(sql, (dispersy_id,))
+        self.deleteMetadataMessages([dispersy_id])
+
+    def deleteMetadataMessages(self, dispersy_ids):
+        if dispersy_ids:
+            sql = "DELETE FROM MetadataMessage WHERE dispersy_id = ?"
+            self._db.executemany(sql, [(dispersy_id,) for dispersy_id in dispersy_ids])
 
     def getMetdataDateByInfohash(self, infohash):
         sql = """
@@ -490,6 +507,26 @@ class TorrentDBHandler(BasicDBHandler):
 
         self.infohash_id = LimitedOrderedDict(DEFAULT_ID_CACHE_SIZE)
 
+        # torrent_id: (queued_at, collected, values)
+        self._pending_index = {}
+        self._pending_index_lock = Lock()
+        self._index_flushes = 0
+        self._indexed_rows = 0
+        self._index_time = 0.0
+        self._rows_since_optimize = 0
+        self.register_task("flush full text index", LoopingCall(self.flushIndex)).start(FTS_FLUSH_INTERVAL, now=False)
+
+        self.term_index = TermIndex()
+        self._term_index_build = None
+        self.register_task("build term index", LoopingCall(self._buildTermIndex)).start(TERM_INDEX_BUILD_INTERVAL, now=False)
+
+    @classmethod
+    def delInstance(cls):
+        with cls._singleton_lock:
+            if cls._single:
+                cls._single.flushIndex()
+        super(TorrentDBHandler, cls).delInstance()
+
     def register(self, torrent_dir):
         self.torrent_dir = torrent_dir
 
@@ -739,22 +776,21 @@ class TorrentDBHandler(BasicDBHandler):
         return torrent_id
 
     def _indexTorrent(self, torrent_id, swarmname, files, collected):
-        existed = self._db.getOne('CollectedTorrent', 'infohash', torrent_id=torrent_id)
-        if existed and not collected:
-            return
-
+        """
+        Queues the FullTextIndex row of a torrent, the rows are written by flushIndex.  A row of a collected torrent is
+        never replaced by a row without its file names.
+        """
         # Niels: new method for indexing, replaces invertedindex
         # Making sure that swarmname does not include extension for single file torrents
-        swarm_keywords = " ".join(split_into_keywords(swarmname, filterStopwords=False))
+        swarm_keywords = tokenizer.get_normalized(swarmname)
 
-        filedict = {}
+        filenames = []
         fileextensions = set()
         for filename in files:
             filename, extension = os.path.splitext(filename)
-            for keyword in split_into_keywords(filename, filterStopwords=True):
-                filedict[keyword] = filedict.get(keyword, 0) + 1
-
+            filenames.append(filename)
             fileextensions.add(extension[1:])
+        filedict = tokenizer.count_keywords(filenames, filterStopwords=True)
 
         filenames = filedict.keys()
         if len(filenames) > 1000:
@@ -764,14 +800,85 @@ class TorrentDBHandler(BasicDBHandler):
             filenames = filenames[:1000]
 
         values = (torrent_id, swarm_keywords, " ".join(filenames), " ".join(fileextensions))
+        with self._pending_index_lock:
+            pending = self._pending_index.get(torrent_id)
+            if pending and pending[1] and not collected:
+                return
+            self._pending_index[torrent_id] = (pending[0] if pending else time(), collected, values)
+            nr_pending = len(self._pending_index)
+
+        if nr_pending >= FTS_BATCH_SIZE:
+            self.flushIndex()
+
+    def flushIndex(self):
+        """
+        Writes all queued FullTextIndex rows using one DELETE and one INSERT statement per batch.
+        """
+        with self._pending_index_lock:
+            if not self._pending_index:
+                return
+            pending = self._pending_index
+            self._pending_index = {}
+
+        t1 = time()
+        # only collected torrents may replace the row of a torrent that has been collected in the meantime
+        not_collected = [torrent_id for torrent_id, (_, collected, _) in pending.iteritems() if not collected]
+        for i in xrange(0, len(not_collected), 500):
+            batch = not_collected[i:i + 500]
+            sql = "SELECT torrent_id FROM CollectedTorrent WHERE torrent_id IN (" + ",".join("?" * len(batch)) + ")"
+            for torrent_id, in self._db.fetchall(sql, batch):
+                del pending[torrent_id]
+
+        rows = [values for _, _, values in pending.itervalues()]
         try:
             # INSERT OR REPLACE not working for fts3 table
-            self._db.execute_write(u"DELETE FROM FullTextIndex WHERE rowid = ?", (torrent_id,))
-            self._db.execute_write(u"INSERT INTO FullTextIndex (rowid, swarmname, filenames, fileextensions) VALUES(?,?,?,?)", values)
+            self._db.executemany(u"DELETE FROM FullTextIndex WHERE rowid = ?", [(values[0],) for values in rows])
+            self._db.executemany(u"INSERT INTO FullTextIndex (rowid, swarmname, filenames, fileextensions) VALUES(?,?,?,?)", rows)
+            self.term_index.add_names(values[1] for values in rows)
+
+            self._rows_since_optimize += len(rows)
+            if self._rows_since_optimize >= FTS_OPTIMIZE_ROWS:
+                self._rows_since_optimize = 0
+                self._db.execute_write(u"INSERT INTO FullTextIndex(FullTextIndex) VALUES('optimize')")
         except:
             # this will fail if the fts3 module cannot be found
             print_exc()
 
+        self._index_flushes += 1
+        self._indexed_rows += len(rows)
+        self._index_time += time() - t1
+
+    def _buildTermIndex(self):
+        # torrents inserted after the build started are added by flushIndex
+        if self._term_index_build is None:
+            self._term_index_build = (0, self._db.fetchone("SELECT max(torrent_id) FROM Torrent") or 0)
+        last_torrent_id, max_torrent_id = self._term_index_build
+
+        sql = "SELECT torrent_id, name FROM Torrent WHERE torrent_id > ? AND torrent_id <= ? AND name IS NOT NULL ORDER BY torrent_id LIMIT ?"
+        torrents = self._db.fetchall(sql, (last_torrent_id, max_torrent_id, TERM_INDEX_BUILD_ROWS))
+        self.term_index.add_names(" ".join(split_into_keywords(name)) for _, name in torrents)
+
+        if len(torrents) < TERM_INDEX_BUILD_ROWS:
+            self.cancel_pending_task("build term index")
+            self.term_index.sort()
+            self._logger.debug("Term index built, %d terms", len(self.term_index))
+        else:
+            self._term_index_build = (torrents[-1][0], max_torrent_id)
+
+    def getIndexStatistics(self):
+        """
+        Returns a dict describing the FullTextIndex queue: the number of queued torrents, the age of the oldest queued
+        torrent in seconds, and the number of rows written, batches and rows per second spent writing them.
+        """
+        with self._pending_index_lock:
+            queued_at = [pending[0] for pending in self._pending_index.itervalues()]
+
+        return {'pending': len(queued_at),
+                'lag': time() - min(queued_at) if queued_at else 0.0,
+                'indexed': self._indexed_rows,
+                'flushes': self._index_flushes,
+                'throughput': self._indexed_rows / self._index_time if self._index_time else 0.0}
+
     # ------------------------------------------------------------
     # Adds the trackers of a given torrent into the database.
     # ------------------------------------------------------------
@@ -1358,6 +1465,11 @@ class TorrentDBHandler(BasicDBHandler):
         # return self._db.size('CollectedTorrent')
         return self._db.getOne('CollectedTorrent', 'count(torrent_id)')
 
+    def getCollectedTorrentHashes(self):
+        """ Returns the (infohash, swift_torrent_hash) pairs of all collected torrents, swift_torrent_hash can be None """
+        results = self._db.fetchall("SELECT infohash, swift_torrent_hash FROM CollectedTorrent")
+        return [(str2bin(infohash), str2bin(roothash) if roothash else None) for infohash, roothash in results]
+
     def getRecentlyCollectedSwiftHashes(self, limit=50):
         sql = """
             SELECT CT.swift_torrent_hash, CT.infohash, CT.num_seeders, CT.num_leechers, T.last_tracker_check, CT.insert_time
@@ -1494,6 +1606,8 @@ class TorrentDBHandler(BasicDBHandler):
         assert 'infohash' in keys
         assert not doSort or ('num_seeders' in keys or 'T.num_seeders' in keys)
 
+        self.flushIndex()
+
         infohash_index = keys.index('infohash')
         swift_hash_index = keys.index('swift_hash') if 'swift_hash' in keys else -1
         swift_torrent_hash_index = keys.index('swift_torrent_hash') if 'swift_torrent_hash' in keys else -1
@@ -1634,66 +1748,38 @@ class TorrentDBHandler(BasicDBHandler):
         return results
 
     def getAutoCompleteTerms(self, keyword, max_terms, limit=100):
-        sql = "SELECT swarmname FROM FullTextIndex WHERE swarmname MATCH ? LIMIT ?"
-        result = self._db.fetchall(sql, (keyword + '*', limit))
-
-        all_terms = set()
-        for line, in result:
-            if len(all_terms) >= max_terms:
-                break
-            i1 = line.find(keyword)
-            i2 = line.find(' ', i1 + len(keyword))
-            all_terms.add(line[i1:i2] if i2 >= 0 else line[i1:])
-
-        if keyword in all_terms:
-            all_terms.remove(keyword)
-        if '' in all_terms:
-            all_terms.remove('')
+        """
+        Returns up to max_terms completions of the last word of keyword, the most frequent terms first.
+        """
+        head, _, prefix = keyword.lower().rpartition(' ')
+        if not prefix:
+            return []
 
-        return list(all_terms)
+        completions = self.term_index.complete(prefix, max_terms)
+        if head:
+            return [head + ' ' + term for term in completions]
+        return completions
 
     def getSearchSuggestion(self, keywords, limit=1):
-        match = [keyword.lower() for keyword in keywords if len(keyword) > 3]
-
-        def lev(a, b):
-            "Calculates the Levenshtein distance between a and b."
-            n, m = len(a), len(b)
-            if n > m:
-                # Make sure n <= m, to use O(min(n,m)) space
-                a, b = b, a
-                n, m = m, n
-
-            current = range(n + 1)
-            for i in range(1, m + 1):
-                previous, current = current, [i] + [0] * n
-                for j in range(1, n + 1):
-                    add, delete = previous[j] + 1, current[j - 1] + 1
-                    change = previous[j - 1]
-                    if a[j - 1] != b[i - 1]:
-                        change = change + 1
-                    current[j] = min(add, delete, change)
-
-            return current[n]
-
-        def levcollate(s1, s2):
-            l1 = sum(sorted([lev(a, b) for a in s1.split() for b in match])[:len(match)])
-            l2 = sum(sorted([lev(a, b) for a in s2.split() for b in match])[:len(match)])
-
-            # return -1 if s1<s2, +1 if s1>s2 else 0
-            if l1 < l2:
-                return -1
-            if l1 > l2:
-                return 1
-            return 0
-
-        cursor = self._db.getCursor()
-        connection = cursor.getconnection()
-        connection.createcollation("leven", levcollate)
+        """
+        Returns up to limit alternative queries, in which the keywords longer than 3 characters that do not occur in any
+        torrent name are replaced by the most similar terms that do.
+        """
+        corrections = []
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if len(keyword) > 3 and keyword not in self.term_index:
+                max_distance = 1 if len(keyword) < 6 else 2
+                corrections.append(self.term_index.correct(keyword, max_distance, limit) or [keyword])
+            else:
+                corrections.append([keyword])
 
-        sql = "SELECT swarmname FROM FullTextIndex WHERE swarmname MATCH ? ORDER By swarmname collate leven ASC LIMIT ?"
-        results = self._db.fetchall(sql, (' OR '.join(['*%s*' % m for m in match]), limit))
-        connection.createcollation("leven", None)
-        return [result[0] for result in results]
+        suggestions = []
+        for i in xrange(max(len(terms) for terms in corrections) if corrections else 0):
+            suggestion = ' '.join(terms[min(i, len(terms) - 1)] for terms in corrections)
+            if suggestion not in suggestions and suggestion != ' '.join(keywords).lower():
+                suggestions.append(suggestion)
+        return suggestions[:limit]
 
     def getTorrentFiles(self, torrent_id):
         sql = "SELECT path, length FROM TorrentFiles WHERE torrent_id = ?"
@@ -2056,6 +2142,9 @@ class ChannelCastDBHandler(BasicDBHandler):
         sql = "DELETE FROM _ChannelMetaData WHERE dipsersy_id > ?"
         self._db.execute_write(sql, (dispersy_id))
 
+        sql = "DELETE FROM ChannelMetaDataLatest WHERE dispersy_id > ?"
+        self._db.execute_write(sql, (dispersy_id,))
+
         sql = "DELETE FROM _Moderations WHERE dipsersy_id > ?"
         self._db.execute_write(sql, (dispersy_id))
 
@@ -2178,6 +2267,8 @@ class ChannelCastDBHandler(BasicDBHandler):
                 update_torrent = "UPDATE or IGNORE Torrent SET swift_hash = ? WHERE infohash = ?"
                 self._db.execute_write(update_torrent, (roothash, infohash))
 
+                self.notifier.notify(NTFY_TORRENTS, NTFY_UPDATE, str2bin(infohash))
+
     def addOrGetChannelTorrentID(self, channel_id, infohash):
         torrent_id = self.torrent_db.addOrGetTorrentID(infohash)
 
@@ -2367,6 +2458,22 @@ class ChannelCastDBHandler(BasicDBHandler):
             deleted_at = long(time())
         self._db.execute_write(sql, (deleted_at, dispersy_id, channel_id))
 
+    def getLatestModification(self, channel_id, channeltorrent_id, playlist_id, type_id):
+        """
+        Returns the (dispersy_id, prev_global_time) of the modification that currently determines the value of
+        type_id, channeltorrent_id and playlist_id are 0 for channel modifications.
+        """
+        sql = "SELECT dispersy_id, prev_global_time FROM ChannelMetaDataLatest WHERE channel_id = ? AND channeltorrent_id = ? AND playlist_id = ? AND type_id = ?"
+        return self._db.fetchone(sql, (channel_id, channeltorrent_id, playlist_id, type_id))
+
+    def setLatestModification(self, channel_id, channeltorrent_id, playlist_id, type_id, dispersy_id, prev_global_time):
+        sql = "INSERT OR REPLACE INTO ChannelMetaDataLatest (channel_id, channeltorrent_id, playlist_id, type_id, dispersy_id, prev_global_time) VALUES (?, ?, ?, ?, ?, ?)"
+        self._db.execute_write(sql, (channel_id, channeltorrent_id, playlist_id, type_id, dispersy_id, prev_global_time))
+
+    def removeLatestModification(self, channel_id, channeltorrent_id, playlist_id, type_id):
+        sql = "DELETE FROM ChannelMetaDataLatest WHERE channel_id = ? AND channeltorrent_id = ? AND playlist_id = ? AND type_id = ?"
+        self._db.execute_write(sql, (channel_id, channeltorrent_id, playlist_id, type_id))
+
     def on_moderation(self, channel_id, dispersy_id, peer_id, by_peer_id, cause, message, timestamp, severity):
         sql = "INSERT OR REPLACE INTO _Moderations (dispersy_id, channel_id, peer_id, by_peer_id, message, cause, time_stamp, severity) VALUES (?,?,?,?,?,?,?,?)"
         self._db.execute_write(sql, (dispersy_id, channel_id, peer_id, by_peer_id, message, cause, timestamp, severity))
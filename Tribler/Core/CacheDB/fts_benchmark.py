@@ -0,0 +1,74 @@
+# Measures writing the FullTextIndex rows of 100k torrents one torrent at a time, as TorrentDBHandler._indexTorrent
+# used to, compared with the batched writes of TorrentDBHandler.flushIndex.  Both run inside a single transaction like
+# SQLiteNoCacheDB does.
+#
+# python -m Tribler.Core.CacheDB.fts_benchmark [ntorrents]
+
+import os
+import sqlite3
+import sys
+from random import Random
+from tempfile import mkstemp
+from time import time
+
+# same as FTS_BATCH_SIZE in SqliteCacheDBHandler, not imported to keep this benchmark independent of the database stack
+FTS_BATCH_SIZE = 1000
+
+WORDS = ["linux", "ubuntu", "debian", "movie", "album", "live", "concert", "season", "episode", "documentary", "nature",
+         "hdtv", "x264", "dvdrip", "remastered", "soundtrack", "collection", "complete", "edition", "2012", "2013"]
+
+
+def rows(rand, ntorrents):
+    for torrent_id in xrange(1, ntorrents + 1):
+        swarmname = " ".join(rand.choice(WORDS) for _ in xrange(rand.randint(2, 8)))
+        filenames = " ".join(rand.choice(WORDS) for _ in xrange(rand.randint(0, 30)))
+        yield torrent_id, swarmname, filenames, "avi mkv"
+
+
+def connect():
+    handle, path = mkstemp(suffix=".sdb")
+    os.close(handle)
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("CREATE TABLE Torrent (torrent_id integer PRIMARY KEY, torrent_file_name text)")
+    connection.execute("CREATE VIEW CollectedTorrent AS SELECT * FROM Torrent WHERE torrent_file_name IS NOT NULL")
+    connection.execute("CREATE VIRTUAL TABLE FullTextIndex USING fts3(swarmname, filenames, fileextensions)")
+    return path, connection
+
+
+def per_torrent(connection, values):
+    for row in values:
+        connection.execute("SELECT torrent_id FROM CollectedTorrent WHERE torrent_id = ?", (row[0],)).fetchone()
+        connection.execute("DELETE FROM FullTextIndex WHERE rowid = ?", (row[0],))
+        connection.execute("INSERT INTO FullTextIndex (rowid, swarmname, filenames, fileextensions) VALUES(?,?,?,?)", row)
+
+
+def batched(connection, values):
+    for i in xrange(0, len(values), FTS_BATCH_SIZE):
+        batch = values[i:i + FTS_BATCH_SIZE]
+        for j in xrange(0, len(batch), 500):
+            torrent_ids = [row[0] for row in batch[j:j + 500]]
+            sql = "SELECT torrent_id FROM CollectedTorrent WHERE torrent_id IN (" + ",".join("?" * len(torrent_ids)) + ")"
+            connection.execute(sql, torrent_ids).fetchall()
+        connection.executemany("DELETE FROM FullTextIndex WHERE rowid = ?", [(row[0],) for row in batch])
+        connection.executemany("INSERT INTO FullTextIndex (rowid, swarmname, filenames, fileextensions) VALUES(?,?,?,?)", batch)
+    connection.execute("INSERT INTO FullTextIndex(FullTextIndex) VALUES('optimize')")
+
+
+def benchmark(ntorrents):
+    values = list(rows(Random(42), ntorrents))
+    for name, func in (("per torrent", per_torrent), ("batched", batched)):
+        path, connection = connect()
+        try:
+            t1 = time()
+            connection.execute("BEGIN")
+            func(connection, values)
+            connection.execute("COMMIT")
+            t2 = time()
+            print "%-12s %7d torrents  %6.2fs  %8.0f torrents/s" % (name, ntorrents, t2 - t1, ntorrents / (t2 - t1))
+        finally:
+            connection.close()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
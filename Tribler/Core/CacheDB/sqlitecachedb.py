@@ -45,10 +45,12 @@ from Tribler.dispersy.util import blocking_call_on_reactor_thread, \
 # Changed from 17 to 18 added swift-thumbnails/video-info metadatatypes
 # Changed from 18 to 19 cleaned peer table, added tracker tables.
 # Changed from 19 to 20 added metdata message and data tables.
+# Changed from 22 to 23 added ChannelMetaDataLatest table.
+# Changed from 23 to 24 added MetadataMessage indices.
 
 # Arno, 2012-08-01: WARNING You must also update the version number that is
 # written to the DB in the schema_sdb_v*.sql file!!!
-CURRENT_MAIN_DB_VERSION = 22
+CURRENT_MAIN_DB_VERSION = 24
 
 config_dir = None
 CREATE_SQL_FILE = None
@@ -2211,6 +2213,33 @@ CREATE TABLE MetadataData (
             self.execute_write("DROP INDEX IF EXISTS idx_search_torrent")
             self.database_update.release()
 
+        if fromver < 23:
+            # the table is filled lazily by the ChannelCommunity, the first time the latest modification is requested
+            self.database_update.acquire()
+            self.execute_write("""
+            CREATE TABLE IF NOT EXISTS ChannelMetaDataLatest (
+              channel_id            integer         NOT NULL,
+              channeltorrent_id     integer         NOT NULL DEFAULT (0),
+              playlist_id           integer         NOT NULL DEFAULT (0),
+              type_id               integer         NOT NULL,
+              dispersy_id           integer         NOT NULL,
+              prev_global_time      integer,
+              PRIMARY KEY (channel_id, channeltorrent_id, playlist_id, type_id),
+              FOREIGN KEY (type_id) REFERENCES MetaDataTypes(id) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS MeLatestDispersyIndex ON ChannelMetaDataLatest(dispersy_id);
+            """)
+            self.database_update.release()
+
+        if fromver < 24:
+            self.database_update.acquire()
+            self.execute_write("""
+            CREATE INDEX IF NOT EXISTS MetaMsgInfohashIndex ON MetadataMessage(infohash);
+            CREATE INDEX IF NOT EXISTS MetaMsgRoothashIndex ON MetadataMessage(roothash);
+            CREATE INDEX IF NOT EXISTS MetaMsgDispersyIndex ON MetadataMessage(dispersy_id);
+            """)
+            self.database_update.release()
+
     def clean_db(self, vacuum=False):
         self.execute_write("DELETE FROM TorrentFiles where torrent_id in (select torrent_id from CollectedTorrent)")
         self.execute_write("DELETE FROM Torrent where name is NULL and torrent_id not in (select torrent_id from _ChannelTorrents)")
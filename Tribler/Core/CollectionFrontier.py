@@ -0,0 +1,124 @@
+# see LICENSE.txt for license information
+#
+# The set of torrents that are collected or being collected, used by the RemoteTorrentHandler to drop requests for
+# torrents it already has or is already requesting without querying the database.  Collected infohashes and roothashes
+# are kept in a bloom filter, a false positive causes a torrent not to be collected by the walker-driven collecting,
+# explicit requests of the user do not consult the frontier.
+
+import logging
+import threading
+from time import time
+
+from Tribler.dispersy.bloomfilter import BloomFilter
+
+# the false positive rate of the bloom filter of collected torrents
+COLLECTED_ERROR_RATE = 0.001
+# a request that did not result in a torrent within this many seconds is forgotten and can be made again
+IN_FLIGHT_TIMEOUT = 5 * 60
+
+
+class CollectionFrontier(object):
+
+    """
+    Keeps track of collected and in-flight torrents.  Torrents are identified by their infohash, or by their roothash
+    if the infohash is unknown.  Can be called by any thread.
+    """
+
+    def __init__(self, capacity):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.capacity = max(1000, capacity)
+        self._collected = BloomFilter(COLLECTED_ERROR_RATE, self.capacity)
+        self._nr_collected = 0
+
+        # hash:time the first request was made
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+        self.nr_requests = 0
+        self.nr_duplicates = 0
+        self.nr_collected_in_flight = 0
+        self.total_time_to_collect = 0.0
+
+    def add_collected(self, hashes):
+        """
+        Adds torrents that were already collected, e.g. the collected torrents in the database at startup.  hashes is a
+        list of (infohash, roothash) tuples, either can be None.
+        """
+        with self._lock:
+            for infohash, roothash in hashes:
+                self._add_collected(infohash, roothash)
+
+    def _add_collected(self, infohash, roothash):
+        for hash_ in (infohash, roothash):
+            if hash_:
+                self._collected.add(hash_)
+        self._nr_collected += 1
+
+    def is_full(self):
+        """
+        Returns True if the bloom filter contains as many torrents as it was created for, beyond which its false
+        positive rate exceeds COLLECTED_ERROR_RATE.  It should then be replaced by a larger CollectionFrontier.
+        """
+        return self._nr_collected >= self.capacity
+
+    def is_collected(self, infohash=None, roothash=None):
+        with self._lock:
+            return any(hash_ in self._collected for hash_ in (infohash, roothash) if hash_)
+
+    def is_in_flight(self, infohash=None, roothash=None):
+        with self._lock:
+            requested_at = self._in_flight.get(infohash or roothash)
+            return requested_at is not None and requested_at + IN_FLIGHT_TIMEOUT > time()
+
+    def request(self, infohash=None, roothash=None):
+        """
+        Registers a request for a torrent.
+
+        @return False if the torrent is already collected or being requested, in which case the request is a duplicate.
+        """
+        key = infohash or roothash
+        now = time()
+        with self._lock:
+            self.nr_requests += 1
+
+            requested_at = self._in_flight.get(key)
+            if (requested_at is not None and requested_at + IN_FLIGHT_TIMEOUT > now) or \
+                    any(hash_ in self._collected for hash_ in (infohash, roothash) if hash_):
+                self.nr_duplicates += 1
+                return False
+
+            self._in_flight[key] = now
+            if len(self._in_flight) % 1000 == 0:
+                self._expire(now)
+            return True
+
+    def collected(self, infohash=None, roothash=None):
+        """
+        Marks a torrent as collected, recording the time since its first request if it was in flight.
+        """
+        now = time()
+        with self._lock:
+            for key in (infohash, roothash):
+                requested_at = self._in_flight.pop(key, None) if key else None
+                if requested_at is not None:
+                    self.nr_collected_in_flight += 1
+                    self.total_time_to_collect += now - requested_at
+            self._add_collected(infohash, roothash)
+
+    def _expire(self, now):
+        for key, requested_at in self._in_flight.items():
+            if requested_at + IN_FLIGHT_TIMEOUT <= now:
+                del self._in_flight[key]
+
+    def get_statistics(self):
+        """
+        @return A dict with the number of torrents in flight, the fraction of duplicate requests and the mean number of
+        seconds it took to collect a requested torrent.
+        """
+        with self._lock:
+            self._expire(time())
+            return {"in_flight": len(self._in_flight),
+                    "collected": self._nr_collected,
+                    "duplicate_rate": self.nr_duplicates / float(self.nr_requests) if self.nr_requests else 0.0,
+                    "time_to_collect": self.total_time_to_collect / self.nr_collected_in_flight if self.nr_collected_in_flight else 0.0}
@@ -8,6 +8,7 @@ from Tribler.Core.simpledefs import UPLOAD, DLSTATUS_STOPPED_ON_ERROR, \
     DLSTATUS_SEEDING, DLSTATUS_DOWNLOADING, DLSTATUS_WAITING4HASHCHECK, \
     DLSTATUS_STOPPED
 from Tribler.Core.Base import Serializable
+from Tribler.Core.Utilities.bitfield import count_available
 
 
 class DownloadState(Serializable):
@@ -92,33 +93,16 @@ class DownloadState(Serializable):
         if stats and stats.get('stats', None):
             # for pieces complete
             if not self.filepieceranges:
-                self.haveslice = stats['stats'].have  # is copy of network engine list
+                self.haveslice = stats['stats'].have  # is a Bitfield copy of network engine list
             else:
                 # For get_files_completion()
                 self.haveslice_total = stats['stats'].have
 
                 selected_files = self.download.get_selected_files()
                 # Show only pieces complete for the selected ranges of files
-                totalpieces = 0
-                for t, tl, o, f in self.filepieceranges:
-                    if f in selected_files or not selected_files:
-                        diff = tl - t
-                        totalpieces += diff
-
-                # print >>sys.stderr,"DownloadState: get_pieces_complete",totalpieces
-                haveslice = [False] * totalpieces
-                have = 0
-                index = 0
-                for t, tl, o, f in self.filepieceranges:
-                    if f in selected_files or not selected_files:
-                        for piece in range(t, tl):
-                            haveslice[index] = stats['stats'].have[piece]
-                            if haveslice[index]:
-                                have += 1
-
-                            index += 1
-                self.haveslice = haveslice
-                if have == len(haveslice) and self.status == DLSTATUS_DOWNLOADING:
+                self.haveslice = self.haveslice_total.select([(t, tl) for t, tl, o, f in self.filepieceranges
+                                                              if f in selected_files or not selected_files])
+                if self.haveslice.complete() and self.status == DLSTATUS_DOWNLOADING:
                     # we have all pieces of the selected files
                     self.status = DLSTATUS_SEEDING
                     self.progress = 1.0
@@ -278,7 +262,7 @@ class DownloadState(Serializable):
         if self.haveslice is None:
             return []
         else:
-            return self.haveslice
+            return self.haveslice.toboollist()
 
     def get_pieces_total_complete(self):
         """ Returns the number of total and completed pieces
@@ -287,7 +271,7 @@ class DownloadState(Serializable):
         if self.haveslice is None:
             return (0, 0)
         else:
-            return (len(self.haveslice), sum(self.haveslice))
+            return (len(self.haveslice), self.haveslice.get_numtrue())
 
     def get_files_completion(self):
         """ Returns a list of filename, progress tuples indicating the progress
@@ -308,12 +292,7 @@ class DownloadState(Serializable):
                     # niels: ranges are from-to (inclusive ie if a file consists one piece t and tl will be the same)
                     total_pieces = tl - t
                     if total_pieces and getattr(self, 'haveslice_total', False):
-                        completed = 0
-                        for index in range(t, tl):
-                            if self.haveslice_total[index]:
-                                completed += 1
-
-                        completion.append((f, completed / (total_pieces * 1.0)))
+                        completion.append((f, self.haveslice_total.get_completion(t, tl)))
                     elif f in files:
                         completion.append((f, 0.0))
         elif files:
@@ -346,29 +325,29 @@ class DownloadState(Serializable):
         of this + the average of all additional pieces.
         """
         nr_seeders_complete = 0
-        merged_bitfields = None
+        leecher_bitfields = []
 
         peers = self.get_peerlist()
         for peer in peers:
             completed = peer.get('completed', 0)
-            have = peer.get('have', [])
+            have = peer.get('have', None)
 
-            if completed == 1 or have and all(have):
+            if completed == 1 or have and have.complete():
                 nr_seeders_complete += 1
-            else:
-                if merged_bitfields == None:
-                    merged_bitfields = [0] * len(have)
+            elif have is not None:
+                leecher_bitfields.append(have)
 
-                for i in range(len(have)):
-                    if have[i]:
-                        merged_bitfields[i] += 1
+        merged_bitfields = None
+        if leecher_bitfields:
+            length = len(leecher_bitfields[0])
+            merged_bitfields = count_available([have for have in leecher_bitfields if len(have) == length], length)
 
         if merged_bitfields:
             # count the number of complete copies due to overlapping leecher bitfields
             nr_leechers_complete = min(merged_bitfields)
 
             # detect remainder of bitfields which are > 0
-            nr_more_than_min = len([x for x in merged_bitfields if x > nr_leechers_complete])
+            nr_more_than_min = len(merged_bitfields) - merged_bitfields.count(nr_leechers_complete)
             fraction_additonal = float(nr_more_than_min) / len(merged_bitfields)
 
             return nr_seeders_complete + nr_leechers_complete + fraction_additonal
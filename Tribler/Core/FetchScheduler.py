@@ -0,0 +1,153 @@
+# see LICENSE.txt for license information
+#
+# Bookkeeping for fetching torrents from several sources at once.  A fetch is started from one source, a backup source
+# joins the race when the first one takes longer than usual, and when one source delivers the others are cancelled.
+# Timeouts adapt to the latencies observed per source, using the estimator TCP uses for its retransmission timeout
+# (Jacobson/Karels).
+
+import threading
+from time import time
+
+# a fetch that did not complete within this many seconds is dropped, freeing its slot in the window
+FETCH_TIMEOUT = 120.0
+
+
+class LatencyEstimator(object):
+
+    """
+    Smoothed latency and latency deviation of the successful fetches from one source.
+    """
+
+    ALPHA = 1 / 8.0
+    BETA = 1 / 4.0
+
+    def __init__(self, initial_timeout, min_timeout, max_timeout):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+        self.latency = None
+        self.deviation = None
+        self.nr_samples = 0
+
+    def add(self, latency):
+        if self.latency is None:
+            self.latency = latency
+            self.deviation = latency / 2.0
+        else:
+            self.deviation += self.BETA * (abs(latency - self.latency) - self.deviation)
+            self.latency += self.ALPHA * (latency - self.latency)
+        self.nr_samples += 1
+
+    def get_timeout(self):
+        """
+        Returns the number of seconds after which a fetch from this source has most likely failed.
+        """
+        if self.latency is None:
+            return self.initial_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.latency + 4 * self.deviation))
+
+    def get_race_delay(self, default):
+        """
+        Returns the number of seconds after which a fetch from this source is slower than usual, and a backup source
+        should join the race.  Returns default as long as no latencies were observed.
+        """
+        if self.latency is None:
+            return default
+        return min(self.max_timeout, self.latency + self.deviation)
+
+
+class FetchScheduler(object):
+
+    """
+    Keeps the fetches in progress, at most window of them, and the sources racing for each of them.  Sources are
+    identified by a name, each with its own LatencyEstimator.  Can be called by any thread.
+    """
+
+    def __init__(self, window, estimators):
+        self.window = window
+        self.estimators = estimators
+
+        # key:{source:time started}
+        self._fetches = {}
+        self._lock = threading.Lock()
+
+        self.nr_started = 0
+        self.nr_succeeded = 0
+        self.nr_failed = 0
+        self.nr_cancelled = 0
+
+    def has_room(self):
+        with self._lock:
+            self._expire(time())
+            return len(self._fetches) < self.window
+
+    def is_fetching(self, key, source=None):
+        with self._lock:
+            sources = self._fetches.get(key)
+            return sources is not None and (source is None or source in sources)
+
+    def start(self, key, source):
+        """
+        Adds source to the race for key, starting a new fetch if key is not being fetched yet.
+        """
+        with self._lock:
+            sources = self._fetches.setdefault(key, {})
+            if source not in sources:
+                sources[source] = time()
+                self.nr_started += 1
+
+    def succeeded(self, key, source, record=True):
+        """
+        Ends the fetch of key, source delivered.
+
+        @param record Whether to add the latency to the estimator of source, False if it is recorded elsewhere.
+        @return The other sources that were racing for key, which should be cancelled.
+        """
+        now = time()
+        with self._lock:
+            sources = self._fetches.pop(key, {})
+            if source in sources:
+                started = sources.pop(source)
+                if record:
+                    self.estimators[source].add(now - started)
+                self.nr_succeeded += 1
+            self.nr_cancelled += len(sources)
+            return sources.keys()
+
+    def failed(self, key, source):
+        """
+        Removes source from the race for key.
+
+        @return True if no other source is fetching key.
+        """
+        with self._lock:
+            sources = self._fetches.get(key, {})
+            if sources.pop(source, None) is not None:
+                self.nr_failed += 1
+            if not sources:
+                self._fetches.pop(key, None)
+                return True
+            return False
+
+    def is_expired(self, key, source):
+        """
+        Returns True if source is fetching key for longer than its adaptive timeout.
+        """
+        with self._lock:
+            started = self._fetches.get(key, {}).get(source)
+            return started is not None and time() - started > self.estimators[source].get_timeout()
+
+    def get_race_delay(self, source, default):
+        return self.estimators[source].get_race_delay(default)
+
+    def get_timeout(self, source):
+        return self.estimators[source].get_timeout()
+
+    def _expire(self, now):
+        for key, sources in self._fetches.items():
+            if all(now - started > FETCH_TIMEOUT for started in sources.itervalues()):
+                del self._fetches[key]
+
+    def __len__(self):
+        return len(self._fetches)
@@ -20,6 +20,7 @@ from Tribler.Core.APIImplementation import maketorrent
 from Tribler.Core.osutils import fix_filebasename
 from Tribler.Core.TorrentDef import TorrentDefNoMetainfo, TorrentDef
 from Tribler.Core.Utilities.Crypto import sha
+from Tribler.Core.Utilities.bitfield import Bitfield
 from Tribler.Core.CacheDB.Notifier import Notifier
 from Tribler.Core.Libtorrent import checkHandleAndSynchronize, waitForHandleAndSynchronize
 
@@ -397,7 +398,7 @@ class LibtorrentDownloadImpl(DownloadConfigInterface):
 
     @checkHandleAndSynchronize(0.0)
     def get_byte_progress(self, byteranges, consecutive=False):
-        pieces = []
+        ranges = []
         for fileindex, bytes_begin, bytes_end in byteranges:
             if fileindex >= 0:
                 # Ensure the we remain within the file's boundaries
@@ -410,12 +411,37 @@ class LibtorrentDownloadImpl(DownloadConfigInterface):
                 startpiece = max(startpiece, 0)
                 endpiece = min(endpiece, self.handle.get_torrent_info().num_pieces())
 
-                pieces += range(startpiece, endpiece)
+                if startpiece < endpiece:
+                    ranges.append((startpiece, endpiece))
             else:
                 self._logger.info("LibtorrentDownloadImpl: could not get progress for incorrect fileindex")
 
-        pieces = list(set(pieces))
-        return self.get_piece_progress(pieces, consecutive)
+        # merge overlapping ranges, every piece is counted once
+        merged = []
+        for startpiece, endpiece in sorted(ranges):
+            if merged and startpiece <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], endpiece))
+            else:
+                merged.append((startpiece, endpiece))
+        return self.get_range_progress(merged, consecutive)
+
+    @checkHandleAndSynchronize(0.0)
+    def get_range_progress(self, ranges, consecutive=False):
+        """ Returns the fraction of the pieces in the sorted, non-overlapping (startpiece, endpiece) ranges that
+        we have, up to the first missing piece when consecutive is True. """
+        pieces_all = sum(endpiece - startpiece for startpiece, endpiece in ranges)
+        if not pieces_all:
+            return 1.0
+
+        status = self.handle.status()
+        if status:
+            bitfield = Bitfield(len(status.pieces), fromarray=status.pieces)
+            if consecutive:
+                pieces_have = bitfield.count_consecutive(ranges)
+            else:
+                pieces_have = sum(bitfield.count(startpiece, endpiece) for startpiece, endpiece in ranges)
+            return float(pieces_have) / pieces_all
+        return 0.0
 
     @checkHandleAndSynchronize()
     def set_piece_priority(self, pieces_need, priority):
@@ -731,7 +757,7 @@ class LibtorrentDownloadImpl(DownloadConfigInterface):
         numTotPeers = status.num_incomplete if status.num_incomplete >= 0 else status.list_peers
         numleech = status.num_peers - status.num_seeds
         numseeds = status.num_seeds
-        pieces = status.pieces
+        pieces = Bitfield(len(status.pieces), fromarray=status.pieces)
         upTotal = status.all_time_upload
         downTotal = status.all_time_download
         return LibtorrentStatisticsResponse(numTotSeeds, numTotPeers, numseeds, numleech, pieces, upTotal, downTotal)
@@ -809,7 +835,7 @@ class LibtorrentDownloadImpl(DownloadConfigInterface):
             peer_dict['utotal'] = peer_info.total_upload
             peer_dict['dtotal'] = peer_info.total_download
             peer_dict['completed'] = peer_info.progress
-            peer_dict['have'] = peer_info.pieces
+            peer_dict['have'] = Bitfield(len(peer_info.pieces), fromarray=peer_info.pieces)
             peer_dict['speed'] = peer_info.remote_dl_rate
             peer_dict['country'] = peer_info.country
             peer_dict['connection_type'] = peer_info.connection_type
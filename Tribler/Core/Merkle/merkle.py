@@ -5,12 +5,14 @@ Reference Implementation of Merkle hash torrent extension, as now
 standardized in http://www.bittorrent.org/beps/bep_0030.html (yay!)
 """
 
-from math import log, floor
 from Tribler.Core.Utilities.Crypto import sha
 import logging
 
 logger = logging.getLogger(__name__)
 
+HASH_LENGTH = 20
+EMPTY_HASH = '\x00' * HASH_LENGTH
+
 # External classes
 
 
@@ -21,24 +23,37 @@ class MerkleTree:
         Create a Merkle hash tree
 
         When creating a .torrent:
-            root_hash is None and hashes is not None
+            root_hash is None and hashes is not None, or
+            root_hash is None and hashes is None, followed by a call to
+            append_piece_hash() for every piece as soon as it is hashed
         When creating an initial seeder:
             root_hash is None and hashes is not None
             (root_hash is None to allow comparison with the calculated
              root hash and the one in the .torrent)
         When creating a downloader:
             root_hash is not None and hashes is None
+
+        The tree is stored in a single bytearray, the hash of node OFFSET
+        is at tree[OFFSET * HASH_LENGTH:(OFFSET + 1) * HASH_LENGTH].  The
+        children of node OFFSET are 2 * OFFSET + 1 and 2 * OFFSET + 2.
         """
         self.npieces = len2npieces(piece_size, total_length)
         self.treeheight = get_tree_height(self.npieces)
         self.tree = create_tree(self.treeheight)
+        # nodes whose hash is known to be correct, see check_hashes_batch()
+        self.verified = bytearray(len(self.tree) / HASH_LENGTH)
+        # the number of piece hashes given to append_piece_hash()
+        self.nappended = 0
         if hashes is None:
             self.root_hash = root_hash
+            if root_hash is not None:
+                set_hash(self.tree, 0, root_hash)
+                self.verified[0] = 1
         else:
             fill_tree(self.tree, self.treeheight, self.npieces, hashes)
             # root_hash is None during .torrent generation
             if root_hash is None:
-                self.root_hash = self.tree[0]
+                self.root_hash = get_hash(self.tree, 0)
             else:
                 raise AssertionError("merkle: if hashes not None, root_hash must be")
 
@@ -48,14 +63,60 @@ class MerkleTree:
     def compare_root_hashes(self, other):
         return self.root_hash == other
 
+    def append_piece_hash(self, piece_hash):
+        """
+        Incrementally builds the tree: adds the hash of the next piece and
+        calculates every parent whose children are complete.  The root hash
+        is available once the hash of the last piece has been appended.
+        """
+        assert self.root_hash is None, "merkle: tree is already complete"
+        offset = (1 << self.treeheight) - 1 + self.nappended
+        set_hash(self.tree, offset, piece_hash)
+        self.nappended += 1
+
+        # a right child completes its parent
+        tree = self.tree
+        while offset and not offset & 1:
+            start = (offset - 1) * HASH_LENGTH
+            offset = (offset - 1) >> 1
+            set_hash(tree, offset, sha(tree[start:start + 2 * HASH_LENGTH]).digest())
+
+        if self.nappended == self.npieces:
+            complete_right_edge(tree, self.treeheight, self.npieces)
+            self.root_hash = get_hash(tree, 0)
+
     def get_hashes_for_piece(self, index):
         return get_hashes_for_piece(self.tree, self.treeheight, index)
 
     def check_hashes(self, hashlist):
-        return check_tree_path(self.root_hash, self.treeheight, hashlist)
+        return check_tree_path(self.root_hash, self.treeheight, hashlist, self.tree, self.verified)
+
+    def check_hashes_batch(self, hashlists, piece_hashes=None):
+        """
+        Checks several hash lists, as returned by get_hashes_for_piece.
+        The hashes of a correct list that were verified are stored in the
+        tree, including the parents calculated while checking, hence
+        checking the next list usually stops at the first node shared with
+        an earlier one.  Hashes after that node, and nodes that were
+        already verified, are left alone.  Verified piece hashes are stored
+        in PIECE_HASHES when given.
+        Returns a list of booleans.
+        """
+        results = []
+        for hashlist in hashlists:
+            checked = []
+            result = check_tree_path(self.root_hash, self.treeheight, hashlist, self.tree, self.verified, checked)
+            if result:
+                store_checked(checked, self.tree, self.verified, self.treeheight, piece_hashes)
+            results.append(result)
+        return results
 
     def update_hash_admin(self, hashlist, piece_hashes):
-        update_hash_admin(hashlist, self.tree, self.treeheight, piece_hashes)
+        """
+        Stores the hashes of HASHLIST that can be verified, and its verified
+        piece hashes in PIECE_HASHES.
+        """
+        return self.check_hashes_batch([hashlist], piece_hashes)[0]
 
     def get_piece_hashes(self):
         """
@@ -68,7 +129,7 @@ class MerkleTree:
 def create_fake_hashes(info):
     total_length = calc_total_length(info)
     npieces = len2npieces(info['piece length'], total_length)
-    return ['\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'] * npieces
+    return [EMPTY_HASH] * npieces
 
 
 # Internal functions
@@ -97,31 +158,45 @@ def calc_total_length(info):
 
 def get_tree_height(npieces):
     logger.debug("merkle: number of pieces is %s", npieces)
-    height = log(npieces, 2)
-    if height - floor(height) > 0.0:
-        height = int(height) + 1
-    else:
-        height = int(height)
+    # the smallest height such that 2 ** height >= npieces
+    height = max(0, npieces - 1).bit_length()
     logger.debug("merkle: tree height is %s", height)
     return height
 
 
+_empty_subtree_hashes = [EMPTY_HASH]
+
+
+def get_empty_subtree_hash(height):
+    """
+    Returns the hash of a subtree of HEIGHT whose leaves are all unused,
+    i.e. EMPTY_HASH.
+    """
+    while len(_empty_subtree_hashes) <= height:
+        _empty_subtree_hashes.append(sha(_empty_subtree_hashes[-1] * 2).digest())
+    return _empty_subtree_hashes[height]
+
+
 def create_tree(height):
     # Create tree that has enough leaves to hold all hashes
-    treesize = int(pow(2, height + 1) -1) # subtract unused tail
+    treesize = (1 << (height + 1)) - 1
     logger.debug("merkle: treesize %s", treesize)
-    tree = ['\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'] * treesize
-    return tree
+    return bytearray(treesize * HASH_LENGTH)
+
+
+def get_hash(tree, offset):
+    return str(tree[offset * HASH_LENGTH:(offset + 1) * HASH_LENGTH])
+
+
+def set_hash(tree, offset, digest):
+    tree[offset * HASH_LENGTH:(offset + 1) * HASH_LENGTH] = digest
 
 
 def fill_tree(tree, height, npieces, hashes):
     # 1. Fill bottom of tree with hashes
-    startoffset = int(pow(2, height) - 1)
+    startoffset = (1 << height) - 1
     logger.debug("merkle: bottom of tree starts at %s", startoffset)
-    for offset in range(startoffset, startoffset + npieces):
-        # print >> sys.stderr,"merkle: copying",offset
-        # print >> sys.stderr,"merkle: hashes[",offset-startoffset,"]=",str(hashes[offset-startoffset])
-        tree[offset] = hashes[offset - startoffset]
+    tree[startoffset * HASH_LENGTH:(startoffset + npieces) * HASH_LENGTH] = ''.join(hashes[:npieces])
     # 2. Note that unused leaves are NOT filled. It may be a good idea to fill
     # them as hashing 0 values may create a security problem. However, the
     # filler values would have to be known to any initial seeder, otherwise it
@@ -131,134 +206,139 @@ def fill_tree(tree, height, npieces, hashes):
     # instead of 0s is any safer, cryptographically speaking. Hence, we stick
     # with 0 for the moment
 
-    # 3. Calculate higher level hashes from leaves
+    # 3. Calculate higher level hashes from leaves, one level at a time.
+    # Subtrees without used leaves all have the same hash, they are not
+    # calculated
+    nnodes = npieces
     for level in range(height, 0, -1):
         logger.debug("merkle: calculating level %s", level)
-        for offset in range(int(pow(2, level) - 1), int(pow(2, level +1)-2), 2):
-            # print >> sys.stderr,"merkle: data offset",offset
-            [parentstartoffset, parentoffset] = get_parent_offset(offset, level)
-            # print >> sys.stderr,"merkle: parent offset",parentoffset
-            data = tree[offset] + tree[offset +1]
-            digester = sha()
-            digester.update(data)
-            digest = digester.digest()
-            tree[parentoffset] = digest
-    # for offset in range(0,treesize-1):
-    #        print offset,"HASH",str(tree[offset])
+        fill_empty_subtrees(tree, height, level, nnodes)
+        levelstart = ((1 << level) - 1) * HASH_LENGTH
+        digests = [sha(tree[offset:offset + 2 * HASH_LENGTH]).digest()
+                   for offset in xrange(levelstart, levelstart + nnodes * HASH_LENGTH, 2 * HASH_LENGTH)]
+        parentstart = ((1 << (level - 1)) - 1) * HASH_LENGTH
+        tree[parentstart:parentstart + len(digests) * HASH_LENGTH] = ''.join(digests)
+        nnodes = len(digests)
     return tree
 
 
+def fill_empty_subtrees(tree, height, level, nnodes):
+    """
+    Sets the nodes of LEVEL after the first NNODES to the hash of an empty
+    subtree.
+    """
+    levelstart = (1 << level) - 1
+    nempty = (1 << level) - nnodes
+    if nempty > 0:
+        tree[(levelstart + nnodes) * HASH_LENGTH:(levelstart + nnodes + nempty) * HASH_LENGTH] = \
+            get_empty_subtree_hash(height - level) * nempty
+
+
+def complete_right_edge(tree, height, npieces):
+    """
+    Calculates the nodes that have both used and unused leaves below them,
+    after all NPIECES piece hashes have been appended.
+    """
+    nnodes = npieces
+    for level in range(height, 0, -1):
+        fill_empty_subtrees(tree, height, level, nnodes)
+        # the parent of the last pair of used nodes
+        left = (1 << level) - 1 + ((nnodes - 1) & ~1)
+        set_hash(tree, left >> 1, sha(tree[left * HASH_LENGTH:(left + 2) * HASH_LENGTH]).digest())
+        nnodes = (nnodes + 1) / 2
+
+
+def get_sibling_offset(offset):
+    return offset - 1 if offset % 2 == 0 else offset + 1
+
+
 def get_hashes_for_piece(tree, height, index):
-    startoffset = int(pow(2, height) - 1)
-    myoffset = startoffset + index
+    myoffset = (1 << height) - 1 + index
     logger.debug("merkle: myoffset %s", myoffset)
     # 1. Add piece's own hash
-    hashlist = [[myoffset, tree[myoffset]]]
+    hashlist = [[myoffset, get_hash(tree, myoffset)]]
+    if height == 0:
+        return hashlist
     # 2. Add hash of piece's sibling, left or right
-    if myoffset % 2 == 0:
-        siblingoffset = myoffset - 1
-    else:
-        siblingoffset = myoffset + 1
-    logger.debug("merkle: siblingoffset %s", siblingoffset)
-    if siblingoffset != -1:
-        hashlist.append([siblingoffset, tree[siblingoffset]])
-    # 3. Add hashes of uncles
-    uncleoffset = myoffset
-    for level in range(height, 0, -1):
-        uncleoffset = get_uncle_offset(uncleoffset, level)
-        logger.debug("merkle: uncleoffset %s", uncleoffset)
-        hashlist.append([uncleoffset, tree[uncleoffset]])
+    siblingoffset = get_sibling_offset(myoffset)
+    hashlist.append([siblingoffset, get_hash(tree, siblingoffset)])
+    # 3. Add hashes of uncles, and the root
+    parentoffset = (myoffset - 1) >> 1
+    while parentoffset:
+        uncleoffset = get_sibling_offset(parentoffset)
+        hashlist.append([uncleoffset, get_hash(tree, uncleoffset)])
+        parentoffset = (parentoffset - 1) >> 1
+    hashlist.append([0, get_hash(tree, 0)])
     return hashlist
 
 
-def check_tree_path(root_hash, height, hashlist):
+def check_tree_path(root_hash, height, hashlist, tree=None, verified=None, checked=None):
     """
     The hashes should be in the right order in the hashlist, otherwise
     the peer will be kicked. The hashlist parameter is assumed to be
     of the right type, and contain values of the right type as well.
     The exact values should be checked for validity here.
+
+    When TREE and VERIFIED are given, checking stops at the first
+    calculated node whose hash is already VERIFIED in TREE.  When CHECKED
+    is a list, the (offset, hash) pairs that take part in the check are
+    appended to it: the piece, the siblings and the calculated parents.
+    Hashes in the list after the node where checking stopped are not.
     """
-    maxoffset = int(pow(2, height + 1) -2)
-    mystartoffset = int(pow(2, height) - 1)
-    i = 0
-    a = hashlist[i]
-    if a[0] < 0 or a[0] > maxoffset:
+    if len(hashlist) < height + 1:
         return False
-    i += 1
-    b = hashlist[i]
-    if b[0] < 0 or b[0] > maxoffset:
+    myoffset, digest = hashlist[0]
+    if not (1 << height) - 1 <= myoffset < (1 << (height + 1)) - 1:
         return False
-    i += 1
-    myindex = a[0] - mystartoffset
-    sibindex = b[0] - mystartoffset
-    for level in range(height, 0, -1):
-        logger.debug("merkle: checking level %s", level)
-        a = check_fork(a, b, level)
-        b = hashlist[i]
-        if b[0] < 0 or b[0] > maxoffset:
+    if checked is not None:
+        checked.append((myoffset, digest))
+
+    for i in range(1, height + 1):
+        siblingoffset, siblingdigest = hashlist[i]
+        if siblingoffset != get_sibling_offset(myoffset):
             return False
-        i += 1
-    logger.debug("merkle: ROOT HASH %s == %s", repr(str(root_hash)), repr(str(a[1])))
-    if a[1] == root_hash:
-        return True
-    else:
-        return False
+        if checked is not None:
+            checked.append((siblingoffset, siblingdigest))
 
+        if myoffset > siblingoffset:
+            data = siblingdigest + digest
+        else:
+            data = digest + siblingdigest
+        digest = sha(data).digest()
+        myoffset = (myoffset - 1) >> 1
 
-def update_hash_admin(hashlist, tree, height, hashes):
-    mystartoffset = int(pow(2, height) - 1)
-    for i in range(0, len(hashlist)):
-        if i < 2:
+        if verified is not None and verified[myoffset]:
+            logger.debug("merkle: reached verified node %s", myoffset)
+            return digest == get_hash(tree, myoffset)
+        if checked is not None:
+            checked.append((myoffset, digest))
+
+    logger.debug("merkle: ROOT HASH %s == %s", repr(str(root_hash)), repr(str(digest)))
+    return digest == root_hash
+
+
+def store_checked(checked, tree, verified, height, hashes=None):
+    """
+    Stores the (offset, hash) pairs in CHECKED, as collected by a successful
+    check_tree_path, such that we incrementally learn the tree and can pass
+    it on to others.  Nodes that are already VERIFIED are never
+    overwritten.  The hashes of pieces are stored in HASHES when given.
+    """
+    mystartoffset = (1 << height) - 1
+    for offset, digest in checked:
+        if hashes is not None:
             # me and sibling real hashes of piece data, save them
-            index = hashlist[i][0] - mystartoffset
+            index = offset - mystartoffset
             # ignore siblings that are just tree filler
-            if index < len(hashes):
-                logger.debug("merkle: update_hash_admin: saving hash of %s", index)
-                hashes[index] = hashlist[i][1]
-        # put all hashes in tree, such that we incrementally learn it
-        # and can pass them on to others
-        tree[hashlist[i][0]] = hashlist[i][1]
-
-
-def check_fork(a, b, level):
-    myoffset = a[0]
-    siblingoffset = b[0]
-    if myoffset > siblingoffset:
-        data = b[1] + a[1]
-        logger.debug("merkle: combining %s %s", siblingoffset, myoffset)
-    else:
-        data = a[1] + b[1]
-        logger.debug("merkle: combining %s %s", myoffset, siblingoffset)
-    digester = sha()
-    digester.update(data)
-    digest = digester.digest()
-    [parentstartoffset, parentoffset] = get_parent_offset(myoffset, level - 1)
-    return [parentoffset, digest]
-
-
-def get_parent_offset(myoffset, level):
-    parentstartoffset = int(pow(2, level) - 1)
-    mystartoffset = int(pow(2, level + 1) -1)
-    parentoffset = parentstartoffset + (myoffset - mystartoffset) /2
-    return [parentstartoffset, parentoffset]
-
-
-def get_uncle_offset(myoffset, level):
-    if level == 1:
-        return 0
-    [parentstartoffset, parentoffset] = get_parent_offset(myoffset, level - 1)
-    logger.debug("merkle: parent offset %s", parentoffset)
-    parentindex = parentoffset - parentstartoffset
-    if parentoffset % 2 == 0:
-        uncleoffset = parentoffset - 1
-    else:
-        uncleoffset = parentoffset + 1
-    return uncleoffset
+            if 0 <= index < len(hashes):
+                logger.debug("merkle: store_checked: saving hash of %s", index)
+                hashes[index] = digest
+        if not verified[offset]:
+            set_hash(tree, offset, digest)
+            verified[offset] = 1
 
 
 def get_piece_hashes(tree, height, npieces):
-    startoffset = int(pow(2, height) - 1)
-    hashes = ['\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'] * npieces
-    for offset in range(startoffset, startoffset + npieces):
-        hashes[offset - startoffset] = tree[offset]
-    return hashes
+    startoffset = ((1 << height) - 1) * HASH_LENGTH
+    leaves = str(tree[startoffset:startoffset + npieces * HASH_LENGTH])
+    return [leaves[offset:offset + HASH_LENGTH] for offset in xrange(0, len(leaves), HASH_LENGTH)]
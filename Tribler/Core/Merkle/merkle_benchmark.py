@@ -0,0 +1,44 @@
+# Measures building and checking Merkle hash trees with millions of leaves.
+#
+# python -m Tribler.Core.Merkle.merkle_benchmark [npieces]
+
+import sys
+from hashlib import sha1
+from random import Random
+from time import time
+
+from Tribler.Core.Merkle.merkle import MerkleTree
+
+
+def benchmark(npieces, nchecks=10000):
+    piece_hashes = [sha1(str(i)).digest() for i in xrange(npieces)]
+
+    t1 = time()
+    tree = MerkleTree(1, npieces, None, piece_hashes)
+    t2 = time()
+    print "%9d pieces  build at once         %6.2fs  %6.1f MB" % (npieces, t2 - t1, len(tree.tree) / 1024.0 / 1024.0)
+
+    incremental = MerkleTree(1, npieces)
+    t1 = time()
+    for piece_hash in piece_hashes:
+        incremental.append_piece_hash(piece_hash)
+    t2 = time()
+    assert incremental.get_root_hash() == tree.get_root_hash()
+    print "%9d pieces  build incrementally   %6.2fs" % (npieces, t2 - t1)
+
+    rand = Random(42)
+    pieces = sorted(rand.sample(xrange(npieces), min(npieces, nchecks)))
+    hashlists = [tree.get_hashes_for_piece(index) for index in pieces]
+
+    downloader = MerkleTree(1, npieces, tree.get_root_hash())
+    t1 = time()
+    assert all(downloader.check_hashes(hashlist) for hashlist in hashlists)
+    t2 = time()
+    assert all(downloader.check_hashes_batch(hashlists))
+    t3 = time()
+    print "%9d pieces  check %d hash lists   %6.2fs, batched %6.2fs" % (npieces, len(hashlists), t2 - t1, t3 - t2)
+
+
+if __name__ == "__main__":
+    for npieces in [int(arg) for arg in sys.argv[1:]] or [2 ** 16, 10 ** 6, 2 ** 21 + 1]:
+        benchmark(npieces)
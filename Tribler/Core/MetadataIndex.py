@@ -0,0 +1,143 @@
+# see LICENSE.txt for license information
+#
+# Index of the metadata (thumbnails) available in the torrent collecting dir.  Metadata is stored in
+# <metadata_type>-<infohash>/<contenthash> directories, the index answers whether such a directory exists without
+# touching the filesystem.  It is loaded from the state dir at startup, or built by scanning the collecting dir once
+# when no (valid) saved index exists.
+
+import binascii
+import json
+import logging
+import os
+import re
+import threading
+
+re_metadata_dir = re.compile("^(\w+)-([0-9a-fA-F]{40})$")
+
+
+class MetadataIndex(object):
+
+    """
+    Maps (metadata_type, infohash) to the set of contenthashes available for it.  A key without contenthashes means
+    that the metadata directory exists and is not empty, but contains no contenthash directories.  Can be called by any
+    thread.
+    """
+
+    def __init__(self, tor_col_dir, filename):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.tor_col_dir = tor_col_dir
+        self.filename = filename
+
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Loads the index saved by save, or scans the collecting dir if there is none or if the collecting dir changed
+        since it was saved.
+        """
+        try:
+            with open(self.filename, 'rb') as fp:
+                saved = json.load(fp)
+
+            if saved["tor_col_dir"] == self.tor_col_dir and saved["mtime"] == os.path.getmtime(self.tor_col_dir):
+                index = {}
+                for metadata_type, infohash, contenthashes in saved["index"]:
+                    index[(str(metadata_type), binascii.unhexlify(infohash))] = set(binascii.unhexlify(contenthash) for contenthash in contenthashes)
+
+                with self._lock:
+                    self._index = index
+                self._logger.debug("MetadataIndex: loaded %d entries", len(index))
+                return
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+
+        self.scan()
+
+    def save(self):
+        with self._lock:
+            saved = [(metadata_type, binascii.hexlify(infohash), [binascii.hexlify(contenthash) for contenthash in contenthashes])
+                     for (metadata_type, infohash), contenthashes in self._index.iteritems()]
+
+        try:
+            with open(self.filename + ".tmp", 'wb') as fp:
+                json.dump({"tor_col_dir": self.tor_col_dir, "mtime": os.path.getmtime(self.tor_col_dir), "index": saved}, fp)
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(self.filename + ".tmp", self.filename)
+        except (IOError, OSError):
+            self._logger.exception("MetadataIndex: could not save to %s", self.filename)
+
+    def scan(self):
+        """
+        Rebuilds the index from the metadata directories in the collecting dir.
+        """
+        index = {}
+        try:
+            filenames = os.listdir(self.tor_col_dir)
+        except OSError:
+            filenames = []
+
+        for filename in filenames:
+            match = re_metadata_dir.match(filename)
+            if match:
+                metadata_type, infohash = match.groups()
+                contenthashes = self._scan_dir(os.path.join(self.tor_col_dir, filename))
+                if contenthashes is not None:
+                    index[(metadata_type, binascii.unhexlify(infohash))] = contenthashes
+
+        with self._lock:
+            self._index = index
+        self._logger.debug("MetadataIndex: scanned %d entries", len(index))
+
+    def scan_metadata(self, metadata_type, infohash):
+        """
+        Updates the entry for a single metadata directory, e.g. after downloading into it.
+        """
+        contenthashes = self._scan_dir(self.get_metadata_dir(metadata_type, infohash))
+        with self._lock:
+            if contenthashes is None:
+                self._index.pop((metadata_type, infohash), None)
+            else:
+                self._index[(metadata_type, infohash)] = contenthashes
+
+    def _scan_dir(self, metadata_dir):
+        # returns None if metadata_dir does not exist or is empty, as has_metadata used to check
+        try:
+            filenames = os.listdir(metadata_dir)
+        except OSError:
+            return None
+        if not filenames:
+            return None
+
+        contenthashes = set()
+        for filename in filenames:
+            if len(filename) == 40 and os.path.isdir(os.path.join(metadata_dir, filename)):
+                try:
+                    contenthash = binascii.unhexlify(filename)
+                except TypeError:
+                    continue
+                if os.listdir(os.path.join(metadata_dir, filename)):
+                    contenthashes.add(contenthash)
+        return contenthashes
+
+    def get_metadata_dir(self, metadata_type, infohash, contenthash=None):
+        metadata_dir = os.path.join(self.tor_col_dir, '%s-%s' % (metadata_type, binascii.hexlify(infohash)))
+        if contenthash:
+            metadata_dir = os.path.join(metadata_dir, binascii.hexlify(contenthash))
+        return metadata_dir
+
+    def has_metadata(self, metadata_type, infohash, contenthash=None):
+        with self._lock:
+            contenthashes = self._index.get((metadata_type, infohash))
+            return contenthashes is not None and (not contenthash or contenthash in contenthashes)
+
+    def add_metadata(self, metadata_type, infohash, contenthash=None):
+        with self._lock:
+            contenthashes = self._index.setdefault((metadata_type, infohash), set())
+            if contenthash:
+                contenthashes.add(contenthash)
+
+    def __len__(self):
+        return len(self._index)
@@ -12,6 +12,7 @@ import shutil
 import sys
 import urllib
 from binascii import hexlify
+from itertools import count
 from time import sleep, time
 from traceback import print_exc
 
@@ -19,6 +20,9 @@ from twisted.internet import reactor
 from twisted.internet.task import LoopingCall
 
 from Tribler.Core.CacheDB.sqlitecachedb import bin2str, forceDBThread
+from Tribler.Core.CollectionFrontier import CollectionFrontier
+from Tribler.Core.FetchScheduler import FetchScheduler, LatencyEstimator
+from Tribler.Core.MetadataIndex import MetadataIndex
 from Tribler.Core.Swift.SwiftDef import SwiftDef
 from Tribler.Core.TorrentDef import TorrentDef
 from Tribler.Core.Utilities.utilities import get_collected_torrent_filename
@@ -31,9 +35,14 @@ from Tribler.dispersy.util import call_on_reactor_thread, blocking_call_on_react
 
 SWIFTFAILED_TIMEOUT = 5 * 60  # 5 minutes
 TORRENT_OVERFLOW_CHECKING_INTERVAL = 30 * 60
+METADATA_INDEX_FILENAME = "metadata_index.json"
 # TODO(emilon): This is not a constant
 LOW_PRIO_COLLECTING = 2
 
+# the sources a torrent can be fetched from
+SWIFT_SOURCE = "swift"
+MAGNET_SOURCE = "magnet"
+
 class RemoteTorrentHandler(TaskManager):
 
     __single = None
@@ -54,6 +63,8 @@ class RemoteTorrentHandler(TaskManager):
         self.mrequesters = {}
         self.drequesters = {}
         self.metadata_requester = None
+        self.metadata_index = None
+        self.frontier = None
 
         self.num_torrents = 0
 
@@ -80,11 +91,16 @@ class RemoteTorrentHandler(TaskManager):
         self.torrent_db = None
         if self.session.get_megacache():
             self.torrent_db = session.open_dbhandler(NTFY_TORRENTS)
+            self.__load_frontier()
             self.__check_overflow()
 
         if session.get_dht_torrent_collecting():
             self.drequesters[0] = MagnetRequester(self, 0)
             self.drequesters[1] = MagnetRequester(self, 1)
+        self.metadata_index = MetadataIndex(self.tor_col_dir, os.path.join(self.session.get_state_dir(), METADATA_INDEX_FILENAME))
+        # requests check has_metadata on the same queue, after the index is loaded
+        self.scheduletask(self.metadata_index.load)
+
         self.metadata_requester = MetadataRequester(self, self.session)
         self.registered = True
 
@@ -96,10 +112,19 @@ class RemoteTorrentHandler(TaskManager):
 
         if self.registered:
             self.tqueue.shutdown(True)
+            self.metadata_index.save()
 
     def set_max_num_torrents(self, max_num_torrents):
         self.max_num_torrents = max_num_torrents
 
+    @call_on_reactor_thread
+    def __load_frontier(self):
+        hashes = self.torrent_db.getCollectedTorrentHashes()
+        frontier = CollectionFrontier(2 * max(self.max_num_torrents, len(hashes)))
+        frontier.add_collected(hashes)
+        self.frontier = frontier
+        self._logger.debug("rtorrent: loaded %d collected torrents into the frontier", len(hashes))
+
     @call_on_reactor_thread
     def __check_overflow(self):
         global LOW_PRIO_COLLECTING
@@ -139,6 +164,9 @@ class RemoteTorrentHandler(TaskManager):
 
             self._logger.debug("rtorrent: setting low_prio_collection to one .torrent every %.1f seconds", LOW_PRIO_COLLECTING * .5)
 
+            if self.frontier and self.frontier.is_full():
+                self.__load_frontier()
+
         self.register_task("torrent overflow check",
                            LoopingCall(torrent_overflow_check)).start(TORRENT_OVERFLOW_CHECKING_INTERVAL, now=True)
 
@@ -157,11 +185,14 @@ class RemoteTorrentHandler(TaskManager):
             return self._searchcommunity
 
     def has_metadata(self, metadata_type, infohash, contenthash=None):
-        folder_prefix = '%s-' % metadata_type
-        metadata_dir = os.path.join(self.tor_col_dir, folder_prefix + binascii.hexlify(infohash))
-        if contenthash:
-            metadata_dir = os.path.join(metadata_dir, binascii.hexlify(contenthash))
-        return os.path.isdir(metadata_dir) and os.listdir(metadata_dir)
+        return self.metadata_index is not None and self.metadata_index.has_metadata(metadata_type, infohash, contenthash)
+
+    def add_metadata(self, metadata_type, infohash, contenthash=None):
+        """
+        Adds metadata that was stored in the collecting dir by someone else than the MetadataRequester.
+        """
+        if self.metadata_index is not None:
+            self.metadata_index.add_metadata(metadata_type, infohash, contenthash)
 
     def download_metadata(self, metadata_type, candidate, roothash, infohash, contenthash=None, usercallback=None, timeout=None):
         if self.registered and not self.has_metadata(metadata_type, infohash, contenthash):
@@ -201,10 +232,19 @@ class RemoteTorrentHandler(TaskManager):
         else:
             return
 
+        # torrents that are collected or requested already are not requested again, unless the user asks for them
+        if not usercallback and self.frontier and not self.frontier.request(infohash, roothash):
+            # the candidate can still be a new source of a queued request
+            for requester in requesters.itervalues():
+                if requester.is_being_requested(hashes):
+                    requester.add_request(hashes, candidate, timeout)
+                    break
+            return
+
         # look for lowest prio requester, which already has this infohash scheduled
         requester = None
         for i in range(0, prio + 1):
-            if i in requesters and requesters[i].is_being_requested(hash):
+            if i in requesters and requesters[i].is_being_requested(hashes):
                 requester = requesters[i]
                 break
 
@@ -321,6 +361,8 @@ class RemoteTorrentHandler(TaskManager):
         def do_db(callback):
             # add this new torrent to db
             infohash = tdef.get_infohash()
+            if self.frontier:
+                self.frontier.collected(infohash, sdef.get_roothash() if sdef else None)
             if self.torrent_db.hasTorrent(infohash):
                 if sdef:
                     self.torrent_db.updateTorrent(infohash, swift_torrent_hash=sdef.get_roothash(), torrent_file_name=swiftpath)
@@ -381,6 +423,8 @@ class RemoteTorrentHandler(TaskManager):
                 self.scheduletask(handle_lambda)
         @forceDBThread
         def do_db(tdef):
+            if self.frontier:
+                self.frontier.collected(tdef.get_infohash(), roothash)
             if self.torrent_db.hasTorrent(tdef.get_infohash()):
                 self.torrent_db.updateTorrent(tdef.get_infohash(), swift_torrent_hash=sdef.get_roothash(), torrent_file_name=swiftpath)
             else:
@@ -406,6 +450,10 @@ class RemoteTorrentHandler(TaskManager):
                 self._logger.info('rtorrent: finished downloading metadata: %s', binascii.hexlify(roothash))
 
     def notify_possible_torrent_infohash(self, infohash, actualTorrentFileName=None):
+        if actualTorrentFileName:
+            for requester in self.trequesters.values():
+                requester.collected(infohash)
+
         keys = self.callbacks.keys()
         for key in keys:
             if key[0] == infohash or key == infohash:
@@ -464,6 +512,12 @@ class RemoteTorrentHandler(TaskManager):
             return '', ''
         return [(qstring, qtooltip) for qstring, qtooltip in [getQueueSuccess("TQueue", self.trequesters), getQueueSuccess("DQueue", self.drequesters), getQueueSuccess("MQueue", self.mrequesters)] if qstring]
 
+    def getFrontierStatistics(self):
+        if self.frontier:
+            stats = self.frontier.get_statistics()
+            return "%d in flight, %.1f%% duplicates, %.1fs to collect" % (stats["in_flight"], stats["duplicate_rate"] * 100, stats["time_to_collect"])
+        return ''
+
     def getBandwidthSpent(self):
         def getQueueBW(qname, requesters):
             bw = 0
@@ -484,8 +538,11 @@ class Requester(object):
         self.scheduletask = scheduletask
         self.prio = prio
 
-        self.queue = Queue.Queue()
+        # requests with more sources are made first, they are more likely to succeed
+        self.queue = Queue.PriorityQueue()
+        self.queue_counter = count()
         self.sources = {}
+        self.timeouts = {}
         self.canrequest = True
 
         self.requests_made = 0
@@ -501,16 +558,22 @@ class Requester(object):
 
         was_empty = self.queue.empty()
 
-        if hash not in self.sources:
-            self.sources[hashes] = set()
-
         if timeout is None:
             timeout = sys.maxsize
         else:
             timeout = timeout + time()
 
-        self.sources[hashes].add(candidate)
-        self.queue.put((hashes, timeout))
+        # a request for hashes that are already queued adds a source, and is queued again to move it forward
+        if hashes in self.sources:
+            if candidate in self.sources[hashes] and timeout <= self.timeouts[hashes]:
+                return
+            self.sources[hashes].add(candidate)
+            timeout = max(timeout, self.timeouts[hashes])
+        else:
+            self.sources[hashes] = set([candidate])
+
+        self.timeouts[hashes] = timeout
+        self.queue.put((-len(self.sources[hashes]), next(self.queue_counter), hashes, timeout))
 
         if was_empty:
             self.scheduletask(self.doRequest, t=self.REQUEST_INTERVAL * self.prio)
@@ -520,6 +583,7 @@ class Requester(object):
 
     def remove_request(self, hashes):
         del self.sources[hashes]
+        del self.timeouts[hashes]
 
     def doRequest(self):
         try:
@@ -532,14 +596,15 @@ class Requester(object):
             if canRequest:
                 # request new infohash from queue
                 while True:
-                    hashes, timeout = self.queue.get_nowait()
+                    _, _, hashes, timeout = self.queue.get_nowait()
 
                     # check if still needed
                     if time() > timeout:
                         self._logger.debug("rtorrent: timeout for hash %s", hash)
 
-                        if hashes in self.sources:
-                            del self.sources[hashes]
+                        if hashes in self.sources and timeout == self.timeouts[hashes]:
+                            self.remove_request(hashes)
+                            self.timedout(hashes)
 
                     elif hashes in self.sources:
                         break
@@ -548,7 +613,7 @@ class Requester(object):
 
                 try:
                     candidates = list(self.sources[hashes])
-                    del self.sources[hashes]
+                    self.remove_request(hashes)
 
                     madeRequest = self.doFetch(hashes, candidates)
                     if madeRequest:
@@ -570,18 +635,34 @@ class Requester(object):
     def doFetch(self, hashes, candidates):
         raise NotImplementedError()
 
+    def timedout(self, hashes):
+        # called when a request timed out in the queue
+        pass
+
 
 class TorrentRequester(Requester):
     MAGNET_TIMEOUT = 5.0
     SWIFT_CANCEL = 30.0
+    SWIFT_MIN_CANCEL = 5.0
+    # the number of swift downloads in progress at the same time
+    WINDOW = 10
 
-    def __init__(self, remote_th, magnet_requester, session, prio):
+    def __init__(self, remote_th, magnet_requester, session, prio, window=WINDOW):
         super(TorrentRequester, self).__init__(remote_th.scheduletask, prio)
 
         self.remote_th = remote_th
         self.magnet_requester = magnet_requester
         self.session = session
 
+        # swift and magnet race for a torrent, the magnet lookup starts when swift is slower than usual
+        estimators = {SWIFT_SOURCE: LatencyEstimator(self.SWIFT_CANCEL, self.SWIFT_MIN_CANCEL, self.SWIFT_CANCEL)}
+        if magnet_requester:
+            estimators[MAGNET_SOURCE] = magnet_requester.latency
+        self.scheduler = FetchScheduler(window, estimators)
+        self.canrequest = self.scheduler.has_room
+        if magnet_requester:
+            magnet_requester.failed_callbacks.append(self.magnet_failed)
+
         defaultDLConfig = DefaultDownloadStartupConfig.getInstance()
         self.dscfg = defaultDLConfig.copy()
         self.dscfg.set_dest_dir(session.get_torrent_collecting_dir())
@@ -628,8 +709,9 @@ class TorrentRequester(Requester):
             try:
                 # hide download from gui
                 download = self.session.start_download(sdef, dcfg, hidden=True)
+                self.scheduler.start(infohash, SWIFT_SOURCE)
 
-                state_lambda = lambda ds, infohash = infohash, roothash = roothash, doMagnet = doMagnet: self.check_progress(ds, infohash, roothash, doMagnet)
+                state_lambda = lambda ds, infohash = infohash, roothash = roothash: self.check_progress(ds, infohash, roothash)
                 download.set_state_callback(state_lambda, delay=self.REQUEST_INTERVAL * (self.prio + 1))
                 download.started_downloading = time()
 
@@ -655,37 +737,82 @@ class TorrentRequester(Requester):
                 except:
                     print_exc()
 
-            # schedule a magnet lookup after X seconds
+            # schedule a magnet lookup for when swift is slower than usual
             if doMagnet and self.magnet_requester:
-                magnet_lambda = lambda hashes = hashes: self.magnet_requester.add_request(hashes, None)
-                self.scheduletask(magnet_lambda, t=self.MAGNET_TIMEOUT * (self.prio))
+                delay = self.MAGNET_TIMEOUT * self.prio
+                if attempting_download and self.prio:
+                    delay = self.scheduler.get_race_delay(SWIFT_SOURCE, delay)
+                magnet_lambda = lambda hashes = hashes, raced = attempting_download: self._race_magnet(hashes, raced)
+                self.scheduletask(magnet_lambda, t=delay)
 
         return attempting_download
 
-    def check_progress(self, ds, infohash, roothash, didMagnet):
+    def _race_magnet(self, hashes, raced):
+        infohash, _ = hashes
+        if raced and not self.scheduler.is_fetching(infohash, SWIFT_SOURCE):
+            # swift finished in time, or failed and requested the magnet itself
+            return
+
+        self.scheduler.start(infohash, MAGNET_SOURCE)
+        self.magnet_requester.add_request(hashes, None)
+
+    def collected(self, infohash):
+        """
+        Called when a torrent was saved, ending the race for it.  A swift download that lost is removed by
+        check_progress.
+        """
+        if not self.scheduler.is_fetching(infohash):
+            # not fetched by this requester, or swift delivered it
+            return
+
+        # MagnetRequester records the latencies of its lookups itself
+        self.scheduler.succeeded(infohash, MAGNET_SOURCE, record=False)
+
+    def magnet_failed(self, infohash):
+        """
+        Called by the MagnetRequester when a lookup failed, timed out or was not made.
+        """
+        self.scheduler.failed(infohash, MAGNET_SOURCE)
+
+    def check_progress(self, ds, infohash, roothash):
         d = ds.get_download()
         cdef = d.get_def()
 
+        if not self.scheduler.is_fetching(infohash, SWIFT_SOURCE):
+            # another source delivered the torrent first
+            remove_lambda = lambda d = d: self._remove_download(d)
+            self.scheduletask(remove_lambda)
+
+            self._logger.debug("rtorrent: swift cancelled for %s %s", cdef.get_name(), bin2str(infohash or ''))
+            return (0, False)
+
         if ds.get_progress() == 1:
             remove_lambda = lambda d = d: self._remove_download(d, False)
             self.scheduletask(remove_lambda)
 
             self._logger.debug("rtorrent: swift finished for %s %s", cdef.get_name(), bin2str(infohash or ''))
 
+            # a queued magnet lookup is no longer needed
+            if MAGNET_SOURCE in self.scheduler.succeeded(infohash, SWIFT_SOURCE) and self.magnet_requester.is_being_requested((infohash, roothash)):
+                self.magnet_requester.remove_request((infohash, roothash))
+
             self.remote_th.notify_possible_torrent_roothash(roothash)
             self.requests_success += 1
             self.bandwidth += d.get_total_down()
             return (0, False)
         else:
             diff = time() - getattr(d, 'started_downloading', time())
-            if (diff > self.SWIFT_CANCEL and ds.get_progress() == 0) or diff > 45 or ds.get_status() == DLSTATUS_STOPPED_ON_ERROR:
+            if (diff > self.scheduler.get_timeout(SWIFT_SOURCE) and ds.get_progress() == 0) or diff > 45 or ds.get_status() == DLSTATUS_STOPPED_ON_ERROR:
                 remove_lambda = lambda d = d: self._remove_download(d)
                 self.scheduletask(remove_lambda)
 
                 self._logger.debug("rtorrent: swift failed download for %s %s", cdef.get_name(), bin2str(infohash or ''))
+                self.scheduler.failed(infohash, SWIFT_SOURCE)
 
-                if not didMagnet and self.magnet_requester:
+                # a magnet lookup scheduled by the race, but not started yet, is skipped as swift is no longer fetching
+                if self.magnet_requester and not self.scheduler.is_fetching(infohash, MAGNET_SOURCE):
                     self._logger.debug("rtorrent: switching to magnet for %s %s", cdef.get_name(), bin2str(infohash or ''))
+                    self.scheduler.start(infohash, MAGNET_SOURCE)
                     self.magnet_requester.add_request((infohash, roothash), None, timeout=SWIFTFAILED_TIMEOUT)
 
                 self.requests_fail += 1
@@ -728,6 +855,7 @@ class TorrentMessageRequester(Requester):
 class MagnetRequester(Requester):
     MAX_CONCURRENT = 1
     MAGNET_RETRIEVE_TIMEOUT = 30.0
+    MAGNET_MIN_RETRIEVE_TIMEOUT = 15.0
 
     def __init__(self, remote_th, prio):
         super(MagnetRequester, self).__init__(remote_th.scheduletask, prio)
@@ -737,6 +865,12 @@ class MagnetRequester(Requester):
 
         self.remote_th = remote_th
         self.requestedInfohashes = set()
+        # called with the infohash of a lookup that failed, timed out or was not made
+        self.failed_callbacks = []
+
+        # lookups are given up when they take much longer than the lookups that succeeded
+        self.latency = LatencyEstimator(self.MAGNET_RETRIEVE_TIMEOUT, self.MAGNET_MIN_RETRIEVE_TIMEOUT, self.MAGNET_RETRIEVE_TIMEOUT)
+        self.requested_at = {}
 
         if prio <= 1 and not sys.platform == 'darwin':
             self.MAX_CONCURRENT = 3
@@ -752,6 +886,15 @@ class MagnetRequester(Requester):
             self.remote_th.has_torrent(hashes, raw_lambda)
             return True
 
+        self._notify_failed(infohash)
+
+    def timedout(self, hashes):
+        self._notify_failed(hashes[0])
+
+    def _notify_failed(self, infohash):
+        for callback in self.failed_callbacks:
+            callback(infohash)
+
     def _doFetch(self, filename, infohash, candidates):
         if filename:
             if infohash in self.requestedInfohashes:
@@ -761,6 +904,9 @@ class MagnetRequester(Requester):
             self.requests_on_disk += 1
 
         else:
+            timeout = self.latency.get_timeout()
+            self.requested_at[infohash] = time()
+
             @forceDBThread
             def construct_magnet():
                 # try magnet link
@@ -775,11 +921,11 @@ class MagnetRequester(Requester):
 
                 self._logger.debug('%d rtorrent: requesting magnet %s %s %s %d', long(time()), bin2str(infohash), self.prio, magnetlink, len(self.requestedInfohashes))
 
-                TorrentDef.retrieve_from_magnet(magnetlink, self.__torrentdef_retrieved, self.MAGNET_RETRIEVE_TIMEOUT, max_connections=30 if self.prio == 0 else 10, silent=True)
+                TorrentDef.retrieve_from_magnet(magnetlink, self.__torrentdef_retrieved, timeout, max_connections=30 if self.prio == 0 else 10, silent=True)
             construct_magnet()
 
             failed_lambda = lambda infohash = infohash: self.__torrentdef_failed(infohash)
-            self.scheduletask(failed_lambda, t=self.MAGNET_RETRIEVE_TIMEOUT)
+            self.scheduletask(failed_lambda, t=timeout)
             return True
 
     def __torrentdef_retrieved(self, tdef):
@@ -789,15 +935,19 @@ class MagnetRequester(Requester):
         self.remote_th.save_torrent(tdef)
         if infohash in self.requestedInfohashes:
             self.requestedInfohashes.remove(infohash)
+        if infohash in self.requested_at:
+            self.latency.add(time() - self.requested_at.pop(infohash))
 
         self.requests_success += 1
         self.bandwidth += tdef.get_torrent_size()
 
     def __torrentdef_failed(self, infohash):
+        self.requested_at.pop(infohash, None)
         if infohash in self.requestedInfohashes:
             self.requestedInfohashes.remove(infohash)
 
             self.requests_fail += 1
+            self._notify_failed(infohash)
 
 class MetadataRequester(Requester):
     SWIFT_CANCEL = 30.0
@@ -809,6 +959,8 @@ class MetadataRequester(Requester):
         self.session = session
 
         self.blacklist_set = set()
+        # roothash:hashes pairs of the metadata being downloaded
+        self.downloading = {}
 
         defaultDLConfig = DefaultDownloadStartupConfig.getInstance()
         self.dscfg = defaultDLConfig.copy()
@@ -828,6 +980,14 @@ class MetadataRequester(Requester):
         elif self.check_blacklist(roothash):
             return False
 
+        elif roothash in self.downloading:
+            # already downloading, the candidates become peers of the running download
+            download = self.session.get_download(roothash)
+            if download:
+                for candidate in candidates:
+                    ip, port = candidate.sock_addr
+                    download.add_peer((ip, port if candidate.tunnel else 7758))
+
         elif candidates:
             candidate = candidates[0]
             candidates = candidates[1:]
@@ -860,6 +1020,7 @@ class MetadataRequester(Requester):
 
             else:
                 attempting_download = True
+                self.downloading[roothash] = hashes
 
             if download and candidates:
                 try:
@@ -881,6 +1042,7 @@ class MetadataRequester(Requester):
             remove_lambda = lambda d = d: self._remove_download(d, False)
             self.scheduletask(remove_lambda)
             self.blacklist_set.add(roothash)
+            self.downloading.pop(roothash, None)
             return (0, False)
 
         cdef = d.get_def()
@@ -890,6 +1052,11 @@ class MetadataRequester(Requester):
 
             self._logger.debug("rtorrent: swift finished for %s", cdef.get_name())
 
+            hashes = self.downloading.pop(roothash, None)
+            if hashes:
+                metadata_type, _, infohash, _ = hashes
+                self.remote_th.metadata_index.scan_metadata(metadata_type, infohash)
+
             self.remote_th.notify_possible_metadata_roothash(roothash)
             self.requests_success += 1
             return (0, False)
@@ -898,6 +1065,7 @@ class MetadataRequester(Requester):
             if (diff > self.SWIFT_CANCEL and ds.get_progress() == 0) or diff > 45 or ds.get_status() == DLSTATUS_STOPPED_ON_ERROR:
                 remove_lambda = lambda d = d: self._remove_download(d)
                 self.scheduletask(remove_lambda)
+                self.downloading.pop(roothash, None)
                 self.requests_fail += 1
                 return (0, False)
 
@@ -5,7 +5,7 @@ from itertools import islice
 import time
 import logging
 
-from Tribler.Core.Search.SearchManager import split_into_keywords
+from Tribler.Core.Search.Tokenizer import tokenizer
 
 # Flags
 USE_PSYCO = False  # Enables Psyco optimization for the Levenshtein algorithm
@@ -546,7 +546,7 @@ class LevGrouping(GroupingAlgorithm):
         # assert: len(hitsgroup) > 0
         N = LevGrouping.MAX_LEN
         hit = hitsgroup.hits[0]
-        key = ' '.join(split_into_keywords(hit.name))
+        key = tokenizer.get_normalized(hit.name)
 
         if len(key) > N:
             # check if we're truncating within a word
@@ -572,7 +572,7 @@ class LevGrouping(GroupingAlgorithm):
         trie.update_cache(new_words)
 
     def key(self, hit, context_state):
-        return ' '.join(split_into_keywords(hit.name))[:LevGrouping.MAX_LEN]
+        return tokenizer.get_normalized(hit.name)[:LevGrouping.MAX_LEN]
 
     def simkey(self, key, context_state):
         # NB: simkey is a list of similar keys in this case, but should also contain key,
@@ -0,0 +1,137 @@
+# see LICENSE.txt for license information
+#
+# The hits of the current search, indexed by infohash.  Hits are ranked by their relevance_score, of which the last
+# element is a score computed from the number of seeders, negative votes and subscriptions normalized over all hits.
+# The sums needed for the normalization are maintained as hits are added, so a new batch of remote hits costs a single
+# pass to rescore the hits instead of a scan of the hits for every one of them.
+
+import threading
+from math import sqrt
+
+# the statistics the score is computed from, and their weights
+SCORE_WEIGHTS = (('num_seeders', 0.8), ('neg_votes', -0.1), ('subscriptions', 0.1))
+
+
+class SearchHits(object):
+
+    """
+    Keeps the hits of one search by infohash, and their order by relevance_score.  A hit should have an infohash, a
+    relevance_score list and a get(key, default) method.  Can be called by any thread.
+
+    Hits are scored from the values of SCORE_WEIGHTS they had when they were added, so a hit of which the number of
+    seeders, negative votes or subscriptions changes afterwards keeps its old score until it is passed to update().
+    """
+
+    def __init__(self):
+        # infohash:hit
+        self._hits = {}
+        # infohash:the values of SCORE_WEIGHTS of the hit, as they were when it was added
+        self._values = {}
+        self._sums = [0.0] * len(SCORE_WEIGHTS)
+        self._squares = [0.0] * len(SCORE_WEIGHTS)
+
+        # the hits in the order of the last sort, None if hits were added or updated since
+        self._sorted = []
+        self._lock = threading.RLock()
+
+    def clear(self):
+        with self._lock:
+            self._hits = {}
+            self._values = {}
+            self._sums = [0.0] * len(SCORE_WEIGHTS)
+            self._squares = [0.0] * len(SCORE_WEIGHTS)
+            self._sorted = []
+
+    def add(self, hit):
+        """
+        Adds hit, or replaces the hit with the same infohash.
+        """
+        with self._lock:
+            self._remove(hit.infohash)
+
+            values = tuple(hit.get(key, 0) or 0 for key, _ in SCORE_WEIGHTS)
+            for index, value in enumerate(values):
+                self._sums[index] += value
+                self._squares[index] += value * value
+
+            self._hits[hit.infohash] = hit
+            self._values[hit.infohash] = values
+            self._sorted = None
+
+    def extend(self, hits):
+        with self._lock:
+            for hit in hits:
+                self.add(hit)
+
+    def update(self, hit):
+        """
+        Takes the current values of SCORE_WEIGHTS of a hit that was modified after it was added.  Hits that are not
+        part of this search are ignored.
+        """
+        with self._lock:
+            if hit.infohash in self._hits:
+                self.add(hit)
+
+    def remove(self, infohash):
+        with self._lock:
+            if self._remove(infohash):
+                self._sorted = None
+
+    def _remove(self, infohash):
+        values = self._values.pop(infohash, None)
+        if values is None:
+            return False
+
+        for index, value in enumerate(values):
+            self._sums[index] -= value
+            self._squares[index] -= value * value
+        del self._hits[infohash]
+        return True
+
+    def get(self, infohash, default=None):
+        with self._lock:
+            return self._hits.get(infohash, default)
+
+    def get_normalization(self):
+        """
+        @return A (mean, standard deviation) tuple for each of SCORE_WEIGHTS over all hits.
+        """
+        with self._lock:
+            nr_hits = len(self._hits)
+            normalization = []
+            for index in xrange(len(SCORE_WEIGHTS)):
+                mean = self._sums[index] / nr_hits if nr_hits else 0.0
+                if nr_hits > 1:
+                    variance = max(0.0, (self._squares[index] - nr_hits * mean * mean) / (nr_hits - 1))
+                else:
+                    variance = 0.0
+                normalization.append((mean, sqrt(variance)))
+            return normalization
+
+    def _score(self):
+        # sets the last element of the relevance_score of all hits
+        weights = [(weight, mean, stddev) for (_, weight), (mean, stddev) in zip(SCORE_WEIGHTS, self.get_normalization())]
+        for infohash, hit in self._hits.iteritems():
+            score = 0
+            for value, (weight, mean, stddev) in zip(self._values[infohash], weights):
+                if stddev > 0:
+                    score += weight * (value - mean) / stddev
+            hit.relevance_score[-1] = score
+
+    def sort(self):
+        """
+        Rescores the hits if any were added since the previous sort.
+
+        @return The hits ordered by relevance_score, highest first.
+        """
+        with self._lock:
+            if self._sorted is None:
+                self._score()
+                self._sorted = sorted(self._hits.itervalues(), key=lambda hit: hit.relevance_score, reverse=True)
+            return list(self._sorted)
+
+    def __contains__(self, infohash):
+        return infohash in self._hits
+
+    def __len__(self):
+        return len(self._hits)
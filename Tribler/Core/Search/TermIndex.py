@@ -0,0 +1,125 @@
+# see LICENSE.txt for license information
+#
+# In-memory index of the terms occurring in torrent names, used for autocompletion and search suggestions.  Prefix
+# lookups use a sorted list of terms, fuzzy lookups use a padded bigram index to find the candidates that can be within
+# the requested edit distance before computing the distance itself.
+
+import threading
+from bisect import bisect_left, insort
+from heapq import nlargest
+
+# the number of new terms that are inserted into the sorted terms one by one, more are added by sorting again
+MAX_INSORT = 1000
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Returns the Levenshtein distance between a and b, or max_distance + 1 if it is larger than max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = range(len(b) + 1)
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def _bigrams(term):
+    padded = u"^%s$" % term
+    return set(padded[i:i + 2] for i in xrange(len(padded) - 1))
+
+
+class TermIndex(object):
+
+    """
+    Counts in how many names each term occurs.  Names are added as strings of space separated keywords, as stored in
+    the swarmname column of the FullTextIndex.  Can be called by any thread.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._sorted = []
+        self._unsorted = []
+        self._bigrams = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, term):
+        return term in self._counts
+
+    def get_count(self, term):
+        return self._counts.get(term, 0)
+
+    def add_names(self, names):
+        with self._lock:
+            counts = self._counts
+            for name in names:
+                for term in set(name.split()):
+                    if term in counts:
+                        counts[term] += 1
+                    else:
+                        counts[term] = 1
+                        self._unsorted.append(term)
+                        for bigram in _bigrams(term):
+                            self._bigrams.setdefault(bigram, set()).add(term)
+
+    def sort(self):
+        """
+        Sorts the terms added since the last lookup, which is otherwise done by the next call to complete.
+        """
+        with self._lock:
+            self._get_sorted()
+
+    def _get_sorted(self):
+        if self._unsorted:
+            if len(self._unsorted) > MAX_INSORT:
+                self._sorted = sorted(self._counts)
+            else:
+                for term in self._unsorted:
+                    insort(self._sorted, term)
+            self._unsorted = []
+        return self._sorted
+
+    def complete(self, prefix, max_terms):
+        """
+        Returns the max_terms most frequent terms starting with prefix, excluding prefix itself.
+        """
+        with self._lock:
+            terms = self._get_sorted()
+            begin = end = bisect_left(terms, prefix)
+            while end < len(terms) and terms[end].startswith(prefix):
+                end += 1
+            candidates = [term for term in terms[begin:end] if term != prefix]
+            return nlargest(max_terms, candidates, key=self._counts.__getitem__)
+
+    def correct(self, term, max_distance, max_terms):
+        """
+        Returns up to max_terms indexed terms within max_distance edits of term, closest and most frequent first.
+        """
+        bigrams = _bigrams(term)
+        # every edit changes at most two bigrams of the padded term
+        minimum_shared = len(bigrams) - 2 * max_distance
+
+        with self._lock:
+            shared = {}
+            for bigram in bigrams:
+                for candidate in self._bigrams.get(bigram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+
+            matches = []
+            for candidate, nr_shared in shared.iteritems():
+                if nr_shared >= minimum_shared:
+                    distance = bounded_levenshtein(term, candidate, max_distance)
+                    if distance <= max_distance:
+                        matches.append((distance, -self._counts[candidate], candidate))
+
+        matches.sort()
+        return [candidate for _, _, candidate in matches[:max_terms]]
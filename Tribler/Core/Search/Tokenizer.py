@@ -0,0 +1,104 @@
+# see LICENSE.txt for license information
+#
+# Shared tokenization of torrent names.  Torrent insertion, categorization, search-result bundling and term extraction
+# all split the same names into keywords, a Tokenizer does this once per name and caches the result in a TokenRecord.
+# The derived forms (terms, bi-term phrase, category words) are filled in lazily by the component that needs them, so
+# later users of the same record get them for free.
+
+import threading
+from collections import OrderedDict
+
+from Tribler.Core.Search.SearchManager import re_keywordsplit, dialog_stopwords
+
+
+class TokenRecord(object):
+
+    """
+    The tokenized form of a single name.
+
+    keywords    tuple of lowercase keywords, as returned by split_into_keywords
+    normalized  the keywords joined by a single space
+    terms       tuple of suitable terms, filled in by TermExtraction
+    biterm      bi-term phrase or None, filled in by TermExtraction together with terms
+    words       frozenset of lowercase alphanumeric words, filled in by Category
+    """
+
+    __slots__ = ("keywords", "normalized", "terms", "biterm", "words")
+
+    def __init__(self, keywords):
+        self.keywords = keywords
+        self.normalized = " ".join(keywords)
+        self.terms = None
+        self.biterm = None
+        self.words = None
+
+
+class Tokenizer(object):
+
+    """
+    Tokenizes names into TokenRecords, keeping the most recently used MAX_RECORDS records.  Can be called by any
+    thread.
+    """
+
+    MAX_RECORDS = 4096
+
+    def __init__(self, max_records=MAX_RECORDS):
+        self._max_records = max_records
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_record(self, name):
+        """
+        Returns the TokenRecord for name, tokenizing it if it is not cached.
+        """
+        with self._lock:
+            record = self._records.pop(name, None)
+            if record is None:
+                self.misses += 1
+                record = TokenRecord(tuple(keyword for keyword in re_keywordsplit.split(name.lower()) if keyword))
+                if len(self._records) >= self._max_records:
+                    self._records.popitem(last=False)
+            else:
+                self.hits += 1
+            self._records[name] = record
+            return record
+
+    def get_records(self, names):
+        """
+        Returns the TokenRecords for a list of names.
+        """
+        return [self.get_record(name) for name in names]
+
+    def get_keywords(self, name):
+        """
+        Returns a new list of keywords for name, equal to split_into_keywords(name).
+        """
+        return list(self.get_record(name).keywords)
+
+    def get_normalized(self, name):
+        return self.get_record(name).normalized
+
+    def count_keywords(self, names, filterStopwords=False):
+        """
+        Counts the keywords of a list of names in one pass, without caching them.  Used to index the (possibly
+        thousands of) file names of a torrent which would otherwise push the torrent names out of the cache.
+
+        @return A dict mapping each keyword to the number of times it occurs.
+        """
+        counts = {}
+        get = counts.get
+        # names are joined using a separator, which splits the same as the boundary between two names would
+        for keyword in re_keywordsplit.split(" ".join(names).lower()):
+            if keyword and not (filterStopwords and keyword in dialog_stopwords):
+                counts[keyword] = get(keyword, 0) + 1
+        return counts
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+# the tokenizer shared by all components
+tokenizer = Tokenizer()
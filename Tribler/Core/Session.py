@@ -560,6 +560,15 @@ class Session(SessionConfigInterface):
 
         return self.lm.dispersy
 
+    def get_reactor_monitor_stats(self):
+        """ Returns the reactor lag statistics and the functions that blocked
+        the reactor thread the longest, see ReactorMonitor.get_stats.
+        @return A dictionary. """
+        if not self.get_reactor_monitor():
+            raise OperationNotEnabledByConfigurationException()
+
+        return self.lm.reactor_monitor.get_stats()
+
     def get_swift_process(self):
         if not self.get_swift_proc():
             raise OperationNotEnabledByConfigurationException()
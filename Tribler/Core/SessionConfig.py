@@ -204,6 +204,17 @@ class SessionConfigInterface(object):
         @return Boolean. """
         return self.sessconfig.get(u'general', u'megacache')
 
+    def set_reactor_monitor(self, value):
+        """ Enable or disable measuring the latency of the reactor thread and
+        logging which functions block it (default = False).
+        @param value Boolean. """
+        self.sessconfig.set(u'general', u'reactor_monitor', value)
+
+    def get_reactor_monitor(self):
+        """ Returns whether the reactor monitor is enabled.
+        @return Boolean. """
+        return self.sessconfig.get(u'general', u'reactor_monitor')
+
     def set_libtorrent(self, value):
         """ Enable or disable LibTorrent (default = True).
         @param value Boolean.
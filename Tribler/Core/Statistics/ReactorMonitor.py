@@ -0,0 +1,217 @@
+# see LICENSE.txt for license information
+
+"""
+Monitor the latency of the Twisted reactor thread.
+
+A heartbeat is scheduled on the reactor every HEARTBEAT_INTERVAL seconds. A separate watchdog thread checks
+whether this heartbeat is overdue, in which case it samples the stack of the reactor thread and attributes the
+time the reactor was stalled to the function that is keeping it busy. Functions wrapped by
+blocking_call_on_reactor_thread/call_on_reactor_thread (forceDBThread, forceAndReturnDBThread) are preferred,
+otherwise the callback that the reactor is running is used.
+"""
+
+import logging
+import os
+import sys
+import thread
+from collections import defaultdict
+from threading import Event, Thread, RLock
+from time import time
+from traceback import format_stack
+
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+
+HEARTBEAT_INTERVAL = 1.0
+LAG_THRESHOLD = 0.25
+SAMPLE_INTERVAL = 0.05
+LOG_INTERVAL = 30.0
+MAX_RECENT_STALLS = 20
+
+# the wrapper functions created by the dispersy decorators and the wx helpers, the frame directly below such a
+# wrapper is the decorated function
+WRAPPER_NAMES = (u"helper", u"invoke_func")
+WRAPPER_FILES = (os.path.join(u"dispersy", u"util.py"), os.path.join(u"vwxGUI", u"__init__.py"))
+
+_TWISTED_DIR = os.sep + u"twisted" + os.sep
+
+
+def describe_frame(frame):
+    code = frame.f_code
+    return "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+def attribute_frame(frame):
+    """
+    Returns the frame that is responsible for keeping the reactor busy, given the innermost frame of the
+    reactor thread. Returns None when the reactor is idle.
+    """
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+
+    # prefer the outermost decorated function, it is the one that was scheduled on the reactor
+    for outer, inner in zip(stack, stack[1:]):
+        if outer.f_code.co_name in WRAPPER_NAMES and outer.f_code.co_filename.endswith(WRAPPER_FILES):
+            return inner
+
+    # otherwise use the callback that twisted is running, when only twisted frames are found the reactor is idle
+    in_reactor = False
+    for frame in stack:
+        if _TWISTED_DIR in frame.f_code.co_filename:
+            in_reactor = True
+        elif in_reactor:
+            return frame
+    return None
+
+
+class ReactorMonitor(object):
+
+    """
+    Measures reactor loop lag and attributes stalls to the functions running on the reactor thread.
+    """
+
+    def __init__(self, heartbeat_interval=HEARTBEAT_INTERVAL, lag_threshold=LAG_THRESHOLD,
+                 sample_interval=SAMPLE_INTERVAL, log_interval=LOG_INTERVAL):
+        super(ReactorMonitor, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self._reactor_ident = None
+        self._heartbeat_interval = heartbeat_interval
+        self._lag_threshold = lag_threshold
+        self._sample_interval = sample_interval
+        self._log_interval = log_interval
+
+        self._lock = RLock()
+        self._done = Event()
+        self._heartbeat_lc = None
+        self._watchdog = None
+
+        self._last_heartbeat = None
+        self._last_log = 0
+
+        self._num_heartbeats = 0
+        self._total_lag = 0.0
+        self._max_lag = 0.0
+
+        self._num_stalls = 0
+        self._num_samples = 0
+        self._attributed = defaultdict(float)
+        self._attributed_samples = defaultdict(int)
+        self._recent_stalls = []
+
+    def start(self):
+        assert self._heartbeat_lc is None, "ReactorMonitor is already running"
+        self._done.clear()
+        self._last_heartbeat = time()
+
+        self._heartbeat_lc = LoopingCall(self._heartbeat)
+        reactor.callFromThread(self._heartbeat_lc.start, self._heartbeat_interval, now=True)
+
+        self._watchdog = Thread(target=self._watchdog_loop, name="ReactorMonitor")
+        self._watchdog.setDaemon(True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._done.set()
+        if self._heartbeat_lc:
+            lc, self._heartbeat_lc = self._heartbeat_lc, None
+
+            def stop_lc():
+                if lc.running:
+                    lc.stop()
+            reactor.callFromThread(stop_lc)
+
+        if self._watchdog:
+            self._watchdog.join(self._sample_interval * 4)
+            self._watchdog = None
+
+    def _heartbeat(self):
+        now = time()
+        with self._lock:
+            self._reactor_ident = thread.get_ident()
+            if self._last_heartbeat is not None and self._num_heartbeats:
+                lag = max(0.0, now - self._last_heartbeat - self._heartbeat_interval)
+                self._total_lag += lag
+                self._max_lag = max(self._max_lag, lag)
+            self._num_heartbeats += 1
+            self._last_heartbeat = now
+
+    def _watchdog_loop(self):
+        stall_start = stall_functions = stall_stack = None
+
+        while not self._done.wait(self._sample_interval):
+            with self._lock:
+                overdue = time() - self._last_heartbeat - self._heartbeat_interval
+
+            if overdue > self._lag_threshold and self._reactor_ident is not None:
+                if stall_start is None:
+                    stall_start = time() - overdue
+                    stall_functions = defaultdict(int)
+                    stall_stack = None
+
+                frame = sys._current_frames().get(self._reactor_ident)
+                culprit = attribute_frame(frame) if frame else None
+                name = describe_frame(culprit) if culprit else u"<idle>"
+
+                with self._lock:
+                    self._num_samples += 1
+                    self._attributed[name] += self._sample_interval
+                    self._attributed_samples[name] += 1
+                stall_functions[name] += 1
+
+                if stall_stack is None and frame:
+                    stall_stack = "".join(format_stack(frame))
+                del frame, culprit
+
+            elif stall_start is not None:
+                self._end_stall(stall_start, stall_functions, stall_stack)
+                stall_start = stall_functions = stall_stack = None
+
+    def _end_stall(self, stall_start, stall_functions, stall_stack):
+        duration = time() - stall_start
+        culprit = max(stall_functions.iteritems(), key=lambda item: item[1])[0]
+
+        with self._lock:
+            self._num_stalls += 1
+            self._recent_stalls.append((stall_start, duration, culprit))
+            del self._recent_stalls[:-MAX_RECENT_STALLS]
+
+        now = time()
+        if now - self._last_log > self._log_interval:
+            self._last_log = now
+            self._logger.warning("reactor thread was blocked for %.2f seconds, mostly by %s\n%s",
+                                 duration, culprit, stall_stack or "")
+        else:
+            self._logger.debug("reactor thread was blocked for %.2f seconds, mostly by %s", duration, culprit)
+
+    def get_stats(self, top=10):
+        """
+        Returns a dictionary describing the reactor lag since the monitor was started. The 'functions' entry
+        contains (name, seconds, samples) tuples of the functions that were running while the reactor was stalled,
+        most expensive first.
+        """
+        with self._lock:
+            functions = sorted(((name, seconds, self._attributed_samples[name])
+                                for name, seconds in self._attributed.iteritems()),
+                               key=lambda item: item[1], reverse=True)
+            return {'heartbeats': self._num_heartbeats,
+                    'mean_lag': self._total_lag / max(1, self._num_heartbeats - 1),
+                    'max_lag': self._max_lag,
+                    'stalls': self._num_stalls,
+                    'samples': self._num_samples,
+                    'recent_stalls': list(self._recent_stalls),
+                    'functions': functions[:top]}
+
+    def reset_stats(self):
+        with self._lock:
+            self._num_heartbeats = 0
+            self._total_lag = 0.0
+            self._max_lag = 0.0
+            self._num_stalls = 0
+            self._num_samples = 0
+            self._attributed.clear()
+            self._attributed_samples.clear()
+            del self._recent_stalls[:]
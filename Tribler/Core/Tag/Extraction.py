@@ -4,7 +4,7 @@
 import os
 
 from Tribler import LIBRARYNAME
-from Tribler.Core.Search.SearchManager import split_into_keywords
+from Tribler.Core.Search.Tokenizer import tokenizer
 from Tribler.Core.Tag.StopwordsFilter import StopwordsFilter
 
 import re
@@ -59,11 +59,9 @@ class TermExtraction:
         if a term occurs multiple times in the name.
         """
         if isinstance(name_or_keywords, basestring):
-            keywords = split_into_keywords(name_or_keywords)
-        else:
-            keywords = name_or_keywords
+            return list(self._getTokens(name_or_keywords).terms)
 
-        return [term for term in keywords if self.isSuitableTerm(term)]
+        return [term for term in name_or_keywords if self.isSuitableTerm(term)]
 
     def extractBiTermPhrase(self, name_or_keywords):
         """
@@ -75,8 +73,22 @@ class TermExtraction:
         @return A tuple containing the two terms of the bi-term phrase. If there is no bi-term,
         i.e. less than two terms were extracted, None is returned.
         """
-        terms = [term for term in self.extractTerms(name_or_keywords)
-                 if self.containsdigits_filter.search(term) is None]
+        if isinstance(name_or_keywords, basestring):
+            return self._getTokens(name_or_keywords).biterm
+
+        return self._getBiTerm(self.extractTerms(name_or_keywords))
+
+    def _getTokens(self, name):
+        # the terms of a name are computed once and stored in its shared token record
+        record = tokenizer.get_record(name)
+        if record.terms is None:
+            terms = tuple(term for term in record.keywords if self.isSuitableTerm(term))
+            record.biterm = self._getBiTerm(terms)
+            record.terms = terms
+        return record
+
+    def _getBiTerm(self, terms):
+        terms = [term for term in terms if self.containsdigits_filter.search(term) is None]
         if len(terms) > 1:
             return tuple(terms[:2])
         else:
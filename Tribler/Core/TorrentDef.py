@@ -13,7 +13,7 @@ from Tribler.Core.defaults import TDEF_DEFAULTS
 from Tribler.Core.exceptions import OperationNotPossibleAtRuntimeException, \
     TorrentDefNotFinalizedException, NotYetImplementedException
 from Tribler.Core.Base import ContentDefinition, Serializable, Copyable
-from Tribler.Core.Utilities.bencode import bencode, bdecode
+from Tribler.Core.Utilities.bencode import bencode, bdecode_spans
 import Tribler.Core.APIImplementation.maketorrent as maketorrent
 import Tribler.Core.APIImplementation.makeurl as makeurl
 from Tribler.Core.APIImplementation.miscutils import parse_playtime_to_secs
@@ -100,13 +100,17 @@ class TorrentDef(ContentDefinition, Serializable, Copyable):
         accordingly. """
         bdata = stream.read()
         stream.close()
-        data = bdecode(bdata)
+        data, spans = bdecode_spans(bdata)
         # print >>sys.stderr,data
+        if 'info' in spans:
+            start, end = spans['info']
+            return TorrentDef._create(data, bdata[start:end])
         return TorrentDef._create(data)
     _read = staticmethod(_read)
 
-    def _create(metainfo):  # TODO: replace with constructor
+    def _create(metainfo, bencoded_info=None):  # TODO: replace with constructor
         # raises ValueErrors if not good
+        # bencoded_info, when given, must equal bencode(metainfo['info'])
         validTorrentFile(metainfo)
 
         t = TorrentDef()
@@ -121,7 +125,7 @@ class TorrentDef(ContentDefinition, Serializable, Copyable):
         else:
             # Two places where infohash calculated, here and in maketorrent.py
             # Elsewhere: must use TorrentDef.get_infohash() to allow P2PURLs.
-            t.infohash = sha(bencode(metainfo['info'])).digest()
+            t.infohash = sha(bencoded_info or bencode(metainfo['info'])).digest()
 
         assert isinstance(t.infohash, str), "INFOHASH has invalid type: %s" % type(t.infohash)
         assert len(t.infohash) == INFOHASH_LENGTH, "INFOHASH has invalid length: %d" % len(t.infohash)
@@ -1,7 +1,7 @@
 # Written by Petru Paler, Uoti Urpala, Ross Cohen and John Hoffman
 # see LICENSE.txt for license information
 
-from types import IntType, LongType, StringType, ListType, TupleType, DictType
+from types import IntType, LongType, StringType, ListType, TupleType, DictType, BufferType
 try:
     from types import BooleanType
 except ImportError:
@@ -11,103 +11,166 @@ try:
 except ImportError:
     UnicodeType = None
 
+from sys import maxint
 from traceback import print_exc, print_stack
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def decode_int(x, f):
-    f += 1
-    newf = x.index('e', f)
-    try:
-        n = int(x[f:newf])
-    except:
-        n = long(x[f:newf])
-    if x[f] == '-':
-        if x[f + 1] == '0':
-            raise ValueError
-    elif x[f] == '0' and newf != f + 1:
-        raise ValueError
-    return (n, newf + 1)
-
-
-def decode_string(x, f):
-    colon = x.index(':', f)
-    try:
-        n = int(x[f:colon])
-    except (OverflowError, ValueError):
-        n = long(x[f:colon])
-    if x[f] == '0' and colon != f + 1:
-        raise ValueError
-    colon += 1
-    return (x[colon:colon + n], colon +n)
+_DIGITS = frozenset("0123456789")
+# the canonical representations of common string lengths
+_LENGTHS = dict((str(n), n) for n in xrange(10000))
 
 
-def decode_unicode(x, f):
-    s, f = decode_string(x, f + 1)
-    return (s.decode('UTF-8'), f)
-
-
-def decode_list(x, f):
-    r, f = [], f + 1
-    while x[f] != 'e':
-        v, f = decode_func[x[f]](x, f)
-        r.append(v)
-    return (r, f + 1)
-
+def _decode(x, f, lazy=None, spans=None):
+    """
+    Decodes the value starting at offset F in X, a str or mmap, without recursion.  Returns the value and the offset
+    following it.
 
-def decode_dict(x, f):
-    r, f = {}, f + 1
+    Strings of at least LAZY bytes are returned as buffer objects referring to X instead of copies.  When SPANS is a
+    dictionary and the value is a dictionary, the (start, end) offsets of the values in X are stored in SPANS for those
+    values whose bencoding is canonical, i.e. bencode(value) == X[start:end].
+    """
+    digits = _DIGITS
+    lengths = _LENGTHS
+    end = len(x)
+    if lazy is None:
+        lazy = maxint
+    check = spans is not None
+    # offsets of values that will encode differently, e.g. unsorted keys
+    irregular = []
+
+    # the state of the enclosing containers, the current one is kept in local variables
+    stack = []
+    container = None
+    isdict = False
+    # the key of the pending dictionary value, None when a key is expected
+    key = None
     lastkey = None
-    while x[f] != 'e':
-        k, f = decode_string(x, f)
-        # Arno, 2008-09-12: uTorrent 1.8 violates the bencoding spec, its keys
-        # in an EXTEND handshake message are not sorted. Be liberal in what we
-        # receive:
-        # if lastkey >= k:
-        # raise ValueError
-        lastkey = k
-        r[k], f = decode_func[x[f]](x, f)
-    return (r, f + 1)
-
-decode_func = {}
-decode_func['l'] = decode_list
-decode_func['d'] = decode_dict
-decode_func['i'] = decode_int
-decode_func['0'] = decode_string
-decode_func['1'] = decode_string
-decode_func['2'] = decode_string
-decode_func['3'] = decode_string
-decode_func['4'] = decode_string
-decode_func['5'] = decode_string
-decode_func['6'] = decode_string
-decode_func['7'] = decode_string
-decode_func['8'] = decode_string
-decode_func['9'] = decode_string
-# decode_func['u'] = decode_unicode
-
-
-def bdecode(x, sloppy=0):
-    r, l = sloppy_bdecode(x)
+    begin = f
+
+    while True:
+        c = x[f]
+        if check:
+            begin = f
+
+        if c in digits:
+            colon = x.find(':', f)
+            if colon < 0:
+                raise ValueError
+            n = lengths.get(x[f:colon])
+            if n is None:
+                n = int(x[f:colon])
+                if c == '0':
+                    raise ValueError
+                if check and str(n) != x[f:colon]:
+                    irregular.append(f)
+            colon += 1
+            f = colon + n
+            if f > end:
+                raise ValueError
+            if n >= lazy and not (isdict and key is None):
+                value = buffer(x, colon, n)
+            else:
+                value = x[colon:f]
+
+        elif c == 'i':
+            newf = x.find('e', f)
+            if newf < 0:
+                raise ValueError
+            token = x[f + 1:newf]
+            value = int(token)
+            if token[:1] == '-':
+                if token[1:2] == '0':
+                    raise ValueError
+            elif token[:1] == '0' and len(token) != 1:
+                raise ValueError
+            if check and str(value) != token:
+                irregular.append(f)
+            f = newf + 1
+
+        elif c == 'l' or c == 'd':
+            stack.append((container, isdict, key, lastkey, f))
+            isdict = c == 'd'
+            container = {} if isdict else []
+            key = lastkey = None
+            f += 1
+            continue
+
+        elif c == 'e':
+            if container is None or key is not None:
+                raise ValueError
+            value = container
+            container, isdict, key, lastkey, begin = stack.pop()
+            f += 1
+
+        else:
+            raise ValueError
+
+        if container is None:
+            break
+
+        if not isdict:
+            container.append(value)
+
+        elif key is None:
+            # Arno, 2008-09-12: uTorrent 1.8 violates the bencoding spec, its keys
+            # in an EXTEND handshake message are not sorted. Be liberal in what we
+            # receive
+            if c not in digits:
+                raise ValueError
+            if check and lastkey is not None and value <= lastkey:
+                irregular.append(f)
+            key = lastkey = value
+
+        else:
+            container[key] = value
+            if check and len(stack) == 1:
+                spans[key] = (begin, f)
+            key = None
+
+    if irregular:
+        for key, (start, stop) in spans.items():
+            if any(start <= offset < stop for offset in irregular):
+                del spans[key]
+    return value, f
+
+
+def bdecode(x, sloppy=0, lazy=None):
+    r, l = sloppy_bdecode(x, lazy)
     if not sloppy and l != len(x):
         raise ValueError("bad bencoded data")
     return r
 
 
-def sloppy_bdecode(x):
+def sloppy_bdecode(x, lazy=None):
     """
     Same as bdecode, except that it returns the decoded data AND the number of bytes read from X.
     """
     try:
-        r, l = decode_func[x[0]](x, 0)
-#    except (IndexError, KeyError):
+        r, l = _decode(x, 0, lazy)
     except (IndexError, KeyError, ValueError):
-        #print_exc()
         raise ValueError("bad bencoded data")
     return r, l
 
 
+def bdecode_spans(x, lazy=None):
+    """
+    Same as bdecode, additionally returns a dictionary with the (start, end) offsets in X of the values of the decoded
+    dictionary.  Values that would encode differently, e.g. dictionaries with unsorted keys, are omitted.  Allows the
+    infohash to be computed as sha(x[start:end]) without encoding the info dictionary again.
+    """
+    spans = {}
+    try:
+        r, l = _decode(x, 0, lazy, spans)
+    except (IndexError, KeyError, ValueError):
+        raise ValueError("bad bencoded data")
+    if l != len(x):
+        raise ValueError("bad bencoded data")
+    return r, spans
+
+
 def test_bdecode():
     try:
         bdecode('0:0:')
@@ -268,7 +331,7 @@ def encode_bencached(x, r):
 
 
 def encode_int(x, r):
-    r.extend(('i', str(x), 'e'))
+    r.append('i%de' % x)
 
 
 def encode_bool(x, r):
@@ -276,7 +339,13 @@ def encode_bool(x, r):
 
 
 def encode_string(x, r):
-    r.extend((str(len(x)), ':', x))
+    r.append('%d:' % len(x))
+    r.append(x)
+
+
+def encode_buffer(x, r):
+    # lazy strings returned by bdecode
+    encode_string(str(x), r)
 
 
 def encode_unicode(x, r):
@@ -299,7 +368,8 @@ def encode_dict(x, r):
         #logger.debug("bencode: Encoding %s %s", k, v)
 
         try:
-            r.extend((str(len(k)), ':', k))
+            r.append('%d:' % len(k))
+            r.append(k)
         except:
             logger.error("k: %s", k)
             raise
@@ -312,6 +382,7 @@ encode_func[BencachedType] = encode_bencached
 encode_func[IntType] = encode_int
 encode_func[LongType] = encode_int
 encode_func[StringType] = encode_string
+encode_func[BufferType] = encode_buffer
 encode_func[ListType] = encode_list
 encode_func[TupleType] = encode_list
 encode_func[DictType] = encode_dict
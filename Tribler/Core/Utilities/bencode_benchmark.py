@@ -0,0 +1,48 @@
+# Measures bdecode on synthesized .torrent files, compared with the original recursive decoder that is kept in the
+# bencode test, and the infohash computation using bdecode_spans compared with encoding the info dictionary again.
+
+from hashlib import sha1
+from os import urandom
+from random import Random
+from time import time
+
+from Tribler.Core.Utilities.bencode import bencode, bdecode, bdecode_spans
+from Tribler.Test.test_bencode import reference_bdecode
+
+
+def torrent(rand, nr_files, nr_pieces):
+    files = [{'path': ['directory', 'file-%d.avi' % i], 'length': rand.randint(1, 2 ** 30)} for i in xrange(nr_files)]
+    return bencode({'announce': 'http://tracker.example.com/announce',
+                    'creation date': 1234567890,
+                    'info': {'name': 'torrent', 'piece length': 2 ** 18, 'pieces': urandom(20 * nr_pieces), 'files': files}})
+
+
+def measure(func, torrents, rounds):
+    t1 = time()
+    for _ in xrange(rounds):
+        for x in torrents:
+            func(x)
+    return rounds * len(torrents) / (time() - t1)
+
+
+def benchmark(description, torrents, rounds=20):
+    for name, func in (("old", reference_bdecode),
+                       ("new", bdecode),
+                       ("new lazy", lambda x: bdecode(x, lazy=1024))):
+        print "%-20s %-12s decode %8.0f torrents/s" % (description, name, measure(func, torrents, rounds))
+
+    def infohash_encode(x):
+        return sha1(bencode(bdecode(x)['info'])).digest()
+
+    def infohash_spans(x):
+        start, end = bdecode_spans(x)[1]['info']
+        return sha1(x[start:end]).digest()
+
+    for name, func in (("encode", infohash_encode), ("spans", infohash_spans)):
+        print "%-20s %-12s infohash %6.0f torrents/s" % (description, name, measure(func, torrents, rounds))
+
+
+if __name__ == "__main__":
+    rand = Random(42)
+    benchmark("single file", [torrent(rand, 1, 2000) for _ in xrange(50)])
+    benchmark("1000 files", [torrent(rand, 1000, 20000) for _ in xrange(10)], rounds=5)
@@ -1,35 +1,19 @@
 # Written by Bram Cohen, Uoti Urpala, and John Hoffman
 # see LICENSE.txt for license information
 
-from functools import reduce
+from binascii import hexlify, unhexlify
+from itertools import imap
+from operator import add
+from string import maketrans
 
-try:
-    True
-except:
-    True = 1
-    False = 0
-    bool = lambda x: not not x
+# pieces are stored as one byte per piece, either 0 or 1.  This allows counting and searching with the bytearray
+# methods, and bitwise operations on the hexlified data where every piece is an 8 bit lane of one python long
+_BITS_TO_BYTES = maketrans("01", "\x00\x01")
+_BYTES_TO_BITS = maketrans("\x00\x01", "01")
 
-try:
-    sum([1])
-    negsum = lambda a: len(a) - sum(a)
-except:
-    negsum = lambda a: reduce(lambda x, y: x + (not y), a, 0)
 
-
-def _int_to_booleans(x):
-    r = []
-    for i in range(8):
-        r.append(bool(x & 0x80))
-        x <<= 1
-    return tuple(r)
-
-lookup_table = []
-reverse_lookup_table = {}
-for i in xrange(256):
-    x = _int_to_booleans(i)
-    lookup_table.append(x)
-    reverse_lookup_table[x] = chr(i)
+def _int_to_bytes(value, length):
+    return bytearray(unhexlify("%0*x" % (2 * length, value))) if length else bytearray()
 
 
 class Bitfield:
@@ -46,7 +30,7 @@ class Bitfield:
 
         if copyfrom is not None:
             self.length = copyfrom.length
-            self.array = copyfrom.array[:]
+            self.data = bytearray(copyfrom.data)
             self.numfalse = copyfrom.numfalse
             return
         if length is None:
@@ -56,88 +40,97 @@ class Bitfield:
             extra = len(bitstring) * 8 - length
             if extra < 0 or extra >= 8:
                 raise ValueError
-            t = lookup_table
-            r = []
 
-            chr0 = chr(0)
-            inrange = False
-            startpiece = 0
-            countpiece = 0
-            for c in bitstring:
-                r.extend(t[ord(c)])
+            bits = bin(int(hexlify(bitstring), 16))[2:].zfill(len(bitstring) * 8) if bitstring else ""
+            data = bytearray(bits.translate(_BITS_TO_BYTES))
+            if data.count("\x01", length):
+                raise ValueError
+            del data[length:]
 
+            if calcactiveranges:
                 # STBSPEED
-                if calcactiveranges:
+                chr0 = chr(0)
+                inrange = False
+                startpiece = 0
+                countpiece = 0
+                for c in bitstring:
                     if c != chr0:
                         # Non-zero value, either start or continuation of range
-                        if inrange:
-                            # Stay in activerange
-                            pass
-                        else:
+                        if not inrange:
                             # Start activerange
                             startpiece = countpiece
                             inrange = True
-                    else:
-                        # Zero, either end or continuation of zeroness
-                        if inrange:
-                            # End of activerange
-                            self.activeranges.append((startpiece, countpiece))
-                            inrange = False
-                        else:
-                            # Stay in zero
-                            pass
+                    elif inrange:
+                        # End of activerange
+                        self.activeranges.append((startpiece, countpiece))
+                        inrange = False
                     countpiece += 8
 
-            if calcactiveranges:
                 if inrange:
                     # activerange ended at end of piece space
                     self.activeranges.append((startpiece, min(countpiece, self.length - 1)))
 
-            if extra > 0:
-                if r[-extra:] != [0] * extra:
-                    raise ValueError
-                del r[-extra:]
-            self.array = r
-            self.numfalse = negsum(r)
+            self.data = data
 
         elif fromarray is not None:
-            self.array = fromarray
-            self.numfalse = negsum(self.array)
+            self.data = bytearray(imap(bool, fromarray))
         else:
-            self.array = [False] * length
-            self.numfalse = length
+            self.data = bytearray(length)
+        self.numfalse = self.length - self.data.count("\x01")
 
     def __setitem__(self, index, val):
         val = bool(val)
-        self.numfalse += self.array[index] - val
-        self.array[index] = val
+        self.numfalse += self.data[index] - val
+        self.data[index] = val
 
     def __getitem__(self, index):
-        return self.array[index]
+        return bool(self.data[index])
+
+    def __iter__(self):
+        return imap(bool, self.data)
 
     def __len__(self):
         return self.length
 
+    def __eq__(self, other):
+        return isinstance(other, Bitfield) and self.data == other.data
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __and__(self, other):
+        return self._combine(other, self._to_int() & other._to_int())
+
+    def __or__(self, other):
+        return self._combine(other, self._to_int() | other._to_int())
+
+    def _to_int(self):
+        return int(hexlify(self.data), 16) if self.length else 0
+
+    def _combine(self, other, value):
+        if self.length != other.length:
+            raise ValueError("bitfields of different lengths")
+        result = Bitfield(0)
+        result.length = self.length
+        result.data = _int_to_bytes(value, self.length)
+        result.numfalse = self.length - result.data.count("\x01")
+        return result
+
     def tostring(self):
-        booleans = self.array
-        t = reverse_lookup_table
-        s = len(booleans) % 8
-        r = [t[tuple(booleans[x:x +8])] for x in xrange(0, len(booleans)-s, 8)]
-        if s:
-            r += t[tuple(booleans[-s:] + ([0] * (8 - s)))]
-        return ''.join(r)
+        if not self.length:
+            return ""
+        bits = str(self.data).translate(_BYTES_TO_BITS)
+        nbytes = (self.length + 7) / 8
+        return unhexlify("%0*x" % (2 * nbytes, int(bits, 2) << (8 * nbytes - self.length)))
 
     def complete(self):
         return not self.numfalse
 
     def copy(self):
-        return self.array[:self.length]
+        return map(bool, self.data)
 
     def toboollist(self):
-        bools = [False] * self.length
-        for piece in range(0, self.length):
-            bools[piece] = self.array[piece]
-        return bools
+        return map(bool, self.data)
 
     def get_active_ranges(self):
         # STBSPEED
@@ -146,6 +139,57 @@ class Bitfield:
     def get_numtrue(self):
         return self.length - self.numfalse
 
+    def count(self, start=0, stop=None):
+        """
+        Returns the number of pieces in [START, STOP) that we have, pieces beyond the end of the bitfield are missing.
+        """
+        return self.data.count("\x01", start, self.length if stop is None else stop)
+
+    def count_consecutive(self, ranges):
+        """
+        Returns the number of pieces we have in the sorted, non-overlapping (start, stop) RANGES, up to the first
+        missing piece.
+        """
+        count = 0
+        for start, stop in ranges:
+            missing = self.data.find("\x00", start, stop)
+            if missing >= 0:
+                return count + missing - start
+            if stop > self.length:
+                return count + max(0, self.length - start)
+            count += stop - start
+        return count
+
+    def get_completion(self, start, stop):
+        """
+        Returns the fraction of the pieces in [START, STOP) that we have.
+        """
+        if stop <= start:
+            return 1.0
+        return self.count(start, stop) / float(stop - start)
+
+    def select(self, ranges):
+        """
+        Returns a new Bitfield consisting of the pieces in the (start, stop) RANGES.
+        """
+        result = Bitfield(0)
+        result.data = bytearray().join(self.data[start:stop] for start, stop in ranges)
+        result.length = len(result.data)
+        result.numfalse = result.length - result.data.count("\x01")
+        return result
+
+
+def count_available(bitfields, length):
+    """
+    Returns a list containing, for every piece, the number of BITFIELDS of LENGTH pieces that have it.
+    """
+    counts = [0] * length
+    # every piece is an 8 bit lane, 255 bitfields can be added before a lane overflows
+    for index in xrange(0, len(bitfields), 255):
+        total = sum(bitfield._to_int() for bitfield in bitfields[index:index + 255])
+        counts = map(add, counts, _int_to_bytes(total, length))
+    return counts
+
 
 def test_bitfield():
     try:
@@ -2,127 +2,101 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def _a_encode_int(value, mapping):
-    """
-    42 --> ('2', 'i', '42')
-    """
-    assert isinstance(value, int), "VALUE has invalid type: %s" % type(value)
-    value = str(value).encode("UTF-8")
-    return (str(len(value)).encode("UTF-8"), "i", value)
-
-
-def _a_encode_long(value, mapping):
-    """
-    42 --> ('2', 'J', '42')
-    """
-    assert isinstance(value, long), "VALUE has invalid type: %s" % type(value)
-    value = str(value).encode("UTF-8")
-    return (str(len(value)).encode("UTF-8"), "J", value)
-
-
-def _a_encode_float(value, mapping):
-    """
-    4.2 --> ('3', 'f', '4.2')
-    """
-    assert isinstance(value, float), "VALUE has invalid type: %s" % type(value)
-    value = str(value).encode("UTF-8")
-    return (str(len(value)).encode("UTF-8"), "f", value)
-
-
-def _a_encode_unicode(value, mapping):
-    """
-    'foo-bar' --> ('7', 's', 'foo-bar')
-    """
-    assert isinstance(value, unicode), "VALUE has invalid type: %s" % type(value)
-    value = value.encode("UTF-8")
-    return (str(len(value)).encode("UTF-8"), "s", value)
+# Version 'a' encodes every value as <ascii length><type character><data>, where <length> is the number of
+# bytes of <data> for the scalar types and the number of elements for the container types:
+#
+#   42                          --> '2i42'
+#   42L                         --> '2J42'
+#   4.2                         --> '3f4.2'
+#   u'foo-bar'                  --> '7sfoo-bar'
+#   'foo-bar'                   --> '7bfoo-bar'
+#   [1, 2]                      --> '2l1i11i2'
+#   set([1, 2])                 --> '2L1i11i2'
+#   (1, 2)                      --> '2t1i11i2'
+#   {'foo': 'bar'}              --> '1d3bfoo3bbar'
+#   None, True, False           --> '0n', '0T', '0F'
+#
+# Both the encoder and the decoder are iterative, they keep an explicit stack instead of recursing into
+# containers.  Every decode error, including a truncated stream, results in a ValueError.
+
+
+# the headers of the values with a small length, to avoid formatting them over and over again
+_a_header_cache = 256
+_a_bytes_headers = ["%db" % length for length in xrange(_a_header_cache)]
+_a_unicode_headers = ["%ds" % length for length in xrange(_a_header_cache)]
+
+
+def _a_encode(data):
+    """
+    Returns the list of strings that, when joined, form the version 'a' encoding of DATA.
+
+    Values are appended to a single list.  Rather than recursing into a container, the iterator over the current
+    container is pushed onto a stack and the values of the nested container are processed first.
+    """
+    encoded = []
+    append = encoded.append
+    bytes_headers = _a_bytes_headers
+    unicode_headers = _a_unicode_headers
+    header_cache = _a_header_cache
+    stack = [iter((data,))]
+    push = stack.append
+
+    while stack:
+        iterator = stack.pop()
+        for value in iterator:
+            value_type = type(value)
+
+            if value_type is str:
+                length = len(value)
+                append(bytes_headers[length] if length < header_cache else "%db" % length)
+                append(value)
+
+            elif value_type is unicode:
+                value = value.encode("UTF-8")
+                length = len(value)
+                append(unicode_headers[length] if length < header_cache else "%ds" % length)
+                append(value)
+
+            elif value_type is int:
+                value = str(value)
+                append("%di%s" % (len(value), value))
+
+            elif value_type is long:
+                value = str(value)
+                append("%dJ%s" % (len(value), value))
+
+            elif value_type is bool:
+                append("0T" if value else "0F")
+
+            elif value is None:
+                append("0n")
+
+            elif value_type is float:
+                value = str(value)
+                append("%df%s" % (len(value), value))
 
+            else:
+                if value_type is tuple:
+                    append("%dt" % len(value))
+                elif value_type is list:
+                    append("%dl" % len(value))
+                elif value_type is dict:
+                    append("%dd" % len(value))
+                    value = [item for pair in sorted(value.items()) for item in pair]
+                elif value_type is set:
+                    append("%dL" % len(value))
+                else:
+                    raise ValueError("Unable to encode type %s" % value_type)
 
-def _a_encode_bytes(value, mapping):
-    """
-    'foo-bar' --> ('7', 'b', 'foo-bar')
-    """
-    assert isinstance(value, bytes), "VALUE has invalid type: %s" % type(value)
-    return (str(len(value)).encode("UTF-8"), "b", value)
-
-
-def _a_encode_list(values, mapping):
-    """
-    [1,2,3] --> ['3', 'l', '1', 'i', '1', '1', 'i', '2', '1', 'i', '3']
-    """
-    assert isinstance(values, list), "VALUE has invalid type: %s" % type(values)
-    encoded = [str(len(values)).encode("UTF-8"), "l"]
-    extend = encoded.extend
-    for value in values:
-        extend(mapping[type(value)](value, mapping))
-    return encoded
-
-
-def _a_encode_set(values, mapping):
-    """
-    [1,2,3] --> ['3', 'l', '1', 'i', '1', '1', 'i', '2', '1', 'i', '3']
-    """
-    assert isinstance(values, set), "VALUE has invalid type: %s" % type(values)
-    encoded = [str(len(values)).encode("UTF-8"), "L"]
-    extend = encoded.extend
-    for value in values:
-        extend(mapping[type(value)](value, mapping))
-    return encoded
-
+                # continue with ITERATOR once all values in the container are encoded
+                if value:
+                    push(iterator)
+                    push(iter(value))
+                    break
 
-def _a_encode_tuple(values, mapping):
-    """
-    (1,2) --> ['2', 't', '1', 'i', '1', '1', 'i', '2']
-    """
-    assert isinstance(values, tuple), "VALUE has invalid type: %s" % type(values)
-    encoded = [str(len(values)).encode("UTF-8"), "t"]
-    extend = encoded.extend
-    for value in values:
-        extend(mapping[type(value)](value, mapping))
     return encoded
 
 
-def _a_encode_dictionary(values, mapping):
-    """
-    {'foo':'bar', 'moo':'milk'} --> ['2', 'd', '3', 's', 'foo', '3', 's', 'bar', '3', 's', 'moo', '4', 's', 'milk']
-    """
-    assert isinstance(values, dict), "VALUE has invalid type: %s" % type(values)
-    encoded = [str(len(values)).encode("UTF-8"), "d"]
-    extend = encoded.extend
-    for key, value in sorted(values.items()):
-        assert type(key) in mapping, (key, values)
-        assert type(value) in mapping, (value, values)
-        extend(mapping[type(key)](key, mapping))
-        extend(mapping[type(value)](value, mapping))
-    return encoded
-
-
-def _a_encode_none(value, mapping):
-    """
-    None --> ['0', 'n']
-    """
-    return ['0n']
-
-
-def _a_encode_bool(value, mapping):
-    """
-    True  --> ['0', 'T']
-    False --> ['0', 'F']
-    """
-    return ['0T' if value else '0F']
-
-_a_encode_mapping = {int: _a_encode_int,
-                     long: _a_encode_long,
-                     float: _a_encode_float,
-                     unicode: _a_encode_unicode,
-                     str: _a_encode_bytes,
-                     list: _a_encode_list,
-                     set: _a_encode_set,
-                     tuple: _a_encode_tuple,
-                     dict: _a_encode_dictionary,
-                     type(None): _a_encode_none,
-                     bool: _a_encode_bool}
-
 # def _b_uint_to_bytes(i):
 #     assert isinstance(i, (int, long))
 #     assert i >= 0
@@ -266,7 +240,9 @@ def encode(data, version="a"):
     """
     assert isinstance(version, str)
     if version == "a":
-        return "a" + "".join(_a_encode_mapping[type(data)](data, _a_encode_mapping))
+        encoded = _a_encode(data)
+        encoded.insert(0, "a")
+        return "".join(encoded)
     elif version == "b":
         # raise ValueError("This version is not yet implemented")
         return "b" + "".join(_b_encode_mapping[type(data)](data, _b_encode_mapping))
@@ -274,157 +250,36 @@ def encode(data, version="a"):
         raise ValueError("Unknown encode version")
 
 
-def _a_decode_int(stream, offset, count, _):
-    """
-    'a2i42',3,2 --> 5,42
-    """
-    return offset + count, int(stream[offset:offset +count])
+# maps every ascii digit onto its value, used to read the <length> of a header
+_a_digits = dict((str(digit), digit) for digit in xrange(10))
 
+# the type characters that do not have any data
+_a_decode_constant = {"n": None,
+                      "T": True,
+                      "F": False}
 
-def _a_decode_long(stream, offset, count, _):
-    """
-    'a2J42',3,2 --> 5,42
-    """
-    return offset + count, long(stream[offset:offset +count])
 
-
-def _a_decode_float(stream, offset, count, _):
+def _a_decode_finish(type_, values, count):
     """
-    'a3f4.2',3,3 --> 6,4.2
+    Returns the container of type TYPE_ holding VALUES, dictionaries are stored as a flat key, value list in VALUES.
     """
-    return offset + count, float(stream[offset:offset +count])
+    if type_ == "t":
+        return tuple(values)
 
+    try:
+        if type_ == "d":
+            container = dict(zip(values[::2], values[1::2]))
+            if len(container) < count:
+                raise ValueError("Duplicate key in dictionary")
+            return container
 
-def _a_decode_unicode(stream, offset, count, _):
-    """
-    'a3sbar',3,3 --> 6,u'bar'
-    """
-    if len(stream) >= offset + count:
-        return offset + count, stream[offset:offset +count].decode("UTF-8")
-    else:
-        raise ValueError("Invalid stream length", len(stream), offset + count)
+        if type_ == "L":
+            return set(values)
 
+    except TypeError:
+        raise ValueError("Unhashable key found", type_)
 
-def _a_decode_bytes(stream, offset, count, _):
-    """
-    'a3bfoo',3,3 --> 6,'foo'
-    """
-    if len(stream) >= offset + count:
-        return offset + count, stream[offset:offset +count]
-    else:
-        raise ValueError("Invalid stream length", len(stream), offset + count)
-
-
-def _a_decode_list(stream, offset, count, mapping):
-    """
-    'a1l3i123',3,1 --> 8,[123]
-    'a2l1i41i2',3,1 --> 8,[4,2]
-    """
-    container = []
-    for _ in range(count):
-
-        index = offset
-        while 48 <= ord(stream[index]) <= 57:
-            index += 1
-        offset, value = mapping[stream[index]](stream, index + 1, int(stream[offset:index]), mapping)
-        container.append(value)
-
-    return offset, container
-
-
-def _a_decode_set(stream, offset, count, mapping):
-    """
-    'a1L3i123',3,1 --> 8,set(123)
-    'a2L1i41i2',3,1 --> 8,set(4,2)
-    """
-    container = set()
-    for _ in range(count):
-
-        index = offset
-        while 48 <= ord(stream[index]) <= 57:
-            index += 1
-        offset, value = mapping[stream[index]](stream, index + 1, int(stream[offset:index]), mapping)
-        container.add(value)
-
-    return offset, container
-
-
-def _a_decode_tuple(stream, offset, count, mapping):
-    """
-    'a1t3i123',3,1 --> 8,[123]
-    'a2t1i41i2',3,1 --> 8,[4,2]
-    """
-    container = []
-    for _ in range(count):
-
-        index = offset
-        while 48 <= ord(stream[index]) <= 57:
-            index += 1
-        offset, value = mapping[stream[index]](stream, index + 1, int(stream[offset:index]), mapping)
-        container.append(value)
-
-    return offset, tuple(container)
-
-
-def _a_decode_dictionary(stream, offset, count, mapping):
-    """
-    'a2d3sfoo3sbar3smoo4smilk',3,2 -> 24,{'foo':'bar', 'moo':'milk'}
-    """
-    container = {}
-    for _ in range(count):
-
-        index = offset
-        while 48 <= ord(stream[index]) <= 57:
-            index += 1
-        offset, key = mapping[stream[index]](stream, index + 1, int(stream[offset:index]), mapping)
-
-        index = offset
-        while 48 <= ord(stream[index]) <= 57:
-            index += 1
-        offset, value = mapping[stream[index]](stream, index + 1, int(stream[offset:index]), mapping)
-
-        container[key] = value
-
-    if len(container) < count:
-        raise ValueError("Duplicate key in dictionary")
-    return offset, container
-
-
-def _a_decode_none(stream, offset, count, mapping):
-    """
-    'a0n',3,0 -> 3,None
-    """
-    assert count == 0
-    return offset, None
-
-
-def _a_decode_true(stream, offset, count, mapping):
-    """
-    'a0T',3,1 -> 3,True
-    """
-    assert count == 0
-    return offset, True
-
-
-def _a_decode_false(stream, offset, count, mapping):
-    """
-    'a0F',3,1 -> 3,False
-    """
-    assert count == 0
-    return offset, False
-
-_a_decode_mapping = {"i": _a_decode_int,
-                     "J": _a_decode_long,
-                     "f": _a_decode_float,
-                     "s": _a_decode_unicode,
-                     "b": _a_decode_bytes,
-                     "l": _a_decode_list,
-                     "L": _a_decode_set,
-                     "t": _a_decode_tuple,
-                     "d": _a_decode_dictionary,
-                     "n": _a_decode_none,
-                     "T": _a_decode_true,
-                     "F": _a_decode_false}
+    return values
 
 
 def decode(stream, offset=0):
@@ -439,13 +294,82 @@ def decode(stream, offset=0):
     """
     assert isinstance(stream, bytes), "STREAM has invalid type: %s" % type(stream)
     assert isinstance(offset, int), "OFFSET has invalid type: %s" % type(offset)
-    if stream[offset] == "a":
-        index = offset + 1
-        while 48 <= ord(stream[index]) <= 57:
+    if stream[offset] != "a":
+        raise ValueError("Unknown version found")
+
+    digits = _a_digits
+    constants = _a_decode_constant
+    stream_length = len(stream)
+
+    # VALUES and REMAINING belong to the innermost container that is being decoded, the containers around it are
+    # kept on STACK as (type, count, values, remaining) tuples
+    stack = []
+    values = None
+    remaining = 0
+    index = offset + 1
+
+    try:
+        while True:
+            type_ = stream[index]
+            if type_ not in digits:
+                raise ValueError("Invalid length found", index)
+            count = digits[type_]
+            index += 1
+            type_ = stream[index]
+            while type_ in digits:
+                count = count * 10 + digits[type_]
+                index += 1
+                type_ = stream[index]
             index += 1
-        return _a_decode_mapping[stream[index]](stream, index + 1, int(stream[offset +1:index]), _a_decode_mapping)
 
-    raise ValueError("Unknown version found")
+            if type_ == "b" or type_ == "s":
+                offset = index
+                index += count
+                if stream_length < index:
+                    raise ValueError("Invalid stream length", stream_length, index)
+                value = stream[offset:index]
+                if type_ == "s":
+                    value = value.decode("UTF-8")
+
+            elif type_ == "i" or type_ == "J" or type_ == "f":
+                offset = index
+                index += count
+                value = (int if type_ == "i" else long if type_ == "J" else float)(stream[offset:index])
+
+            elif type_ == "t" or type_ == "l" or type_ == "d" or type_ == "L":
+                if count:
+                    stack.append((type_, count, values, remaining))
+                    values = []
+                    remaining = count * 2 if type_ == "d" else count
+                    continue
+                value = _a_decode_finish(type_, [], 0)
+
+            elif type_ in constants:
+                if count:
+                    raise ValueError("Invalid count for constant", index)
+                value = constants[type_]
+
+            else:
+                raise ValueError("Unknown type found", type_)
+
+            # add VALUE to its container, a container is itself a value once all its values are decoded
+            while True:
+                if values is None:
+                    return index, value
+
+                values.append(value)
+                remaining -= 1
+                if remaining:
+                    break
+
+                type_, count, parent_values, parent_remaining = stack.pop()
+                value = _a_decode_finish(type_, values, count)
+                values = parent_values
+                remaining = parent_remaining
+
+    except IndexError:
+        raise ValueError("Invalid stream length", stream_length, index)
+
 
 if __debug__:
     if __name__ == "__main__":
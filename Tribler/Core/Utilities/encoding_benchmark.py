@@ -0,0 +1,108 @@
+# Measures the throughput of the version 'a' encoding on search-response and channelcast payloads, compared with
+# the original recursive implementation that is kept in the encoding test.  The payload validation using a compiled
+# schema is compared with the hand-written checks that SearchConversion used before.
+
+from os import urandom
+from random import Random
+from struct import pack
+from time import time
+
+from Tribler.Core.Utilities.encoding import encode, decode
+from Tribler.Core.Utilities.schema import Schema, Record, Sized, ListOf, Optional
+from Tribler.Test.test_encoding import reference_encode, reference_decode
+
+
+def search_response_payload(rand, nr_results=25):
+    # see SearchConversion._encode_search_response
+    results = []
+    for _ in xrange(nr_results):
+        results.append((urandom(20),
+                        u"Some.Swarm.Name.%d.720p.x264" % rand.randint(0, 10 ** 6),
+                        long(rand.randint(0, 2 ** 34)),
+                        rand.randint(1, 100),
+                        [u"Video"],
+                        long(time()),
+                        rand.randint(0, 1000),
+                        rand.randint(0, 1000),
+                        urandom(20),
+                        urandom(20),
+                        urandom(20) if rand.random() < 0.5 else None))
+    return pack('!H', rand.randint(0, 2 ** 16 - 1)), results
+
+
+def channelcast_payload(rand, nr_channels=10, nr_torrents=5):
+    # see AllChannelConversion._encode_channelcast
+    return dict((urandom(20), set(urandom(20) for _ in xrange(nr_torrents))) for _ in xrange(nr_channels))
+
+
+def benchmark(description, payloads, rounds=20):
+    streams = [encode(payload) for payload in payloads]
+    size = sum(len(stream) for stream in streams) * rounds / 1024.0 / 1024.0
+
+    for name, encode_func, decode_func in (("old", lambda payload: "a" + reference_encode(payload), lambda stream: reference_decode(stream, 1)),
+                                           ("new", encode, decode)):
+        t1 = time()
+        for _ in xrange(rounds):
+            for payload in payloads:
+                encode_func(payload)
+        t2 = time()
+        for _ in xrange(rounds):
+            for stream in streams:
+                decode_func(stream)
+        t3 = time()
+        print "%-25s %s encode %7.2f MB/s  decode %7.2f MB/s" % (description, name, size / (t2 - t1), size / (t3 - t2))
+
+
+def handwritten_search_response(payload):
+    identifier, results = payload[:2]
+    if len(identifier) != 2:
+        raise ValueError()
+    if not isinstance(results, list):
+        raise ValueError()
+    for result in results:
+        if not isinstance(result, tuple) or len(result) < 11:
+            raise ValueError()
+        infohash, swarmname, length, nrfiles, categorykeys, creation_date, seeders, leechers, swift_hash, swift_torrent_hash, cid = result[:11]
+        if not (isinstance(infohash, str) and len(infohash) == 20):
+            raise ValueError()
+        if not (isinstance(swarmname, unicode) and isinstance(length, long) and isinstance(nrfiles, int)):
+            raise ValueError()
+        if not (isinstance(categorykeys, list) and all(isinstance(key, unicode) for key in categorykeys)):
+            raise ValueError()
+        if not (isinstance(creation_date, long) and isinstance(seeders, int) and isinstance(leechers, int)):
+            raise ValueError()
+        for hash_ in (swift_hash, swift_torrent_hash, cid):
+            if hash_ and not (isinstance(hash_, str) and len(hash_) == 20):
+                raise ValueError()
+
+
+# see SEARCH_RESPONSE_PAYLOAD in Tribler.community.search.conversion
+SEARCH_RESPONSE = Schema(Record(tuple, [("identifier", Sized(str, length=2)),
+                                        ("results", ListOf(Record(tuple, [("infohash", Sized(str, length=20)),
+                                                                          ("swarmname", unicode),
+                                                                          ("length", long),
+                                                                          ("nrfiles", int),
+                                                                          ("categorykeys", ListOf(unicode)),
+                                                                          ("creation_date", long),
+                                                                          ("seeders", int),
+                                                                          ("leechers", int),
+                                                                          ("swift_hash", Optional(Sized(str, length=20))),
+                                                                          ("swift_torrent_hash", Optional(Sized(str, length=20))),
+                                                                          ("cid", Optional(Sized(str, length=20)))])))]))
+
+
+def benchmark_validation(payloads, rounds=200):
+    for name, validate in (("handwritten", handwritten_search_response), ("schema", SEARCH_RESPONSE.validate)):
+        t1 = time()
+        for _ in xrange(rounds):
+            for payload in payloads:
+                validate(payload)
+        t2 = time()
+        print "%-25s %s %7.0f payloads/s" % ("search-response validate", name, rounds * len(payloads) / (t2 - t1))
+
+
+if __name__ == "__main__":
+    rand = Random(42)
+    benchmark("search-response", [search_response_payload(rand) for _ in xrange(50)])
+    benchmark("channelcast", [channelcast_payload(rand) for _ in xrange(50)])
+    benchmark_validation([decode(encode(search_response_payload(rand)))[1] for _ in xrange(50)])
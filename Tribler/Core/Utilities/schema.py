@@ -0,0 +1,195 @@
+"""
+Declarative validation of payloads decoded with Tribler.Core.Utilities.encoding.
+
+A schema describes the structure of a decoded payload using the following specifications:
+
+- a type or a tuple of types, e.g. unicode or (int, long), the value must be an instance of it;
+- Sized(types, length=None, minimum=None, maximum=None), additionally restricts len(value);
+- Optional(spec), the value is only validated when it evaluates to True, e.g. an empty string or None;
+- ListOf(spec), TupleOf(spec), SetOf(spec) and DictOf(key_spec, value_spec), homogeneous containers;
+- Record(container_type, [(name, spec), ...], exact=False), a list or tuple with (at least) the given fields.
+
+The specification is compiled into a single python function once, validating a payload does not involve any
+per-field function calls.  Every failure raises a ValueError describing the field that is invalid, conversions
+translate this into a DropPacket.
+
+    SEARCH_RESPONSE = Schema(Record(tuple, [("identifier", Sized(str, length=2)), ...]))
+    offset, payload = SEARCH_RESPONSE.decode(data, offset)
+"""
+
+from Tribler.Core.Utilities.encoding import decode
+
+
+class Sized(object):
+
+    def __init__(self, types, length=None, minimum=None, maximum=None):
+        super(Sized, self).__init__()
+        self.types = types
+        self.length = length
+        self.minimum = minimum
+        self.maximum = maximum
+
+
+class Optional(object):
+
+    def __init__(self, spec):
+        super(Optional, self).__init__()
+        self.spec = spec
+
+
+class _Container(object):
+
+    container_type = None
+
+    def __init__(self, spec, minimum=None):
+        super(_Container, self).__init__()
+        self.spec = spec
+        self.minimum = minimum
+
+
+class ListOf(_Container):
+    container_type = list
+
+
+class TupleOf(_Container):
+    container_type = tuple
+
+
+class SetOf(_Container):
+    container_type = set
+
+
+class DictOf(object):
+
+    def __init__(self, key_spec, value_spec, minimum=None):
+        super(DictOf, self).__init__()
+        self.key_spec = key_spec
+        self.value_spec = value_spec
+        self.minimum = minimum
+
+
+class Record(object):
+
+    def __init__(self, container_type, fields, exact=False):
+        super(Record, self).__init__()
+        self.container_type = container_type
+        self.fields = fields
+        self.exact = exact
+
+
+class _Compiler(object):
+
+    """
+    Generates the source of the validation function for a specification.
+    """
+
+    def __init__(self):
+        super(_Compiler, self).__init__()
+        self.lines = []
+        self.constants = {}
+        self._counter = 0
+
+    def variable(self):
+        self._counter += 1
+        return "v%d" % self._counter
+
+    def constant(self, value):
+        name = "c%d" % len(self.constants)
+        self.constants[name] = value
+        return name
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def fail(self, indent, message):
+        self.emit(indent + 1, "raise ValueError(%r)" % message)
+
+    def check_type(self, indent, variable, types, name):
+        self.emit(indent, "if not isinstance(%s, %s):" % (variable, self.constant(types)))
+        self.fail(indent, "Invalid '%s' type" % name)
+
+    def check_length(self, indent, variable, name, length=None, minimum=None, maximum=None):
+        if length is not None:
+            self.emit(indent, "if len(%s) != %d:" % (variable, length))
+            self.fail(indent, "Invalid '%s' length" % name)
+        if minimum is not None:
+            self.emit(indent, "if len(%s) < %d:" % (variable, minimum))
+            self.fail(indent, "Invalid '%s' length" % name)
+        if maximum is not None:
+            self.emit(indent, "if len(%s) > %d:" % (variable, maximum))
+            self.fail(indent, "Invalid '%s' length" % name)
+
+    def compile(self, spec, variable, name, indent):
+        if isinstance(spec, (type, tuple)):
+            self.check_type(indent, variable, spec, name)
+
+        elif isinstance(spec, Sized):
+            self.check_type(indent, variable, spec.types, name)
+            self.check_length(indent, variable, name, spec.length, spec.minimum, spec.maximum)
+
+        elif isinstance(spec, Optional):
+            self.emit(indent, "if %s:" % variable)
+            self.compile(spec.spec, variable, name, indent + 1)
+
+        elif isinstance(spec, _Container):
+            self.check_type(indent, variable, spec.container_type, name)
+            self.check_length(indent, variable, name, minimum=spec.minimum)
+            item = self.variable()
+            self.emit(indent, "for %s in %s:" % (item, variable))
+            self.compile(spec.spec, item, name + " item", indent + 1)
+
+        elif isinstance(spec, DictOf):
+            self.check_type(indent, variable, dict, name)
+            self.check_length(indent, variable, name, minimum=spec.minimum)
+            key, value = self.variable(), self.variable()
+            self.emit(indent, "for %s, %s in %s.iteritems():" % (key, value, variable))
+            self.compile(spec.key_spec, key, name + " key", indent + 1)
+            self.compile(spec.value_spec, value, name + " value", indent + 1)
+
+        elif isinstance(spec, Record):
+            self.check_type(indent, variable, spec.container_type, name)
+            if spec.exact:
+                self.check_length(indent, variable, name, length=len(spec.fields))
+            else:
+                self.check_length(indent, variable, name, minimum=len(spec.fields))
+            for index, (field_name, field_spec) in enumerate(spec.fields):
+                field = self.variable()
+                self.emit(indent, "%s = %s[%d]" % (field, variable, index))
+                self.compile(field_spec, field, field_name, indent)
+
+        else:
+            raise TypeError("Unknown specification %r" % (spec,))
+
+
+def compile_schema(spec, name="payload"):
+    """
+    Returns a function that raises a ValueError when its argument does not match SPEC.
+    """
+    compiler = _Compiler()
+    compiler.compile(spec, "value", name, 1)
+
+    source = "def validate(value):\n%s\n" % "\n".join(compiler.lines)
+    namespace = dict(compiler.constants)
+    exec compile(source, "<schema %s>" % name, "exec") in namespace
+    return namespace["validate"]
+
+
+class Schema(object):
+
+    """
+    A compiled payload specification.
+    """
+
+    def __init__(self, spec, name="payload"):
+        super(Schema, self).__init__()
+        self.spec = spec
+        self.validate = compile_schema(spec, name)
+
+    def decode(self, stream, offset=0):
+        """
+        Decodes STREAM from OFFSET using encoding.decode and validates the result.  Returns the new offset and the
+        decoded value, raises ValueError when STREAM can not be decoded or does not match the specification.
+        """
+        offset, value = decode(stream, offset)
+        self.validate(value)
+        return offset, value
@@ -1,13 +1,11 @@
 # Written by Egbert Bouman
 import os
 import sys
-import tempfile
 import subprocess
 
 from re import search
 from math import sqrt
-
-from Tribler.Core.osutils import is_android
+from operator import add, sub, mul
 
 def get_thumbnail(videofile, thumbfile, resolution, ffmpeg, timecode):
     startupinfo = None
@@ -77,39 +75,81 @@ def limit_resolution(cur_res, max_res):
     return tuple(new_res)
 
 
-def preferred_timecodes(videofile, duration, sample_res, ffmpeg, num_samples=20, k=4):
+def get_frames(videofile, timecodes, resolution, ffmpeg, cancel=None):
+    """
+    Extracts the frames at the given timecodes using a single ffmpeg process, which seeks to each timecode and
+    outputs the frames scaled to resolution as raw RGB data.
+
+    @param cancel An optional threading.Event, ffmpeg is killed when it is set.
+    @return A list of (timecode, frame) tuples, frames are strings of width * height * 3 bytes.  Timecodes for which
+    no frame could be extracted are left out.
+    """
+    width, height = max(1, int(resolution[0])), max(1, int(resolution[1]))
+
+    frames = _read_frames(videofile, timecodes, width, height, ffmpeg, cancel)
+    if frames is None:
+        return []
+    if len(frames) == len(timecodes):
+        return zip(timecodes, frames)
+
+    # a seek that yielded no frame shifts the frames of all later timecodes, hence we cannot tell which frame belongs
+    # to which timecode.  Extract the frames one at a time instead
     results = []
-    dest_dir = tempfile.gettempdir()
+    for timecode in timecodes:
+        frames = _read_frames(videofile, [timecode], width, height, ffmpeg, cancel)
+        if frames is None:
+            return []
+        if frames:
+            results.append((timecode, frames[0]))
+    return results
+
+
+def _read_frames(videofile, timecodes, width, height, ffmpeg, cancel=None):
+    # returns the concatenated frames at timecodes, in order, or None when cancelled
+    framesize = width * height * 3
+
+    args = [ffmpeg.encode('utf-8')]
+    for timecode in timecodes:
+        args += ["-ss", str(int(timecode)), "-i", videofile.encode('utf-8')]
+    filters = ["[%d:v]trim=end_frame=1,scale=%d:%d,setsar=1[v%d]" % (i, width, height, i) for i in range(len(timecodes))]
+    filters.append("".join("[v%d]" % i for i in range(len(timecodes))) + "concat=n=%d:v=1:a=0[out]" % len(timecodes))
+    args += ["-filter_complex", ";".join(filters), "-map", "[out]", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+
+    startupinfo = None
+    if sys.platform == "win32":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    with open(os.devnull, 'wb') as devnull:
+        ffmpeg = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=devnull, startupinfo=startupinfo)
+        frames = []
+        try:
+            while len(frames) < len(timecodes):
+                if cancel and cancel.is_set():
+                    return None
+                frame = ffmpeg.stdout.read(framesize)
+                if len(frame) < framesize:
+                    break
+                frames.append(frame)
+        finally:
+            if ffmpeg.poll() is None:
+                ffmpeg.kill()
+            ffmpeg.stdout.close()
+            ffmpeg.wait()
+
+    return frames
+
+
+def preferred_timecodes(videofile, duration, sample_res, ffmpeg, num_samples=20, k=4, cancel=None):
     num_samples = min(num_samples, duration)
+    if num_samples <= 0 or not sample_res:
+        return []
 
-    for timecode in range(0, duration, duration / num_samples):
-        outputfile = os.path.join(dest_dir, 'tn%d.jpg' % timecode)
-        get_thumbnail(videofile, outputfile, sample_res, ffmpeg, timecode)
-        if os.path.exists(outputfile):
-            # Android doesn't have wx, use PIL instead
-            if is_android():
-                def GetImageData():
-                    import Image  # PIL
-
-                    im = Image.open(outputfile)
-                    return list(im.getdata())
-            else:
-                import wx
-                from Tribler.Main.vwxGUI import forceAndReturnWxThread
-
-                @forceAndReturnWxThread
-                def GetImageData():
-                    pxls = []
-                    wxstr = wx.Bitmap(outputfile, wx.BITMAP_TYPE_ANY).ConvertToImage().GetData()
-                    for index in range(0, len(wxstr), 3):
-                        pxls.append(tuple(map(ord, wxstr[index:index + 3])))
-                    return pxls
-
-            this_colour = colourfulness(GetImageData())
-            if this_colour != None:
-                results.append((this_colour, timecode))
-                if os.path.exists(outputfile):
-                    os.remove(outputfile)
+    timecodes = range(0, duration, duration / num_samples)
+    results = []
+    for timecode, frame in get_frames(videofile, timecodes, sample_res, ffmpeg, cancel):
+        this_colour = colourfulness(frame)
+        if this_colour != None:
+            results.append((this_colour, timecode))
 
     results.sort()
     results.reverse()
@@ -118,19 +158,21 @@ def preferred_timecodes(videofile, duration, sample_res, ffmpeg, num_samples=20,
 
 
 def colourfulness(image_data):
+    """
+    Computes the colourfulness metric of Hasler and Suesstrunk for a string of RGB bytes.  The per pixel arithmetic is
+    done by map over the colour channels, which keeps the loops out of the interpreter.
+    """
     if image_data:
-        rg_values = []
-        yb_values = []
+        pixels = bytearray(image_data)
+        r, g, b = pixels[0::3], pixels[1::3], pixels[2::3]
 
-        for pxl in image_data:
-            r, g, b = pxl
-            rg = r - g
-            yb = 0.5 * (r + g) - b
-            rg_values.append(rg)
-            yb_values.append(yb)
+        rg_values = map(sub, r, g)
+        # twice the yellow-blue value, keeps the arithmetic in integers
+        yb_values = map(sub, map(add, r, g), map(add, b, b))
 
-        s_rg, m_rg = meanstdv(rg_values)
-        s_yb, m_yb = meanstdv(yb_values)
+        m_rg, s_rg = meanstdv(rg_values)
+        m_yb, s_yb = meanstdv(yb_values)
+        m_yb, s_yb = m_yb / 2.0, s_yb / 2.0
 
         s_rgyb = sqrt(s_rg ** 2 + s_yb ** 2)
         m_rgyb = sqrt(m_rg ** 2 + m_yb ** 2)
@@ -138,15 +180,12 @@ def colourfulness(image_data):
         return s_rgyb + 0.3 * m_rgyb
 
 
-# Source: http://www.physics.rutgers.edu/~masud/computing/WPark_recipes_in_python.html
 def meanstdv(x):
-    n, mean, std = len(x), 0, 0
-    for a in x:
-        mean = mean + a
-        mean = mean / float(n)
-    for a in x:
-        std = std + (a - mean) ** 2
-    std = sqrt(std / float(n - 1))
+    n = len(x)
+    mean = sum(x) / float(n)
+    if n < 2:
+        return mean, 0.0
+    std = sqrt(max(0.0, (sum(map(mul, x, x)) - n * mean ** 2) / float(n - 1)))
     return mean, std
 
 
@@ -0,0 +1,82 @@
+# Measures selecting thumbnail timecodes for a generated test video, extracting one frame per ffmpeg process and
+# scoring per pixel tuple as preferred_timecodes used to, compared with get_frames and the map based colourfulness.
+#
+# python -m Tribler.Core.Video.thumbnail_benchmark [ffmpeg] [duration]
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from math import sqrt
+from time import time
+
+from Tribler.Core.Video.VideoUtility import get_frames, get_thumbnail, colourfulness
+
+NUM_SAMPLES = 20
+SAMPLE_RES = (100, 56)
+
+
+def generate_video(ffmpeg, filename, duration):
+    with open(os.devnull, 'wb') as devnull:
+        subprocess.check_call([ffmpeg, "-y", "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=25:duration=%d" % duration,
+                               "-pix_fmt", "yuv420p", filename], stdout=devnull, stderr=devnull)
+
+
+def per_pixel_colourfulness(pxls):
+    rg_values = []
+    yb_values = []
+    for r, g, b in pxls:
+        rg_values.append(r - g)
+        yb_values.append(0.5 * (r + g) - b)
+
+    def meanstdv(x):
+        mean = sum(x) / float(len(x))
+        return mean, sqrt(sum((a - mean) ** 2 for a in x) / float(len(x) - 1))
+
+    m_rg, s_rg = meanstdv(rg_values)
+    m_yb, s_yb = meanstdv(yb_values)
+    return sqrt(s_rg ** 2 + s_yb ** 2) + 0.3 * sqrt(m_rg ** 2 + m_yb ** 2)
+
+
+def per_timecode(ffmpeg, videofile, timecodes, tempdir):
+    results = []
+    for timecode in timecodes:
+        outputfile = os.path.join(tempdir, 'tn%d.ppm' % timecode)
+        get_thumbnail(videofile, outputfile, SAMPLE_RES, ffmpeg, timecode)
+        if os.path.exists(outputfile):
+            with open(outputfile, 'rb') as fp:
+                data = fp.read()[-SAMPLE_RES[0] * SAMPLE_RES[1] * 3:]
+            os.remove(outputfile)
+            pxls = [tuple(map(ord, data[index:index + 3])) for index in range(0, len(data), 3)]
+            results.append((per_pixel_colourfulness(pxls), timecode))
+    return results
+
+
+def single_pass(ffmpeg, videofile, timecodes, _):
+    return [(colourfulness(frame), timecode) for timecode, frame in get_frames(videofile, timecodes, SAMPLE_RES, ffmpeg)]
+
+
+def benchmark(ffmpeg, duration):
+    tempdir = tempfile.mkdtemp()
+    try:
+        videofile = os.path.join(tempdir, "test.mp4")
+        generate_video(ffmpeg, videofile, duration)
+        timecodes = range(0, duration, duration / NUM_SAMPLES)
+
+        for name, func in (("per timecode", per_timecode), ("single pass", single_pass)):
+            t1 = time()
+            c1 = os.times()
+            results = func(ffmpeg, videofile, timecodes, tempdir)
+            c2 = os.times()
+            t2 = time()
+            # user and system time of this process and of the ffmpeg processes it waited for
+            cpu = sum(c2[:4]) - sum(c1[:4])
+            best = [timecode for _, timecode in sorted(results, reverse=True)[:4]]
+            print "%-12s %2d frames  %6.2fs  cpu %6.2fs  best %s" % (name, len(results), t2 - t1, cpu, best)
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else "ffmpeg", int(sys.argv[2]) if len(sys.argv) > 2 else 600)
@@ -56,6 +56,7 @@ sessdefaults['general']['mugshot'] = None
 sessdefaults['general']['videoanalyserpath'] = None
 sessdefaults['general']['peer_icon_path'] = None
 sessdefaults['general']['live_aux_seeders'] = []
+sessdefaults['general']['reactor_monitor'] = False
 
 # Tunnel community section
 sessdefaults['tunnel_community'] = OrderedDict()
@@ -8,7 +8,7 @@ from time import time
 
 from datetime import date
 
-from Tribler.Core.Search.SearchManager import split_into_keywords
+from Tribler.Core.Search.Tokenizer import tokenizer
 from Tribler.Core.Video.utils import videoextdefaults
 from Tribler.Core.simpledefs import (DLSTATUS_DOWNLOADING, DLSTATUS_STOPPED, DLSTATUS_SEEDING, DLSTATUS_HASHCHECKING,
                                      DLSTATUS_WAITING4HASHCHECK, DLSTATUS_ALLOCATING_DISKSPACE,
@@ -335,7 +335,7 @@ class Torrent(Helper):
         # Find the lowest term position of the matching keywords
         pos_score = None
         if matches['swarmname']:
-            swarmnameTerms = split_into_keywords(self.name)
+            swarmnameTerms = tokenizer.get_record(self.name).keywords
             swarmnameMatches = matches['swarmname']
 
             for i, term in enumerate(swarmnameTerms):
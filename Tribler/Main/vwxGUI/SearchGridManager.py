@@ -15,7 +15,8 @@ from Tribler.Core.CacheDB.sqlitecachedb import bin2str, str2bin, forceAndReturnD
 from Tribler.Core.RemoteTorrentHandler import RemoteTorrentHandler
 from Tribler.Core.Search.Bundler import Bundler
 from Tribler.Core.Search.Reranking import DefaultTorrentReranker
-from Tribler.Core.Search.SearchManager import split_into_keywords
+from Tribler.Core.Search.SearchHits import SearchHits
+from Tribler.Core.Search.Tokenizer import tokenizer
 from Tribler.Core.Swift.SwiftDef import SwiftDef
 from Tribler.Core.TorrentDef import TorrentDef, TorrentDefNoMetainfo
 from Tribler.Core.Utilities.utilities import parse_magnetlink
@@ -68,6 +69,9 @@ class TorrentManager:
         self.hits = []
         self.hitsLock = threading.Lock()
 
+        # The same hits by infohash, used to merge remote hits and to rank them
+        self.searchHits = SearchHits()
+
         # Remote results for current keywords
         self.remoteHits = []
         self.gotRemoteHits = False
@@ -468,10 +472,10 @@ class TorrentManager:
                 tdef = TorrentDef.load(torrent_fn)
 
                 # find the original hit
-                for hit in self.hits:
-                    if hit.infohash == tdef.get_infohash():
-                        self._logger.debug("Prefetch: in %.1fs %s", time() - begin_time, hit.name)
-                        return
+                hit = self.searchHits.get(tdef.get_infohash())
+                if hit:
+                    self._logger.debug("Prefetch: in %.1fs %s", time() - begin_time, hit.name)
+                    return
                 self._logger.debug("Prefetch BUG. We got a hit from something we didn't ask for")
             except:
                 pass
@@ -481,7 +485,7 @@ class TorrentManager:
         prefetch_counter = [0, 0]
         prefetch_counter_limit = [5, 10]
 
-        for i, hit in enumerate(self.hits):
+        for i, hit in enumerate(self.hits[:max(hit_counter_limit)]):
             torrent_filename = self.getCollectedFilename(hit, retried=True)
             if not torrent_filename:
                 # this .torrent is not collected, decide if we want to collect it, or only collect torrentmessage
@@ -517,6 +521,7 @@ class TorrentManager:
                 self.filteredResults = 0
 
                 self.hits = []
+                self.searchHits.clear()
                 self.remoteHits = []
                 self.gotRemoteHits = False
                 self.oldsearchkeywords = None
@@ -580,6 +585,9 @@ class TorrentManager:
             results = map(create_torrent, results)
         self.hits = results
 
+        self.searchHits.clear()
+        self.searchHits.extend(results)
+
         self._logger.debug('TorrentSearchGridManager: _doSearchLocalDatabase took: %s of which tuple creation took %s', time() - begintime, time() - begintuples)
         return True
 
@@ -597,40 +605,41 @@ class TorrentManager:
             for remoteItem in hits:
                 known = False
 
-                for item in self.hits:
-                    if item.infohash == remoteItem.infohash:
-                        if item.query_candidates == None:
-                            item.query_candidates = set()
-                        item.query_candidates.update(remoteItem.query_candidates)
+                item = self.searchHits.get(remoteItem.infohash)
+                if item:
+                    known = True
 
-                        if item.swift_hash == None:
-                            item.swift_hash = remoteItem.swift_hash
-                            hitsModified.add(item.infohash)
+                    if item.query_candidates == None:
+                        item.query_candidates = set()
+                    item.query_candidates.update(remoteItem.query_candidates)
 
-                        if item.swift_torrent_hash == None:
-                            item.swift_torrent_hash = remoteItem.swift_torrent_hash
-                            hitsModified.add(item.infohash)
+                    if item.swift_hash == None:
+                        item.swift_hash = remoteItem.swift_hash
+                        hitsModified.add(item.infohash)
 
-                        if remoteItem.hasChannel():
-                            if isinstance(item, RemoteTorrent):
-                                self.hits.remove(item)  # Replace this item with a new result with a channel
-                                break
+                    if item.swift_torrent_hash == None:
+                        item.swift_torrent_hash = remoteItem.swift_torrent_hash
+                        hitsModified.add(item.infohash)
 
-                            # Maybe update channel?
-                            if isinstance(item, RemoteChannelTorrent):
-                                this_rating = remoteItem.channel.nr_favorites - remoteItem.channel.nr_spam
+                    if remoteItem.hasChannel():
+                        if isinstance(item, RemoteTorrent):
+                            # Replace this item with a new result with a channel
+                            self.searchHits.remove(item.infohash)
+                            known = False
 
-                                if item.hasChannel():
-                                    current_rating = item.channel.nr_favorites - item.channel.nr_spam
-                                else:
-                                    current_rating = this_rating - 1
+                        # Maybe update channel?
+                        elif isinstance(item, RemoteChannelTorrent):
+                            this_rating = remoteItem.channel.nr_favorites - remoteItem.channel.nr_spam
 
-                                if this_rating > current_rating:
-                                    item.updateChannel(remoteItem.channel)
-                                    hitsModified.add(item.infohash)
+                            if item.hasChannel():
+                                current_rating = item.channel.nr_favorites - item.channel.nr_spam
+                            else:
+                                current_rating = this_rating - 1
 
-                        known = True
-                        break
+                            if this_rating > current_rating:
+                                item.updateChannel(remoteItem.channel)
+                                self.searchHits.update(item)
+                                hitsModified.add(item.infohash)
 
                 if not known:
                     # Niels 26-10-2012: override category if name is xxx
@@ -640,9 +649,12 @@ class TorrentManager:
                             self._logger.debug('TorrentSearchGridManager: %s is xxx', remoteItem.name)
                             remoteItem.category_id = self.xxx_category
 
-                    self.hits.append(remoteItem)
+                    self.searchHits.add(remoteItem)
                     hitsUpdated = True
 
+            if hitsUpdated:
+                self.hits = self.searchHits.sort()
+
             return hitsUpdated, hitsModified
         except:
             raise
@@ -682,7 +694,7 @@ class TorrentManager:
 
                     # Guess matches
                     keywordset = set(keywords)
-                    swarmnameset = set(split_into_keywords(remoteHit.name))
+                    swarmnameset = set(tokenizer.get_record(remoteHit.name).keywords)
                     matches = {'fileextensions': set()}
                     matches['swarmname'] = swarmnameset & keywordset  # all keywords matching in swarmname
                     matches['filenames'] = keywordset - matches['swarmname']  # remaining keywords should thus me matching in filenames or fileextensions
@@ -738,15 +750,7 @@ class TorrentManager:
         self.hits.sort(cmp, reverse=True)
 
     def fulltextSort(self):
-        norm_num_seeders = self.doStatNormalization(self.hits, 'num_seeders')
-        norm_neg_votes = self.doStatNormalization(self.hits, 'neg_votes')
-        norm_subscriptions = self.doStatNormalization(self.hits, 'subscriptions')
-
-        for hit in self.hits:
-            score = 0.8 * norm_num_seeders[hit.infohash] - 0.1 * norm_neg_votes[hit.infohash] + 0.1 * norm_subscriptions[hit.infohash]
-            hit.relevance_score[-1] = score
-
-        self.hits.sort(key=lambda hit: hit.relevance_score, reverse=True)
+        self.hits = self.searchHits.sort()
 
     def doStatNormalization(self, hits, normKey):
         '''Center the variance on zero (this means mean == 0) and divide
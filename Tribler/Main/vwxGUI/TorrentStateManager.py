@@ -5,7 +5,7 @@ import hashlib
 import binascii
 import logging
 import tempfile
-from threading import currentThread, Thread
+from threading import currentThread, Event
 
 try:
     prctlimported = True
@@ -13,10 +13,14 @@ try:
 except ImportError, e:
     prctlimported = False
 
+from Tribler.Core.APIImplementation.ThreadPool import ThreadPool
 from Tribler.Core.Swift.SwiftDef import SwiftDef
 from Tribler.Core.Video.VideoUtility import get_videoinfo, preferred_timecodes, \
     limit_resolution, get_thumbnail
 
+# the number of videos that are analysed for thumbnails concurrently
+THUMBNAIL_WORKERS = 2
+
 
 class TorrentStateManager:
     # Code to make this a singleton
@@ -29,6 +33,9 @@ class TorrentStateManager:
 
         self._logger = logging.getLogger(self.__class__.__name__)
 
+        self.thumbnail_pool = ThreadPool(THUMBNAIL_WORKERS)
+        self.thumbnail_cancel = Event()
+
     def getInstance(*args, **kw):
         if TorrentStateManager.__single is None:
             TorrentStateManager(*args, **kw)
@@ -36,6 +43,8 @@ class TorrentStateManager:
     getInstance = staticmethod(getInstance)
 
     def delInstance(*args, **kw):
+        if TorrentStateManager.__single:
+            TorrentStateManager.__single.shutdown()
         TorrentStateManager.__single = None
     delInstance = staticmethod(delInstance)
 
@@ -59,9 +68,13 @@ class TorrentStateManager:
                 self._logger.info('Can run post-download scripts for %s %s %s', torrent, filename, destname)
                 self.create_and_seed_metadata(destname, torrent)
 
+    def shutdown(self):
+        # running ffmpeg processes are killed, queued videos are not analysed
+        self.thumbnail_cancel.set()
+        self.thumbnail_pool.joinAll(waitForTasks=False, waitForThreads=False)
+
     def create_and_seed_metadata(self, videofile, torrent):
-        t = Thread(target=self._create_and_seed_metadata, args=(videofile, torrent), name="ThumbnailGenerator")
-        t.start()
+        self.thumbnail_pool.queueTask(self._create_and_seed_metadata, (videofile, torrent))
 
     def _create_metadata_roothash_and_contenthash(self, tempdir, torrent):
         assert isinstance(tempdir, str) or isinstance(tempdir, unicode), \
@@ -98,6 +111,9 @@ class TorrentStateManager:
             shutil.rmtree(tempdir)
         else:
             shutil.move(tempdir, finaldir)
+
+        from Tribler.Core.RemoteTorrentHandler import RemoteTorrentHandler
+        RemoteTorrentHandler.getInstance().add_metadata('thumbs', torrent.infohash, binascii.unhexlify(contenthash_hex))
         thumb_filenames = [fn.replace(tempdir, finaldir) for fn in thumb_filenames]
 
         if len(thumb_filenames) == 1:
@@ -131,6 +147,9 @@ class TorrentStateManager:
         if prctlimported:
             prctl.set_name("Tribler" + currentThread().getName())
 
+        if self.thumbnail_cancel.is_set():
+            return
+
         # skip if we already have a video-info
         from Tribler.Core.CacheDB.SqliteCacheDBHandler import MetadataDBHandler
         metadata_db_handler = MetadataDBHandler.getInstance()
@@ -167,7 +186,10 @@ class TorrentStateManager:
 
         thumb_filenames = [os.path.join(tempdir, "ag_" + videoname + postfix) for postfix in ["-thumb%d.jpg" % i for i in range(1, 5)]]
         thumb_resolutions = [(1280, 720), (320, 240), (320, 240), (320, 240)]
-        thumb_timecodes = preferred_timecodes(videofile, duration, limit_resolution(resolution, (100, 100)), videoanalyser, k=4)
+        thumb_timecodes = preferred_timecodes(videofile, duration, limit_resolution(resolution, (100, 100)), videoanalyser, k=4, cancel=self.thumbnail_cancel)
+        if self.thumbnail_cancel.is_set():
+            shutil.rmtree(tempdir, ignore_errors=True)
+            return
 
         for filename, max_res, timecode in zip(thumb_filenames, thumb_resolutions, thumb_timecodes):
             thumb_res = limit_resolution(resolution, max_res)
@@ -20,6 +20,8 @@ logger = logging.getLogger(__name__)
 LIST_ITEM_BATCH_SIZE = 5
 LIST_ITEM_MAX_SIZE = 50
 LIST_RATE_LIMIT = 1
+# virtual lists create the items in view plus this many rows above and below it
+LIST_ITEM_MARGIN = 10
 
 THUMBNAIL_FILETYPES = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
 
@@ -389,6 +389,8 @@ class NetworkPanel(HomePanel):
         self.queueSuccess = StaticText(panel)
         self.queueBW = StaticText(panel)
         self.queueBW.SetToolTipString('Bandwidth spent on collecting .torrents')
+        self.frontier = StaticText(panel)
+        self.frontier.SetToolTipString('Torrents being collected, requests for torrents already collected or being collected, and mean time to collect a torrent')
         self.nrChannels = StaticText(panel)
 
         self.freeMem = None
@@ -413,6 +415,8 @@ class NetworkPanel(HomePanel):
         gridSizer.Add(self.queueSuccess, 0, wx.EXPAND)
         gridSizer.Add(StaticText(panel, -1, 'Torrent queue bw'))
         gridSizer.Add(self.queueBW, 0, wx.EXPAND)
+        gridSizer.Add(StaticText(panel, -1, 'Torrent frontier'))
+        gridSizer.Add(self.frontier, 0, wx.EXPAND)
         gridSizer.Add(StaticText(panel, -1, 'Channels found'))
         gridSizer.Add(self.nrChannels, 0, wx.EXPAND)
         if self.freeMem:
@@ -448,6 +452,7 @@ class NetworkPanel(HomePanel):
         self.nrFiles.SetLabel(str(stats[2]))
         self.queueSize.SetLabel(self.remotetorrenthandler.getQueueSize())
         self.queueBW.SetLabel(self.remotetorrenthandler.getBandwidthSpent())
+        self.frontier.SetLabel(self.remotetorrenthandler.getFrontierStatistics())
 
         qsuccess = self.remotetorrenthandler.getQueueSuccess()
         qlabel = ", ".join(label for label, tooltip in qsuccess)
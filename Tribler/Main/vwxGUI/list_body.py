@@ -12,7 +12,8 @@ from time import time
 
 from Tribler.Main.vwxGUI import warnWxThread, LIST_SELECTED, LIST_EXPANDED, \
     LIST_DARKBLUE, LIST_DESELECTED, DEFAULT_BACKGROUND, LIST_ITEM_BATCH_SIZE, \
-    LIST_AUTOSIZEHEADER, LIST_HIGHTLIGHT, LIST_RATE_LIMIT, LIST_ITEM_MAX_SIZE
+    LIST_AUTOSIZEHEADER, LIST_HIGHTLIGHT, LIST_RATE_LIMIT, LIST_ITEM_MAX_SIZE, \
+    LIST_ITEM_MARGIN
 from Tribler.Main.vwxGUI.GuiUtility import GUIUtility
 from Tribler.Main.vwxGUI.GuiImageManager import GuiImageManager
 from Tribler.Main.vwxGUI.widgets import BetterText as StaticText, \
@@ -21,6 +22,10 @@ from Tribler.Main.vwxGUI.widgets import BetterText as StaticText, \
 
 class ListItem(wx.Panel):
 
+    # whether a virtual list can reuse this item for another row, subclasses that build their controls from
+    # original_data when they are created should set this to False
+    recyclable = True
+
     @warnWxThread
     def __init__(self, parent, parent_list, columns, data, original_data, leftSpacer=0, rightSpacer=0, showChange=False, list_selected=LIST_SELECTED, list_expanded=LIST_EXPANDED, list_selected_and_expanded=LIST_DARKBLUE):
         wx.Panel.__init__(self, parent)
@@ -251,7 +256,41 @@ class ListItem(wx.Panel):
 
         self.Thaw()
 
-    def RefreshColumn(self, columnindex, data):
+    @warnWxThread
+    def Recycle(self, data, original_data):
+        # show another row in this item, as if it was created with data and original_data.  Returns False if a column
+        # got no control when this item was created, as it would not show that column for the other row.
+        for column in self.columns:
+            if column.get('show', True) and not self.controls[column['controlindex']]:
+                return False
+
+        if self.highlightTimer:
+            self.highlightTimer.Stop()
+            self.highlightTimer = None
+
+        self.selected = False
+        self.expanded = False
+        self.expandedPanel = None
+        self.original_data = original_data
+
+        self.data = data
+
+        new_controls = False
+
+        self.Freeze()
+        for i in xrange(len(self.columns)):
+            i_new_controls, _ = self.RefreshColumn(i, data[i], force=True)
+            if i_new_controls:
+                new_controls = True
+
+        if new_controls:
+            self.hSizer.Layout()
+
+        self.ShowSelected()
+        self.Thaw()
+        return True
+
+    def RefreshColumn(self, columnindex, data, force=False):
         new_controls = has_changed = False
         column = self.columns[columnindex]
         prevdata = self.data[columnindex]
@@ -282,7 +321,7 @@ class ListItem(wx.Panel):
                     has_changed = True
 
             elif type == 'method':
-                if prevdata != data:
+                if prevdata != data or force:
                     control = column['method'](self, self)
 
                     if isinstance(control, Iterable):
@@ -514,6 +553,9 @@ class ListItem(wx.Panel):
 
 class AbstractListBody():
 
+    # a virtual list only creates the items of the rows in view, see IsVirtual
+    virtual = False
+
     @warnWxThread
     def __init__(self, parent_list, columns, leftSpacer=0, rightSpacer=0, singleExpanded=False, showChange=False, list_item_max=None, hasFilter=True, listRateLimit=LIST_RATE_LIMIT, grid_columns=0, horizontal_scroll=False):
         self._logger = logging.getLogger(self.__class__.__name__)
@@ -602,6 +644,16 @@ class AbstractListBody():
         self.items = {}
         self.to_be_removed = set()
 
+        # key:position in self.data
+        self.data_index = {}
+
+        # virtual list, the rows [start, end) of self.data have an item in vSizer, between two spacers standing in for
+        # the other rows.  Items that scrolled out of view are kept in recycled, per type, to show another row.
+        self.window = (0, 0)
+        self.window_items = []
+        self.topSpacer = self.bottomSpacer = None
+        self.recycled = {}
+
         # Allow list-items to store the most recent mouse left-down events:
         self.lastMouseLeftDownEvent = None
         self.curWidth = -1
@@ -638,41 +690,35 @@ class AbstractListBody():
         self.SetData(highlight=False, force=True)
 
     def DoSort(self):
-        def sortby(b, a):
-            if a[0] in self.items:
-                a = self.items[a[0]].data[self.sortcolumn]
-            else:
-                a = a[1][self.sortcolumn]
-
-            if b[0] in self.items:
-                b = self.items[b[0]].data[self.sortcolumn]
-            else:
-                b = b[1][self.sortcolumn]
-
-            if isinstance(a, basestring):
-                a = a.lower()
-            if isinstance(b, basestring):
-                b = b.lower()
+        def sortkey(curdata):
+            item = self.items.get(curdata[0])
+            value = item.data[self.sortcolumn] if item else curdata[1][self.sortcolumn]
 
-            return cmp(a, b)
+            if isinstance(value, basestring):
+                return value.lower()
+            return value
 
+        data = []
         fixed_positions = []
-
-        index = 0
-        while index < len(self.data):
-            item = self.data[index]
-            if len(item) == 5:
-                fixed_positions.append((item[-1], item))
-                self.data.pop(index)
-                continue
-            index += 1
+        for curdata in self.data:
+            if len(curdata) == 5:
+                fixed_positions.append((curdata[-1], curdata))
+            else:
+                data.append(curdata)
 
         if self.sortcolumn != None:
-            self.data = sorted(self.data, cmp=sortby, reverse=self.sortreverse)
+            # lists are sorted descending, unless sortreverse is set
+            data.sort(key=sortkey, reverse=not self.sortreverse)
 
         fixed_positions.sort()
-        for pos, item in fixed_positions:
-            self.data.insert(pos, item)
+        for pos, curdata in fixed_positions:
+            data.insert(pos, curdata)
+
+        self.data = data
+        self.IndexData()
+
+    def IndexData(self):
+        self.data_index = dict((curdata[0], index) for index, curdata in enumerate(self.data))
 
     def SetFilter(self, filter, filterMessage, highlight):
         self.filterMessage = filterMessage
@@ -753,12 +799,22 @@ class AbstractListBody():
         self._logger.debug("ListBody: OnChange")
         self.Freeze()
 
+        if self.IsVirtual():
+            self.UpdateSpacers()
+
         self.vSizer.Layout()
         self.listpanel.Layout()
         self.Layout()
 
         # Determine scrollrate
-        if not self.horizontal_scroll:
+        if self.IsVirtual():
+            # one scroll unit per row, GetWindow and ScrollToId depend on it
+            if self.rate:
+                self.SetupScrolling(scrollToTop=scrollToTop, rate_y=self.rate)
+            else:
+                self.SetupScrolling(scrollToTop=scrollToTop)
+
+        elif not self.horizontal_scroll:
             nritems = len(self.vSizer.GetChildren())
             if self.rate is None or nritems <= LIST_ITEM_BATCH_SIZE * 3:
                 if nritems > 0:
@@ -788,11 +844,13 @@ class AbstractListBody():
         self.sortcolumn = None
         self.rate = None
 
-        self.vSizer.ShowItems(False)
-        self.vSizer.Clear()
+        self.ClearSizer()
         for item in self.items.itervalues():
             if item:
                 item.Destroy()
+        for recycled in self.recycled.itervalues():
+            for item in recycled:
+                item.Destroy()
 
         if self.dataTimer:
             self.dataTimer.Stop()
@@ -802,6 +860,9 @@ class AbstractListBody():
         self.items = {}
         self.to_be_removed = set()
         self.data = None
+        self.data_index = {}
+        self.window = (0, 0)
+        self.recycled = {}
         self.lastData = 0
         self.raw_data = None
         self.ShowLoading()
@@ -820,9 +881,7 @@ class AbstractListBody():
         if onlyCreated or not self.data:
             return key in self.items
 
-        if key in self.items:
-            return True
-        return any(curdata[0] == key for curdata in self.data)
+        return key in self.items or key in self.data_index
 
     @warnWxThread
     def ScrollToEnd(self, scroll_to_end):
@@ -830,6 +889,7 @@ class AbstractListBody():
             self.Scroll(-1, self.vSizer.GetSize()[1])
         else:
             self.Scroll(-1, 0)
+        self.UpdateWindow()
 
     @warnWxThread
     def ScrollToNextPage(self, scroll_to_nextpage):
@@ -839,10 +899,15 @@ class AbstractListBody():
         else:
             scroll_pos = max(scroll_pos - self.GetScrollPageSize(0), 0)
         self.Scroll(-1, scroll_pos)
+        self.UpdateWindow()
 
     @warnWxThread
     def ScrollToId(self, id):
-        if id in self.items:
+        if self.IsVirtual() and self.rate and not self.InWindow(id) and id in self.data_index:
+            self.Scroll(-1, self.data_index[id])
+            self.UpdateWindow()
+
+        elif id in self.items:
             sy = self.items[id].GetPosition()[1] / self.GetScrollPixelsPerUnit()[1]
             self.Scroll(-1, sy)
 
@@ -875,8 +940,7 @@ class AbstractListBody():
 
         if clearitems:
             self.loadNext.Hide()
-            self.vSizer.ShowItems(False)
-            self.vSizer.Clear()
+            self.ClearSizer()
 
         if not self.messagePanel.IsShown():
             self.messagePanel.Show()
@@ -902,6 +966,16 @@ class AbstractListBody():
 
     @warnWxThread
     def RefreshData(self, key, data):
+        pos = self.data_index.get(key) if self.data else None
+        if pos is not None:
+            # keep the row up to date, a virtual list creates its item again when it scrolls back into view
+            curdata = self.data[pos]
+            original_data = data[2]
+            if isinstance(original_data, dict) and isinstance(curdata[2], dict):
+                curdata[2].update(original_data)
+                original_data = curdata[2]
+            self.data[pos] = (curdata[0], data[1], original_data) + tuple(data[3:] if len(data) > 3 else curdata[3:])
+
         if key in self.items:
             self._logger.debug("ListBody: refresh item %s", self.items[key])
             self.items[key].RefreshData(data)
@@ -914,8 +988,20 @@ class AbstractListBody():
                 panel.RefreshData(data)
 
         elif self.data:
-            self.data.append(data)
-            self.CreateItem(key)
+            if pos is None:
+                self.data.append(data)
+                self.data_index[key] = len(self.data) - 1
+
+                if self.IsVirtual():
+                    start, end = self.window
+                    if self.window_items and end == len(self.data) - 1:
+                        self.MaterializeWindow(start, end + 1)
+                    else:
+                        self.OnChange()
+                    return
+
+            if not self.IsVirtual():
+                self.CreateItem(key)
 
     @warnWxThread
     def SetData(self, data=None, highlight=None, force=False):
@@ -971,43 +1057,54 @@ class AbstractListBody():
         if getattr(self.parent_list, 'SetNrResults', None):
             self.parent_list.SetNrResults(len(data))
 
+        # diff by key against the current rows, only the items of removed rows are destroyed
         self.highlightSet = set()
-        cur_keys = set(self.items.keys())
-        for curdata in data[:self.list_cur_max]:
+        prev_keys = self.data_index if self.data else {}
+        new_keys = set()
+        for curdata in data:
             key = curdata[0]
-            if key not in cur_keys:
-                if highlight:
-                    self.highlightSet.add(key)
-            else:
-                cur_keys.discard(key)
+            new_keys.add(key)
+            if highlight and key not in prev_keys and key not in self.items:
+                self.highlightSet.add(key)
 
-        # cur_keys now contains all removed items
-        for key in cur_keys:
-            self.items[key].DoCollapse()
-            self.items[key].Show(False)
-            self.items[key].Destroy()
-            del self.items[key]
+        for key in [key for key in self.items if key not in new_keys]:
+            item = self.items.pop(key)
+            if item:
+                item.DoCollapse()
+                item.Show(False)
+                item.Destroy()
 
         self.data = data
         self.DoSort()
         self.done = False
 
         if len(data) > 0:
-            self.vSizer.ShowItems(False)
-            self.vSizer.Clear()
+            if self.IsVirtual():
+                self.messagePanel.Show(False)
+                self.loadNext.Show(False)
+            else:
+                self.ClearSizer()
 
             self.CreateItems(nr_items_to_create=3 * LIST_ITEM_BATCH_SIZE)
 
+            if self.IsVirtual() and self.filter:
+                header, message = self.filterMessage()
+                if message:
+                    self.ShowMessage(message + '.', header, clearitems=False)
+
             # Try to yield
             try:
                 wx.Yield()
             except:
                 pass
 
-        elif self.filter:
-            header, message = self.filterMessage(empty=True)
-            if message:
-                self.ShowMessage(message + '.', header)
+        else:
+            self.ClearSizer()
+
+            if self.filter:
+                header, message = self.filterMessage(empty=True)
+                if message:
+                    self.ShowMessage(message + '.', header)
 
         if self.done:
             self.Unbind(wx.EVT_IDLE)  # unbinding unnecessary event handler seems to improve visual performance
@@ -1044,17 +1141,21 @@ class AbstractListBody():
 
     @warnWxThread
     def CreateItem(self, key):
-        if not key in self.items and self.data:
-            for curdata in self.data:
-                if key == curdata[0]:
-                    if len(curdata) > 3:
-                        _, item_data, original_data, create_method = curdata[:4]
-                    else:
-                        _, item_data, original_data = curdata
-                        create_method = ListItem
+        if not key in self.items and self.data and key in self.data_index:
+            pos = self.data_index[key]
+            self.items[key] = self.NewItem(self.data[pos])
+
+            if self.IsVirtual():
+                # only add the item if its row is in view, otherwise it is kept hidden until it is
+                start, end = self.window
+                if self.window_items and start <= pos < end:
+                    self.MaterializeWindow(start, end)
+                else:
+                    self.items[key].Show(False)
+                return True
 
-                    self.items[key] = create_method(self.listpanel, self, self.columns, item_data, original_data, self.leftSpacer, self.rightSpacer, showChange=self.showChange, list_selected=self.list_selected, list_expanded=self.list_expanded)
-                    break
+        if self.IsVirtual():
+            return key in self.items
 
         if key in self.items:
             item = self.items[key]
@@ -1074,6 +1175,12 @@ class AbstractListBody():
 
         self._logger.debug("ListBody: Creating items %s", time())
 
+        if self.IsVirtual():
+            if self.data:
+                self.MaterializeWindow(*self.GetWindow())
+            self.done = True
+            return
+
         initial_nr_items_to_add = nr_items_to_add
         done = True
         didAdd = False
@@ -1092,11 +1199,7 @@ class AbstractListBody():
             revertList = []
             # Add created/cached items
             for curdata in self.data:
-                if len(curdata) > 3:
-                    key, item_data, original_data, create_method = curdata[:4]
-                else:
-                    key, item_data, original_data = curdata
-                    create_method = ListItem
+                key = curdata[0]
 
                 if nr_items_to_add > 0 and nr_items_to_create > 0:
                     if key in self.to_be_removed:
@@ -1104,12 +1207,8 @@ class AbstractListBody():
                         self.to_be_removed.remove(key)
 
                     if key not in self.items:
-                        try:
-                            self.items[key] = create_method(self.listpanel, self, self.columns, item_data, original_data, self.leftSpacer, self.rightSpacer, showChange=self.showChange, list_selected=self.list_selected, list_expanded=self.list_expanded)
-                            nr_items_to_create -= 1
-                        except:
-                            print_exc()
-                            self.items[key] = None
+                        self.items[key] = self.NewItem(curdata)
+                        nr_items_to_create -= 1
 
                     item = self.items[key]
                     sizer = self.vSizer.GetItem(item) if item else True
@@ -1162,6 +1261,166 @@ class AbstractListBody():
         self.done = done
         self._logger.debug("List created %s rows of %s took %s done: %s %s", len(self.vSizer.GetChildren()), len(self.data), time() - t1, self.done, time())
 
+    def IsVirtual(self):
+        return self.virtual and not self.horizontal_scroll and self.grid_columns == 0
+
+    def InWindow(self, key):
+        pos = self.data_index.get(key)
+        return pos is not None and self.window[0] <= pos < self.window[1]
+
+    @warnWxThread
+    def ClearSizer(self):
+        self.vSizer.ShowItems(False)
+        self.vSizer.Clear()
+
+        self.window = (0, 0)
+        self.window_items = []
+        self.topSpacer = self.bottomSpacer = None
+
+    @warnWxThread
+    def NewItem(self, curdata):
+        if len(curdata) > 3:
+            _, item_data, original_data, create_method = curdata[:4]
+        else:
+            _, item_data, original_data = curdata
+            create_method = ListItem
+
+        try:
+            recycled = self.recycled.get(create_method)
+            while recycled:
+                item = recycled.pop()
+                if item.Recycle(item_data, original_data):
+                    return item
+                item.Destroy()
+
+            return create_method(self.listpanel, self, self.columns, item_data, original_data, self.leftSpacer, self.rightSpacer, showChange=self.showChange, list_selected=self.list_selected, list_expanded=self.list_expanded)
+        except:
+            print_exc()
+            return None
+
+    @warnWxThread
+    def ReleaseItem(self, key):
+        item = self.items.pop(key, None)
+        if item:
+            self.vSizer.Detach(item)
+            item.Show(False)
+
+            recycled = self.recycled.setdefault(type(item), [])
+            if item.recyclable and len(recycled) < 2 * LIST_ITEM_MARGIN:
+                recycled.append(item)
+            else:
+                item.Destroy()
+
+    def GetRowAt(self, y):
+        # Returns the row at unscrolled position y, the rows outside the window are assumed to be self.rate pixels high
+        start, end = self.window
+        bottom = start * self.rate
+        if y < bottom:
+            return y / self.rate
+
+        pos = start
+        for pos, item in self.window_items:
+            bottom = item.GetPosition()[1] + item.GetSize()[1] + 1
+            if y < bottom:
+                return pos
+        return max(pos + 1, end) + (y - bottom) / self.rate
+
+    def GetWindow(self):
+        # Returns the rows in view plus LIST_ITEM_MARGIN rows on both sides, as long as the height of a row is unknown
+        # the first rows are used
+        if not self.rate:
+            return 0, min(len(self.data), 3 * LIST_ITEM_BATCH_SIZE + LIST_ITEM_MARGIN)
+
+        y = self.CalcUnscrolledPosition(0, 0)[1]
+        first = self.GetRowAt(y)
+        last = self.GetRowAt(y + self.GetClientSize()[1])
+        return max(0, first - LIST_ITEM_MARGIN), min(len(self.data), last + 1 + LIST_ITEM_MARGIN)
+
+    @warnWxThread
+    def UpdateWindow(self):
+        if not self.IsVirtual() or not self.data or not self.window_items:
+            return
+
+        # only move the window once the margin on either side has been scrolled halfway into view
+        start, end = self.window
+        new_start, new_end = self.GetWindow()
+        if (new_start + LIST_ITEM_MARGIN / 2 < start) or (start < new_start - LIST_ITEM_MARGIN and start > 0) or \
+                (new_end - LIST_ITEM_MARGIN / 2 > end) or (end > new_end + LIST_ITEM_MARGIN and end < len(self.data)):
+            self.MaterializeWindow(new_start, new_end)
+
+    @warnWxThread
+    def MaterializeWindow(self, start, end):
+        self._logger.debug("ListBody: showing rows %d-%d of %d", start, end, len(self.data))
+        t1 = time()
+
+        self.Freeze()
+
+        window_keys = set(curdata[0] for curdata in self.data[start:end])
+        for key, item in self.items.items():
+            if key not in window_keys:
+                if item and item.expanded:
+                    # keep expanded items, they are shown again when they scroll back into view
+                    self.vSizer.Detach(item)
+                    item.Show(False)
+                else:
+                    self.ReleaseItem(key)
+
+        self.vSizer.Clear()
+        self.topSpacer = self.vSizer.Add((0, 0))
+
+        revertList = []
+        self.window_items = []
+        for pos in xrange(start, end):
+            curdata = self.data[pos]
+            key = curdata[0]
+
+            if key in self.to_be_removed:
+                self.DestroyItem(key)
+                self.to_be_removed.remove(key)
+
+            if key not in self.items:
+                self.items[key] = self.NewItem(curdata)
+
+            item = self.items[key]
+            if item:
+                self.vSizer.Add(item, 0, wx.EXPAND | wx.BOTTOM, 1)
+                item.Show()
+                self.window_items.append((pos, item))
+
+                if key in self.highlightSet:
+                    self.highlightSet.remove(key)
+
+                    if item.Highlight(revert=False):
+                        revertList.append(key)
+
+        self.bottomSpacer = self.vSizer.Add((0, 0))
+        self.window = (start, end)
+
+        had_rate = bool(self.rate)
+        self.OnChange()
+        self.Thaw()
+
+        if len(revertList) > 0:
+            wx.CallLater(1000, self.Revert, revertList)
+
+        if not had_rate and self.rate:
+            # now that the height of a row is known, the window can be fitted to the view
+            wx.CallAfter(self.UpdateWindow)
+
+        self._logger.debug("ListBody: showing %d rows took %s", len(self.window_items), time() - t1)
+
+    def UpdateSpacers(self):
+        if self.rate is None and self.window_items:
+            heights = [item.GetBestSize()[1] + 1 for _, item in self.window_items]
+            self.rate = max(1, sum(heights) / len(heights))
+            self._logger.debug("ListBody: setting scrollrate to %s", self.rate)
+
+        if self.topSpacer and self.bottomSpacer:
+            start, end = self.window
+            rate = self.rate or 0
+            self.topSpacer.SetSpacer((0, start * rate))
+            self.bottomSpacer.SetSpacer((0, (len(self.data) - end) * rate))
+
     def HasItem(self, key):
         return key in self.items
 
@@ -1173,9 +1432,8 @@ class AbstractListBody():
 
     def GetItemPos(self, key):
         # Returns the index of the ListItem belonging to this key
-        for i, data in enumerate(self.data):
-            if key == data[0]:
-                return i
+        if self.data:
+            return self.data_index.get(key)
 
     def GetItemKey(self, item):
         for key, curitem in self.items.iteritems():
@@ -1200,22 +1458,26 @@ class AbstractListBody():
             if self.DestroyItem(key):
                 updated = True
 
+        if self.data and any(key in self.data_index for key in _keys):
+            self.data = [curdata for curdata in self.data if curdata[0] not in _keys]
+            self.IndexData()
+
+            if self.IsVirtual() and self.window_items:
+                start, end = self.window
+                self.MaterializeWindow(min(start, len(self.data)), min(end, len(self.data)))
+                updated = False
+
         if updated:
             self.OnChange()
 
         if self.raw_data:
-            for i, curdata in enumerate(self.raw_data):
-                if curdata[0] in _keys:
-                    self.raw_data.pop(i)
-                    _keys.discard(curdata[0])
-
-                if len(_keys) == 0:
-                    break
+            self.raw_data[:] = [curdata for curdata in self.raw_data if curdata[0] not in _keys]
 
     def DestroyItem(self, key):
         item = self.items.get(key, None)
         if item:
             self.items.pop(key)
+            self.window_items = [(pos, window_item) for pos, window_item in self.window_items if window_item is not item]
 
             self.vSizer.Detach(item)
             item.Destroy()
@@ -1253,22 +1515,20 @@ class AbstractListBody():
         if not item:
             return
 
-        key = None
-        for k, i in self.items.iteritems():
-            if item == i:
-                key = k
-
         select = None
-        for index, data in enumerate(self.data):
-            if data[0] == key:
-                offset = self.grid_columns or 1
-                if next and len(self.data) > index + offset:
-                    select = self.data[index + offset][0]
-                elif not next and index >= offset:
-                    select = self.data[index - offset][0]
-                break
+        index = self.GetItemPos(self.GetItemKey(item))
+        if index is not None:
+            offset = self.grid_columns or 1
+            if next and len(self.data) > index + offset:
+                select = self.data[index + offset][0]
+            elif not next and index >= offset:
+                select = self.data[index - offset][0]
 
         if select:
+            # a virtual list has to show the row before its item can be positioned
+            if self.IsVirtual() and not self.InWindow(select):
+                self.ScrollToId(select)
+
             cur_scroll = self.CalcUnscrolledPosition(0, 0)[1] / self.GetScrollPixelsPerUnit()[1]
             if next:
                 tot_scroll = (self.items[select].GetPosition()[1] + self.items[select].GetSize()[1] + 1) / self.GetScrollPixelsPerUnit()[1]
@@ -1336,6 +1596,8 @@ class AbstractListBody():
 
 class ListBody(AbstractListBody, scrolled.ScrolledPanel):
 
+    virtual = True
+
     def __init__(self, parent, parent_list, columns, leftSpacer=0, rightSpacer=0, singleExpanded=False, showChange=False, list_item_max=LIST_ITEM_MAX_SIZE, listRateLimit=LIST_RATE_LIMIT, grid_columns=0, horizontal_scroll=False):
         scrolled.ScrolledPanel.__init__(self, parent)
         AbstractListBody.__init__(self, parent_list, columns, leftSpacer, rightSpacer, singleExpanded, showChange, listRateLimit=listRateLimit, list_item_max=list_item_max, grid_columns=grid_columns, horizontal_scroll=horizontal_scroll)
@@ -1375,6 +1637,7 @@ class ListBody(AbstractListBody, scrolled.ScrolledPanel):
         TIMER_ID = wx.NewId()
         self.scrollTimer = wx.Timer(self, TIMER_ID)
         self.Bind(wx.EVT_TIMER, self.checkScroll)
+        self.Bind(wx.EVT_SCROLLWIN, self.OnScroll)
         self.processingMousewheel = False
 
     def OnChildFocus(self, event):
@@ -1383,6 +1646,11 @@ class ListBody(AbstractListBody, scrolled.ScrolledPanel):
     def OnBack(self, event):
         pass
 
+    def OnScroll(self, event):
+        event.Skip()
+        if self.IsVirtual():
+            wx.CallAfter(self.UpdateWindow)
+
     def OnMouseWheel(self, event):
         try:
             if self.processingMousewheel:
@@ -1406,6 +1674,10 @@ class ListBody(AbstractListBody, scrolled.ScrolledPanel):
             self.scrollTimer.Stop()
 
     def checkScroll(self, event):
+        if self.IsVirtual():
+            self.UpdateWindow()
+            return
+
         maxY = self.vSizer.GetSize()[1]
         doMore = maxY * 0.8
 
@@ -25,6 +25,8 @@ BUNDLE_NUM_ROWS = 3
 
 class BundleListItem(ListItem):
 
+    recyclable = False
+
     def __init__(self, parent, parent_list, columns, data, original_data, leftSpacer=0, rightSpacer=0, showChange=False, list_selected=LIST_SELECTED):
         self._logger = logging.getLogger(self.__class__.__name__)
 
@@ -877,6 +877,11 @@ class TorrentDetails(AbstractDetails):
 
         self.torrent.updateSwarminfo(newTorrent.swarminfo)
         self.torrent.update_torrent_id(newTorrent.torrent_id)
+
+        # rescore the search hit with its new number of seeders
+        searchHits = self.guiutility.torrentsearch_manager.searchHits
+        if searchHits.get(curTorrent.infohash) is curTorrent:
+            searchHits.update(curTorrent)
         del self.torrent.status
 
         if not curTorrent.exactCopy(newTorrent):
@@ -55,6 +55,8 @@ class ColumnsManager:
 
 class DoubleLineListItem(ListItem):
 
+    recyclable = False
+
     def __init__(self, *args, **kwargs):
         self.guiutility = GUIUtility.getInstance()
         ListItem.__init__(self, *args, **kwargs)
@@ -916,6 +918,8 @@ class LibraryListItem(TorrentListItem):
 
 class ThumbnailListItemNoTorrent(FancyPanel, ListItem):
 
+    recyclable = False
+
     def __init__(self, parent, parent_list, columns, data, original_data, leftSpacer=0, rightSpacer=0, showChange=False, list_selected=LIST_SELECTED, list_expanded=LIST_EXPANDED, list_selected_and_expanded=LIST_DARKBLUE):
         FancyPanel.__init__(self, parent, border=wx.RIGHT | wx.BOTTOM)
         self.SetBorderColour(SEPARATOR_GREY)
@@ -1049,6 +1053,8 @@ class ThumbnailListItem(ThumbnailListItemNoTorrent, TorrentListItem):
 
 class ActivityListItem(ListItem):
 
+    recyclable = False
+
     def __init__(self, *args, **kwargs):
         ListItem.__init__(self, *args, **kwargs)
 
@@ -1078,6 +1084,8 @@ class DragItem(TorrentListItem):
 
 class AvantarItem(ListItem):
 
+    recyclable = False
+
     def __init__(self, parent, parent_list, columns, data, original_data, leftSpacer=0, rightSpacer=0, showChange=False, list_selected=LIST_SELECTED, list_expanded=LIST_EXPANDED):
         self.header = ''
         self.body = ''
@@ -11,8 +11,34 @@ from Tribler.Core.simpledefs import UPLOAD, DOWNLOAD, DLSTATUS_ALLOCATING_DISKSP
 from Tribler.Core.Libtorrent.LibtorrentMgr import LibtorrentMgr
 
 
+def max_min_fair_shares(capacity, demands):
+    """
+    Divides capacity over demands such that no demand gets more than it asks for and the smallest share is as large
+    as possible: demands below the equal share are granted, the rest divides what remains equally.
+
+    @param demands A list of demands, None for a demand without limit.
+    @return A list of shares in the same order as demands.
+    """
+    shares = [0.0] * len(demands)
+    order = sorted(xrange(len(demands)), key=lambda i: (demands[i] is None, demands[i]))
+
+    remaining = float(capacity)
+    for position, i in enumerate(order):
+        share = remaining / (len(order) - position)
+        if demands[i] is not None and demands[i] < share:
+            share = demands[i]
+        shares[i] = share
+        remaining -= share
+    return shares
+
+
 class RateManager:
 
+    # a computed speed limit is only applied when it differs more than MIN_CHANGE KB/s and RELATIVE_CHANGE from the
+    # current limit, small fluctuations of the computed limits do not reach libtorrent
+    MIN_CHANGE = 1.0
+    RELATIVE_CHANGE = 0.1
+
     def __init__(self):
         self._logger = logging.getLogger(self.__class__.__name__)
 
@@ -20,12 +46,11 @@ class RateManager:
         self.statusmap = {}
         self.currenttotal = {}
         self.dset = Set()
+        self.nr_speed_changes = 0
         self.clear_downloadstates()
 
     def add_downloadstate(self, ds):
         """ Returns the number of unique states currently stored """
-        self._logger.debug("RateManager: add_downloadstate %s", repr(ds.get_download().get_def().get_roothash()))
-
         self.lock.acquire()
         try:
             d = ds.get_download()
@@ -75,6 +100,23 @@ class RateManager:
         """ Override this method to write you own speed management policy. """
         pass
 
+    def set_max_speed(self, d, direct, speed, damped=False):
+        """ Sets the speed limit of a download.  A damped limit, i.e. a computed share of the global limit, is not
+        applied when it is close to the current limit, unless the current limit exceeds the desired speed of the user.
+        @return Whether the limit was changed. """
+        current = d.get_max_speed(direct)
+        if current == speed:
+            return False
+        # 0 means unlimited, going from or to unlimited is always a change
+        if damped and current > 0 and speed > 0 and abs(speed - current) <= max(self.MIN_CHANGE, current * self.RELATIVE_CHANGE):
+            desired = d.get_max_desired_speed(direct)
+            if desired <= 0 or current <= desired:
+                return False
+
+        d.set_max_speed(direct, speed)
+        self.nr_speed_changes += 1
+        return True
+
 
 class UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager(RateManager):
 
@@ -91,6 +133,7 @@ class UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager(RateManager):
         RateManager.__init__(self)
         self.global_max_speed = {UPLOAD: 0.0, DOWNLOAD: 0.0}
         self.ltmgr = None
+        self.libtorrent_rate = {UPLOAD: None, DOWNLOAD: None}
 
     def set_global_max_speed(self, direct, speed):
         self.lock.acquire()
@@ -126,7 +169,7 @@ class UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager(RateManager):
             # Unlimited speed
             for ds in workingset:
                 d = ds.get_download()
-                d.set_max_speed(dir, d.get_max_desired_speed(dir))
+                self.set_max_speed(d, dir, d.get_max_desired_speed(dir))
 
         else:
             self._logger.debug("RateManager: calc_and_set_speed_limits: globalmaxspeed is %s %s", globalmaxspeed, dir)
@@ -137,7 +180,7 @@ class UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager(RateManager):
                 d = ds.get_download()
                 maxdesiredspeed = d.get_max_desired_speed(dir)
                 if maxdesiredspeed > 0.0:
-                    d.set_max_speed(dir, maxdesiredspeed)
+                    self.set_max_speed(d, dir, maxdesiredspeed)
                 else:
                     todoset.append(ds)
 
@@ -150,22 +193,27 @@ class UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager(RateManager):
 
                 for ds in todoset:
                     d = ds.get_download()
-                    d.set_max_speed(dir, localmaxspeed)
+                    self.set_max_speed(d, dir, localmaxspeed, damped=True)
 
 
+        self.set_libtorrent_rate_limit(dir)
+
+    def get_global_max_speed(self, dir=UPLOAD):
+        return self.global_max_speed[dir]
+
+    def set_libtorrent_rate_limit(self, dir=UPLOAD):
         if self.ltmgr == None and LibtorrentMgr.hasInstance():
             self.ltmgr = LibtorrentMgr.getInstance()
 
         if self.ltmgr:
             rate = self.global_max_speed[dir]  # unlimited == 0, stop == -1, else rate in kbytes
             libtorrent_rate = -1 if rate == 0 else (1 if rate == -1 else rate * 1024)
-            if dir == UPLOAD:
-                self.ltmgr.set_upload_rate_limit(libtorrent_rate)
-            else:
-                self.ltmgr.set_download_rate_limit(libtorrent_rate)
-
-    def get_global_max_speed(self, dir=UPLOAD):
-        return self.global_max_speed[dir]
+            if libtorrent_rate != self.libtorrent_rate[dir]:
+                self.libtorrent_rate[dir] = libtorrent_rate
+                if dir == UPLOAD:
+                    self.ltmgr.set_upload_rate_limit(libtorrent_rate)
+                else:
+                    self.ltmgr.set_download_rate_limit(libtorrent_rate)
 
 
 class UserDefinedMaxAlwaysOtherwiseDividedOnDemandRateManager(UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager):
@@ -204,9 +252,6 @@ class UserDefinedMaxAlwaysOtherwiseDividedOnDemandRateManager(UserDefinedMaxAlwa
         workingset = newws
 
         self._logger.debug("RateManager: calc_and_set_speed_limits: len new workingset %s", len(workingset))
-        for ds in workingset:
-            d = ds.get_download()
-            self._logger.debug("RateManager: calc_and_set_speed_limits: working is %s", d.get_def().get_name())
 
         # No active file, not need to calculate
         if not workingset:
@@ -218,7 +263,7 @@ class UserDefinedMaxAlwaysOtherwiseDividedOnDemandRateManager(UserDefinedMaxAlwa
             # Unlimited speed
             for ds in workingset:
                 d = ds.get_download()
-                d.set_max_speed(dir, d.get_max_desired_speed(dir))
+                self.set_max_speed(d, dir, d.get_max_desired_speed(dir))
 
         else:
             self._logger.debug("RateManager: calc_and_set_speed_limits: globalmaxspeed is %s %s", globalmaxspeed, dir)
@@ -229,7 +274,7 @@ class UserDefinedMaxAlwaysOtherwiseDividedOnDemandRateManager(UserDefinedMaxAlwa
                 d = ds.get_download()
                 maxdesiredspeed = d.get_max_desired_speed(dir)
                 if maxdesiredspeed > 0.0:
-                    d.set_max_speed(dir, maxdesiredspeed)
+                    self.set_max_speed(d, dir, maxdesiredspeed)
                 else:
                     todoset.append(ds)
 
@@ -240,65 +285,27 @@ class UserDefinedMaxAlwaysOtherwiseDividedOnDemandRateManager(UserDefinedMaxAlwa
 
                 self._logger.debug("RateManager: calc_and_set_speed_limits: localmaxspeed is %s %s", localmaxspeed, dir)
 
-                # See if underutilizers and overutilizers. If not, just divide equally
-                downloadsatmax = False
-                downloadsunderutil = False
+                # Downloads using less than their share are limited to their current speed plus some room to
+                # grow, the others divide what remains (max-min fairness). A download at its current limit
+                # needs more and has no demand limit.
+                demands = []
                 for ds in todoset:
-                    d = ds.get_download()
                     currspeed = ds.get_current_speed(dir)
-                    currmaxspeed = d.get_max_speed(dir)
-
-                    newmaxspeed = currspeed + self.ROOM
-                    if currspeed >= (currmaxspeed - 3.0):  # dl needs more
-                        downloadsatmax = True
-                    elif newmaxspeed < localmaxspeed:  # dl got quota to spare
-                        downloadsunderutil = True
-
-                if downloadsatmax and downloadsunderutil:
-                    totalunused = 0.0
-                    todoset2 = []
-                    for ds in todoset:
-                        d = ds.get_download()
-                        currspeed = ds.get_current_speed(dir)
-
-                        newmaxspeed = currspeed + self.ROOM
-                        if newmaxspeed < localmaxspeed:
-                            # If unterutilizing:
-                            totalunused += (localmaxspeed - newmaxspeed)
-                            # Give current speed + 5.0 KB/s extra so it can grow
-                            self._logger.info("RateManager: calc_and_set_speed_limits: Underutil set to %s", newmaxspeed)
-                            d.set_max_speed(dir, newmaxspeed)
-                        else:
-                            todoset2.append(ds)
-
-                    # Divide the unused bandwidth equally amongst others
-                    if len(todoset2) > 0:
-                        pie = float(len(todoset2)) * localmaxspeed + totalunused
-                        piece = pie / float(len(todoset2))
-                        for ds in todoset:
-                            d = ds.get_download()
-                            self._logger.info("RateManager: calc_and_set_speed_limits: Overutil set to %s", piece)
-                            d.set_max_speed(dir, piece)
+                    if currspeed >= (ds.get_download().get_max_speed(dir) - 3.0):
+                        demands.append(None)
                     else:
-                        # what the f? No overutilizers now?
-                        self._logger.info("UserDefinedMaxAlwaysOtherwiseDividedOnDemandRateManager: Internal error: No overutilizers anymore?")
+                        demands.append(currspeed + self.ROOM)
+
+                if None in demands:
+                    shares = max_min_fair_shares(localmaxspeed * len(todoset), demands)
                 else:
-                    # No over and under utilizers, just divide equally
-                    for ds in todoset:
-                        d = ds.get_download()
-                        self._logger.info("RateManager: calc_and_set_speed_limits: Normal set to %s", piece)
-                        d.set_max_speed(dir, localmaxspeed)
+                    # No download needs more, just divide equally
+                    shares = [localmaxspeed] * len(todoset)
 
-        if self.ltmgr == None and LibtorrentMgr.hasInstance():
-            self.ltmgr = LibtorrentMgr.getInstance()
+                for ds, share in zip(todoset, shares):
+                    self.set_max_speed(ds.get_download(), dir, share, damped=True)
 
-        if self.ltmgr:
-            rate = self.global_max_speed[dir]  # unlimited == 0, stop == -1, else rate in kbytes
-            libtorrent_rate = -1 if rate == 0 else (1 if rate == -1 else rate * 1024)
-            if dir == UPLOAD:
-                self.ltmgr.set_upload_rate_limit(libtorrent_rate)
-            else:
-                self.ltmgr.set_download_rate_limit(libtorrent_rate)
+        self.set_libtorrent_rate_limit(dir)
 
 
 class UserDefinedMaxAlwaysOtherwiseDividedOverActiveSwarmsRateManager(UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager):
@@ -343,9 +350,6 @@ class UserDefinedMaxAlwaysOtherwiseDividedOverActiveSwarmsRateManager(UserDefine
         workingset = newws
 
         self._logger.debug("RateManager: set_lim: len new workingset %s", len(workingset))
-        for ds in workingset:
-            d = ds.get_download()
-            self._logger.debug("RateManager: set_lim: working is %s", d.get_def().get_name())
 
         globalmaxspeed = self.get_global_max_speed(dir)
 
@@ -357,10 +361,10 @@ class UserDefinedMaxAlwaysOtherwiseDividedOverActiveSwarmsRateManager(UserDefine
             # Unlimited speed
             for ds in workingset:
                 d = ds.get_download()
-                d.set_max_speed(dir, d.get_max_desired_speed(dir))
+                self.set_max_speed(d, dir, d.get_max_desired_speed(dir))
             for ds in inactiveset:
                 d = ds.get_download()
-                d.set_max_speed(dir, d.get_max_desired_speed(dir))  # 0 is default
+                self.set_max_speed(d, dir, d.get_max_desired_speed(dir))  # 0 is default
 
         else:
             self._logger.debug("RateManager: set_lim: globalmaxspeed is %s %s", globalmaxspeed, dir)
@@ -371,7 +375,7 @@ class UserDefinedMaxAlwaysOtherwiseDividedOverActiveSwarmsRateManager(UserDefine
                 d = ds.get_download()
                 maxdesiredspeed = d.get_max_desired_speed(dir)
                 if maxdesiredspeed > 0.0:
-                    d.set_max_speed(dir, maxdesiredspeed)
+                    self.set_max_speed(d, dir, maxdesiredspeed)
                 else:
                     todoset.append(ds)
 
@@ -383,9 +387,7 @@ class UserDefinedMaxAlwaysOtherwiseDividedOverActiveSwarmsRateManager(UserDefine
                 self._logger.debug("RateManager: set_lim: localmaxspeed is %s %s", localmaxspeed, dir)
 
                 for ds in todoset:
-                    d = ds.get_download()
-                    self._logger.debug("RateManager: set_lim: %s WorkQ %s", d.get_def().get_name(), localmaxspeed)
-                    d.set_max_speed(dir, localmaxspeed)
+                    self.set_max_speed(ds.get_download(), dir, localmaxspeed, damped=True)
 
             # For inactives set limit to user desired, with max of globalmaxspeed
             # or to globalmaxspeed. This way the peers have a limit already set
@@ -399,16 +401,6 @@ class UserDefinedMaxAlwaysOtherwiseDividedOverActiveSwarmsRateManager(UserDefine
                     setspeed = globalmaxspeed
                 else:
                     setspeed = min(desspeed, globalmaxspeed)
-                self._logger.debug("RateManager: set_lim: %s InactQ %s", d.get_def().get_name(), setspeed)
-                d.set_max_speed(dir, setspeed)
-
-        if self.ltmgr == None and LibtorrentMgr.hasInstance():
-            self.ltmgr = LibtorrentMgr.getInstance()
+                self.set_max_speed(d, dir, setspeed)
 
-        if self.ltmgr:
-            rate = self.global_max_speed[dir]  # unlimited == 0, stop == -1, else rate in kbytes
-            libtorrent_rate = -1 if rate == 0 else (1 if rate == -1 else rate * 1024)
-            if dir == UPLOAD:
-                self.ltmgr.set_upload_rate_limit(libtorrent_rate)
-            else:
-                self.ltmgr.set_download_rate_limit(libtorrent_rate)
+        self.set_libtorrent_rate_limit(dir)
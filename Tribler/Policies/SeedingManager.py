@@ -2,63 +2,106 @@
 # see LICENSE.txt for license information
 
 import logging
+from heapq import heappush, heappop
+from time import time
 
 from Tribler.Core.simpledefs import DLSTATUS_SEEDING, DLMODE_VOD
 from Tribler.Main.vwxGUI.UserDownloadChoice import UserDownloadChoice
 
+# seeds are evaluated at least this often (in seconds), to pick up changes to the configuration and to the user's
+# download choices
+MAX_EVALUATION_INTERVAL = 60.0
+
 
 class GlobalSeedingManager:
 
     def __init__(self, Read):
         self._logger = logging.getLogger(self.__class__.__name__)
 
-        # seeding managers containing infohash:seeding_manager pairs
+        # seeding managers containing download:seeding_manager pairs
         self.seeding_managers = {}
 
+        # (deadline, seeding_manager) pairs of the seeds to evaluate, entries of which the deadline is no longer the
+        # deadline of the seeding manager are skipped
+        self.deadlines = []
+
         # callback to read from abc configuration file
         self.Read = Read
 
     def apply_seeding_policy(self, dslist):
-        # Remove stopped seeds
-        for infohash, seeding_manager in self.seeding_managers.items():
-            if not seeding_manager.download_state.get_download().get_status() == DLSTATUS_SEEDING:
-                self._logger.debug("SeedingManager: removing seeding manager %s", infohash.encode("HEX"))
-                del self.seeding_managers[infohash]
-
+        """
+        Evaluates the seeding policy of the seeds that are due, or of which the upload counter crossed the threshold at
+        which the policy could change its decision.  The other seeds only get their download state updated.
+        """
+        now = time()
+        seeding = {}
         for download_state in dslist:
-            # Arno, 2012-05-07: ContentDef support
-            cdef = download_state.get_download().get_def()
-            hash = cdef.get_id()
             if download_state.get_status() == DLSTATUS_SEEDING:
-                if hash not in self.seeding_managers:
-                    # apply new seeding manager
-                    self._logger.debug("SeedingManager: apply seeding manager %s", hash.encode("HEX"))
-                    seeding_manager = SeedingManager(download_state)
-
-                    policy = self.Read('t4t_option') if cdef.get_def_type() == 'torrent' else self.Read('g2g_option')
-                    if policy == 0:
-                        # No leeching, seeding until sharing ratio is met
-                        self._logger.debug("GlobalSeedingManager: RatioBasedSeeding")
-                        seeding_manager.set_policy(TitForTatRatioBasedSeeding(self.Read) if cdef.get_def_type() == 'torrent' else GiveToGetRatioBasedSeeding(self.Read))
-
-                    elif policy == 1:
-                        # Unlimited seeding
-                        self._logger.debug("GlobalSeedingManager: UnlimitedSeeding")
-                        seeding_manager.set_policy(UnlimitedSeeding())
-
-                    elif policy == 2:
-                        # Time based seeding
-                        self._logger.debug("GlobalSeedingManager: TimeBasedSeeding")
-                        seeding_manager.set_policy(TitForTatTimeBasedSeeding(self.Read) if cdef.get_def_type() == 'torrent' else GiveToGetTimeBasedSeeding(self.Read))
+                seeding[download_state.get_download()] = download_state
 
-                    else:
-                        # No seeding
-                        self._logger.debug("GlobalSeedingManager: NoSeeding")
-                        seeding_manager.set_policy(NoSeeding())
+        # Remove stopped seeds
+        for download in self.seeding_managers.keys():
+            if download not in seeding:
+                self._logger.debug("SeedingManager: removing seeding manager %s", self.seeding_managers[download].infohash.encode("HEX"))
+                del self.seeding_managers[download]
+
+        for download, download_state in seeding.iteritems():
+            seeding_manager = self.seeding_managers.get(download)
+            if seeding_manager is None:
+                seeding_manager = self.seeding_managers[download] = self.create_seeding_manager(download_state)
+                self.evaluate(seeding_manager, download_state, now)
+
+            elif seeding_manager.upload_threshold is not None and \
+                    download_state.get_seeding_statistics()["total_up"] >= seeding_manager.upload_threshold:
+                self.evaluate(seeding_manager, download_state, now)
+
+            else:
+                seeding_manager.download_state = download_state
+
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, seeding_manager = heappop(self.deadlines)
+            if seeding_manager.deadline == deadline and self.seeding_managers.get(seeding_manager.download) is seeding_manager:
+                self.evaluate(seeding_manager, seeding_manager.download_state, now)
+
+    def evaluate(self, seeding_manager, download_state, now):
+        seeding_manager.update_download_state(download_state)
+
+        delay = MAX_EVALUATION_INTERVAL
+        if seeding_manager.next_change is not None:
+            delay = min(delay, seeding_manager.next_change)
+        seeding_manager.deadline = now + delay
+        heappush(self.deadlines, (seeding_manager.deadline, seeding_manager))
+
+    def create_seeding_manager(self, download_state):
+        # Arno, 2012-05-07: ContentDef support
+        cdef = download_state.get_download().get_def()
+
+        # apply new seeding manager
+        self._logger.debug("SeedingManager: apply seeding manager %s", cdef.get_id().encode("HEX"))
+        seeding_manager = SeedingManager(download_state)
+
+        policy = self.Read('t4t_option') if cdef.get_def_type() == 'torrent' else self.Read('g2g_option')
+        if policy == 0:
+            # No leeching, seeding until sharing ratio is met
+            self._logger.debug("GlobalSeedingManager: RatioBasedSeeding")
+            seeding_manager.set_policy(TitForTatRatioBasedSeeding(self.Read) if cdef.get_def_type() == 'torrent' else GiveToGetRatioBasedSeeding(self.Read))
+
+        elif policy == 1:
+            # Unlimited seeding
+            self._logger.debug("GlobalSeedingManager: UnlimitedSeeding")
+            seeding_manager.set_policy(UnlimitedSeeding())
+
+        elif policy == 2:
+            # Time based seeding
+            self._logger.debug("GlobalSeedingManager: TimeBasedSeeding")
+            seeding_manager.set_policy(TitForTatTimeBasedSeeding(self.Read) if cdef.get_def_type() == 'torrent' else GiveToGetTimeBasedSeeding(self.Read))
 
-                    self.seeding_managers[hash] = seeding_manager
+        else:
+            # No seeding
+            self._logger.debug("GlobalSeedingManager: NoSeeding")
+            seeding_manager.set_policy(NoSeeding())
 
-                self.seeding_managers[hash].update_download_state(download_state)
+        return seeding_manager
 
 
 class SeedingManager:
@@ -67,24 +110,41 @@ class SeedingManager:
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.download_state = download_state
+        self.download = download_state.get_download()
+        self.infohash = self.download.get_def().get_id()
         self.policy = None
         self.udc = UserDownloadChoice.get_singleton()
 
+        # the number of seconds and the total upload after which the policy could change its decision, as computed by
+        # the last evaluation, None if it does not depend on them
+        self.next_change = None
+        self.upload_threshold = None
+        self.deadline = None
+
     def update_download_state(self, download_state):
         self.download_state = download_state
+        self.next_change = self.upload_threshold = None
+
         download = self.download_state.get_download()
         if download.get_def().get_def_type() == 'torrent':
             if self.udc.get_download_state(download.get_def().get_id()) != 'restartseed' and download.get_mode() != DLMODE_VOD:
-                if not self.policy.apply(self.download_state, self.download_state.get_seeding_statistics()):
+                if not self.apply_policy():
                     self._logger.debug("Stop seeding with libtorrent: %s", self.download_state.get_download().get_dest_files())
                     self.udc.set_download_state(download.get_def().get_id(), 'stop')
                     self.download_state.get_download().stop()
         else:
             if self.udc.get_download_state(download.get_def().get_id()) != 'restartseed' and download.get_mode() != DLMODE_VOD:
-                if not self.policy.apply(self.download_state, self.download_state.get_seeding_statistics()):
+                if not self.apply_policy():
                     self._logger.debug("Stop seeding with libswift: %s", self.download_state.get_download().get_dest_files())
                     self.download_state.get_download().stop()
 
+    def apply_policy(self):
+        storage = self.download_state.get_seeding_statistics()
+        if self.policy.apply(self.download_state, storage):
+            self.next_change, self.upload_threshold = self.policy.next_change(self.download_state, storage)
+            return True
+        return False
+
     def set_policy(self, policy):
         self.policy = policy
 
@@ -97,6 +157,11 @@ class SeedingPolicy:
     def apply(self, _, __):
         pass
 
+    def next_change(self, _, __):
+        """ Returns the number of seconds and the total upload after which apply could return a different value,
+        either can be None if apply does not depend on it. """
+        return None, None
+
 
 class UnlimitedSeeding(SeedingPolicy):
 
@@ -125,10 +190,17 @@ class TitForTatTimeBasedSeeding(SeedingPolicy):
 
     def apply(self, _, storage):
         current = storage["time_seeding"]
-        limit = long(self.Read('t4t_hours')) * 3600 + long(self.Read('t4t_mins')) * 60
+        limit = self.get_limit()
         self._logger.debug("TitForTatTimeBasedSeeding: apply: %s/ %s", current, limit)
         return current <= limit
 
+    def next_change(self, _, storage):
+        # seeding time increases with wall time
+        return self.get_limit() - storage["time_seeding"] + 1, None
+
+    def get_limit(self):
+        return long(self.Read('t4t_hours')) * 3600 + long(self.Read('t4t_mins')) * 60
+
 
 class GiveToGetTimeBasedSeeding(SeedingPolicy):
 
@@ -139,10 +211,17 @@ class GiveToGetTimeBasedSeeding(SeedingPolicy):
 
     def apply(self, _, storage):
         current = storage["time_seeding"]
-        limit = long(self.Read('g2g_hours')) * 3600 + long(self.Read('g2g_mins')) * 60
+        limit = self.get_limit()
         self._logger.debug("GiveToGetTimeBasedSeeding: apply: %s / %s", current, limit)
         return current <= limit
 
+    def next_change(self, _, storage):
+        # seeding time increases with wall time
+        return self.get_limit() - storage["time_seeding"] + 1, None
+
+    def get_limit(self):
+        return long(self.Read('g2g_hours')) * 3600 + long(self.Read('g2g_mins')) * 60
+
 
 class TitForTatRatioBasedSeeding(SeedingPolicy):
 
@@ -154,11 +233,7 @@ class TitForTatRatioBasedSeeding(SeedingPolicy):
     def apply(self, download_state, storage):
         # No Bittorrent leeching (minimal ratio of 1.0)
         ul = storage["total_up"]
-        dl = storage["total_down"]
-
-        # set dl at min progress*length
-        size_progress = download_state.get_length() * download_state.get_progress()
-        dl = max(dl, size_progress)
+        dl = self.get_total_down(download_state, storage)
 
         if dl == 0:
             # no download will result in no-upload to anyone
@@ -170,6 +245,15 @@ class TitForTatRatioBasedSeeding(SeedingPolicy):
 
         return ratio < self.Read('t4t_ratio') / 100.0
 
+    def next_change(self, download_state, storage):
+        dl = self.get_total_down(download_state, storage)
+        return None, (dl * self.Read('t4t_ratio') / 100.0 if dl else None)
+
+    def get_total_down(self, download_state, storage):
+        # set dl at min progress*length
+        size_progress = download_state.get_length() * download_state.get_progress()
+        return max(storage["total_down"], size_progress)
+
 
 class GiveToGetRatioBasedSeeding(SeedingPolicy):
 
@@ -190,3 +274,7 @@ class GiveToGetRatioBasedSeeding(SeedingPolicy):
 
         self._logger.debug("GiveToGetRatioBasedSeedingapply: %s %s %s %s", dl, ul, ratio, self.Read('g2g_ratio', "int") / 100.0)
         return ratio < self.Read('g2g_ratio') / 100.0
+
+    def next_change(self, _, storage):
+        dl = storage["total_down"]
+        return None, (dl * self.Read('g2g_ratio') / 100.0 if dl else None)
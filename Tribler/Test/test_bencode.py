@@ -0,0 +1,146 @@
+import unittest
+from random import Random
+
+from Tribler.Core.Utilities.bencode import bencode, bdecode, sloppy_bdecode, bdecode_spans
+
+
+def reference_bdecode(x, f=0):
+    """
+    The original recursive decoder, returns (value, offset).
+    """
+    c = x[f]
+    if c == 'i':
+        newf = x.index('e', f + 1)
+        token = x[f + 1:newf]
+        n = int(token)
+        if token[0] == '-':
+            if token[1] == '0':
+                raise ValueError
+        elif token[0] == '0' and len(token) != 1:
+            raise ValueError
+        return n, newf + 1
+    if c in "0123456789":
+        colon = x.index(':', f)
+        n = int(x[f:colon])
+        if c == '0' and colon != f + 1:
+            raise ValueError
+        colon += 1
+        return x[colon:colon + n], colon + n
+    if c == 'l':
+        r, f = [], f + 1
+        while x[f] != 'e':
+            v, f = reference_bdecode(x, f)
+            r.append(v)
+        return r, f + 1
+    if c == 'd':
+        r, f = {}, f + 1
+        while x[f] != 'e':
+            if x[f] not in "0123456789":
+                raise ValueError
+            k, f = reference_bdecode(x, f)
+            r[k], f = reference_bdecode(x, f)
+        return r, f + 1
+    raise KeyError(c)
+
+
+def random_value(rand, depth=0):
+    choice = rand.randint(0, 5 if depth < 4 else 2)
+    if choice == 0:
+        return rand.randint(-2 ** 40, 2 ** 40)
+    if choice == 1:
+        return rand.choice([0, 1, -1, 2 ** 70, -2 ** 70])
+    if choice == 2:
+        return "".join(chr(rand.randint(0, 255)) for _ in xrange(rand.choice([0, 1, 5, 20, 300])))
+    if choice == 3:
+        return [random_value(rand, depth + 1) for _ in xrange(rand.randint(0, 6))]
+    return dict((str(rand.randint(0, 1000)), random_value(rand, depth + 1)) for _ in xrange(rand.randint(0, 6)))
+
+
+class TestBencode(unittest.TestCase):
+
+    def test_known_values(self):
+        for value, expected in ((4, 'i4e'),
+                                (-10, 'i-10e'),
+                                (12345678901234567890, 'i12345678901234567890e'),
+                                ('', '0:'),
+                                ('abc', '3:abc'),
+                                ([1, 2, 3], 'li1ei2ei3ee'),
+                                ([['Alice', 'Bob'], [2, 3]], 'll5:Alice3:Bobeli2ei3eee'),
+                                ({}, 'de'),
+                                ({'age': 25, 'eyes': 'blue'}, 'd3:agei25e4:eyes4:bluee'),
+                                ({'spam.mp3': {'author': 'Alice', 'length': 100000}}, 'd8:spam.mp3d6:author5:Alice6:lengthi100000eee')):
+            self.assertEqual(bencode(value), expected)
+            self.assertEqual(bdecode(expected), value)
+
+    def test_invalid(self):
+        for x in ('0:0:', 'ie', 'i341foo382e', 'i-0e', 'i123', '', 'i6easd', '2:abfdjslhfld', '02:xy', 'l',
+                  'leanfdldjfh', 'd', 'defoobar', 'd3:fooe', 'di1e0:e', 'i03e', 'l01:ae', '9999:x', 'l0:', 'd0:0:',
+                  'd0:', 'e', 'le0:'):
+            self.assertRaises(ValueError, bdecode, x)
+
+    def test_deeply_nested(self):
+        # the recursive decoder failed with a RuntimeError on these
+        value = bdecode('l' * 5000 + 'e' * 5000)
+        depth = 0
+        while value:
+            value = value[0]
+            depth += 1
+        self.assertEqual(depth, 4999)
+
+    def test_sloppy(self):
+        self.assertEqual(sloppy_bdecode('li1ee trailing'), ([1], 5))
+        self.assertEqual(bdecode('li1ee trailing', 1), [1])
+
+    def test_unsorted_keys(self):
+        # uTorrent 1.8 does not sort its keys, these are accepted
+        self.assertEqual(bdecode('d1:b0:1:a0:e'), {'a': '', 'b': ''})
+
+    def test_spans(self):
+        x = 'd8:announce3:url4:infod6:lengthi1e4:name1:ae5:otherd1:bi1e1:ai2eee'
+        value, spans = bdecode_spans(x)
+        self.assertEqual(sorted(spans), ['announce', 'info'])
+        for key, (start, end) in spans.iteritems():
+            self.assertEqual(x[start:end], bencode(value[key]))
+
+    def test_lazy(self):
+        pieces = "\x01" * 400
+        x = bencode({'pieces': pieces, 'name': 'a'})
+        value = bdecode(x, lazy=100)
+        self.assertTrue(isinstance(value['pieces'], buffer))
+        self.assertEqual(str(value['pieces']), pieces)
+        self.assertEqual(value['name'], 'a')
+        self.assertEqual(bencode(value), x)
+
+    def test_fuzz_round_trip(self):
+        rand = Random(42)
+        for _ in xrange(500):
+            value = random_value(rand)
+            x = bencode(value)
+            self.assertEqual(bdecode(x), value)
+            self.assertEqual(reference_bdecode(x), (value, len(x)))
+
+    def test_fuzz_mutations(self):
+        # a corrupted stream must either decode exactly like the recursive decoder did or fail with a ValueError
+        rand = Random(42)
+        for _ in xrange(1000):
+            x = list(bencode(random_value(rand)))
+            for _ in xrange(rand.randint(1, 3)):
+                x[rand.randint(0, len(x) - 1)] = rand.choice("0123456789ilde:-" + chr(rand.randint(0, 255)))
+            x = "".join(x)
+
+            try:
+                expected, offset = reference_bdecode(x)
+                if offset != len(x):
+                    expected = None
+            except (ValueError, KeyError, IndexError):
+                expected = None
+
+            try:
+                result = bdecode(x)
+            except ValueError:
+                result = None
+
+            self.assertEqual(result, expected, repr(x))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from random import Random
+
+from Tribler.Core.Utilities.bitfield import Bitfield, count_available, test_bitfield
+
+
+class TestBitfield(unittest.TestCase):
+
+    def setUp(self):
+        rand = Random(42)
+        self.booleans = [rand.random() < 0.5 for _ in xrange(1001)]
+        self.bitfield = Bitfield(len(self.booleans), fromarray=self.booleans)
+
+    def test_legacy(self):
+        test_bitfield()
+
+    def test_tostring(self):
+        bitstring = self.bitfield.tostring()
+        self.assertEqual(len(bitstring), 126)
+        self.assertEqual(Bitfield(len(self.booleans), bitstring).toboollist(), self.booleans)
+
+    def test_count(self):
+        self.assertEqual(self.bitfield.get_numtrue(), sum(self.booleans))
+        self.assertEqual(self.bitfield.count(100, 200), sum(self.booleans[100:200]))
+        self.assertEqual(self.bitfield.count(1000, 2000), sum(self.booleans[1000:]))
+        self.assertEqual(self.bitfield.get_completion(10, 30), sum(self.booleans[10:30]) / 20.0)
+
+        self.bitfield[0] = not self.booleans[0]
+        self.assertEqual(self.bitfield.get_numtrue(), sum(self.booleans[1:]) + (not self.booleans[0]))
+
+    def test_count_consecutive(self):
+        bitfield = Bitfield(10, fromarray=[1, 1, 1, 0, 1, 1, 1, 1, 1, 1])
+        self.assertEqual(bitfield.count_consecutive([(0, 2), (4, 10)]), 8)
+        self.assertEqual(bitfield.count_consecutive([(1, 5)]), 2)
+        self.assertEqual(bitfield.count_consecutive([(8, 20)]), 2)
+
+    def test_bitwise(self):
+        other = Bitfield(len(self.booleans), fromarray=reversed(self.booleans))
+        reversed_booleans = self.booleans[::-1]
+        self.assertEqual((self.bitfield & other).toboollist(), [a and b for a, b in zip(self.booleans, reversed_booleans)])
+        self.assertEqual((self.bitfield | other).toboollist(), [a or b for a, b in zip(self.booleans, reversed_booleans)])
+        self.assertRaises(ValueError, lambda: self.bitfield & Bitfield(10))
+
+    def test_select(self):
+        selection = self.bitfield.select([(0, 10), (500, 600)])
+        self.assertEqual(selection.toboollist(), self.booleans[0:10] + self.booleans[500:600])
+        self.assertEqual(selection.get_numtrue(), sum(selection.toboollist()))
+
+    def test_count_available(self):
+        rand = Random(42)
+        bitfields = [[rand.random() < 0.5 for _ in xrange(100)] for _ in xrange(300)]
+        expected = [sum(column) for column in zip(*bitfields)]
+        self.assertEqual(count_available([Bitfield(100, fromarray=bitfield) for bitfield in bitfields], 100), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import sqlite3
+import unittest
+
+from Tribler.community.bartercast3.bookstore import BookStore
+from Tribler.community.bartercast3.efforthistory import CYCLE_SIZE, EffortHistory
+
+
+class FakeMember(object):
+
+    def __init__(self, database_id):
+        self.database_id = database_id
+
+
+class FakeDispersy(object):
+
+    def get_member_from_database_id(self, database_id):
+        return FakeMember(database_id)
+
+
+class TestBookStore(unittest.TestCase):
+
+    def setUp(self):
+        self.database = sqlite3.connect(":memory:")
+        self.database.execute(u"CREATE TABLE book(member INTEGER, cycle INTEGER, effort BLOB, upload INTEGER, download INTEGER, PRIMARY KEY (member))")
+        self.store = BookStore(self.database, length=2)
+
+    def insert_book(self, database_id, upload, download):
+        cycle = 10
+        effort = EffortHistory(float(cycle * CYCLE_SIZE))
+        self.database.execute(u"INSERT INTO book (member, cycle, effort, upload, download) VALUES (?, ?, ?, ?, ?)",
+                              (database_id, cycle, buffer(effort.bytes), upload, download))
+
+    def select_book(self, database_id):
+        return self.database.execute(u"SELECT upload, download FROM book WHERE member = ?", (database_id,)).fetchone()
+
+    def test_lookup(self):
+        self.insert_book(1, 100, 50)
+
+        book = self.store.get(FakeMember(1))
+        self.assertEqual((book.upload, book.download, book.cycle), (100, 50, 10))
+        self.assertEqual(self.store.misses, 1)
+
+        # a second lookup is served from the cache
+        self.assertIs(self.store.get(FakeMember(1)), book)
+        self.assertEqual(self.store.hits, 1)
+
+        # an unknown member gets an empty book
+        book = self.store.get(FakeMember(2))
+        self.assertEqual((book.upload, book.download), (0, 0))
+        self.assertEqual(self.select_book(2), None)
+
+    def test_insert(self):
+        book = self.store.get(FakeMember(1))
+        book.upload = 10
+        self.store.mark_dirty(book)
+        self.assertEqual(self.select_book(1), None)
+
+        self.store.flush()
+        self.assertEqual(self.select_book(1), (10, 0))
+        self.assertEqual(self.store.get_statistics()["dirty"], 0)
+
+        # updates replace the stored row
+        book.download = 20
+        self.store.mark_dirty(book)
+        self.store.flush()
+        self.assertEqual(self.select_book(1), (10, 20))
+        self.assertEqual((self.store.flushes, self.store.flushed_books), (2, 2))
+
+        # nothing dirty, nothing written
+        self.store.flush()
+        self.assertEqual(self.store.flushes, 2)
+
+    def test_eviction(self):
+        books = [self.store.get(FakeMember(database_id)) for database_id in (1, 2)]
+        self.store.get(FakeMember(1))
+
+        # the least recently used book is evicted
+        self.store.get(FakeMember(3))
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.evictions, 1)
+        self.assertEqual(sorted(book.member.database_id for book in self.store.itervalues()), [1, 3])
+
+        # an evicted dirty book is returned unchanged and still written by the next flush
+        books[0].upload = 5
+        self.store.mark_dirty(books[0])
+        self.store.get(FakeMember(3))
+        self.store.get(FakeMember(2))
+        books[1].upload = 7
+        self.store.mark_dirty(books[1])
+        self.store.get(FakeMember(4))
+        self.store.get(FakeMember(3))
+        self.assertIs(self.store.get(FakeMember(2)), books[1])
+
+        self.store.flush()
+        self.assertEqual(self.select_book(1), (5, 0))
+        self.assertEqual(self.select_book(2), (7, 0))
+
+    def test_preload(self):
+        for database_id, upload in ((1, 10), (2, 300), (3, 200)):
+            self.insert_book(database_id, upload, 0)
+
+        self.store.preload(FakeDispersy())
+        self.assertEqual(sorted(book.member.database_id for book in self.store.itervalues()), [2, 3])
+
+        self.store.get(FakeMember(2))
+        self.assertEqual((self.store.hits, self.store.misses), (1, 0))
+
+if __name__ == "__main__":
+    unittest.main()
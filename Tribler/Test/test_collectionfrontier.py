@@ -0,0 +1,49 @@
+import unittest
+
+from Tribler.Core import CollectionFrontier as frontier_module
+from Tribler.Core.CollectionFrontier import CollectionFrontier
+
+
+class TestCollectionFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self._time = frontier_module.time
+        frontier_module.time = lambda: self.now
+
+        self.frontier = CollectionFrontier(10)
+        self.frontier.add_collected([("a" * 20, "b" * 20), ("c" * 20, None)])
+
+    def tearDown(self):
+        frontier_module.time = self._time
+
+    def test_collected(self):
+        self.assertTrue(self.frontier.is_collected("a" * 20))
+        self.assertTrue(self.frontier.is_collected(roothash="b" * 20))
+        self.assertTrue(self.frontier.is_collected("c" * 20))
+        self.assertFalse(self.frontier.request("c" * 20, "d" * 20))
+        self.assertFalse(self.frontier.is_full())
+
+    def test_request(self):
+        self.assertTrue(self.frontier.request("e" * 20, "f" * 20))
+        self.assertTrue(self.frontier.is_in_flight("e" * 20))
+        self.assertFalse(self.frontier.request("e" * 20, "f" * 20))
+
+        # requests that did not result in a torrent are forgotten
+        self.now += frontier_module.IN_FLIGHT_TIMEOUT
+        self.assertFalse(self.frontier.is_in_flight("e" * 20))
+        self.assertTrue(self.frontier.request("e" * 20, "f" * 20))
+
+        self.now += 10
+        self.frontier.collected("e" * 20, "f" * 20)
+        self.assertFalse(self.frontier.is_in_flight("e" * 20))
+        self.assertFalse(self.frontier.request("e" * 20))
+
+        stats = self.frontier.get_statistics()
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["collected"], 3)
+        self.assertEqual(stats["duplicate_rate"], 2 / 4.0)
+        self.assertEqual(stats["time_to_collect"], 10.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+from random import Random
+
+from Tribler.Core.Utilities.encoding import encode, decode
+
+
+def reference_encode(value):
+    """
+    The original recursive version 'a' encoder, used to ensure that the wire format did not change.
+    """
+    if isinstance(value, bool):
+        return "0T" if value else "0F"
+    if value is None:
+        return "0n"
+    if isinstance(value, str):
+        return "%db%s" % (len(value), value)
+    if isinstance(value, unicode):
+        value = value.encode("UTF-8")
+        return "%ds%s" % (len(value), value)
+    for type_, char in ((int, "i"), (long, "J"), (float, "f")):
+        if isinstance(value, type_):
+            value = str(value)
+            return "%d%s%s" % (len(value), char, value)
+    for type_, char in ((list, "l"), (set, "L"), (tuple, "t")):
+        if isinstance(value, type_):
+            return "%d%s" % (len(value), char) + "".join(reference_encode(item) for item in value)
+    assert isinstance(value, dict)
+    return "%dd" % len(value) + "".join(reference_encode(key) + reference_encode(item) for key, item in sorted(value.items()))
+
+
+def reference_decode(stream, offset):
+    """
+    The original recursive version 'a' decoder, returns (offset, value).
+    """
+    index = offset
+    while 48 <= ord(stream[index]) <= 57:
+        index += 1
+    count = int(stream[offset:index])
+    type_ = stream[index]
+    offset = index + 1
+
+    if type_ in "iJf":
+        return offset + count, {"i": int, "J": long, "f": float}[type_](stream[offset:offset + count])
+    if type_ in "bs":
+        if len(stream) < offset + count:
+            raise ValueError()
+        value = stream[offset:offset + count]
+        return offset + count, value.decode("UTF-8") if type_ == "s" else value
+    if type_ in "nTF":
+        assert count == 0
+        return offset, {"n": None, "T": True, "F": False}[type_]
+    if type_ in "lLt":
+        container = []
+        for _ in xrange(count):
+            offset, value = reference_decode(stream, offset)
+            container.append(value)
+        return offset, {"l": list, "L": set, "t": tuple}[type_](container)
+    if type_ == "d":
+        container = {}
+        for _ in xrange(count):
+            offset, key = reference_decode(stream, offset)
+            offset, value = reference_decode(stream, offset)
+            container[key] = value
+        if len(container) < count:
+            raise ValueError()
+        return offset, container
+    raise KeyError(type_)
+
+
+def random_value(rand, depth=0):
+    choice = rand.randint(0, 12 if depth < 3 else 7)
+    if choice == 0:
+        return rand.randint(-2 ** 31, 2 ** 31)
+    if choice == 1:
+        return long(rand.randint(0, 2 ** 70))
+    if choice == 2:
+        return rand.random() * 10 ** rand.randint(-20, 20)
+    if choice == 3:
+        return "".join(chr(rand.randint(0, 255)) for _ in xrange(rand.randint(0, 40)))
+    if choice == 4:
+        return u"".join(unichr(rand.randint(0, 0xd7ff)) for _ in xrange(rand.randint(0, 20)))
+    if choice == 5:
+        return None
+    if choice == 6:
+        return rand.random() < 0.5
+    if choice == 7:
+        return rand.choice(["", u"", 0, 0L, 0.0])
+    if choice == 8:
+        return [random_value(rand, depth + 1) for _ in xrange(rand.randint(0, 8))]
+    if choice == 9:
+        return tuple(random_value(rand, depth + 1) for _ in xrange(rand.randint(0, 8)))
+    if choice == 10:
+        return set(str(rand.randint(0, 1000)) for _ in xrange(rand.randint(0, 8)))
+    return dict((str(rand.randint(0, 1000)), random_value(rand, depth + 1)) for _ in xrange(rand.randint(0, 8)))
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_known_values(self):
+        for value, expected in ((42, "a2i42"),
+                                (-42, "a3i-42"),
+                                (42L, "a2J42"),
+                                (4.2, "a3f4.2"),
+                                (u"foo-bar", "a7sfoo-bar"),
+                                ("foo-bar", "a7bfoo-bar"),
+                                ([1, 2], "a2l1i11i2"),
+                                ((1, 2), "a2t1i11i2"),
+                                ({"foo": "bar", "moo": "milk"}, "a2d3bfoo3bbar3bmoo4bmilk"),
+                                ([], "a0l"),
+                                (None, "a0n"),
+                                ([True, False], "a2l0T0F")):
+            self.assertEqual(encode(value), expected)
+            self.assertEqual(decode(expected), (len(expected), value))
+
+    def test_offset(self):
+        stream = "header" + encode([1, u"two"]) + "trailer"
+        offset, value = decode(stream, 6)
+        self.assertEqual(value, [1, u"two"])
+        self.assertEqual(stream[offset:], "trailer")
+
+    def test_invalid(self):
+        for stream in ("b2i42", "a", "a2", "a3bfo", "a2l1i1", "a2d1i11i21i11i3", "a1x", "ail", "a1n", "a9T", "a1d0l1i1", "a1L0d"):
+            self.assertRaises(ValueError, decode, stream)
+
+    def test_fuzz_compatibility(self):
+        rand = Random(42)
+        for _ in xrange(500):
+            value = random_value(rand)
+            stream = encode(value)
+            self.assertEqual(stream, "a" + reference_encode(value))
+            self.assertEqual(decode(stream), reference_decode(stream, 1))
+
+    def test_fuzz_mutations(self):
+        # a corrupted stream must either decode exactly like it did before or fail with a ValueError
+        rand = Random(42)
+        for _ in xrange(500):
+            stream = list(encode(random_value(rand)))
+            for _ in xrange(rand.randint(1, 3)):
+                stream[rand.randint(0, len(stream) - 1)] = chr(rand.randint(0, 255))
+            stream = "".join(stream)
+
+            try:
+                expected = reference_decode(stream, 1) if stream[0] == "a" else None
+            except (ValueError, KeyError, IndexError, TypeError, AssertionError):
+                expected = None
+
+            try:
+                result = decode(stream)
+            except ValueError:
+                result = None
+
+            self.assertEqual(result, expected, repr(stream))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from random import Random
+
+from Tribler.Core import FetchScheduler as scheduler_module
+from Tribler.Core.FetchScheduler import FetchScheduler, LatencyEstimator
+
+
+class FakePeer(object):
+
+    """
+    A source that delivers a torrent after latency seconds, or never if latency is None.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def delivers(self, started, now):
+        return self.latency is not None and now - started >= self.latency
+
+
+class TestFetchScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self._time = scheduler_module.time
+        scheduler_module.time = lambda: self.now
+
+        self.scheduler = FetchScheduler(2, {"swift": LatencyEstimator(30.0, 5.0, 30.0),
+                                            "magnet": LatencyEstimator(30.0, 15.0, 30.0)})
+
+    def tearDown(self):
+        scheduler_module.time = self._time
+
+    def test_latency_estimator(self):
+        estimator = LatencyEstimator(30.0, 5.0, 30.0)
+        self.assertEqual(estimator.get_timeout(), 30.0)
+        self.assertEqual(estimator.get_race_delay(5.0), 5.0)
+
+        for _ in range(20):
+            estimator.add(1.0)
+        self.assertEqual(estimator.get_timeout(), 5.0)
+        self.assertAlmostEqual(estimator.get_race_delay(5.0), 1.0, 2)
+
+        for _ in range(20):
+            estimator.add(60.0)
+        self.assertEqual(estimator.get_timeout(), 30.0)
+
+    def test_race(self):
+        self.scheduler.start("a", "swift")
+        self.now += 5
+        self.scheduler.start("a", "magnet")
+        self.assertTrue(self.scheduler.is_fetching("a", "magnet"))
+
+        self.now += 2
+        self.assertEqual(self.scheduler.succeeded("a", "magnet"), ["swift"])
+        self.assertFalse(self.scheduler.is_fetching("a"))
+        self.assertEqual(self.scheduler.estimators["magnet"].latency, 2.0)
+        self.assertEqual(self.scheduler.estimators["swift"].latency, None)
+
+        # a source that lost does not end a new fetch
+        self.scheduler.start("b", "swift")
+        self.scheduler.start("b", "magnet")
+        self.assertFalse(self.scheduler.failed("b", "swift"))
+        self.assertTrue(self.scheduler.failed("b", "magnet"))
+        self.assertEqual(self.scheduler.succeeded("b", "swift"), [])
+        self.assertEqual(self.scheduler.nr_failed, 2)
+
+    def test_window(self):
+        self.scheduler.start("a", "swift")
+        self.scheduler.start("b", "swift")
+        self.assertFalse(self.scheduler.has_room())
+
+        self.scheduler.succeeded("a", "swift")
+        self.assertTrue(self.scheduler.has_room())
+
+        # fetches of which all sources went silent are dropped
+        self.scheduler.start("c", "swift")
+        self.assertFalse(self.scheduler.has_room())
+        self.now += scheduler_module.FETCH_TIMEOUT + 1
+        self.assertTrue(self.scheduler.has_room())
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_fake_peers(self):
+        # swift peers answer within 1-3 seconds or not at all, a magnet lookup always succeeds after 20 seconds
+        rand = Random(42)
+        peers = [FakePeer(rand.uniform(1.0, 3.0) if rand.random() < 0.8 else None) for _ in range(200)]
+        magnet = FakePeer(20.0)
+
+        scheduler = FetchScheduler(10, {"swift": LatencyEstimator(30.0, 5.0, 30.0),
+                                        "magnet": LatencyEstimator(30.0, 15.0, 30.0)})
+        pending = list(enumerate(peers))
+        started = {}
+        collected = {}
+        while pending or len(scheduler):
+            while pending and scheduler.has_room():
+                key, peer = pending.pop(0)
+                scheduler.start(key, "swift")
+                started[key] = (self.now, peer)
+
+            for key, (start, peer) in started.items():
+                if scheduler.is_fetching(key, "swift"):
+                    if peer.delivers(start, self.now):
+                        self.assertEqual(scheduler.succeeded(key, "swift"), [])
+                        collected[key] = self.now - start
+                    elif scheduler.is_expired(key, "swift"):
+                        scheduler.failed(key, "swift")
+                        scheduler.start(key, "magnet")
+                        started[key] = (self.now, magnet)
+                elif scheduler.is_fetching(key, "magnet") and magnet.delivers(start, self.now):
+                    scheduler.succeeded(key, "magnet")
+                    collected[key] = self.now - started[key][0]
+            self.now += 0.5
+
+        self.assertEqual(len(collected), len(peers))
+        # once latencies are known, dead swift peers are given up after a few seconds instead of 30
+        self.assertTrue(scheduler.get_timeout("swift") < 10.0)
+        self.assertTrue(scheduler.estimators["swift"].latency < 3.0)
+        self.assertEqual(scheduler.nr_failed, len([peer for peer in peers if peer.latency is None]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from Tribler.community.privatesocial.database import FriendDatabase
+
+
+class FakeDatabase(object):
+
+    _file_path = u":memory:"
+
+    def attach_commit_callback(self, callback):
+        pass
+
+    def detach_commit_callback(self, callback):
+        pass
+
+
+class FakeDispersy(object):
+
+    def __init__(self):
+        self._database = self.database = FakeDatabase()
+
+
+class TestFriendDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.database = FriendDatabase(FakeDispersy())
+        self.database.open()
+
+        # friend "a" sent a message at every global time, friend "b" at every even global time
+        messages = [(global_time, global_time, "a") for global_time in xrange(1, 21)]
+        messages += [(100 + global_time, global_time, "b") for global_time in xrange(2, 21, 2)]
+        messages += [(200, 5, "c")]
+        self.database.add_messages(messages)
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_get_sync_ids(self):
+        self.assertEqual(self.database.get_sync_ids(["a"], 10, True, 3), [(11, 11), (12, 12), (13, 13)])
+        self.assertEqual(self.database.get_sync_ids(["a"], 10, False, 3), [(9, 9), (8, 8), (7, 7)])
+
+        # the messages of all keyhashes, closest to global_time first
+        self.assertEqual(self.database.get_sync_ids(["a", "b"], 10, True, 4), [(11, 11), (12, 12), (12, 112), (13, 13)])
+        self.assertEqual(self.database.get_sync_ids(["b", "a"], 4, False, 4), [(3, 3), (2, 102), (2, 2), (1, 1)])
+        self.assertEqual(self.database.get_sync_ids(["b"], 20, True, 4), [])
+        self.assertEqual(self.database.get_sync_ids([], 10, True, 4), [])
+
+    def test_get_sync_ids_in_range(self):
+        self.assertEqual(sorted(self.database.get_sync_ids_in_range(["a"], 5, 8, 0, 1)), [5, 6, 7, 8])
+        self.assertEqual(sorted(self.database.get_sync_ids_in_range(["a", "b"], 5, 10, 0, 2)), [6, 8, 10, 106, 108, 110])
+        self.assertEqual(sorted(self.database.get_sync_ids_in_range(["a", "b"], 5, 10, 1, 2)), [5, 7, 9])
+        self.assertEqual(sorted(self.database.get_sync_ids_in_range(["b", "c"], 1, 5, 0, 1)), [102, 104, 200])
+        self.assertEqual(self.database.get_sync_ids_in_range(["unknown"], 1, 20, 0, 1), [])
+        self.assertEqual(self.database.get_sync_ids_in_range([], 1, 20, 0, 1), [])
+
+if __name__ == "__main__":
+    unittest.main()
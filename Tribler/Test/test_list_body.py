@@ -0,0 +1,47 @@
+import unittest
+
+from Tribler.Main.vwxGUI.list_body import AbstractListBody
+
+
+class SortListBody(AbstractListBody):
+
+    """
+    Only the state DoSort needs, without creating any windows.
+    """
+
+    def __init__(self, data, sortcolumn, sortreverse):
+        self.items = {}
+        self.data = data
+        self.sortcolumn = sortcolumn
+        self.sortreverse = sortreverse
+
+
+class TestListBody(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [(1, [u"b", 20], None), (2, [u"C", 30], None), (3, [u"a", 10], None)]
+
+    def sort(self, sortcolumn, sortreverse, data=None):
+        body = SortListBody(list(data or self.data), sortcolumn, sortreverse)
+        body.DoSort()
+        self.assertEqual(body.data_index, dict((curdata[0], index) for index, curdata in enumerate(body.data)))
+        return [curdata[0] for curdata in body.data]
+
+    def test_sort_direction(self):
+        # highest first by default, as with the cmp based sort
+        self.assertEqual(self.sort(1, False), [2, 1, 3])
+        self.assertEqual(self.sort(1, True), [3, 1, 2])
+
+        # strings are compared without case
+        self.assertEqual(self.sort(0, False), [2, 1, 3])
+        self.assertEqual(self.sort(0, True), [3, 1, 2])
+
+        self.assertEqual(self.sort(None, False), [1, 2, 3])
+
+    def test_fixed_position(self):
+        data = self.data + [(4, [u"z", 0], None, None, 0)]
+        self.assertEqual(self.sort(1, False, data), [4, 2, 1, 3])
+        self.assertEqual(self.sort(1, True, data), [4, 3, 1, 2])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,7 +12,7 @@ import sha
 
 from Tribler.Core.TorrentDef import TorrentDef
 from Tribler.Core.Merkle.merkle import MerkleTree, \
-    get_tree_height, create_tree, get_hashes_for_piece
+    get_tree_height, create_tree, get_hashes_for_piece, EMPTY_HASH
 from Tribler.Core.Utilities.bencode import bdecode
 
 
@@ -183,6 +183,80 @@ class TestMerkleHashes(unittest.TestCase):
         for p in range(npieces):
             self.assert_(piece_hashes[p] == empty_piece_hashes[p], msg)
 
+    def test_incremental_construction(self):
+        """
+            test MerkleTree.append_piece_hash() against building the tree at once
+        """
+        for npieces in range(1, 40) + [1023, 1024, 1025]:
+            piece_hashes = [self.calc_digest(str(i)) for i in range(npieces)]
+            fulltree = MerkleTree(1, npieces, None, piece_hashes)
+            tree = MerkleTree(1, npieces)
+            for piece_hash in piece_hashes:
+                self.assert_(tree.get_root_hash() is None)
+                tree.append_piece_hash(piece_hash)
+            self.assertEquals(tree.get_root_hash(), fulltree.get_root_hash())
+            self.assertEquals(tree.tree, fulltree.tree)
+            self.assertEquals(tree.get_piece_hashes(), piece_hashes)
+
+    def test_check_hashes_batch(self):
+        """
+            test MerkleTree.check_hashes_batch() method
+        """
+        npieces = 37
+        piece_hashes = [self.calc_digest(str(i)) for i in range(npieces)]
+        fulltree = MerkleTree(1, npieces, None, piece_hashes)
+        emptytree = MerkleTree(1, npieces, fulltree.get_root_hash(), None)
+
+        ohlists = [fulltree.get_hashes_for_piece(p) for p in range(npieces)]
+        wrong = [list(oh) for oh in ohlists[3]]
+        wrong[1][1] = EMPTY_HASH
+        ohlists.insert(4, wrong)
+
+        empty_piece_hashes = [0] * npieces
+        results = emptytree.check_hashes_batch(ohlists, empty_piece_hashes)
+        self.assertEquals(results, [True] * 4 + [False] + [True] * (npieces - 4))
+        self.assertEquals(empty_piece_hashes, piece_hashes)
+
+        # the verified nodes are used when checking later hashes
+        self.assert_(emptytree.check_hashes(fulltree.get_hashes_for_piece(5)))
+        self.failIf(emptytree.check_hashes(wrong))
+
+    def test_check_hashes_batch_forged(self):
+        """
+            test that MerkleTree.check_hashes_batch() only stores verified hashes
+        """
+        npieces = 8
+        piece_hashes = [self.calc_digest(str(i)) for i in range(npieces)]
+        fulltree = MerkleTree(1, npieces, None, piece_hashes)
+        emptytree = MerkleTree(1, npieces, fulltree.get_root_hash(), None)
+        empty_piece_hashes = [0] * npieces
+        self.assertEquals(emptytree.check_hashes_batch([fulltree.get_hashes_for_piece(0)], empty_piece_hashes), [True])
+
+        # checking piece 1 stops at the parent it shares with piece 0, its
+        # forged uncle (the parent of pieces 2 and 3) and root were not checked
+        forged_parent = self.calc_digest("forged2") + self.calc_digest("forged3")
+        ohlist = [list(oh) for oh in fulltree.get_hashes_for_piece(1)]
+        self.assertEquals(ohlist[2][0], 4)
+        ohlist[2][1] = self.calc_digest(forged_parent)
+        ohlist[-1][1] = self.calc_digest("forged root")
+        self.assertEquals(emptytree.check_hashes_batch([ohlist], empty_piece_hashes), [True])
+        self.assertEquals(emptytree.get_root_hash(), fulltree.get_root_hash())
+        self.assertEquals(emptytree.tree[4 * 20:5 * 20], fulltree.tree[4 * 20:5 * 20])
+
+        # a chain for piece 2 leading to the forged uncle must be rejected
+        forged = [list(oh) for oh in fulltree.get_hashes_for_piece(2)]
+        forged[0][1] = forged_parent[:20]
+        forged[1][1] = forged_parent[20:]
+        self.assertEquals(emptytree.check_hashes_batch([forged], empty_piece_hashes), [False])
+        self.failIf(emptytree.check_hashes(forged))
+        self.assertEquals(empty_piece_hashes, piece_hashes[:2] + [0] * (npieces - 2))
+
+        # the honest chains are still accepted
+        ohlists = [fulltree.get_hashes_for_piece(p) for p in range(npieces)]
+        self.assertEquals(emptytree.check_hashes_batch(ohlists, empty_piece_hashes), [True] * npieces)
+        self.assertEquals(empty_piece_hashes, piece_hashes)
+        self.assertEquals(emptytree.tree, fulltree.tree)
+
     def test_merkle_torrent(self):
         """
             test the creation of Merkle torrent files via TorrentMaker/btmakemetafile.py
@@ -0,0 +1,77 @@
+import os
+import shutil
+import unittest
+from binascii import hexlify
+from tempfile import mkdtemp
+
+from Tribler.Core.MetadataIndex import MetadataIndex
+
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.state_dir = mkdtemp()
+        self.tor_col_dir = os.path.join(self.state_dir, "collected_torrent_files")
+        os.mkdir(self.tor_col_dir)
+        self.filename = os.path.join(self.state_dir, "metadata_index.json")
+
+        self.infohash = "\x01" * 20
+        self.contenthash = "\x02" * 20
+        self.create_metadata(self.infohash, self.contenthash)
+        # empty metadata directories do not count
+        os.mkdir(os.path.join(self.tor_col_dir, "thumbs-" + hexlify("\x03" * 20)))
+        open(os.path.join(self.tor_col_dir, hexlify("\x04" * 20)), "wb").close()
+
+        self.index = MetadataIndex(self.tor_col_dir, self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def create_metadata(self, infohash, contenthash):
+        metadata_dir = os.path.join(self.tor_col_dir, "thumbs-" + hexlify(infohash), hexlify(contenthash))
+        os.makedirs(metadata_dir)
+        open(os.path.join(metadata_dir, "ag_thumb.jpg"), "wb").close()
+
+    def assertIndexed(self, index):
+        self.assertEqual(len(index), 1)
+        self.assertTrue(index.has_metadata("thumbs", self.infohash))
+        self.assertTrue(index.has_metadata("thumbs", self.infohash, self.contenthash))
+        self.assertFalse(index.has_metadata("thumbs", self.infohash, "\x05" * 20))
+        self.assertFalse(index.has_metadata("thumbs", "\x03" * 20))
+
+    def test_scan(self):
+        self.index.load()
+        self.assertIndexed(self.index)
+
+    def test_save_load(self):
+        self.index.load()
+        self.index.save()
+
+        index = MetadataIndex(self.tor_col_dir, self.filename)
+        index.scan = self.fail
+        index.load()
+        self.assertIndexed(index)
+
+        # the collecting dir changed since the index was saved
+        self.create_metadata("\x06" * 20, self.contenthash)
+        os.utime(self.tor_col_dir, (1, 1))
+        index = MetadataIndex(self.tor_col_dir, self.filename)
+        index.load()
+        self.assertTrue(index.has_metadata("thumbs", "\x06" * 20, self.contenthash))
+
+    def test_update(self):
+        self.index.load()
+        self.index.add_metadata("thumbs", self.infohash, "\x05" * 20)
+        self.assertTrue(self.index.has_metadata("thumbs", self.infohash, "\x05" * 20))
+
+        self.create_metadata("\x06" * 20, self.contenthash)
+        self.index.scan_metadata("thumbs", "\x06" * 20)
+        self.assertTrue(self.index.has_metadata("thumbs", "\x06" * 20, self.contenthash))
+
+        # rescanning a removed metadata directory drops it from the index
+        shutil.rmtree(self.index.get_metadata_dir("thumbs", self.infohash))
+        self.index.scan_metadata("thumbs", self.infohash)
+        self.assertFalse(self.index.has_metadata("thumbs", self.infohash))
+
+if __name__ == "__main__":
+    unittest.main()
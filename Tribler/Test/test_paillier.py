@@ -0,0 +1,96 @@
+import unittest
+
+from Tribler.community.privatesemantic.crypto.optional_crypto import mpz, invert
+from Tribler.community.privatesemantic.crypto.paillier import PaillierKey, FixedBasePow, PaillierRandomizerPool, \
+    paillier_encrypt, paillier_encrypt_vector, paillier_decrypt
+from Tribler.community.privatesemantic.crypto.ecutils import EllipticCurve
+
+
+def small_key(p=1009, q=1013):
+    n = p * q
+    n2 = n * n
+    g = n + 1
+    lambda_ = (p - 1) * (q - 1) / 4  # lcm(1008, 1012), as gcd(1008, 1012) == 4
+    d = invert((pow(g, lambda_, n2) - 1) / n, n)
+    return PaillierKey(mpz(n), mpz(n2), mpz(g), mpz(lambda_), mpz(d), 20, 40)
+
+
+class TestFixedBasePow(unittest.TestCase):
+
+    def test_pow(self):
+        modulo = 1009 * 1013
+        for window in (1, 3, 4, 5):
+            fixed = FixedBasePow(12345, modulo, 40, window)
+            for exponent in (0, 1, 2, 15, 16, 17, 1000, 123456789, (1 << 40) - 1):
+                self.assertEqual(fixed(exponent), pow(12345, exponent, modulo))
+
+    def test_too_large(self):
+        fixed = FixedBasePow(3, 101, 8, 4)
+        self.assertEqual(fixed(255), pow(3, 255, 101))
+        self.assertRaises(AssertionError, fixed, 256)
+
+
+class TestPaillierRandomizerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.key = small_key()
+        self.pool = PaillierRandomizerPool(self.key, size=10)
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_randomizers(self):
+        h = self.pool._h(1)
+        for exponent in (0, 1, 2, 1000, long(self.key.n) - 1):
+            self.assertEqual(self.pool._h(exponent), pow(h, exponent, self.key.n2))
+
+        # a randomizer is a n-th residue, hence it decrypts to 0
+        for randomizer in self.pool.get(5):
+            self.assertEqual(pow(randomizer, self.key.lambda_, self.key.n2), 1)
+
+    def test_get(self):
+        self.assertEqual(len(self.pool.get(0)), 0)
+        self.assertEqual(len(self.pool.get(3)), 3)
+
+        self.pool._pool.extend(self.pool.create() for _ in xrange(2))
+        self.assertEqual(len(self.pool.get(5)), 5)
+        self.assertEqual(len(self.pool), 0)
+
+    def test_encrypt(self):
+        elements = [0, 1, 42, 1000000]
+        ciphers = paillier_encrypt_vector(self.key, elements, self.pool)
+        self.assertEqual([paillier_decrypt(self.key, cipher) for cipher in ciphers], elements)
+
+        randomizer = self.pool.create()
+        self.assertEqual(paillier_encrypt(self.key, 7, randomizer), pow(self.key.g, 7, self.key.n2) * randomizer % self.key.n2)
+
+
+class TestJacobian(unittest.TestCase):
+
+    def setUp(self):
+        # y^2 = x^3 + 2x + 3 mod 97
+        self.ec = EllipticCurve(2, 3, 97, 3, 6)
+
+    def test_multiply(self):
+        # k * P should equal adding P k times using affine coordinates
+        expected = self.ec.zero
+        for k in xrange(1, 120):
+            expected = expected + self.ec.g
+            self.assertEqual(k * self.ec.g, expected, "%d * g" % k)
+
+    def test_add_double(self):
+        g = (self.ec.g.x, self.ec.g.y, mpz(1))
+        self.assertEqual(self.ec.from_jacobian(self.ec.jacobian_double(g)), self.ec.g + self.ec.g)
+        self.assertEqual(self.ec.from_jacobian(self.ec.jacobian_add(g, g)), self.ec.g + self.ec.g)
+        self.assertEqual(self.ec.from_jacobian(self.ec.jacobian_add(None, g)), self.ec.g)
+
+        three = self.ec.jacobian_add(self.ec.jacobian_double(g), g)
+        self.assertEqual(self.ec.from_jacobian(three), self.ec.g + self.ec.g + self.ec.g)
+
+        # P + -P is the point at infinity
+        minus = (self.ec.g.x, -self.ec.g.y % self.ec.q, mpz(1))
+        self.assertEqual(self.ec.jacobian_add(g, minus), None)
+        self.assertEqual(self.ec.from_jacobian(None), self.ec.zero)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from Tribler.Core.simpledefs import UPLOAD, DOWNLOAD, DLSTATUS_DOWNLOADING
+from Tribler.Policies.RateManager import max_min_fair_shares, RateManager, \
+    UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager
+
+
+class FakeDownload(object):
+
+    def __init__(self, max_speed=0, max_desired_speed=0):
+        self.max_speed = {UPLOAD: max_speed, DOWNLOAD: max_speed}
+        self.max_desired_speed = {UPLOAD: max_desired_speed, DOWNLOAD: max_desired_speed}
+
+    def get_max_speed(self, direct):
+        return self.max_speed[direct]
+
+    def set_max_speed(self, direct, speed):
+        self.max_speed[direct] = speed
+
+    def get_max_desired_speed(self, direct):
+        return self.max_desired_speed[direct]
+
+
+class FakeDownloadState(object):
+
+    def __init__(self, download, current_speed=0):
+        self.download = download
+        self.current_speed = current_speed
+
+    def get_download(self):
+        return self.download
+
+    def get_status(self):
+        return DLSTATUS_DOWNLOADING
+
+    def get_current_speed(self, direct):
+        return self.current_speed
+
+    def get_num_peers(self):
+        return 1
+
+
+class TestMaxMinFairShares(unittest.TestCase):
+
+    def test_shares(self):
+        self.assertEqual(max_min_fair_shares(100, []), [])
+        self.assertEqual(max_min_fair_shares(100, [None, None, None, None]), [25.0] * 4)
+        self.assertEqual(max_min_fair_shares(100, [5, 10]), [5, 10])
+
+        # small demands are granted, the remainder is divided equally
+        self.assertEqual(max_min_fair_shares(100, [None, 10, None, 30]), [30.0, 10, 30.0, 30])
+        self.assertEqual(max_min_fair_shares(100, [None, 20, None]), [40.0, 20, 40.0])
+        self.assertEqual(max_min_fair_shares(100, [60, None]), [50.0, 50.0])
+
+    def test_capacity(self):
+        demands = [None, 3, 50, None, 12, 7, None, 80]
+        shares = max_min_fair_shares(120, demands)
+        self.assertAlmostEqual(sum(shares), 120)
+        self.assertTrue(all(demand is None or share <= demand for share, demand in zip(shares, demands)))
+
+
+class TestRateManager(unittest.TestCase):
+
+    def setUp(self):
+        self.ratemanager = RateManager()
+
+    def test_damped(self):
+        d = FakeDownload(50)
+
+        # small changes of a computed share are ignored
+        self.assertFalse(self.ratemanager.set_max_speed(d, UPLOAD, 52, damped=True))
+        self.assertFalse(self.ratemanager.set_max_speed(d, UPLOAD, 46, damped=True))
+        self.assertEqual(d.get_max_speed(UPLOAD), 50)
+
+        self.assertTrue(self.ratemanager.set_max_speed(d, UPLOAD, 40, damped=True))
+        self.assertEqual(d.get_max_speed(UPLOAD), 40)
+
+        # from or to unlimited is always a change
+        self.assertTrue(self.ratemanager.set_max_speed(d, UPLOAD, 0, damped=True))
+        self.assertTrue(self.ratemanager.set_max_speed(d, UPLOAD, 40, damped=True))
+        self.assertEqual(self.ratemanager.nr_speed_changes, 3)
+
+    def test_desired(self):
+        # a limit set by the user is always applied
+        d = FakeDownload(50)
+        self.assertTrue(self.ratemanager.set_max_speed(d, UPLOAD, 46))
+        self.assertEqual(d.get_max_speed(UPLOAD), 46)
+
+        # a computed share that takes a download below its desired speed is always applied
+        d = FakeDownload(50, max_desired_speed=48)
+        self.assertTrue(self.ratemanager.set_max_speed(d, UPLOAD, 47, damped=True))
+        self.assertFalse(self.ratemanager.set_max_speed(d, UPLOAD, 46, damped=True))
+        self.assertEqual(d.get_max_speed(UPLOAD), 47)
+
+    def test_calc_and_set_speed_limits(self):
+        ratemanager = UserDefinedMaxAlwaysOtherwiseEquallyDividedRateManager()
+        ratemanager.set_global_max_speed(DOWNLOAD, 100)
+
+        user = FakeDownload(50, max_desired_speed=46)
+        shared = [FakeDownload(48), FakeDownload(48)]
+        ratemanager.add_downloadstatelist([FakeDownloadState(d) for d in [user] + shared])
+        ratemanager.adjust_speeds()
+
+        # the user limit is applied, the equal share of 50 is close to the current limits
+        self.assertEqual(user.get_max_speed(DOWNLOAD), 46)
+        self.assertEqual([d.get_max_speed(DOWNLOAD) for d in shared], [48, 48])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from time import sleep
+
+from nose.twistedtools import reactor
+
+from Tribler.Core.Statistics.ReactorMonitor import ReactorMonitor
+
+
+def slow_reactor_function():
+    sleep(0.6)
+
+
+class TestReactorMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = ReactorMonitor(heartbeat_interval=0.1, lag_threshold=0.1, sample_interval=0.02)
+        self.monitor.start()
+        sleep(0.3)
+
+    def tearDown(self):
+        self.monitor.stop()
+
+    def test_idle(self):
+        sleep(0.5)
+        stats = self.monitor.get_stats()
+        self.assertTrue(stats['heartbeats'] > 0)
+        self.assertEqual(stats['stalls'], 0)
+
+    def test_attribution(self):
+        reactor.callFromThread(slow_reactor_function)
+        sleep(1.0)
+
+        stats = self.monitor.get_stats()
+        self.assertTrue(stats['max_lag'] >= 0.4, stats)
+        self.assertEqual(stats['stalls'], 1)
+
+        name, seconds, samples = stats['functions'][0]
+        self.assertTrue(name.startswith("slow_reactor_function"), name)
+        self.assertTrue(samples > 0)
+
+if __name__ == "__main__":
+    unittest.main()
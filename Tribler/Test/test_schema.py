@@ -0,0 +1,85 @@
+import unittest
+from os import urandom
+
+from Tribler.Core.Utilities.encoding import encode
+from Tribler.Core.Utilities.schema import Schema, Record, Sized, Optional, ListOf, TupleOf, SetOf, DictOf
+
+
+class TestSchema(unittest.TestCase):
+
+    def assertInvalid(self, schema, value, message):
+        try:
+            schema.validate(value)
+        except ValueError as exception:
+            self.assertEqual(str(exception), message)
+        else:
+            self.fail("%r should not match" % (value,))
+
+    def test_types(self):
+        schema = Schema((int, long), "number")
+        schema.validate(1)
+        schema.validate(1L)
+        self.assertInvalid(schema, "1", "Invalid 'number' type")
+
+    def test_sized(self):
+        schema = Schema(Sized(str, length=20), "infohash")
+        schema.validate(urandom(20))
+        self.assertInvalid(schema, urandom(19), "Invalid 'infohash' length")
+        self.assertInvalid(schema, u"x" * 20, "Invalid 'infohash' type")
+
+        schema = Schema(Sized(unicode, minimum=1, maximum=3), "name")
+        schema.validate(u"abc")
+        self.assertInvalid(schema, u"", "Invalid 'name' length")
+        self.assertInvalid(schema, u"abcd", "Invalid 'name' length")
+
+    def test_optional(self):
+        schema = Schema(Optional(Sized(str, length=20)), "cid")
+        schema.validate(None)
+        schema.validate("")
+        schema.validate(urandom(20))
+        self.assertInvalid(schema, urandom(10), "Invalid 'cid' length")
+
+    def test_containers(self):
+        schema = Schema(ListOf(unicode, minimum=1), "keywords")
+        schema.validate([u"foo", u"bar"])
+        self.assertInvalid(schema, [], "Invalid 'keywords' length")
+        self.assertInvalid(schema, (u"foo",), "Invalid 'keywords' type")
+        self.assertInvalid(schema, [u"foo", "bar"], "Invalid 'keywords item' type")
+
+        Schema(TupleOf(str)).validate(("a", "b"))
+        Schema(SetOf(str)).validate(set(["a", "b"]))
+
+        schema = Schema(DictOf(Sized(str, length=20), SetOf(Sized(str, length=20))), "torrents")
+        schema.validate({urandom(20): set([urandom(20)])})
+        self.assertInvalid(schema, {urandom(20): [urandom(20)]}, "Invalid 'torrents value' type")
+        self.assertInvalid(schema, {urandom(20): set([urandom(2)])}, "Invalid 'torrents value item' length")
+        self.assertInvalid(schema, {urandom(2): set()}, "Invalid 'torrents key' length")
+
+    def test_record(self):
+        spec = [("name", unicode), ("size", long)]
+        schema = Schema(Record(tuple, spec), "torrent")
+        schema.validate((u"name", 1L))
+        schema.validate((u"name", 1L, "future extension"))
+        self.assertInvalid(schema, (u"name",), "Invalid 'torrent' length")
+        self.assertInvalid(schema, (u"name", 1), "Invalid 'size' type")
+        self.assertInvalid(schema, [u"name", 1L], "Invalid 'torrent' type")
+
+        schema = Schema(Record(tuple, spec, exact=True), "torrent")
+        self.assertInvalid(schema, (u"name", 1L, "future extension"), "Invalid 'torrent' length")
+
+    def test_decode(self):
+        schema = Schema(Record(tuple, [("identifier", Sized(str, length=2)),
+                                       ("results", ListOf(Record(tuple, [("infohash", Sized(str, length=20)),
+                                                                         ("swift_hash", Optional(Sized(str, length=20)))])))]))
+        payload = ("id", [(urandom(20), None), (urandom(20), urandom(20))])
+        stream = "header" + encode(payload)
+        self.assertEqual(schema.decode(stream, 6), (len(stream), payload))
+
+        self.assertRaises(ValueError, schema.decode, encode(("id", [(urandom(20), urandom(2))])))
+        self.assertRaises(ValueError, schema.decode, "a3bfo")
+
+    def test_unknown_specification(self):
+        self.assertRaises(TypeError, Schema, ListOf(42))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from math import sqrt
+from random import Random
+
+from Tribler.Core.Search.SearchHits import SearchHits
+
+
+class FakeHit(object):
+
+    def __init__(self, infohash, num_seeders, neg_votes=0, subscriptions=0, matches=1):
+        self.infohash = infohash
+        self.num_seeders = num_seeders
+        self.neg_votes = neg_votes
+        self.subscriptions = subscriptions
+        self.relevance_score = [matches, 0]
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+def normalize(hits, key):
+    # the normalization TorrentManager.doStatNormalization does, on floats
+    values = [float(hit.get(key, 0) or 0) for hit in hits]
+    mean = sum(values) / len(values)
+    stddev = sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1)) if len(values) > 1 else 0
+    return dict((hit.infohash, (value - mean) / stddev if stddev > 0 else 0) for hit, value in zip(hits, values))
+
+
+class TestSearchHits(unittest.TestCase):
+
+    def test_merge(self):
+        hits = SearchHits()
+        hits.extend([FakeHit("a", 10), FakeHit("b", 20)])
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(hits.get("a").num_seeders, 10)
+
+        # a hit with a known infohash replaces the previous one
+        hits.add(FakeHit("a", 30))
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(hits.get_normalization()[0], (25.0, sqrt(50.0)))
+
+        hits.remove("b")
+        self.assertFalse("b" in hits)
+        self.assertEqual(hits.get_normalization()[0], (30.0, 0.0))
+
+        hits.clear()
+        self.assertEqual(len(hits), 0)
+        self.assertEqual(hits.sort(), [])
+
+    def test_sort(self):
+        rand = Random(42)
+        all_hits = [FakeHit(str(i), rand.randint(0, 1000), rand.randint(0, 5), rand.randint(0, 50), rand.randint(0, 2)) for i in range(300)]
+
+        hits = SearchHits()
+        for index in range(0, len(all_hits), 50):
+            hits.extend(all_hits[index:index + 50])
+            ranked = hits.sort()
+
+            # the same scores as normalizing all hits received so far
+            received = all_hits[:index + 50]
+            norm_num_seeders = normalize(received, 'num_seeders')
+            norm_neg_votes = normalize(received, 'neg_votes')
+            norm_subscriptions = normalize(received, 'subscriptions')
+            for hit in received:
+                score = 0.8 * norm_num_seeders[hit.infohash] - 0.1 * norm_neg_votes[hit.infohash] + 0.1 * norm_subscriptions[hit.infohash]
+                self.assertAlmostEqual(hit.relevance_score[-1], score)
+
+            self.assertEqual(ranked, sorted(received, key=lambda hit: hit.relevance_score, reverse=True))
+
+        hits.add(FakeHit("new", 2000, matches=3))
+        self.assertEqual(hits.sort()[0].infohash, "new")
+
+    def test_update(self):
+        hits = SearchHits()
+        hits.extend([FakeHit("a", 10), FakeHit("b", 20)])
+        self.assertEqual(hits.sort()[0].infohash, "b")
+
+        # a modified hit keeps its score until it is updated
+        hits.get("a").num_seeders = 30
+        self.assertEqual(hits.sort()[0].infohash, "b")
+        hits.update(hits.get("a"))
+        self.assertEqual(hits.sort()[0].infohash, "a")
+        self.assertEqual(hits.get_normalization()[0], (25.0, sqrt(50.0)))
+
+        # hits of another search are not added
+        hits.update(FakeHit("c", 40))
+        self.assertFalse("c" in hits)
+        self.assertEqual(len(hits), 2)
+
+if __name__ == "__main__":
+    unittest.main()
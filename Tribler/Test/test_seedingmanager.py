@@ -0,0 +1,122 @@
+import unittest
+
+from Tribler.Core.simpledefs import DLSTATUS_SEEDING, DLSTATUS_STOPPED, DLMODE_NORMAL
+from Tribler.Policies import SeedingManager as seeding
+from Tribler.Policies.SeedingManager import GlobalSeedingManager
+
+
+class FakeDef(object):
+
+    def __init__(self, infohash):
+        self.infohash = infohash
+
+    def get_id(self):
+        return self.infohash
+
+    def get_def_type(self):
+        return 'torrent'
+
+
+class FakeDownload(object):
+
+    def __init__(self, infohash):
+        self.tdef = FakeDef(infohash)
+        self.stopped = False
+
+    def get_def(self):
+        return self.tdef
+
+    def get_mode(self):
+        return DLMODE_NORMAL
+
+    def get_dest_files(self):
+        return []
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakeDownloadState(object):
+
+    def __init__(self, download, status, total_up=0, total_down=100, time_seeding=0):
+        self.download = download
+        self.status = status
+        self.seedingstats = {"total_up": total_up, "total_down": total_down, "time_seeding": time_seeding}
+
+    def get_download(self):
+        return self.download
+
+    def get_status(self):
+        return self.status
+
+    def get_seeding_statistics(self):
+        return self.seedingstats
+
+    def get_length(self):
+        return 100
+
+    def get_progress(self):
+        return 1.0
+
+
+class TestGlobalSeedingManager(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {'t4t_option': 0, 't4t_ratio': 150, 't4t_hours': 0, 't4t_mins': 10}
+        self.nr_reads = 0
+        self.now = 1000.0
+        self._time = seeding.time
+        seeding.time = lambda: self.now
+        self.manager = GlobalSeedingManager(self.read)
+
+    def tearDown(self):
+        seeding.time = self._time
+
+    def read(self, key, *_):
+        self.nr_reads += 1
+        return self.config[key]
+
+    def test_ratio_threshold(self):
+        download = FakeDownload("a" * 20)
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING, total_up=10)])
+        self.assertEqual(self.manager.seeding_managers[download].upload_threshold, 150)
+
+        # below the threshold and before the deadline the policy is not evaluated
+        nr_reads = self.nr_reads
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING, total_up=149)])
+        self.assertEqual(self.nr_reads, nr_reads)
+        self.assertFalse(download.stopped)
+
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING, total_up=150)])
+        self.assertTrue(download.stopped)
+
+    def test_time_deadline(self):
+        self.config['t4t_option'] = 2
+        download = FakeDownload("b" * 20)
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING, time_seeding=570)])
+        self.assertEqual(self.manager.seeding_managers[download].deadline, self.now + 31)
+
+        self.now += 30
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING, time_seeding=600)])
+        self.assertFalse(download.stopped)
+
+        self.now += 1
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING, time_seeding=601)])
+        self.assertTrue(download.stopped)
+
+    def test_remove_stopped(self):
+        self.config['t4t_option'] = 1
+        download = FakeDownload("c" * 20)
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_SEEDING)])
+        self.assertTrue(download in self.manager.seeding_managers)
+
+        self.manager.apply_seeding_policy([FakeDownloadState(download, DLSTATUS_STOPPED)])
+        self.assertEqual(self.manager.seeding_managers, {})
+
+        # stale deadlines of removed seeds are skipped
+        self.now += seeding.MAX_EVALUATION_INTERVAL
+        self.manager.apply_seeding_policy([])
+        self.assertEqual(self.manager.deadlines, [])
+
+if __name__ == "__main__":
+    unittest.main()
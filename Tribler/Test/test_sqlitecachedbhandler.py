@@ -8,7 +8,7 @@ from unittest.case import skip
 from twisted.internet import reactor
 
 from Tribler.Core.CacheDB.SqliteCacheDBHandler import (TorrentDBHandler, MyPreferenceDBHandler, BasicDBHandler,
-                                                       PeerDBHandler, MiscDBHandler)
+                                                       PeerDBHandler, MiscDBHandler, ChannelCastDBHandler, MetadataDBHandler)
 from Tribler.Core.CacheDB.sqlitecachedb import SQLiteCacheDB, bin2str, str2bin
 from Tribler.Core.Session import Session
 from Tribler.Core.TorrentDef import TorrentDef
@@ -312,6 +312,24 @@ class TestTorrentDBHandler(AbstractDB):
         my_infohash = str2bin(my_infohash_str_126)
         assert not self.tdb.deleteTorrent(my_infohash)
 
+    @blocking_call_on_reactor_thread
+    def test_index_queue(self):
+        self.addTorrent()
+        self.assertEqual(self.tdb.getIndexStatistics()['pending'], 2)
+
+        self.tdb.flushIndex()
+        statistics = self.tdb.getIndexStatistics()
+        self.assertEqual((statistics['pending'], statistics['indexed'], statistics['flushes']), (0, 2, 1))
+
+        sql = "SELECT swarmname FROM FullTextIndex WHERE rowid = ?"
+        multiple_torrent_id = self.tdb.getTorrentID(unhexlify('ed81da94d21ad1b305133f2726cdaec5a57fed98'))
+        self.assertEqual(self.tdb._db.fetchone(sql, (multiple_torrent_id,)), u'tribler 4 1 7 src')
+
+        # a row without file names does not replace the row of a collected torrent
+        self.tdb._indexTorrent(multiple_torrent_id, u'other name', [], False)
+        self.tdb.flushIndex()
+        self.assertEqual(self.tdb._db.fetchone(sql, (multiple_torrent_id,)), u'tribler 4 1 7 src')
+
     @blocking_call_on_reactor_thread
     def test_getCollectedTorrentHashes(self):
         res = self.tdb.getNumberCollectedTorrents()
@@ -422,3 +440,56 @@ class TestMyPreferenceDBHandler(AbstractDB):
         for k in res:
             data = res[k]
             assert len(data) == 3
+
+
+class TestChannelCastDBHandler(AbstractDB):
+
+    def setUp(self):
+        AbstractDB.setUp(self)
+        self.cdb = ChannelCastDBHandler.getInstance()
+
+    @blocking_call_on_reactor_thread
+    def tearDown(self):
+        ChannelCastDBHandler.delInstance()
+
+        AbstractDB.tearDown(self)
+
+    @blocking_call_on_reactor_thread
+    def test_latest_modification(self):
+        assert self.cdb.getLatestModification(1, 0, 0, 1) is None
+
+        self.cdb.setLatestModification(1, 0, 0, 1, 100, None)
+        self.cdb.setLatestModification(1, 5, 0, 1, 101, 10)
+        assert self.cdb.getLatestModification(1, 0, 0, 1) == (100, None)
+        assert self.cdb.getLatestModification(1, 5, 0, 1) == (101, 10)
+
+        self.cdb.setLatestModification(1, 5, 0, 1, 102, 11)
+        assert self.cdb.getLatestModification(1, 5, 0, 1) == (102, 11)
+
+        self.cdb.removeLatestModification(1, 5, 0, 1)
+        assert self.cdb.getLatestModification(1, 5, 0, 1) is None
+        assert self.cdb.getLatestModification(1, 0, 0, 1) == (100, None)
+
+
+class TestMetadataDBHandler(AbstractDB):
+
+    def setUp(self):
+        AbstractDB.setUp(self)
+        self.mdb = MetadataDBHandler.getInstance()
+
+    @blocking_call_on_reactor_thread
+    def tearDown(self):
+        MetadataDBHandler.delInstance()
+        TorrentDBHandler.delInstance()
+        MiscDBHandler.delInstance()
+
+        AbstractDB.tearDown(self)
+
+    @blocking_call_on_reactor_thread
+    def test_deleteMetadataMessages(self):
+        infohash = '\x01' * 20
+        for dispersy_id in (1, 2, 3):
+            self.mdb.addAndGetIDMetadataMessage(dispersy_id, dispersy_id, '\x02' * 20, infohash, None)
+
+        self.mdb.deleteMetadataMessages([1, 2])
+        assert self.mdb.getMetadataMessageList(infohash, None, ("dispersy_id",)) == [(3,)]
@@ -0,0 +1,52 @@
+import unittest
+from random import Random
+
+from Tribler.Core.Search.TermIndex import TermIndex, bounded_levenshtein
+
+
+def levenshtein(a, b):
+    previous = range(len(b) + 1)
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class TestTermIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TermIndex()
+        self.index.add_names([u"ubuntu 12 04 desktop", u"ubuntu server", u"kubuntu desktop", u"ubuntu ubuntu live",
+                              u"debian live", u"united states"])
+
+    def test_counts(self):
+        self.assertEqual(len(self.index), 10)
+        self.assertEqual(self.index.get_count(u"ubuntu"), 3)
+        self.assertEqual(self.index.get_count(u"desktop"), 2)
+        self.assertFalse(u"fedora" in self.index)
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete(u"u", 2), [u"ubuntu", u"united"])
+        self.assertEqual(self.index.complete(u"ubuntu", 5), [])
+        self.assertEqual(self.index.complete(u"x", 5), [])
+
+        # terms added after a lookup are found as well
+        self.index.add_names([u"unity"])
+        self.assertEqual(sorted(self.index.complete(u"uni", 5)), [u"united", u"unity"])
+
+    def test_correct(self):
+        self.assertEqual(self.index.correct(u"ubunt", 2, 3), [u"ubuntu", u"kubuntu"])
+        self.assertEqual(self.index.correct(u"debain", 2, 3), [u"debian"])
+        self.assertEqual(self.index.correct(u"fedora", 2, 3), [])
+
+    def test_bounded_levenshtein(self):
+        rand = Random(42)
+        for _ in xrange(500):
+            a = u"".join(rand.choice(u"abc") for _ in xrange(rand.randint(0, 7)))
+            b = u"".join(rand.choice(u"abc") for _ in xrange(rand.randint(0, 7)))
+            self.assertEqual(bounded_levenshtein(a, b, 2), min(levenshtein(a, b), 3))
+
+if __name__ == "__main__":
+    unittest.main()
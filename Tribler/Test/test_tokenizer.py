@@ -0,0 +1,50 @@
+import unittest
+
+from Tribler.Core.Search.SearchManager import split_into_keywords
+from Tribler.Core.Search.Tokenizer import Tokenizer
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def setUp(self):
+        self.tokenizer = Tokenizer(max_records=2)
+
+    def test_keywords(self):
+        for name in (u"The.Big_Lebowski (1998) [DVDRip]", u"Caf\xe9 del Mar", u"", "plain str-name"):
+            record = self.tokenizer.get_record(name)
+            self.assertEqual(list(record.keywords), split_into_keywords(name))
+            self.assertEqual(record.normalized, " ".join(split_into_keywords(name)))
+
+    def test_cached(self):
+        record = self.tokenizer.get_record(u"a b")
+        self.assertTrue(self.tokenizer.get_record(u"a b") is record)
+        self.assertEqual((self.tokenizer.hits, self.tokenizer.misses), (1, 1))
+
+        # the returned keyword lists can be modified by the caller
+        self.tokenizer.get_keywords(u"a b").append(u"c")
+        self.assertEqual(record.keywords, (u"a", u"b"))
+
+    def test_lru(self):
+        first = self.tokenizer.get_record(u"first")
+        self.tokenizer.get_record(u"second")
+        self.tokenizer.get_record(u"first")
+        self.tokenizer.get_record(u"third")
+
+        # second was the least recently used record
+        self.assertTrue(self.tokenizer.get_record(u"first") is first)
+        self.assertEqual(self.tokenizer.misses, 3)
+        self.tokenizer.get_record(u"second")
+        self.assertEqual(self.tokenizer.misses, 4)
+
+    def test_count_keywords(self):
+        names = [u"The_Movie", u"movie.sample", u"of the end"]
+        expected = {}
+        for name in names:
+            for keyword in split_into_keywords(name, filterStopwords=True):
+                expected[keyword] = expected.get(keyword, 0) + 1
+        self.assertEqual(self.tokenizer.count_keywords(names, filterStopwords=True), expected)
+        self.assertEqual(self.tokenizer.count_keywords([]), {})
+        self.assertEqual(self.tokenizer.misses, 0)
+
+if __name__ == "__main__":
+    unittest.main()
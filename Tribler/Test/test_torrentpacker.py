@@ -0,0 +1,70 @@
+import unittest
+import zlib
+from os import urandom
+from struct import unpack_from
+
+from Tribler.Core.Utilities.encoding import decode
+from Tribler.community.search.torrentpacker import TorrentPacker
+
+MAX_LEN = 1024
+
+
+class TestTorrentPacker(unittest.TestCase):
+
+    def setUp(self):
+        self.packer = TorrentPacker()
+        self.infohash = urandom(20)
+        self.trackers = tuple("http://tracker%d.example.com/announce" % i for i in xrange(50))
+
+    def unpack(self, packet):
+        _, (infohash_time, name, files, trackers) = decode(zlib.decompress(packet))
+        infohash, timestamp = unpack_from('!20sQ', infohash_time)
+        return infohash, timestamp, name, files, trackers
+
+    def test_small(self):
+        files = ((u"file.avi", 42L),)
+        packet = self.packer.pack(self.infohash, 1L, u"name", files, self.trackers[:2], MAX_LEN)
+        self.assertEqual(self.unpack(packet), (self.infohash, 1L, u"name", files, self.trackers[:2]))
+
+    def test_many_files(self):
+        files = tuple((u"directory/file-%d-%s.avi" % (i, urandom(4).encode("HEX")), long(i)) for i in xrange(20000))
+        packet = self.packer.pack(self.infohash, 1L, u"name", files, self.trackers, MAX_LEN)
+        self.assertTrue(len(packet) <= MAX_LEN, len(packet))
+
+        _, _, _, packed_files, packed_trackers = self.unpack(packet)
+        self.assertEqual(packed_trackers, self.trackers[:10])
+        self.assertTrue(0 < len(packed_files) < len(files))
+        self.assertTrue(set(packed_files).issubset(files))
+
+        # the selection is reused, also when only the timestamp differs
+        self.assertEqual(self.packer.pack(self.infohash, 1L, u"name", files, self.trackers, MAX_LEN), packet)
+        packet = self.packer.pack(self.infohash, 2L, u"name", files, self.trackers, MAX_LEN)
+        self.assertEqual(self.unpack(packet)[1:], (2L, u"name", packed_files, packed_trackers))
+        self.assertEqual(self.packer.hits, 2)
+
+        # changed metadata is packed again
+        self.packer.pack(self.infohash, 2L, u"new name", files, self.trackers, MAX_LEN)
+        self.assertEqual(self.packer.misses, 2)
+
+    def test_oversized_file(self):
+        # a single file with a path that does not compress into MAX_LEN bytes
+        path = urandom(2 * MAX_LEN).encode("HEX").decode("ASCII")
+        files = ((path, 42L),)
+        packet = self.packer.pack(self.infohash, 1L, u"name", files, self.trackers[:2], MAX_LEN)
+        self.assertTrue(len(packet) <= MAX_LEN, len(packet))
+
+        infohash, _, name, packed_files, packed_trackers = self.unpack(packet)
+        self.assertEqual((infohash, name, packed_trackers), (self.infohash, u"name", self.trackers[:2]))
+        self.assertEqual(len(packed_files), 1)
+        self.assertTrue(0 < len(packed_files[0][0]) < len(path))
+        self.assertTrue(path.startswith(packed_files[0][0]))
+        self.assertEqual(packed_files[0][1], 42L)
+
+        # with many oversized files one of them is truncated
+        files = tuple((urandom(2 * MAX_LEN).encode("HEX").decode("ASCII"), long(i)) for i in xrange(10))
+        packet = self.packer.pack(self.infohash, 1L, u"name", files, self.trackers, MAX_LEN)
+        self.assertTrue(len(packet) <= MAX_LEN, len(packet))
+        self.assertEqual(len(self.unpack(packet)[3]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
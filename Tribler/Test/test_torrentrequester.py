@@ -0,0 +1,174 @@
+import unittest
+from os import urandom
+
+from Tribler.Core.FetchScheduler import LatencyEstimator
+from Tribler.Core.RemoteTorrentHandler import TorrentRequester, MAGNET_SOURCE, SWIFT_SOURCE
+from Tribler.Core.simpledefs import DLSTATUS_DOWNLOADING, DLSTATUS_STOPPED_ON_ERROR
+
+
+class FakeCandidate(object):
+
+    sock_addr = ("127.0.0.1", 7758)
+    tunnel = False
+
+
+class FakeRemoteTorrentHandler(object):
+
+    def __init__(self):
+        self.tasks = []
+
+    def scheduletask(self, task, t=0):
+        self.tasks.append((t, task))
+
+    def has_torrent(self, hashes, callback):
+        callback(None)
+
+    def run_tasks(self):
+        tasks, self.tasks = self.tasks, []
+        for _, task in tasks:
+            task()
+
+
+class FakeMagnetRequester(object):
+
+    def __init__(self):
+        self.latency = LatencyEstimator(30.0, 15.0, 30.0)
+        self.requests = []
+        self.failed_callbacks = []
+
+    def add_request(self, hashes, candidate, timeout=None):
+        self.requests.append(hashes)
+
+    def is_being_requested(self, hashes):
+        return hashes in self.requests
+
+    def fail(self, hashes):
+        self.requests.remove(hashes)
+        for callback in self.failed_callbacks:
+            callback(hashes[0])
+
+
+class FakeDownload(object):
+
+    def __init__(self, sdef):
+        self.sdef = sdef
+        self.state_callback = None
+
+    def get_def(self):
+        return self.sdef
+
+    def set_state_callback(self, callback, delay=0):
+        self.state_callback = callback
+
+    def add_peer(self, address):
+        pass
+
+
+class FakeDownloadState(object):
+
+    def __init__(self, download, status, progress=0.0):
+        self.download = download
+        self.status = status
+        self.progress = progress
+
+    def get_download(self):
+        return self.download
+
+    def get_status(self):
+        return self.status
+
+    def get_progress(self):
+        return self.progress
+
+
+class FakeSession(object):
+
+    def __init__(self):
+        self.downloads = []
+
+    def get_torrent_collecting_dir(self):
+        return u"."
+
+    def start_download(self, sdef, dcfg, hidden=False):
+        self.downloads.append(FakeDownload(sdef))
+        return self.downloads[-1]
+
+    def remove_download(self, download, removecontent=False, removestate=False, hidden=False):
+        self.downloads.remove(download)
+
+
+class TestTorrentRequester(unittest.TestCase):
+
+    def setUp(self):
+        self.remote_th = FakeRemoteTorrentHandler()
+        self.magnet_requester = FakeMagnetRequester()
+        self.session = FakeSession()
+        self.hashes = (urandom(20), urandom(20))
+
+    def fetch(self, prio, window=TorrentRequester.WINDOW):
+        requester = TorrentRequester(self.remote_th, self.magnet_requester, self.session, prio, window)
+        self.assertTrue(requester.doFetch(self.hashes, [FakeCandidate()]))
+        self.assertTrue(requester.scheduler.is_fetching(self.hashes[0], SWIFT_SOURCE))
+        return requester, self.session.downloads[0]
+
+    def test_swift_failed_before_race(self):
+        requester, download = self.fetch(1)
+
+        # swift fails before the magnet lookup of the race starts
+        download.state_callback(FakeDownloadState(download, DLSTATUS_STOPPED_ON_ERROR))
+        self.assertEqual(self.magnet_requester.requests, [self.hashes])
+        self.assertTrue(requester.scheduler.is_fetching(self.hashes[0], MAGNET_SOURCE))
+        self.assertEqual(requester.requests_fail, 1)
+
+        # the scheduled lookup does not request it again
+        self.remote_th.run_tasks()
+        self.assertEqual(self.magnet_requester.requests, [self.hashes])
+        self.assertEqual(self.session.downloads, [])
+
+    def test_swift_failed_after_race(self):
+        requester, download = self.fetch(1)
+
+        # swift is slow, the race starts the magnet lookup
+        self.remote_th.run_tasks()
+        self.assertEqual(self.magnet_requester.requests, [self.hashes])
+        self.assertEqual(download.state_callback(FakeDownloadState(download, DLSTATUS_DOWNLOADING))[1], True)
+
+        download.state_callback(FakeDownloadState(download, DLSTATUS_STOPPED_ON_ERROR))
+        self.assertEqual(self.magnet_requester.requests, [self.hashes])
+
+    def test_swift_failed_low_prio(self):
+        requester, download = self.fetch(2)
+
+        # low priority requests only use magnet links after swift failed
+        self.remote_th.run_tasks()
+        self.assertEqual(self.magnet_requester.requests, [])
+
+        download.state_callback(FakeDownloadState(download, DLSTATUS_STOPPED_ON_ERROR))
+        self.assertEqual(self.magnet_requester.requests, [self.hashes])
+
+    def test_magnet_failed(self):
+        requester, download = self.fetch(1, window=1)
+
+        download.state_callback(FakeDownloadState(download, DLSTATUS_STOPPED_ON_ERROR))
+        self.assertFalse(requester.scheduler.has_room())
+
+        # a failed magnet lookup frees its place in the window
+        self.magnet_requester.fail(self.hashes)
+        self.assertFalse(requester.scheduler.is_fetching(self.hashes[0]))
+        self.assertTrue(requester.scheduler.has_room())
+
+    def test_collected(self):
+        requester, download = self.fetch(1)
+
+        # torrents this requester is not fetching are not counted
+        requester.collected(urandom(20))
+        self.assertEqual((requester.scheduler.nr_succeeded, requester.scheduler.nr_cancelled), (0, 0))
+
+        # the race is over when the magnet lookup delivered the torrent
+        self.remote_th.run_tasks()
+        requester.collected(self.hashes[0])
+        self.assertEqual((requester.scheduler.nr_succeeded, requester.scheduler.nr_cancelled), (1, 1))
+        self.assertEqual(download.state_callback(FakeDownloadState(download, DLSTATUS_DOWNLOADING))[1], False)
+
+if __name__ == "__main__":
+    unittest.main()
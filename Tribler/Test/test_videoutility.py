@@ -0,0 +1,72 @@
+import unittest
+from StringIO import StringIO
+from math import sqrt
+from random import Random
+
+from Tribler.Core.Video import VideoUtility
+from Tribler.Core.Video.VideoUtility import colourfulness, meanstdv, limit_resolution, get_frames
+
+
+class FakeFFmpeg(object):
+
+    """
+    Outputs a 1x1 frame for each -ss argument, of which the colour is the timecode, as the concat filter of ffmpeg
+    does: nothing is output for a timecode in FAILING.
+    """
+    failing = ()
+    processes = 0
+
+    def __init__(self, args, stdout=None, stderr=None, startupinfo=None):
+        FakeFFmpeg.processes += 1
+        timecodes = [int(args[i + 1]) for i, arg in enumerate(args) if arg == "-ss"]
+        self.stdout = StringIO("".join(chr(timecode) * 3 for timecode in timecodes if timecode not in self.failing))
+
+    def poll(self):
+        return 0
+
+    def wait(self):
+        return 0
+
+
+class TestVideoUtility(unittest.TestCase):
+
+    def test_meanstdv(self):
+        self.assertEqual(meanstdv([2, 4, 4, 4, 5, 5, 7, 9]), (5.0, sqrt(32 / 7.0)))
+        self.assertEqual(meanstdv([3]), (3.0, 0.0))
+
+    def test_colourfulness(self):
+        # grey images have no colour
+        self.assertEqual(colourfulness("\x80" * 300), 0.0)
+        self.assertEqual(colourfulness(""), None)
+
+        rand = Random(42)
+        pxls = [(rand.randint(0, 255), rand.randint(0, 255), rand.randint(0, 255)) for _ in range(1000)]
+        m_rg, s_rg = meanstdv([r - g for r, g, b in pxls])
+        m_yb, s_yb = meanstdv([0.5 * (r + g) - b for r, g, b in pxls])
+        expected = sqrt(s_rg ** 2 + s_yb ** 2) + 0.3 * sqrt(m_rg ** 2 + m_yb ** 2)
+        self.assertAlmostEqual(colourfulness("".join(chr(c) for pxl in pxls for c in pxl)), expected)
+
+        # more saturated images are more colourful
+        self.assertTrue(colourfulness("\xff\x00\x00\x00\xff\x00" * 50) > colourfulness("\x90\x70\x70\x70\x90\x70" * 50))
+
+    def test_get_frames(self):
+        popen = VideoUtility.subprocess.Popen
+        VideoUtility.subprocess.Popen = FakeFFmpeg
+        try:
+            FakeFFmpeg.processes = 0
+            self.assertEqual(get_frames(u"video", [10, 20, 30], (1, 1), u"ffmpeg"), [(10, "\n" * 3), (20, "\x14" * 3), (30, "\x1e" * 3)])
+            self.assertEqual(FakeFFmpeg.processes, 1)
+
+            # a seek in the middle that yields no frame, the frames keep their own timecode
+            FakeFFmpeg.failing = (20,)
+            self.assertEqual(get_frames(u"video", [10, 20, 30], (1, 1), u"ffmpeg"), [(10, "\n" * 3), (30, "\x1e" * 3)])
+        finally:
+            FakeFFmpeg.failing = ()
+            VideoUtility.subprocess.Popen = popen
+
+    def test_limit_resolution(self):
+        self.assertEqual(limit_resolution((1280, 720), (100, 100)), (100, 56.25))
+        self.assertEqual(limit_resolution((0, 720), (100, 100)), None)
+
+if __name__ == "__main__":
+    unittest.main()
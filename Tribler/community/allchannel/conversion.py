@@ -1,10 +1,21 @@
 from struct import pack, unpack_from
 from random import choice, sample
 
-from Tribler.Core.Utilities.encoding import encode, decode
+from Tribler.Core.Utilities.encoding import encode
+from Tribler.Core.Utilities.schema import Schema, Record, Sized, ListOf, SetOf, DictOf
 from Tribler.dispersy.message import DropPacket
 from Tribler.dispersy.conversion import BinaryConversion
 
+# channel cid -> set of infohashes
+CHANNEL_TORRENTS = DictOf(Sized(str, length=20), SetOf(Sized(str, length=20)))
+
+CHANNELCAST_PAYLOAD = Schema(CHANNEL_TORRENTS, "channelcast")
+CHANNELSEARCH_PAYLOAD = Schema(ListOf(unicode), "channelsearch")
+CHANNELSEARCH_RESPONSE_PAYLOAD = Schema(Record(tuple, [("keywords", ListOf(unicode)),
+                                                       ("torrents", CHANNEL_TORRENTS)],
+                                               exact=True),
+                                        "channelsearch-response")
+
 
 class AllChannelConversion(BinaryConversion):
 
@@ -37,20 +48,9 @@ class AllChannelConversion(BinaryConversion):
 
     def _decode_channelcast(self, placeholder, offset, data):
         try:
-            offset, payload = decode(data, offset)
-        except ValueError:
-            raise DropPacket("Unable to decode the channelcast-payload")
-
-        if not isinstance(payload, dict):
-            raise DropPacket("Invalid payload type")
-
-        for cid, infohashes in payload.iteritems():
-            if not (isinstance(cid, str) and len(cid) == 20):
-                raise DropPacket("Invalid 'cid' type or value")
-
-            for infohash in infohashes:
-                if not (isinstance(infohash, str) and len(infohash) == 20):
-                    raise DropPacket("Invalid 'infohash' type or value")
+            offset, payload = CHANNELCAST_PAYLOAD.decode(data, offset)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the channelcast-payload: %s" % exception)
         return offset, placeholder.meta.payload.implement(payload)
 
     def _encode_channelsearch(self, message):
@@ -59,16 +59,9 @@ class AllChannelConversion(BinaryConversion):
 
     def _decode_channelsearch(self, placeholder, offset, data):
         try:
-            offset, payload = decode(data, offset)
-        except ValueError:
-            raise DropPacket("Unable to decode the channelcast-payload")
-
-        if not isinstance(payload, list):
-            raise DropPacket("Invalid payload type")
-
-        for keyword in payload:
-            if not isinstance(keyword, unicode):
-                raise DropPacket("Invalid 'keyword' type")
+            offset, payload = CHANNELSEARCH_PAYLOAD.decode(data, offset)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the channelsearch-payload: %s" % exception)
         return offset, placeholder.meta.payload.implement(payload)
 
     def _encode_channelsearch_response(self, message):
@@ -77,25 +70,9 @@ class AllChannelConversion(BinaryConversion):
 
     def _decode_channelsearch_response(self, placeholder, offset, data):
         try:
-            offset, payload = decode(data, offset)
-        except ValueError:
-            raise DropPacket("Unable to decode the channelcast-payload")
-
-        if not isinstance(payload, tuple):
-            raise DropPacket("Invalid payload type")
-
-        keywords, torrents = payload
-        for keyword in keywords:
-            if not isinstance(keyword, unicode):
-                raise DropPacket("Invalid 'keyword' type")
-
-        for cid, infohashes in torrents.iteritems():
-            if not (isinstance(cid, str) and len(cid) == 20):
-                raise DropPacket("Invalid 'cid' type or value")
-
-            for infohash in infohashes:
-                if not (isinstance(infohash, str) and len(infohash) == 20):
-                    raise DropPacket("Invalid 'infohash' type or value")
+            offset, (keywords, torrents) = CHANNELSEARCH_RESPONSE_PAYLOAD.decode(data, offset)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the channelsearch-response-payload: %s" % exception)
 
         return offset, placeholder.meta.payload.implement(keywords, torrents)
 
@@ -0,0 +1,156 @@
+import logging
+from time import time
+
+from .efforthistory import CYCLE_SIZE, EffortHistory
+
+try:
+    # python 2.7 only...
+    from collections import OrderedDict
+except ImportError:
+    from Tribler.dispersy.python27_ordereddict import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class Book(object):
+
+    """
+    Container class for all the bookkeeping information per peer.
+    """
+    def __init__(self, member):
+        super(Book, self).__init__()
+        self.member = member
+        self.cycle = 0
+        self.effort = None
+        self.upload = 0
+        self.download = 0
+
+    @property
+    def score(self):
+        """
+        Score is used to order members by how useful it is to make a (new) record with them.
+        """
+        # how much this member contributed - how much this member consumed
+        return self.upload - self.download
+
+    @property
+    def row(self):
+        return (self.member.database_id, self.cycle, buffer(self.effort.bytes), self.upload, self.download)
+
+
+class BookStore(object):
+
+    """
+    LRU cache of Book instances backed by the book table.
+
+    Modified books must be reported using mark_dirty.  Dirty books, including those that were evicted from the
+    cache, are written to the database in a single executemany when flush is called.
+    """
+    def __init__(self, database, length=512):
+        super(BookStore, self).__init__()
+        self._database = database
+        self._length = length
+
+        # _BOOKS contains member.database_id:Book pairs, the least recently used book first
+        self._books = OrderedDict()
+        # _DIRTY contains member.database_id:Book pairs for all books that have not yet been written to the
+        # database, including books that are no longer in _BOOKS
+        self._dirty = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.flushed_books = 0
+
+    def __len__(self):
+        return len(self._books)
+
+    def itervalues(self):
+        return self._books.itervalues()
+
+    def preload(self, dispersy, count=None):
+        """
+        Load the books of the COUNT most active members in one query, COUNT defaults to the cache length.
+        """
+        rows = list(self._database.execute(u"SELECT member, cycle, effort, upload, download FROM book ORDER BY upload + download DESC LIMIT ?",
+                                           (count or self._length,)))
+        for database_id, cycle, effort, upload, download in reversed(rows):
+            if database_id in self._books:
+                continue
+
+            member = dispersy.get_member_from_database_id(database_id)
+            if member:
+                self._store(self._create_book(member, (cycle, effort, upload, download)))
+
+        logger.debug("preloaded %d books", len(self._books))
+
+    def get(self, member):
+        database_id = member.database_id
+        book = self._books.get(database_id)
+        if book:
+            self.hits += 1
+            # move to the most recently used position
+            del self._books[database_id]
+            self._books[database_id] = book
+            return book
+
+        self.misses += 1
+        book = self._dirty.get(database_id)
+        if not book:
+            try:
+                row = self._database.execute(u"SELECT cycle, effort, upload, download FROM book WHERE member = ?",
+                                             (database_id,)).next()
+            except StopIteration:
+                row = None
+            book = self._create_book(member, row)
+
+        self._store(book)
+        return book
+
+    def mark_dirty(self, book):
+        self._dirty[book.member.database_id] = book
+
+    def flush(self):
+        """
+        Write all dirty books to the database in one transaction.
+        """
+        if self._dirty:
+            books, self._dirty = self._dirty, {}
+            self._database.executemany(u"INSERT OR REPLACE INTO book (member, cycle, effort, upload, download) VALUES (?, ?, ?, ?, ?)",
+                                       [book.row for book in books.itervalues()])
+            self.flushes += 1
+            self.flushed_books += len(books)
+            logger.debug("flushed %d books", len(books))
+
+    def get_statistics(self):
+        return {"size": len(self._books),
+                "dirty": len(self._dirty),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "flushes": self.flushes,
+                "flushed_books": self.flushed_books}
+
+    @staticmethod
+    def _create_book(member, row):
+        book = Book(member)
+        if row:
+            cycle, effort, upload, download = row
+            book.cycle = cycle
+            book.effort = EffortHistory(str(effort), float(cycle * CYCLE_SIZE))
+            book.upload = upload
+            book.download = download
+        else:
+            now = time()
+            book.cycle = int(now / CYCLE_SIZE)
+            book.effort = EffortHistory(now)
+        return book
+
+    def _store(self, book):
+        self._books[book.member.database_id] = book
+        if len(self._books) > self._length:
+            # evicted books that are dirty remain in _DIRTY until the next flush
+            self._books.popitem(False)
+            self.evictions += 1
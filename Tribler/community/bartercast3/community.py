@@ -3,7 +3,10 @@ from random import random
 from time import time
 
 from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from twisted.python.threadable import isInIOThread
 
+from .bookstore import BookStore
 from .conversion import BarterConversion
 from .database import BarterDatabase
 from .efforthistory import CYCLE_SIZE, EffortHistory
@@ -42,6 +45,9 @@ logger = logging.getLogger(__name__)
 MASTER_MEMBER_PUBLIC_KEY = "3081a7301006072a8648ce3d020106052b8104002703819200040792e72441554e5d5448043bcf516c18d93125cf299244f85fa3bc2c89cdca3029b2f8d832573d337babae5f64ff49dbf70ceca5a0a15e1b13a685c50c4bf285252667e3470b82f90318ac8ee2ad2d09ddabdc140ca879b938921831f0089511321e456b67c3b545ca834f67259e4cf7eff02fbd797c03a2df6db5b945ff3589227d686d6bf593b1372776ece283ab0d".decode("HEX")
 MASTER_MEMBER_PUBLIC_KEY_DIGEST = "4fe1172862c649485c25b3d446337a35f389a2a2".decode("HEX")
 
+# interval (in seconds) at which modified books are written to the database
+BOOK_FLUSH_INTERVAL = 60.0
+
 
 def bitcount(l):
     c = 0
@@ -106,28 +112,6 @@ class Association(object):
         return False
 
 
-class Book(object):
-
-    """
-    Container class for all the bookkeeping information per peer.
-    """
-    def __init__(self, member):
-        super(Book, self).__init__()
-        self.member = member
-        self.cycle = 0
-        self.effort = None
-        self.upload = 0
-        self.download = 0
-
-    @property
-    def score(self):
-        """
-        Score is used to order members by how useful it is to make a (new) record with them.
-        """
-        # how much this member contributed - how much this member consumed
-        return self.upload - self.download
-
-
 class BarterCommunity(Community):
 
     @classmethod
@@ -160,9 +144,9 @@ class BarterCommunity(Community):
         self._associated_up = long(str(options.get(u"associated-up", 0)))
         self._associated_down = long(str(options.get(u"associated-down", 0)))
 
-        # _BOOKS cache (reduce _DATABASE access)
-        self._books_length = 512
-        self._books = OrderedDict()
+        # _BOOKS cache (reduce _DATABASE access), modified books are written back periodically
+        self._books = BookStore(self._database, 512)
+        self._books.preload(self._dispersy)
 
         # _ADDRESS_ASSOCIATION containing address:Association pairs
         self._address_association_length = 512
@@ -185,6 +169,8 @@ class BarterCommunity(Community):
         # wait till next time we can create records with the candidates on our slope
         self.register_task("periodically create records", reactor.callLater(0, self._periodically_create_records))
 
+        self.register_task("flush books", LoopingCall(self._books.flush)).start(BOOK_FLUSH_INTERVAL, now=False)
+
     @property
     def database(self):
         return self._database
@@ -286,9 +272,9 @@ class BarterCommunity(Community):
         # update all up and download values
         self.download_state_callback([], False)
 
-        # store all cached bookkeeping
-        self._database.executemany(u"INSERT OR REPLACE INTO book (member, cycle, effort, upload, download) VALUES (?, ?, ?, ?, ?)",
-                                   [(book.member.database_id, book.cycle, buffer(book.effort.bytes), book.upload, book.download) for book in self._books.itervalues()])
+        # store all modified bookkeeping
+        self._books.flush()
+        logger.debug("book cache statistics: %s", self._books.get_statistics())
 
         # store bandwidth counters
         self._database.executemany(u"INSERT OR REPLACE INTO option (key, value) VALUES (?, ?)",
@@ -301,32 +287,7 @@ class BarterCommunity(Community):
         self._database.close()
 
     def get_book(self, member):
-        # try cache
-        book = self._books.get(member.database_id)
-        if not book:
-            book = Book(member)
-
-            # fetch from database
-            try:
-                cycle, effort, upload, download = self._database.execute(u"SELECT cycle, effort, upload, download FROM book WHERE member = ?",
-                                                                         (member.database_id,)).next()
-            except StopIteration:
-                now = time()
-                book.cycle = int(now / CYCLE_SIZE)
-                book.effort = EffortHistory(now)
-            else:
-                book.cycle = cycle
-                book.effort = EffortHistory(str(effort), float(cycle * CYCLE_SIZE))
-                book.upload = upload
-                book.download = download
-
-            # store in cache
-            self._books[member.database_id] = book
-            if len(self._books) > self._books_length:
-                _, old = self._books.popitem(False)
-                self._database.execute(u"INSERT OR REPLACE INTO book (member, cycle, effort, upload, download) VALUES (?, ?, ?, ?)",
-                                       (old.member.database_id, old.cycle, buffer(old.effort.bytes), old.upload, old.download))
-        return book
+        return self._books.get(member)
 
     def update_book_from_address(self, swift_address, timestamp, bytes_up, bytes_down, delayed=True):
         """
@@ -343,6 +304,7 @@ class BarterCommunity(Community):
                 book.cycle = max(book.cycle, int(timestamp / CYCLE_SIZE))
                 book.upload += bytes_up
                 book.download += bytes_down
+                self._books.mark_dirty(book)
                 logger.debug("update book for %s +%d -%d", member.mid.encode("HEX"), book.upload, book.download)
 
                 # associated_{up,down} is from our viewpoint while bytes_{up,down} is from the other
@@ -456,6 +418,7 @@ class BarterCommunity(Community):
                 if book.cycle < cycle:
                     book.cycle = cycle
                     book.effort.set(cycle * CYCLE_SIZE)
+                    self._books.mark_dirty(book)
 
                 self.try_adding_to_slope(message.candidate, book.member)
 
@@ -471,6 +434,7 @@ class BarterCommunity(Community):
                 if book.cycle < cycle:
                     book.cycle = cycle
                     book.effort.set(cycle * CYCLE_SIZE)
+                    self._books.mark_dirty(book)
 
                 self.try_adding_to_slope(message.candidate, book.member)
 
@@ -710,6 +674,7 @@ class BarterCommunity(Community):
             if book.cycle < cycle:
                 book.cycle = cycle
                 book.effort.set(cycle * CYCLE_SIZE)
+                self._books.mark_dirty(book)
 
         meta = self._meta_messages[u"pong"]
         responses = [meta.impl(distribution=(self._global_time,), destination=(ping.candidate,), payload=(ping.payload.identifier, self._my_member)) for ping in messages]
@@ -731,6 +696,7 @@ class BarterCommunity(Community):
             if book.cycle < cycle:
                 book.cycle = cycle
                 book.effort.set(cycle * CYCLE_SIZE)
+                self._books.mark_dirty(book)
 
     def check_barter_record(self, messages):
         # stupidly accept everything...
@@ -683,20 +683,24 @@ class ChannelCommunity(Community):
                 # see if this is new information, if so call on_X_from_dispersy to update local 'cached' information
                 if message_name == u"torrent":
                     channeltorrent_id = channeltorrentDict[modifying_dispersy_id]
+                    if not channeltorrent_id:
+                        continue
 
-                    latest = self._get_latest_modification_from_torrent_id(channeltorrent_id, modification_type_id)
+                    latest = self._add_latest_modification(channeltorrent_id, 0, modification_type_id, message)
                     if not latest or latest.packet_id == dispersy_id:
                         self._channelcast_db.on_torrent_modification_from_dispersy(channeltorrent_id, modification_type, modification_value)
 
                 elif message_name == u"playlist":
                     playlist_id = playlistDict[modifying_dispersy_id]
+                    if not playlist_id:
+                        continue
 
-                    latest = self._get_latest_modification_from_playlist_id(playlist_id, modification_type_id)
+                    latest = self._add_latest_modification(0, playlist_id, modification_type_id, message)
                     if not latest or latest.packet_id == dispersy_id:
                         self._channelcast_db.on_playlist_modification_from_dispersy(playlist_id, modification_type, modification_value)
 
                 elif message_name == u"channel":
-                    latest = self._get_latest_modification_from_channel_id(modification_type_id)
+                    latest = self._add_latest_modification(0, 0, modification_type_id, message)
                     if not latest or latest.packet_id == dispersy_id:
                         self._channelcast_db.on_channel_modification_from_dispersy(self._channel_id, modification_type, modification_value)
 
@@ -711,40 +715,42 @@ class ChannelCommunity(Community):
                 dispersy_id = packet.packet_id
 
                 message = packet.load_message()
-                message_name = message.name
+                message_name = message.payload.modification_on.name
                 modifying_dispersy_id = message.payload.modification_on.packet_id
                 modification_type = message.payload.modification_type
                 modification_type_id = self._modification_types[modification_type]
 
+                self._channelcast_db.on_remove_metadata_from_dispersy(self._channel_id, dispersy_id, redo)
+
                 # load local ids from database
-                playlist_id = channeltorrent_id = None
+                playlist_id = channeltorrent_id = 0
                 if message_name == u"torrent":
                     channeltorrent_id = self._get_torrent_id_from_message(modifying_dispersy_id)
+                    if not channeltorrent_id:
+                        continue
 
                 elif message_name == u"playlist":
                     playlist_id = self._get_playlist_id_from_message(modifying_dispersy_id)
-                self._channelcast_db.on_remove_metadata_from_dispersy(self._channel_id, dispersy_id, redo)
-
-                if message_name == u"torrent":
-                    latest = self._get_latest_modification_from_torrent_id(channeltorrent_id, modification_type_id)
-
-                    if not latest or latest.packet_id == dispersy_id:
-                        modification_value = latest.payload.modification_value if latest else ''
-                        self._channelcast_db.on_torrent_modification_from_dispersy(channeltorrent_id, modification_type, modification_value)
-
-                elif message_name == u"playlist":
-                    latest = self._get_latest_modification_from_playlist_id(playlist_id, modification_type_id)
+                    if not playlist_id:
+                        continue
 
-                    if not latest or latest.packet_id == dispersy_id:
-                        modification_value = latest.payload.modification_value if latest else ''
-                        self._channelcast_db.on_playlist_modification_from_dispersy(playlist_id, modification_type, modification_value)
+                if redo:
+                    latest = self._add_latest_modification(channeltorrent_id, playlist_id, modification_type_id, message)
+                    changed = not latest or latest.packet_id == dispersy_id
+                else:
+                    changed, latest = self._remove_latest_modification(channeltorrent_id, playlist_id, modification_type_id, dispersy_id)
 
-                elif message_name == u"channel":
-                    latest = self._get_latest_modification_from_channel_id(modification_type_id)
+                if changed:
+                    self._on_latest_modification(channeltorrent_id, playlist_id, modification_type, latest)
 
-                    if not latest or latest.packet_id == dispersy_id:
-                        modification_value = latest.payload.modification_value if latest else ''
-                        self._channelcast_db.on_channel_modification_from_dispersy(self._channel_id, modification_type, modification_value)
+    def _on_latest_modification(self, channeltorrent_id, playlist_id, modification_type, latest):
+        modification_value = latest.payload.modification_value if latest else ''
+        if channeltorrent_id:
+            self._channelcast_db.on_torrent_modification_from_dispersy(channeltorrent_id, modification_type, modification_value)
+        elif playlist_id:
+            self._channelcast_db.on_playlist_modification_from_dispersy(playlist_id, modification_type, modification_value)
+        else:
+            self._channelcast_db.on_channel_modification_from_dispersy(self._channel_id, modification_type, modification_value)
 
     # create, check or receive playlist_torrent messages
     @call_on_reactor_thread
@@ -858,26 +864,18 @@ class ChannelCommunity(Community):
                 else:
                     by_peer_id = self._peer_db.addOrGetPeerID(authentication_member.public_key)
 
-                # determine if we are reverting latest
-                updateTorrent = False
+                self._channelcast_db.on_moderation(self._channel_id, dispersy_id, peer_id, by_peer_id, cause, message.payload.text, message.payload.timestamp, message.payload.severity)
 
+                # determine if we reverted the latest modification
                 modifying_dispersy_id = cause_message.payload.modification_on.packet_id
                 channeltorrent_id = self._get_torrent_id_from_message(modifying_dispersy_id)
                 if channeltorrent_id:
                     modification_type = cause_message.payload.modification_type
                     modification_type_id = self._modification_types[modification_type]
 
-                    latest = self._get_latest_modification_from_torrent_id(channeltorrent_id, modification_type_id)
-                    if not latest or latest.packet_id == cause_message.packet_id:
-                        updateTorrent = True
-
-                self._channelcast_db.on_moderation(self._channel_id, dispersy_id, peer_id, by_peer_id, cause, message.payload.text, message.payload.timestamp, message.payload.severity)
-
-                if updateTorrent:
-                    latest = self._get_latest_modification_from_torrent_id(channeltorrent_id, modification_type_id)
-
-                    modification_value = latest.payload.modification_value if latest else ''
-                    self._channelcast_db.on_torrent_modification_from_dispersy(channeltorrent_id, modification_type, modification_value)
+                    changed, latest = self._remove_latest_modification(channeltorrent_id, 0, modification_type_id, cause)
+                    if changed:
+                        self._on_latest_modification(channeltorrent_id, 0, modification_type, latest)
 
     def _disp_undo_moderation(self, descriptors, redo=False):
         if self.integrate_with_tribler:
@@ -885,6 +883,24 @@ class ChannelCommunity(Community):
                 dispersy_id = packet.packet_id
                 self._channelcast_db.on_remove_moderation(self._channel_id, dispersy_id, redo)
 
+                # undoing a moderation makes the modification it reverted available again
+                message = packet.load_message()
+                cause_message = message.payload.causepacket.load_message()
+                modifying_dispersy_id = cause_message.payload.modification_on.packet_id
+                channeltorrent_id = self._get_torrent_id_from_message(modifying_dispersy_id)
+                if channeltorrent_id:
+                    modification_type = cause_message.payload.modification_type
+                    modification_type_id = self._modification_types[modification_type]
+
+                    if redo:
+                        changed, latest = self._remove_latest_modification(channeltorrent_id, 0, modification_type_id, cause_message.packet_id)
+                    else:
+                        latest = self._add_latest_modification(channeltorrent_id, 0, modification_type_id, cause_message)
+                        changed = latest and latest.packet_id == cause_message.packet_id
+
+                    if changed:
+                        self._on_latest_modification(channeltorrent_id, 0, modification_type, latest)
+
     # check or receive torrent_mark messages
     @call_on_reactor_thread
     def _disp_create_mark_torrent(self, infohash, type, timestamp, store=True, update=True, forward=True):
@@ -1031,26 +1047,76 @@ class ChannelCommunity(Community):
 
     def _get_latest_modification_from_channel_id(self, type_id):
         assert isinstance(type_id, (int, long)), "type_id type is '%s'" % type(type_id)
-
-        # 1. get the dispersy identifier from the channel_id
-        dispersy_ids = self._channelcast_db._db.fetchall(u"SELECT dispersy_id, prev_global_time FROM ChannelMetaData WHERE type_id = ? AND channel_id = ? AND id NOT IN (SELECT metadata_id FROM MetaDataTorrent) AND id NOT IN (SELECT metadata_id FROM MetaDataPlaylist) AND dispersy_id not in (SELECT cause FROM Moderations WHERE channel_id = ?) ORDER BY prev_global_time DESC", (type_id, self._channel_id, self._channel_id))
-        return self._determine_latest_modification(dispersy_ids)
+        return self._get_latest_modification(0, 0, type_id)
 
     def _get_latest_modification_from_torrent_id(self, channeltorrent_id, type_id):
         assert isinstance(channeltorrent_id, (int, long)), "channeltorrent_id type is '%s'" % type(channeltorrent_id)
         assert isinstance(type_id, (int, long)), "type_id type is '%s'" % type(type_id)
-
-        # 1. get the dispersy identifier from the channel_id
-        dispersy_ids = self._channelcast_db._db.fetchall(u"SELECT dispersy_id, prev_global_time FROM ChannelMetaData, MetaDataTorrent WHERE ChannelMetaData.id = MetaDataTorrent.metadata_id AND type_id = ? AND channeltorrent_id = ? AND dispersy_id not in (SELECT cause FROM Moderations WHERE channel_id = ?) ORDER BY prev_global_time DESC", (type_id, channeltorrent_id, self._channel_id))
-        return self._determine_latest_modification(dispersy_ids)
+        return self._get_latest_modification(channeltorrent_id, 0, type_id)
 
     def _get_latest_modification_from_playlist_id(self, playlist_id, type_id):
         assert isinstance(playlist_id, (int, long)), "playlist_id type is '%s'" % type(playlist_id)
         assert isinstance(type_id, (int, long)), "type_id type is '%s'" % type(type_id)
+        return self._get_latest_modification(0, playlist_id, type_id)
+
+    def _get_latest_modification(self, channeltorrent_id, playlist_id, type_id):
+        """
+        Returns the modification message that currently determines the value of TYPE_ID for the channel (both ids 0),
+        a torrent or a playlist.  The result is materialized in the ChannelMetaDataLatest table, only if it is
+        missing the full modification history is resolved.
+        """
+        latest = self._channelcast_db.getLatestModification(self._channel_id, channeltorrent_id, playlist_id, type_id)
+        if latest:
+            message = self._dispersy.load_message_by_packetid(self, latest[0])
+            if message:
+                return message
 
-        # 1. get the dispersy identifier from the channel_id
-        dispersy_ids = self._channelcast_db._db.fetchall(u"SELECT dispersy_id, prev_global_time FROM ChannelMetaData, MetaDataPlaylist WHERE ChannelMetaData.id = MetaDataPlaylist.metadata_id AND type_id = ? AND playlist_id = ? AND dispersy_id not in (SELECT cause FROM Moderations WHERE channel_id = ?) ORDER BY prev_global_time DESC", (type_id, playlist_id, self._channel_id))
-        return self._determine_latest_modification(dispersy_ids)
+        message = self._determine_latest_modification(self._get_modification_history(channeltorrent_id, playlist_id, type_id))
+        self._store_latest_modification(channeltorrent_id, playlist_id, type_id, message)
+        return message
+
+    def _get_modification_history(self, channeltorrent_id, playlist_id, type_id):
+        # 1. get the dispersy identifiers of all modifications which have not been reverted by a moderation
+        if channeltorrent_id:
+            return self._channelcast_db._db.fetchall(u"SELECT dispersy_id, prev_global_time FROM ChannelMetaData, MetaDataTorrent WHERE ChannelMetaData.id = MetaDataTorrent.metadata_id AND type_id = ? AND channeltorrent_id = ? AND dispersy_id not in (SELECT cause FROM Moderations WHERE channel_id = ?) ORDER BY prev_global_time DESC", (type_id, channeltorrent_id, self._channel_id))
+
+        if playlist_id:
+            return self._channelcast_db._db.fetchall(u"SELECT dispersy_id, prev_global_time FROM ChannelMetaData, MetaDataPlaylist WHERE ChannelMetaData.id = MetaDataPlaylist.metadata_id AND type_id = ? AND playlist_id = ? AND dispersy_id not in (SELECT cause FROM Moderations WHERE channel_id = ?) ORDER BY prev_global_time DESC", (type_id, playlist_id, self._channel_id))
+
+        return self._channelcast_db._db.fetchall(u"SELECT dispersy_id, prev_global_time FROM ChannelMetaData WHERE type_id = ? AND channel_id = ? AND id NOT IN (SELECT metadata_id FROM MetaDataTorrent) AND id NOT IN (SELECT metadata_id FROM MetaDataPlaylist) AND dispersy_id not in (SELECT cause FROM Moderations WHERE channel_id = ?) ORDER BY prev_global_time DESC", (type_id, self._channel_id, self._channel_id))
+
+    def _store_latest_modification(self, channeltorrent_id, playlist_id, type_id, message):
+        if message:
+            self._channelcast_db.setLatestModification(self._channel_id, channeltorrent_id, playlist_id, type_id, message.packet_id, message.payload.prev_modification_global_time)
+        else:
+            self._channelcast_db.removeLatestModification(self._channel_id, channeltorrent_id, playlist_id, type_id)
+
+    def _add_latest_modification(self, channeltorrent_id, playlist_id, type_id, message):
+        """
+        Called when MESSAGE became available, i.e. it was received, redone or its moderation was undone.  Only the
+        current latest modification and MESSAGE need to be compared to find the new latest modification.
+        """
+        latest = self._get_latest_modification(channeltorrent_id, playlist_id, type_id)
+        if latest and latest.packet_id != message.packet_id:
+            candidates = sorted([(latest.packet_id, latest.payload.prev_modification_global_time),
+                                 (message.packet_id, message.payload.prev_modification_global_time)],
+                                key=lambda candidate: candidate[1], reverse=True)
+            new_latest = self._determine_latest_modification(candidates)
+            if new_latest and new_latest.packet_id != latest.packet_id:
+                self._store_latest_modification(channeltorrent_id, playlist_id, type_id, new_latest)
+                latest = new_latest
+        return latest
+
+    def _remove_latest_modification(self, channeltorrent_id, playlist_id, type_id, dispersy_id):
+        """
+        Called when the modification DISPERSY_ID was undone or reverted by a moderation.  Only when it was the
+        current latest modification the history has to be resolved again.
+        """
+        latest = self._channelcast_db.getLatestModification(self._channel_id, channeltorrent_id, playlist_id, type_id)
+        if not latest or latest[0] == dispersy_id:
+            self._channelcast_db.removeLatestModification(self._channel_id, channeltorrent_id, playlist_id, type_id)
+            return True, self._get_latest_modification(channeltorrent_id, playlist_id, type_id)
+        return False, None
 
     @warnDispersyThread
     def _determine_latest_modification(self, list):
@@ -1062,9 +1128,8 @@ class ChannelCommunity(Community):
             for dispersy_id, prev_global_time in list:
                 if prev_global_time >= max_global_time:
                     try:
-                        message = self._dispersy.load_message_by_packetid(dispersy_id)
+                        message = self._dispersy.load_message_by_packetid(self, dispersy_id)
                         if message:
-                            message = message.load_message()
                             conflicting_messages.append(message)
 
                             max_global_time = prev_global_time
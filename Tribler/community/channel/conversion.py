@@ -1,19 +1,26 @@
 from struct import pack, unpack_from
-from random import sample
 import zlib
 
 from Tribler.Core.Utilities.encoding import encode, decode
+from Tribler.Core.Utilities.schema import Schema, Record, Sized
 from Tribler.dispersy.message import DropPacket, Packet, \
     DelayPacketByMissingMessage, DelayPacketByMissingMember
 from Tribler.dispersy.conversion import BinaryConversion
+from Tribler.community.search.torrentpacker import TorrentPacker, TORRENT_PAYLOAD
 
 DEBUG = False
 
+CHANNEL_PAYLOAD = Schema(Record(tuple, [("name", Sized(unicode, maximum=255)),
+                                        ("description", Sized(unicode, maximum=1023))],
+                                exact=True),
+                         "channel")
+
 
 class ChannelConversion(BinaryConversion):
 
     def __init__(self, community):
         super(ChannelConversion, self).__init__(community, "\x01")
+        self._torrent_packer = TorrentPacker()
         self.define_meta_message(chr(1), community.get_meta_message(u"channel"), lambda message: self._encode_decode(self._encode_channel, self._decode_channel, message), self._decode_channel)
         self.define_meta_message(chr(2), community.get_meta_message(u"torrent"), lambda message: self._encode_decode(self._encode_torrent, self._decode_torrent, message), self._decode_torrent)
         self.define_meta_message(chr(3), community.get_meta_message(u"playlist"), lambda message: self._encode_decode(self._encode_playlist, self._decode_playlist, message), self._decode_playlist)
@@ -26,13 +33,14 @@ class ChannelConversion(BinaryConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
 
-        except DropPacket:
-            raise
-        except:
-            pass
+            except DropPacket:
+                raise
+            except:
+                pass
         return result
 
     def _encode_channel(self, message):
@@ -40,19 +48,9 @@ class ChannelConversion(BinaryConversion):
 
     def _decode_channel(self, placeholder, offset, data):
         try:
-            offset, values = decode(data, offset)
-            if len(values) != 2:
-                raise ValueError
-        except ValueError:
-            raise DropPacket("Unable to decode the channel-payload")
-
-        name = values[0]
-        if not (isinstance(name, unicode) and len(name) < 256):
-            raise DropPacket("Invalid 'name' type or value")
-
-        description = values[1]
-        if not (isinstance(description, unicode) and len(description) < 1024):
-            raise DropPacket("Invalid 'description' type or value")
+            offset, (name, description) = CHANNEL_PAYLOAD.decode(data, offset)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the channel-payload: %s" % exception)
 
         return offset, placeholder.meta.payload.implement(name, description)
 
@@ -64,68 +62,18 @@ class ChannelConversion(BinaryConversion):
 
     def _encode_torrent(self, message):
         max_len = self._community.dispersy_sync_bloom_filter_bits / 8
-
-        files = message.payload.files
-        trackers = message.payload.trackers
-
-        def create_msg():
-            normal_msg = pack('!20sQ', message.payload.infohash, message.payload.timestamp), message.payload.name, tuple(files), tuple(trackers)
-            normal_msg = encode(normal_msg)
-            return zlib.compress(normal_msg)
-
-        compressed_msg = create_msg()
-        while len(compressed_msg) > max_len:
-            if len(trackers) > 10:
-                # only use first 10 trackers, .torrents in the wild have been seen to have 1000+ trackers...
-                trackers = trackers[:10]
-            else:
-                # reduce files by the amount we are currently to big
-                reduce_by = max_len / (len(compressed_msg) * 1.0)
-                nr_files_to_include = int(len(files) * reduce_by)
-                files = sample(files, nr_files_to_include)
-
-            compressed_msg = create_msg()
-        return compressed_msg,
+        return self._torrent_packer.pack(message.payload.infohash, message.payload.timestamp, message.payload.name, message.payload.files, message.payload.trackers, max_len),
 
     def _decode_torrent(self, placeholder, offset, data):
         uncompressed_data = zlib.decompress(data[offset:])
         offset = len(data)
 
         try:
-            _, values = decode(uncompressed_data)
-        except ValueError:
-            raise DropPacket("Unable to decode the torrent-payload")
-
-        infohash_time, name, files, trackers = values
-        if len(infohash_time) != 28:
-            raise DropPacket("Unable to decode the torrent-payload, got %d bytes expected 28" % (len(infohash_time)))
+            _, (infohash_time, name, files, trackers) = TORRENT_PAYLOAD.decode(uncompressed_data)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the torrent-payload: %s" % exception)
         infohash, timestamp = unpack_from('!20sQ', infohash_time)
 
-        if not isinstance(name, unicode):
-            raise DropPacket("Invalid 'name' type")
-
-        if not isinstance(files, tuple):
-            raise DropPacket("Invalid 'files' type")
-
-        if len(files) == 0:
-            raise DropPacket("Should have at least one file")
-
-        for file in files:
-            if len(file) != 2:
-                raise DropPacket("Invalid 'file_len' type")
-
-            path, length = file
-            if not isinstance(path, unicode):
-                raise DropPacket("Invalid 'files_path' type is %s" % type(path))
-            if not isinstance(length, (int, long)):
-                raise DropPacket("Invalid 'files_length' type is %s" % type(length))
-
-        if not isinstance(trackers, tuple):
-            raise DropPacket("Invalid 'trackers' type")
-        for tracker in trackers:
-            if not isinstance(tracker, str):
-                raise DropPacket("Invalid 'tracker' type")
-
         return offset, placeholder.meta.payload.implement(infohash, timestamp, name, files, trackers)
 
     def _encode_comment(self, message):
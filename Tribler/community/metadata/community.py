@@ -225,14 +225,11 @@ class MetadataCommunity(Community):
         else:
             unique.add(key)
 
-            if not message.authentication.member.database_id in times:
-                times[message.authentication.member.database_id] = [global_time for global_time, in self._dispersy._database.execute(u"SELECT global_time FROM sync WHERE community = ? AND member = ? AND meta_message = ?", (message.community.database_id, message.authentication.member.database_id, message.database_id))]
-                # assert len(times[message.authentication.member.database_id]) <= message.distribution.history_size, [message.packet_id, message.distribution.history_size, times[message.authentication.member.database_id]]
-
-            tim = times[message.authentication.member.database_id]
-
-            if message.distribution.global_time in tim and \
-                    self._dispersy._is_duplicate_sync_message(message):
+            # a member may have created metadata for many torrents, only look up the global time of this message
+            # instead of loading all of them into times
+            stored = self._dispersy._database.execute(u"SELECT 1 FROM sync WHERE community = ? AND member = ? AND global_time = ? AND meta_message = ?",
+                (message.community.database_id, message.authentication.member.database_id, message.distribution.global_time, message.database_id))
+            if next(stored, None) and self._dispersy._is_duplicate_sync_message(message):
                 self.__log(2, message)
                 return DropMessage(message, "duplicate message by member^global_time (3)")
 
@@ -254,21 +251,19 @@ class MetadataCommunity(Community):
 
             # compare previous pointers
             if message_list:
-                message_list.append(this_message)
-                message_list.sort()
-
                 # This message be in the top X in order to be stored, otherwise
                 # it is an old message and we send back our latest one.
                 history_size = message.distribution.history_size
                 history_size = 1 if history_size < 1 else history_size
-                if this_message not in message_list[-history_size:]:
+                newer_list = [other for other in message_list if other > this_message]
+                if len(newer_list) >= history_size:
                     # dirty way
                     if message.distribution.history_size == 1:
                         # send the latest message to the sender
                         try:
                             packet, = self._dispersy._database.execute(
                                 u"SELECT packet FROM sync WHERE id = ?",
-                                    (message_list[-1][-1],)).next()
+                                    (max(newer_list)[-1],)).next()
                         except StopIteration:
                             pass
                         else:
@@ -312,6 +307,7 @@ class MetadataCommunity(Community):
         self._metadata_db.addMetadataDataInBatch(value_list)
 
         # STEP 2: cleanup and update metadataData
+        history_size = max(messages[0].distribution.history_size, 1)
         sync_id_list = []
         for to_clear_infohash, to_clear_roothash in to_clear_set:
             message_list = self._metadata_db.getMetadataMessageList(
@@ -319,15 +315,15 @@ class MetadataCommunity(Community):
                 ("previous_global_time", "previous_mid", "this_global_time", "this_mid", "dispersy_id"))
 
             # compare previous pointers
-            if message_list:
+            if len(message_list) > history_size:
                 message_list.sort()
 
-                for message in message_list[:-1]:
+                for message in message_list[:-history_size]:
                     dispersy_id = message[-1]
-                    self._metadata_db.deleteMetadataMessage(dispersy_id)
-
                     sync_id_list.append((dispersy_id, dispersy_id))
 
+        # remove all superseded messages at once
+        self._metadata_db.deleteMetadataMessages([dispersy_id for dispersy_id, _ in sync_id_list])
         return sync_id_list
 
 
@@ -391,9 +387,14 @@ class MetadataDBStub(object):
 
 
     def deleteMetadataMessage(self, dispersy_id):
+        self.deleteMetadataMessages([dispersy_id])
+
+
+    def deleteMetadataMessages(self, dispersy_ids):
+        dispersy_ids = set(dispersy_ids)
         new_metadata_message_db_list = []
         for data in self._metadata_message_db_list:
-            if data["dispersy_id"] != dispersy_id:
+            if data["dispersy_id"] not in dispersy_ids:
                 new_metadata_message_db_list.append(data)
         self._metadata_message_db_list = new_metadata_message_db_list
 
@@ -18,13 +18,14 @@ class MetadataConversion(BinaryConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
-
-        except DropPacket:
-            raise
-        except:
-            pass
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
+
+            except DropPacket:
+                raise
+            except:
+                pass
         return result
 
 
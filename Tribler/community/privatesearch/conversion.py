@@ -188,11 +188,12 @@ class SearchConversion(NoDefBinaryConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
-
-        except DropPacket:
-            raise
-        except:
-            pass
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
+
+            except DropPacket:
+                raise
+            except:
+                pass
         return result
@@ -19,11 +19,12 @@ class OneSwarmConversion(SearchConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
 
-        except DropPacket:
-            raise
-        except:
-            pass
+            except DropPacket:
+                raise
+            except:
+                pass
         return result
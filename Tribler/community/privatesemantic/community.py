@@ -13,8 +13,9 @@ from twisted.internet.defer import inlineCallbacks
 from twisted.internet.task import LoopingCall, deferLater
 
 from .conversion import ForwardConversion, PSearchConversion, HSearchConversion, PoliSearchConversion
-from .crypto.paillier import (paillier_add, paillier_init, paillier_encrypt, paillier_decrypt, paillier_polyval,
-                              paillier_multiply, paillier_add_unenc)
+from .crypto.paillier import (paillier_init, paillier_decrypt, paillier_multiply, paillier_add_unenc,
+                              paillier_encrypt_vector, paillier_decrypt_vector, paillier_sum, paillier_polyval_vector,
+                              PaillierRandomizerPool)
 from .crypto.polycreate import compute_coeff, polyval
 from .crypto.rsa import rsa_init, rsa_encrypt, rsa_decrypt, rsa_compatible, hash_element
 from .payload import *
@@ -889,8 +890,21 @@ class ForwardCommunity():
 class PForwardCommunity(ForwardCommunity):
 
     def init_key(self):
+        self.randomizer_pool = None
         return paillier_init(ForwardCommunity.init_key(self))
 
+    def get_randomizer_pool(self):
+        # the pool is only created, and its thread started, once something has to be encrypted
+        if self.randomizer_pool is None:
+            self.randomizer_pool = PaillierRandomizerPool(self.key)
+            self.randomizer_pool.start()
+        return self.randomizer_pool
+
+    def unload_community(self):
+        if self.randomizer_pool is not None:
+            self.randomizer_pool.stop()
+        ForwardCommunity.unload_community(self)
+
     def initiate_meta_messages(self):
         messages = ForwardCommunity.initiate_meta_messages(self)
         messages.append(Message(self, u"msimilarity-request", MemberAuthentication(), PublicResolution(), DirectDistribution(), CandidateDestination(), EncryptedVectorPayload(), self.check_msimilarity_request, self.on_msimilarity_request))
@@ -912,10 +926,7 @@ class PForwardCommunity(ForwardCommunity):
         else:
             my_vector = self.get_my_vector(global_vector, local=True)
             if self.encryption:
-                encrypted_vector = []
-                for element in my_vector:
-                    cipher = paillier_encrypt(self.key, element)
-                    encrypted_vector.append(cipher)
+                encrypted_vector = paillier_encrypt_vector(self.key, my_vector, self.get_randomizer_pool())
             else:
                 encrypted_vector = my_vector
 
@@ -996,12 +1007,8 @@ class PForwardCommunity(ForwardCommunity):
             assert len(global_vector) == len(user_vector) and len(global_vector) == len(my_vector), "vector sizes not equal %d vs %d vs %d" % (len(global_vector), len(user_vector), len(my_vector))
 
             if self.encryption:
-                _sum = 1l
                 user_n2 = pow(message.payload.key_n, 2)
-
-                for i, element in enumerate(user_vector):
-                    if my_vector[i]:
-                        _sum = paillier_add(_sum, element, user_n2)
+                _sum = paillier_sum((element for i, element in enumerate(user_vector) if my_vector[i]), user_n2)
             else:
                 _sum = 0l
                 for i, element in enumerate(user_vector):
@@ -1246,8 +1253,21 @@ class HForwardCommunity(ForwardCommunity):
 class PoliForwardCommunity(ForwardCommunity):
 
     def init_key(self):
+        self.randomizer_pool = None
         return paillier_init(ForwardCommunity.init_key(self))
 
+    def get_randomizer_pool(self):
+        # the pool is only created, and its thread started, once something has to be encrypted
+        if self.randomizer_pool is None:
+            self.randomizer_pool = PaillierRandomizerPool(self.key)
+            self.randomizer_pool.start()
+        return self.randomizer_pool
+
+    def unload_community(self):
+        if self.randomizer_pool is not None:
+            self.randomizer_pool.stop()
+        ForwardCommunity.unload_community(self)
+
     def initiate_conversions(self):
         return [DefaultConversion(self), PoliSearchConversion(self)]
 
@@ -1287,7 +1307,7 @@ class PoliForwardCommunity(ForwardCommunity):
                 coeffs = compute_coeff(values)
 
                 if self.encryption:
-                    coeffs = [paillier_encrypt(self.key, coeff) for coeff in coeffs]
+                    coeffs = paillier_encrypt_vector(self.key, coeffs, self.get_randomizer_pool())
                 else:
                     coeffs = [long(coeff) for coeff in coeffs]
 
@@ -1330,10 +1350,8 @@ class PoliForwardCommunity(ForwardCommunity):
 
         t1 = time()
 
-        decrypted_values = []
         if self.encryption:
-            for py in evaluated_polynomial:
-                decrypted_values.append(paillier_decrypt(self.key, py))
+            decrypted_values = paillier_decrypt_vector(self.key, evaluated_polynomial)
         else:
             decrypted_values = evaluated_polynomial
 
@@ -1429,14 +1447,16 @@ class PoliForwardCommunity(ForwardCommunity):
             results = []
             if self.encryption:
                 user_n2 = pow(message.payload.key_n, 2)
-                for partition, val in _myPreferences:
-                    py = paillier_polyval(message.payload.coefficients[partition], val, user_n2)
-                    py = paillier_multiply(py, randint(0, 2 ** self.key.size), user_n2)
-                    if self.psi_mode == PSI_OVERLAP:
-                        py = paillier_add_unenc(py, val, message.payload.key_g, user_n2)
-                    elif self.psi_mode == PSI_AES:
-                        py = paillier_add_unenc(py, aes_key, message.payload.key_g, user_n2)
-                    results.append(py)
+                for partition, g in groupby(sorted(_myPreferences), lambda x: x[0]):
+                    values = [val for _, val in g]
+                    evaluated = paillier_polyval_vector(message.payload.coefficients[partition], values, user_n2)
+                    for val, py in zip(values, evaluated):
+                        py = paillier_multiply(py, randint(0, 2 ** self.key.size), user_n2)
+                        if self.psi_mode == PSI_OVERLAP:
+                            py = paillier_add_unenc(py, val, message.payload.key_g, user_n2)
+                        elif self.psi_mode == PSI_AES:
+                            py = paillier_add_unenc(py, aes_key, message.payload.key_g, user_n2)
+                        results.append(py)
             else:
                 for partition, val in _myPreferences:
                     py = polyval(message.payload.coefficients[partition], val)
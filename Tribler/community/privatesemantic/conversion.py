@@ -115,13 +115,14 @@ class ForwardConversion(BinaryConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
 
-        except DropPacket:
-            raise
-        except:
-            pass
+            except DropPacket:
+                raise
+            except:
+                pass
         return result
 
 class PSearchConversion(ForwardConversion):
@@ -0,0 +1,83 @@
+# Compares the element-by-element crypto paths with the batched/precomputed ones used by the
+# PForward/PoliForward communities.
+
+from random import randint, Random
+from time import time
+
+from optional_crypto import mpz, rand
+from Crypto.Util.number import GCD
+
+from rsa import rsa_init
+from paillier import paillier_init, paillier_decrypt, improved_pow, paillier_add, paillier_encrypt_vector, \
+    paillier_sum, paillier_polyval, paillier_polyval_vector, PaillierRandomizerPool
+from polycreate import compute_coeff
+from ecelgamal import ecelgamal_init
+
+
+def old_paillier_encrypt(key, element):
+    _n = long(key.n)
+    while True:
+        r = rand('next', _n)
+        if GCD(r, _n) == 1: break
+    r = mpz(r)
+
+    t1 = improved_pow(key.g, element, key.n2)
+    t2 = pow(r, key.n, key.n2)
+    return long((t1 * t2) % key.n2)
+
+
+def old_ec_multiply(n, point):
+    r = point.ec.zero
+    result = point
+    while 0 < n:
+        if n & 1 == 1:
+            r += result
+        result = result + result
+        n /= 2
+    return r
+
+
+def timeit(description, func, *args):
+    t1 = time()
+    result = func(*args)
+    print "%-45s %8.3fs" % (description, time() - t1)
+    return result
+
+
+if __name__ == "__main__":
+    key = paillier_init(rsa_init(1024))
+    vector = [long(randint(0, 1)) for _ in xrange(500)]
+
+    # preference vector encryption (PForwardCommunity.create_similarity_payload)
+    timeit("encrypt %d elements (old)" % len(vector), lambda: [old_paillier_encrypt(key, element) for element in vector])
+    timeit("encrypt %d elements (no pool)" % len(vector), paillier_encrypt_vector, key, vector)
+
+    pool = PaillierRandomizerPool(key, size=len(vector))
+    timeit("precompute %d randomizers" % len(vector), lambda: [pool._pool.append(pool.create()) for _ in vector])
+    encrypted = timeit("encrypt %d elements (precomputed pool)" % len(vector), paillier_encrypt_vector, key, vector, pool)
+
+    # homomorphic sum (PForwardCommunity.on_similarity_request)
+    def old_sum():
+        _sum = 1l
+        for element in encrypted:
+            _sum = paillier_add(_sum, element, key.n2)
+        return _sum
+    timeit("sum %d ciphers (old)" % len(encrypted), old_sum)
+    _sum = timeit("sum %d ciphers (batched)" % len(encrypted), paillier_sum, encrypted, key.n2)
+    assert paillier_decrypt(key, _sum) == sum(vector)
+
+    # polynomial evaluation (PoliForwardCommunity.on_similarity_request)
+    r = Random()
+    roots = [r.randint(0, 2 ** 32) for _ in xrange(5)]
+    coeffs = paillier_encrypt_vector(key, compute_coeff(roots))
+    xs = [r.randint(0, 2 ** 32) for _ in xrange(200)] + roots
+    old = timeit("evaluate polynomial %d times (old)" % len(xs), lambda: [paillier_polyval(coeffs, x, key.n2) for x in xs])
+    new = timeit("evaluate polynomial %d times (vector)" % len(xs), paillier_polyval_vector, coeffs, xs, key.n2)
+    assert old == new
+
+    # elliptic curve scalar multiplication
+    ec_key = ecelgamal_init(256)
+    scalars = [r.randint(0, 2 ** 256) for _ in xrange(50)]
+    old = timeit("ec multiply %d times (affine)" % len(scalars), lambda: [old_ec_multiply(n, ec_key.ec.g) for n in scalars])
+    new = timeit("ec multiply %d times (jacobian)" % len(scalars), lambda: [n * ec_key.ec.g for n in scalars])
+    assert old == new
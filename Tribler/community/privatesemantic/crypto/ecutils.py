@@ -76,15 +76,20 @@ class PointOnCurve(Point):
         return self.__add__(-p)
 
     def __rmul__(self, n):
-        r = self.ec.zero
+        # double-and-add using jacobian coordinates, only a single inversion is required at the end
+        if self.is_zero() or n == 0:
+            return self.ec.zero
 
-        result = self
+        ec = self.ec
+        r = None
+        p = (self.x, self.y, mpz(1))
         while 0 < n:
             if n & 1 == 1:
-                r += result
-            result = result + result
-            n /= 2
-        return r
+                r = ec.jacobian_add(r, p)
+            n >>= 1
+            if n:
+                p = ec.jacobian_double(p)
+        return ec.from_jacobian(r)
 
     def __neg__(self):
         return self.ec.point(self.x, -self.y % self.ec.q)
@@ -115,6 +120,63 @@ class EllipticCurve(object):
 
         return PointOnCurve(self, _x, _y)
 
+    def jacobian_double(self, p):
+        if p is None:
+            return None
+
+        x, y, z = p
+        if not z or not y:
+            return None
+
+        q = self.q
+        yy = y * y % q
+        s = 4 * x * yy % q
+        zz = z * z % q
+        m = (3 * x * x + self.a * zz * zz) % q
+        x3 = (m * m - 2 * s) % q
+        y3 = (m * (s - x3) - 8 * yy * yy) % q
+        z3 = 2 * y * z % q
+        return (x3, y3, z3)
+
+    def jacobian_add(self, p1, p2):
+        if p1 is None:
+            return p2
+        if p2 is None:
+            return p1
+
+        q = self.q
+        x1, y1, z1 = p1
+        x2, y2, z2 = p2
+        z1z1 = z1 * z1 % q
+        z2z2 = z2 * z2 % q
+        u1 = x1 * z2z2 % q
+        u2 = x2 * z1z1 % q
+        s1 = y1 * z2 * z2z2 % q
+        s2 = y2 * z1 * z1z1 % q
+        if u1 == u2:
+            if s1 != s2:
+                return None
+            return self.jacobian_double(p1)
+
+        h = (u2 - u1) % q
+        r = (s2 - s1) % q
+        hh = h * h % q
+        hhh = h * hh % q
+        v = u1 * hh % q
+        x3 = (r * r - hhh - 2 * v) % q
+        y3 = (r * (v - x3) - s1 * hhh) % q
+        z3 = h * z1 * z2 % q
+        return (x3, y3, z3)
+
+    def from_jacobian(self, p):
+        if p is None or not p[2]:
+            return self.zero
+
+        x, y, z = p
+        z_inv = invert(z, self.q)
+        z_inv2 = z_inv * z_inv % self.q
+        return self.point(x * z_inv2 % self.q, y * z_inv2 * z_inv % self.q)
+
     def convert_to_point(self, element):
         for i in xrange(1000):
             x = mpz(1000 * element + i)
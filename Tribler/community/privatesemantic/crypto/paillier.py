@@ -10,6 +10,7 @@ from sys import maxint
 
 from rsa import rsa_init
 from collections import namedtuple
+from threading import Condition, Thread
 from polycreate import compute_coeff
 from itertools import groupby
 from cProfile import Profile
@@ -50,20 +51,135 @@ def paillier_init(rsa_key):
     d = mpz(invert(d, n))
     return PaillierKey(n, n2, g, lambda_, d, rsa_key.size, rsa_key.size * 2)
 
-def paillier_encrypt(key, element):
+def paillier_encrypt(key, element, randomizer=None):
     assert isinstance(element, (int, long)), type(element)
 
-    _n = long(key.n)
-    while True:
-        r = rand('next', _n)
-        if GCD(r, _n) == 1: break
-    r = mpz(r)
+    if randomizer is None:
+        _n = long(key.n)
+        while True:
+            r = rand('next', _n)
+            if GCD(r, _n) == 1: break
+        r = mpz(r)
+        randomizer = pow(r, key.n, key.n2)
 
-    t1 = improved_pow(key.g, element, key.n2)
-    t2 = pow(r, key.n, key.n2)
-    cipher = (t1 * t2) % key.n2
+    t1 = paillier_pow_g(key.g, element, key.n2)
+    cipher = (t1 * randomizer) % key.n2
     return long(cipher)
 
+def paillier_encrypt_vector(key, elements, pool=None):
+    """
+    Encrypt all ELEMENTS, using precomputed randomizers from POOL when available.
+    """
+    randomizers = pool.get(len(elements)) if pool else [None] * len(elements)
+    return [paillier_encrypt(key, element, randomizer) for element, randomizer in zip(elements, randomizers)]
+
+def paillier_pow_g(g, exponent, n2):
+    # as g = n + 1, g^m = (1 + n)^m = 1 + m * n (mod n^2), which avoids the modular exponentiation
+    n = g - 1
+    if n * n == n2:
+        return (1 + exponent * n) % n2
+    return improved_pow(g, exponent, n2)
+
+class FixedBasePow(object):
+
+    """
+    Fixed-base windowed exponentiation, precomputes BASE^(d * 2^(WINDOW * i)) for all digits d such that each
+    exponentiation only requires one multiplication per WINDOW bits of the exponent.
+    """
+    def __init__(self, base, modulo, max_bits, window=4):
+        self.modulo = modulo
+        self.window = window
+        self.mask = (1 << window) - 1
+
+        self.table = []
+        base = mpz(base)
+        for _ in xrange((max_bits + window - 1) // window):
+            row = [mpz(1)]
+            for _ in xrange(self.mask):
+                row.append((row[-1] * base) % modulo)
+            self.table.append(row)
+            base = (row[-1] * base) % modulo
+
+    def __call__(self, exponent):
+        assert exponent >= 0
+        assert exponent >> (len(self.table) * self.window) == 0, "exponent too large"
+
+        result = mpz(1)
+        for row in self.table:
+            if not exponent:
+                break
+            digit = exponent & self.mask
+            if digit:
+                result = (result * row[digit]) % self.modulo
+            exponent >>= self.window
+        return result
+
+class PaillierRandomizerPool(object):
+
+    """
+    Keeps a pool of precomputed randomizers r^n mod n^2 which is refilled by a background thread.
+
+    Randomizers are computed as h^t mod n^2, with h = s^n for a random s and t a random exponent, which allows
+    for fixed-base windowed exponentiation.
+    """
+    def __init__(self, key, size=1000, window=5):
+        self.key = key
+        self.size = size
+
+        _n = long(key.n)
+        while True:
+            s = rand('next', _n)
+            if GCD(s, _n) == 1: break
+        self._h = FixedBasePow(pow(mpz(s), key.n, key.n2), key.n2, key.size, window)
+
+        self._pool = []
+        self._condition = Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._thread = Thread(target=self._refill, name="PaillierRandomizerPool")
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def __len__(self):
+        return len(self._pool)
+
+    def create(self):
+        return self._h(rand('next', long(self.key.n)))
+
+    def get(self, count):
+        """
+        Returns COUNT randomizers, missing randomizers are computed on the calling thread.
+        """
+        with self._condition:
+            randomizers = self._pool[-count:] if count else []
+            del self._pool[len(self._pool) - len(randomizers):]
+            self._condition.notify()
+
+        while len(randomizers) < count:
+            randomizers.append(self.create())
+        return randomizers
+
+    def _refill(self):
+        while True:
+            with self._condition:
+                while self._running and len(self._pool) >= self.size:
+                    self._condition.wait()
+                if not self._running:
+                    break
+
+            randomizer = self.create()
+            with self._condition:
+                self._pool.append(randomizer)
+
 def paillier_decrypt(key, cipher):
     cipher_ = mpz(cipher)
 
@@ -87,14 +203,38 @@ def paillier_add(cipher1, cipher2, n2):
     return (cipher1 * cipher2) % n2
 
 def paillier_add_unenc(cipher, value, g, n2):
-    return cipher * improved_pow(g, value, n2)
+    return cipher * paillier_pow_g(g, value, n2)
+
+def paillier_sum(ciphers, n2):
+    result = mpz(1)
+    for cipher in ciphers:
+        result = (result * cipher) % n2
+    return long(result)
 
 def paillier_polyval(coefficients, x, n2):
-    result = coefficients[0]
+    n2_ = mpz(n2)
+    result = mpz(coefficients[0])
     for coefficient in coefficients[1:]:
-        result = paillier_add(paillier_multiply(result, x, n2), coefficient, n2)
+        result = (pow(result, x, n2_) * coefficient) % n2_
 
-    return result
+    return long(result)
+
+def paillier_polyval_vector(coefficients, xs, n2):
+    """
+    Evaluate the encrypted polynomial for all XS, the coefficients are only converted once.
+    """
+    n2_ = mpz(n2)
+    coefficients = [mpz(coefficient) for coefficient in coefficients]
+    results = []
+    for x in xs:
+        result = coefficients[0]
+        for coefficient in coefficients[1:]:
+            result = (pow(result, x, n2_) * coefficient) % n2_
+        results.append(long(result))
+    return results
+
+def paillier_decrypt_vector(key, ciphers):
+    return [paillier_decrypt(key, cipher) for cipher in ciphers]
 
 def encrypt_str(key, plain_str):
     aes_key = StrongRandom().getrandbits(128)
@@ -84,11 +84,9 @@ class SocialCommunity(Community):
                 if DEBUG_VERBOSE:
                     print >> sys.stderr, "GOT sync-request from", message.candidate, tb
 
-                keyhashes = tuple(buffer(str(overlapping_friend)) for overlapping_friend in tb.overlap)
-                sync_ids = self._friend_db.execute(u"SELECT sync_id FROM friendsync WHERE global_time BETWEEN ? AND ? AND (global_time + ?) % ? = 0 AND keyhash in (" + ", ".join("?" * len(keyhashes)) + ")",
-                                                   (time_low, time_high, offset, modulo) + keyhashes)
+                sync_ids = self._friend_db.get_sync_ids_in_range(tb.overlap, time_low, time_high, offset, modulo)
 
-                sync_ids = tuple(str(sync_id) for sync_id, in sync_ids)
+                sync_ids = tuple(str(sync_id) for sync_id in sync_ids)
                 yield message, ((str(packet),) for packet, in self._dispersy._database.execute(u"SELECT packet FROM sync WHERE undone = 0 AND id IN (" + ",".join(sync_ids) + ") ORDER BY global_time DESC"))
 
             elif DEBUG:
@@ -100,15 +98,8 @@ class SocialCommunity(Community):
             if DEBUG_VERBOSE:
                 print >> sys.stderr, "SELECTING packets for", request_cache.helper_candidate, tb
 
-            keyhashes = tuple(buffer(str(overlapping_friend)) for overlapping_friend in tb.overlap)
-
             # first select_and_fix based on friendsync table
-            if higher:
-                data = list(self._friend_db.execute(u"SELECT global_time, sync_id FROM friendsync WHERE global_time > ? AND keyhash in (" + ", ".join("?" * len(keyhashes)) + ") ORDER BY global_time ASC LIMIT ?",
-                                                        (global_time,) + keyhashes + (to_select + 1,)))
-            else:
-                data = list(self._friend_db.execute(u"SELECT global_time, sync_id FROM friendsync WHERE global_time < ? AND keyhash in (" + ", ".join("?" * len(keyhashes)) + ") ORDER BY global_time DESC LIMIT ?",
-                                                        (global_time,) + keyhashes + (to_select + 1,)))
+            data = self._friend_db.get_sync_ids(tb.overlap, global_time, higher, to_select + 1)
 
             fixed = False
             if len(data) > to_select:
@@ -179,19 +170,17 @@ class SocialCommunity(Community):
 
     def on_encrypted(self, messages):
         if __debug__:
-            key_hashes = [keyhash for _, keyhash in self._friend_db.get_my_keys()] + [keyhash for _, _, keyhash in self._friend_db.get_friend_keys()]
+            key_hashes = self._friend_db.get_my_keyhashes() | self._friend_db.get_friend_keyhashes()
             assert all(message.payload.keyhash in key_hashes for message in messages)
 
+        self._friend_db.add_messages([(message.packet_id, message._distribution.global_time, message.payload.keyhash) for message in messages])
+
         decrypted_messages = []
         for message in messages:
-            self._friend_db.add_message(message.packet_id, message._distribution.global_time, message.payload.keyhash)
-
-            could_decrypt = False
-            for key, keyhash in self._friend_db.get_my_keys():
-                if keyhash == message.payload._keyhash:
-                    decrypted_messages.append((message.candidate, self.dispersy.crypto.decrypt(key, message.payload.encrypted_message)))
-                    could_decrypt = True
-                    break
+            key = self._friend_db.get_my_key(message.payload.keyhash)
+            could_decrypt = key is not None
+            if could_decrypt:
+                decrypted_messages.append((message.candidate, self.dispersy.crypto.decrypt(key, message.payload.encrypted_message)))
 
             if self.log_text:
                 # if no candidate -> message is created by me
@@ -204,7 +193,7 @@ class SocialCommunity(Community):
         tbs = [TasteBuddy(overlap, (ip, port)) for overlap, ip, port in self._peercache.get_peers()]
 
         friends, foafs = self.determine_friends_foafs(tbs)
-        my_key_hashes = [keyhash for _, keyhash in self._friend_db.get_my_keys()]
+        my_key_hashes = self._friend_db.get_my_keyhashes()
 
         if len(friends) > nr:
             friends = sample(list(friends), nr)
@@ -243,7 +232,7 @@ class SocialCommunity(Community):
         return to_maintain
 
     def determine_friends_foafs(self, tbs):
-        my_key_hashes = [keyhash for _, keyhash in self._friend_db.get_my_keys()]
+        my_key_hashes = self._friend_db.get_my_keyhashes()
 
         friends = self.filter_overlap(tbs, my_key_hashes)
         foafs = defaultdict(list)
@@ -264,7 +253,7 @@ class SocialCommunity(Community):
         return to_maintain
 
     def add_possible_taste_buddies(self):
-        my_key_hashes = [keyhash for _, keyhash in self._friend_db.get_my_keys()]
+        my_key_hashes = self._friend_db.get_my_keyhashes()
 
         connections = defaultdict(int)
         for tb in self.yield_taste_buddies():
@@ -3,7 +3,7 @@ from time import time
 
 from Tribler.dispersy.database import Database
 
-LATEST_VERSION = 1
+LATEST_VERSION = 2
 
 schema = u"""
 CREATE TABLE friendsync(
@@ -11,6 +11,7 @@ CREATE TABLE friendsync(
  global_time integer,
  keyhash text
 );
+CREATE INDEX friendsync_keyhash_global_time ON friendsync(keyhash, global_time);
 
 CREATE TABLE friends(
  id integer PRIMARY KEY AUTOINCREMENT NOT NULL,
@@ -42,6 +43,10 @@ class FriendDatabase(Database):
         else:
             super(FriendDatabase, self).__init__(path.join(dispersy.working_directory, u"sqlite", u"friendsync.db"))
 
+        # loaded on first use, and reloaded after add_my_key and add_friend
+        self._my_keys = None
+        self._friend_keyhashes = None
+
     def open(self):
         self._dispersy.database.attach_commit_callback(self.commit)
         return super(FriendDatabase, self).open()
@@ -64,12 +69,11 @@ class FriendDatabase(Database):
         else:
             # upgrade to version 2
             if database_version < 2:
-                # there is no version 2 yet...
-                # if __debug__: dprint("upgrade database ", database_version, " -> ", 2)
-                # self.executescript(u"""UPDATE option SET value = '2' WHERE key = 'database_version';""")
-                # self.commit()
-                # if __debug__: dprint("upgrade database ", database_version, " -> ", 2, " (done)")
-                pass
+                self.executescript(u"""
+CREATE INDEX IF NOT EXISTS friendsync_keyhash_global_time ON friendsync(keyhash, global_time);
+UPDATE option SET value = '2' WHERE key = 'database_version';
+""")
+                self.commit()
 
         return LATEST_VERSION
 
@@ -82,14 +86,47 @@ class FriendDatabase(Database):
         return stats_dict
 
     def add_message(self, sync_id, global_time, keyhash):
-        _keyhash = buffer(str(keyhash))
-        self.execute(u"INSERT INTO friendsync (sync_id, global_time, keyhash) VALUES (?,?,?) ", (sync_id, global_time, _keyhash))
+        self.add_messages([(sync_id, global_time, keyhash)])
+
+    def add_messages(self, messages):
+        self.executemany(u"INSERT INTO friendsync (sync_id, global_time, keyhash) VALUES (?,?,?) ",
+                         [(sync_id, global_time, buffer(str(keyhash))) for sync_id, global_time, keyhash in messages])
+
+    def get_sync_ids(self, keyhashes, global_time, higher, limit):
+        """
+        Returns up to limit (global_time, sync_id) tuples of the messages for keyhashes with a global_time higher (or
+        lower) than global_time, closest to global_time first.  Each keyhash is an index range scan of at most limit
+        rows.
+        """
+        if higher:
+            sql = u"SELECT global_time, sync_id FROM friendsync WHERE keyhash = ? AND global_time > ? ORDER BY global_time ASC LIMIT ?"
+        else:
+            sql = u"SELECT global_time, sync_id FROM friendsync WHERE keyhash = ? AND global_time < ? ORDER BY global_time DESC LIMIT ?"
+
+        data = []
+        for keyhash in keyhashes:
+            data.extend(self.execute(sql, (buffer(str(keyhash)), global_time, limit)))
+        data.sort(reverse=not higher)
+        return data[:limit]
+
+    def get_sync_ids_in_range(self, keyhashes, time_low, time_high, offset, modulo):
+        """
+        Returns the sync_ids of the messages for keyhashes with a global_time between time_low and time_high (inclusive)
+        for which (global_time + offset) % modulo == 0.  Each keyhash is an index range scan.
+        """
+        sql = u"SELECT sync_id FROM friendsync WHERE keyhash = ? AND global_time BETWEEN ? AND ? AND (global_time + ?) % ? = 0"
+
+        sync_ids = []
+        for keyhash in keyhashes:
+            sync_ids.extend(sync_id for sync_id, in self.execute(sql, (buffer(str(keyhash)), time_low, time_high, offset, modulo)))
+        return sync_ids
 
     def add_friend(self, name, key, keyhash):
         _name = unicode(name)
         _key = buffer(self._dispersy.crypto.key_to_bin(key.pub()))
         _keyhash = buffer(str(keyhash))
         self.execute(u"INSERT INTO friends (name, key, keyhash) VALUES (?,?,?)", (_name, _key, _keyhash))
+        self._friend_keyhashes = None
 
     def get_friend(self, name):
         return self._converted_keys(self.execute(u"SELECT key, keyhash FROM friends WHERE name = ?", (unicode(name),))).next()
@@ -101,14 +138,35 @@ class FriendDatabase(Database):
     def get_friend_keys(self):
         return list(self._converted_keys(self.execute(u"SELECT name, key, keyhash FROM friends")))
 
+    def get_friend_keyhashes(self):
+        if self._friend_keyhashes is None:
+            self._friend_keyhashes = frozenset(keytuple[-1] for keytuple in self.get_friend_keys() if keytuple[-1] is not None)
+        return self._friend_keyhashes
+
     def add_my_key(self, key, keyhash):
         _key = buffer(self._dispersy.crypto.key_to_bin(key))
         _keyhash = buffer(str(keyhash))
         self.execute(u"INSERT INTO my_keys (key, keyhash, inserted) VALUES (?,?,?)", (_key, _keyhash, time()))
+        self._my_keys = None
 
     def get_my_keys(self):
         return list(self._converted_keys(self.execute(u"SELECT key, keyhash FROM my_keys ORDER BY inserted DESC"), mykeys=True))
 
+    def get_my_key(self, keyhash):
+        """
+        Returns my private key with this keyhash, or None.
+        """
+        return self._get_my_keys().get(keyhash)
+
+    def get_my_keyhashes(self):
+        return self._get_my_keys().viewkeys()
+
+    def _get_my_keys(self):
+        if self._my_keys is None:
+            # converting the keys is expensive, the most recent key is used if a keyhash occurs more than once
+            self._my_keys = dict((keyhash, key) for key, keyhash in reversed(self.get_my_keys()) if keyhash is not None)
+        return self._my_keys
+
     def _converted_keys(self, keylist, mykeys=False):
         did_yield = False
         for keytuple in keylist:
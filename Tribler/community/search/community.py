@@ -2,6 +2,7 @@
 import logging
 from os import path
 from random import shuffle
+from struct import pack
 from time import time
 from traceback import print_exc
 
@@ -73,6 +74,7 @@ class SearchCommunity(Community):
         if self.integrate_with_tribler:
             from Tribler.Core.CacheDB.SqliteCacheDBHandler import ChannelCastDBHandler, TorrentDBHandler, MyPreferenceDBHandler, MiscDBHandler
             from Tribler.Core.CacheDB.Notifier import Notifier
+            from Tribler.Core.simpledefs import NTFY_MYPREFERENCES, NTFY_TORRENTS, NTFY_INSERT, NTFY_UPDATE, NTFY_DELETE
 
             # tribler channelcast database
             self._channelcast_db = ChannelCastDBHandler.getInstance()
@@ -83,14 +85,23 @@ class SearchCommunity(Community):
 
             # torrent collecting
             self._rtorrent_handler = RemoteTorrentHandler.getInstance()
+
+            # keep the taste bloom filter up to date with my preferences
+            self._notifier.add_observer(self.on_preference_changed, NTFY_MYPREFERENCES, [NTFY_INSERT, NTFY_DELETE])
+            self._notifier.add_observer(self.on_torrent_updated, NTFY_TORRENTS, [NTFY_UPDATE])
         else:
             self._channelcast_db = ChannelCastDBStub(self._dispersy)
             self._torrent_db = None
             self._mypref_db = None
             self._notifier = None
 
+        # the infohashes and swift hashes of my (at most 500) most recent preferences, TASTE_BLOOM_FILTER contains
+        # these hashes and TASTE_BLOOM_FILTER_BYTES its serialized form as appended to the introduction-request
+        self.taste_preferences = []
+        self.taste_preference_hashes = set()
         self.taste_bloom_filter = None
-        self.taste_bloom_filter_key = None
+        self.taste_bloom_filter_bytes = None
+        self.taste_bloom_filter_dirty = True
 
         self.torrent_cache = None
 
@@ -98,6 +109,12 @@ class SearchCommunity(Community):
                            LoopingCall(self.create_torrent_collect_requests)).start(CREATE_TORRENT_COLLECT_INTERVAL,
                                                                                     now=True)
 
+    def unload_community(self):
+        if self._notifier:
+            self._notifier.remove_observer(self.on_preference_changed)
+            self._notifier.remove_observer(self.on_torrent_updated)
+        super(SearchCommunity, self).unload_community()
+
     def initiate_meta_messages(self):
         return super(SearchCommunity, self).initiate_meta_messages() + [
             Message(self, u"search-request",
@@ -227,20 +244,8 @@ class SearchCommunity(Community):
 
         advice = True
         if not is_fast_walker:
-            myPreferences = sorted(self._mypref_db.getMyPrefListInfohash(limit=500))
-            num_preferences = len(myPreferences)
-
-            myPref_key = ",".join(map(bin2str, myPreferences))
-            if myPref_key != self.taste_bloom_filter_key:
-                if num_preferences > 0:
-                    # no prefix changing, we want false positives (make sure it is a single char)
-                    self.taste_bloom_filter = BloomFilter(0.005, len(myPreferences), prefix=' ')
-                    self.taste_bloom_filter.add_keys(myPreferences)
-                else:
-                    self.taste_bloom_filter = None
-
-                self.taste_bloom_filter_key = myPref_key
-
+            self.update_taste_bloom_filter()
+            num_preferences = len(self.taste_preferences)
             taste_bloom_filter = self.taste_bloom_filter
 
             cache = self._request_cache.add(IntroductionRequestCache(self, destination))
@@ -263,11 +268,41 @@ class SearchCommunity(Community):
         self._dispersy._forward([request])
         return request
 
+    def on_preference_changed(self, subject, change_type, infohash):
+        # called by the notifier, the bloom filter is rebuilt on the reactor thread when it is needed next
+        self.taste_bloom_filter_dirty = True
+
+    def on_torrent_updated(self, subject, change_type, infohash):
+        # called by the notifier, the swift hash of one of my preferences may have changed
+        if infohash in self.taste_preference_hashes:
+            self.taste_bloom_filter_dirty = True
+
+    def update_taste_bloom_filter(self):
+        if not self.taste_bloom_filter_dirty:
+            return
+        self.taste_bloom_filter_dirty = False
+
+        myPreferences = sorted(self._mypref_db.getMyPrefListInfohash(limit=500))
+        self.taste_preferences = myPreferences
+        self.taste_preference_hashes = set(hash_ for hash_ in myPreferences if hash_)
+
+        if myPreferences:
+            # no prefix changing, we want false positives (make sure it is a single char)
+            taste_bloom_filter = BloomFilter(0.005, len(myPreferences), prefix=' ')
+            taste_bloom_filter.add_keys(myPreferences)
+
+            self.taste_bloom_filter = taste_bloom_filter
+            self.taste_bloom_filter_bytes = pack('!IBH', len(myPreferences), taste_bloom_filter.functions, taste_bloom_filter.size) + taste_bloom_filter.prefix + taste_bloom_filter.bytes
+        else:
+            self.taste_bloom_filter = None
+            self.taste_bloom_filter_bytes = None
+
     def on_introduction_request(self, messages):
         super(SearchCommunity, self).on_introduction_request(messages)
 
         if any(message.payload.taste_bloom_filter for message in messages):
-            myPreferences = self._mypref_db.getMyPrefListInfohash(limit=500)
+            self.update_taste_bloom_filter()
+            myPreferences = self.taste_preferences
         else:
             myPreferences = []
 
@@ -383,6 +418,10 @@ class SearchCommunity(Community):
                     if len(message.payload.results) > 0:
                         self._torrent_db.on_search_response(message.payload.results)
 
+                        # the response could have added a swift hash to one of my preferences
+                        if any(result[0] in self.taste_preference_hashes or result[8] in self.taste_preference_hashes for result in message.payload.results):
+                            self.taste_bloom_filter_dirty = True
+
                     search_request.callback(search_request.keywords, message.payload.results, message.candidate)
 
                     # see if we need to join some channels
@@ -495,7 +534,9 @@ class SearchCommunity(Community):
                 self._torrent_db.on_torrent_collect_response(toInsert[:50])
                 toInsert = toInsert[50:]
 
-        hashes = [hash_ for hash_ in toCollect.keys() if hash_]
+        # skip the torrents the frontier knows are collected or being collected, without querying the database
+        frontier = self._rtorrent_handler.frontier
+        hashes = [hash_ for hash_ in toCollect.keys() if hash_ and not (frontier and (frontier.is_collected(hash_) or frontier.is_in_flight(hash_)))]
         if hashes:
             hashesToCollect = self._torrent_db.selectSwiftTorrentsToCollect(hashes)
             for infohash, roothash in hashesToCollect[:5]:
@@ -6,9 +6,25 @@ import logging
 import zlib
 
 from Tribler.Core.Utilities.encoding import encode, decode
+from Tribler.Core.Utilities.schema import Schema, Record, Sized, ListOf, Optional
 from Tribler.dispersy.message import DropPacket
 from Tribler.dispersy.conversion import BinaryConversion
 from Tribler.dispersy.bloomfilter import BloomFilter
+from Tribler.community.search.torrentpacker import TorrentPacker, TORRENT_PAYLOAD
+
+SEARCH_RESPONSE_PAYLOAD = Schema(Record(tuple, [("identifier", Sized(str, length=2)),
+                                                ("results", ListOf(Record(tuple, [("infohash", Sized(str, length=20)),
+                                                                                  ("swarmname", unicode),
+                                                                                  ("length", long),
+                                                                                  ("nrfiles", int),
+                                                                                  ("categorykeys", ListOf(unicode)),
+                                                                                  ("creation_date", long),
+                                                                                  ("seeders", int),
+                                                                                  ("leechers", int),
+                                                                                  ("swift_hash", Optional(Sized(str, length=20))),
+                                                                                  ("swift_torrent_hash", Optional(Sized(str, length=20))),
+                                                                                  ("cid", Optional(Sized(str, length=20)))])))]),
+                                 "search-response")
 
 
 class SearchConversion(BinaryConversion):
@@ -17,6 +33,7 @@ class SearchConversion(BinaryConversion):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         super(SearchConversion, self).__init__(community, "\x01")
+        self._torrent_packer = TorrentPacker()
         self.define_meta_message(chr(1), community.get_meta_message(u"search-request"), lambda message: self._encode_decode(self._encode_search_request, self._decode_search_request, message), self._decode_search_request)
         self.define_meta_message(chr(2), community.get_meta_message(u"search-response"), lambda message: self._encode_decode(self._encode_search_response, self._decode_search_response, message), self._decode_search_response)
         self.define_meta_message(chr(3), community.get_meta_message(u"torrent-request"), lambda message: self._encode_decode(self._encode_torrent_request, self._decode_torrent_request, message), self._decode_torrent_request)
@@ -28,7 +45,11 @@ class SearchConversion(BinaryConversion):
         data = BinaryConversion._encode_introduction_request(self, message)
 
         if message.payload.taste_bloom_filter:
-            data.extend((pack('!IBH', message.payload.num_preferences, message.payload.taste_bloom_filter.functions, message.payload.taste_bloom_filter.size), message.payload.taste_bloom_filter.prefix, message.payload.taste_bloom_filter.bytes))
+            if message.payload.taste_bloom_filter is self._community.taste_bloom_filter:
+                # reuse the serialized form of our own taste bloom filter
+                data.append(self._community.taste_bloom_filter_bytes)
+            else:
+                data.extend((pack('!IBH', message.payload.num_preferences, message.payload.taste_bloom_filter.functions, message.payload.taste_bloom_filter.size), message.payload.taste_bloom_filter.prefix, message.payload.taste_bloom_filter.bytes))
         return data
 
     def _decode_introduction_request(self, placeholder, offset, data):
@@ -69,13 +90,16 @@ class SearchConversion(BinaryConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
-
-        except DropPacket:
-            raise
-        except:
-            pass
+        # the payloads are validated when they are created, decoding our own messages is only done to catch
+        # encoder bugs during development and is skipped when running optimized
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
+
+            except DropPacket:
+                raise
+            except:
+                pass
         return result
 
     def _encode_search_request(self, message):
@@ -137,81 +161,13 @@ class SearchConversion(BinaryConversion):
 
     def _decode_search_response(self, placeholder, offset, data):
         try:
-            offset, payload = decode(data, offset)
-        except ValueError:
-            raise DropPacket("Unable to decode the search-reponse-payload")
-
-        if len(payload) < 2:
-            raise DropPacket("Invalid payload length")
+            offset, payload = SEARCH_RESPONSE_PAYLOAD.decode(data, offset)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the search-response-payload: %s" % exception)
 
         identifier, results = payload[:2]
-
-        if len(identifier) != 2:
-            raise DropPacket("Unable to decode the search-response-payload, got %d bytes expected 2" % (len(identifier)))
         identifier, = unpack_from('!H', identifier)
 
-        if not isinstance(results, list):
-            raise DropPacket("Invalid 'results' type")
-
-        for result in results:
-            if not isinstance(result, tuple):
-                raise DropPacket("Invalid result type")
-
-            if len(result) < 11:
-                raise DropPacket("Invalid result length")
-
-            infohash, swarmname, length, nrfiles, categorykeys, creation_date, seeders, leechers, swift_hash, swift_torrent_hash, cid = result[:11]
-
-            if not isinstance(infohash, str):
-                raise DropPacket("Invalid infohash type")
-            if len(infohash) != 20:
-                raise DropPacket("Invalid infohash length")
-
-            if not isinstance(swarmname, unicode):
-                raise DropPacket("Invalid swarmname type")
-
-            if not isinstance(length, long):
-                raise DropPacket("Invalid length type '%s'" % type(length))
-
-            if not isinstance(nrfiles, int):
-                raise DropPacket("Invalid nrfiles type")
-
-            if not isinstance(categorykeys, list):
-                raise DropPacket("Invalid categorykeys type")
-
-            if not all(isinstance(key, unicode) for key in categorykeys):
-                raise DropPacket("Invalid categorykey type")
-
-            if not isinstance(creation_date, long):
-                raise DropPacket("Invalid creation_date type")
-
-            if not isinstance(seeders, int):
-                raise DropPacket("Invalid seeders type '%s'" % type(seeders))
-
-            if not isinstance(leechers, int):
-                raise DropPacket("Invalid leechers type '%s'" % type(leechers))
-
-            if swift_hash:
-                if not isinstance(swift_hash, str):
-                    raise DropPacket("Invalid swift_hash type '%s'" % type(swift_hash))
-
-                if len(swift_hash) != 20:
-                    raise DropPacket("Invalid swift_hash length")
-
-            if swift_torrent_hash:
-                if not isinstance(swift_torrent_hash, str):
-                    raise DropPacket("Invalid swift_torrent_hash type")
-
-                if len(swift_torrent_hash) != 20:
-                    raise DropPacket("Invalid swift_torrent_hash length")
-
-            if cid:
-                if not isinstance(cid, str):
-                    raise DropPacket("Invalid cid type")
-
-                if len(cid) != 20:
-                    raise DropPacket("Invalid cid length")
-
         return offset, placeholder.meta.payload.implement(identifier, results)
 
     def _encode_torrent_request(self, message):
@@ -295,66 +251,16 @@ class SearchConversion(BinaryConversion):
 
     def _encode_torrent(self, message):
         max_len = self._community.dispersy_sync_bloom_filter_bits / 8
-
-        files = message.payload.files
-        trackers = message.payload.trackers
-
-        def create_msg():
-            normal_msg = pack('!20sQ', message.payload.infohash, message.payload.timestamp), message.payload.name, tuple(files), tuple(trackers)
-            normal_msg = encode(normal_msg)
-            return zlib.compress(normal_msg)
-
-        compressed_msg = create_msg()
-        while len(compressed_msg) > max_len:
-            if len(trackers) > 10:
-                # only use first 10 trackers, .torrents in the wild have been seen to have 1000+ trackers...
-                trackers = trackers[:10]
-            else:
-                # reduce files by the amount we are currently to big
-                reduce_by = max_len / (len(compressed_msg) * 1.0)
-                nr_files_to_include = int(len(files) * reduce_by)
-                files = sample(files, nr_files_to_include)
-
-            compressed_msg = create_msg()
-        return compressed_msg,
+        return self._torrent_packer.pack(message.payload.infohash, message.payload.timestamp, message.payload.name, message.payload.files, message.payload.trackers, max_len),
 
     def _decode_torrent(self, placeholder, offset, data):
         uncompressed_data = zlib.decompress(data[offset:])
         offset = len(data)
 
         try:
-            _, values = decode(uncompressed_data)
-        except ValueError:
-            raise DropPacket("Unable to decode the torrent-payload")
-
-        infohash_time, name, files, trackers = values
-        if len(infohash_time) != 28:
-            raise DropPacket("Unable to decode the torrent-payload, got %d bytes expected 28" % (len(infohash_time)))
+            _, (infohash_time, name, files, trackers) = TORRENT_PAYLOAD.decode(uncompressed_data)
+        except ValueError as exception:
+            raise DropPacket("Unable to decode the torrent-payload: %s" % exception)
         infohash, timestamp = unpack_from('!20sQ', infohash_time)
 
-        if not isinstance(name, unicode):
-            raise DropPacket("Invalid 'name' type")
-
-        if not isinstance(files, tuple):
-            raise DropPacket("Invalid 'files' type")
-
-        if len(files) == 0:
-            raise DropPacket("Should have at least one file")
-
-        for file in files:
-            if len(file) != 2:
-                raise DropPacket("Invalid 'file_len' type")
-
-            path, length = file
-            if not isinstance(path, unicode):
-                raise DropPacket("Invalid 'files_path' type is %s" % type(path))
-            if not isinstance(length, (int, long)):
-                raise DropPacket("Invalid 'files_length' type is %s" % type(length))
-
-        if not isinstance(trackers, tuple):
-            raise DropPacket("Invalid 'trackers' type")
-        for tracker in trackers:
-            if not isinstance(tracker, str):
-                raise DropPacket("Invalid 'tracker' type")
-
         return offset, placeholder.meta.payload.implement(infohash, timestamp, name, files, trackers)
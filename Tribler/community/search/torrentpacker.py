@@ -0,0 +1,172 @@
+import logging
+import zlib
+from collections import OrderedDict
+from random import sample
+from struct import pack
+
+from Tribler.Core.Utilities.encoding import encode
+from Tribler.Core.Utilities.schema import Schema, Record, Sized, TupleOf
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKERS = 10
+MAX_PROBES = 8
+# torrents that encode to more than ESTIMATE_FACTOR * max_len bytes are never compressed as a whole
+ESTIMATE_FACTOR = 8
+
+# the decoded payload of torrent messages, files are (path, length) pairs
+TORRENT_PAYLOAD = Schema(Record(tuple, [("infohash_time", Sized(str, length=28)),
+                                        ("name", unicode),
+                                        ("files", TupleOf(Record((tuple, list), [("files_path", unicode),
+                                                                                 ("files_length", (int, long))],
+                                                                 exact=True),
+                                                          minimum=1)),
+                                        ("trackers", TupleOf(str))],
+                                exact=True),
+                         "torrent")
+
+
+class TorrentPacker(object):
+
+    """
+    Builds the compressed payload of torrent messages, used by the search and channel conversions.
+
+    When the payload does not fit in MAX_LEN bytes the trackers are limited to the first MAX_TRACKERS and a random
+    subset of the files is included.  The number of files is estimated from the compression ratio and refined using
+    a binary search, rather than repeatedly sampling and compressing.  The selected files and trackers are cached per
+    (infohash, max_len), a torrent that is sent again only has to be encoded and compressed once.  A cached entry is
+    discarded when the name, files or trackers of the torrent differ.
+    """
+
+    def __init__(self, length=256):
+        super(TorrentPacker, self).__init__()
+        self._length = length
+        self._cache = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def pack(self, infohash, timestamp, name, files, trackers, max_len):
+        key = (infohash, max_len)
+        entry = self._cache.pop(key, None)
+        if entry and entry[0] == name and entry[1] == files and entry[2] == trackers:
+            self.hits += 1
+            self._cache[key] = entry
+
+            _, _, _, selected_files, selected_trackers, packet_timestamp, packet = entry
+            if packet_timestamp == timestamp:
+                return packet
+
+            # only the timestamp changed, which hardly affects the compressed size
+            packet = self._create(infohash, timestamp, name, selected_files, selected_trackers)
+            if len(packet) <= max_len:
+                self._store(key, (name, files, trackers, selected_files, selected_trackers, timestamp, packet))
+                return packet
+
+        self.misses += 1
+        selected_files, selected_trackers, packet = self._fit(infohash, timestamp, name, files, trackers, max_len)
+        self._store(key, (name, files, trackers, selected_files, selected_trackers, timestamp, packet))
+        return packet
+
+    def _store(self, key, entry):
+        self._cache[key] = entry
+        if len(self._cache) > self._length:
+            self._cache.popitem(False)
+
+    @staticmethod
+    def _encode(infohash, timestamp, name, files, trackers):
+        return encode((pack('!20sQ', infohash, timestamp), name, tuple(files), tuple(trackers)))
+
+    def _create(self, infohash, timestamp, name, files, trackers):
+        return zlib.compress(self._encode(infohash, timestamp, name, files, trackers))
+
+    def _fit(self, infohash, timestamp, name, files, trackers, max_len):
+        encoded = self._encode(infohash, timestamp, name, files, trackers)
+        if len(encoded) <= ESTIMATE_FACTOR * max_len:
+            packet = zlib.compress(encoded)
+            if len(packet) <= max_len:
+                return files, trackers, packet
+
+            if len(trackers) > MAX_TRACKERS:
+                # only use first 10 trackers, .torrents in the wild have been seen to have 1000+ trackers...
+                trackers = trackers[:MAX_TRACKERS]
+                packet = self._create(infohash, timestamp, name, files, trackers)
+                if len(packet) <= max_len:
+                    return files, trackers, packet
+            compressed_size = len(packet)
+
+        else:
+            # compressing a huge torrent only to learn that it is too large is expensive, estimate the compressed
+            # size from a prefix instead.  The files will be sampled, hence the trackers are limited as well
+            trackers = trackers[:MAX_TRACKERS]
+            prefix_size = ESTIMATE_FACTOR * max_len
+            compressed_size = len(encoded) * len(zlib.compress(encoded[:prefix_size])) / prefix_size
+
+        # a prefix of a random permutation is a random sample, the size of the packet grows with the number of
+        # files which allows a binary search.  HIGH files are known not to fit
+        files = sample(files, len(files))
+        low, high = 1, len(files)
+        best = None
+
+        # the first guess assumes that every file takes the same number of compressed bytes
+        guess = max(1, min(high - 1, int(len(files) * max_len / float(compressed_size))))
+        for _ in xrange(MAX_PROBES):
+            packet = self._create(infohash, timestamp, name, files[:guess], trackers)
+            if len(packet) <= max_len:
+                low, best = guess, (guess, packet)
+            else:
+                high = guess
+
+            if high - low <= 1:
+                break
+            guess = (low + high) / 2
+
+        if best is None:
+            # not even a single file fits, the receiver requires at least one file hence it is truncated
+            return self._truncate(infohash, timestamp, name, files[0], trackers, max_len)
+
+        nr_files, packet = best
+        logger.debug("packed %d/%d files of %s in %d bytes", nr_files, len(files), infohash.encode("HEX"), len(packet))
+        return files[:nr_files], trackers, packet
+
+    def _truncate(self, infohash, timestamp, name, file_, trackers, max_len):
+        # cut the path of FILE_ to the longest prefix that fits, without trackers when needed.  When the name alone
+        # is too large the name is cut as well, such a packet is not reused by the cache as the name differs
+        path, length = file_
+        for selected_trackers in (trackers, ()):
+            fit = self._fit_prefix(path, max_len, lambda prefix: self._create(infohash, timestamp, name, [(prefix, length)], selected_trackers))
+            if fit:
+                prefix, packet = fit
+                logger.debug("truncated the path of %s to %d/%d characters", infohash.encode("HEX"), len(prefix), len(path))
+                return [(prefix, length)], selected_trackers, packet
+
+        fit = self._fit_prefix(name, max_len, lambda prefix: self._create(infohash, timestamp, prefix, [(u"", length)], ()))
+        if fit:
+            prefix, packet = fit
+        else:
+            packet = self._create(infohash, timestamp, u"", [(u"", length)], ())
+        logger.warning("truncated the name of %s to fit %d bytes", infohash.encode("HEX"), max_len)
+        return [(u"", length)], (), packet
+
+    @staticmethod
+    def _fit_prefix(text, max_len, create):
+        # binary search for the longest prefix of TEXT for which CREATE returns at most MAX_LEN bytes
+        packet = create(text[:0])
+        if len(packet) > max_len:
+            return None
+
+        low, high = 0, len(text) + 1
+        best = (text[:0], packet)
+        while high - low > 1:
+            middle = (low + high) / 2
+            packet = create(text[:middle])
+            if len(packet) <= max_len:
+                low, best = middle, (text[:middle], packet)
+            else:
+                high = middle
+        return best
+
+    def get_statistics(self):
+        return {"size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses}
@@ -132,15 +132,16 @@ class TunnelConversion(BinaryConversion):
 
     def _encode_decode(self, encode, decode, message):
         result = encode(message)
-        try:
-            decode(None, 0, result[0])
-
-        except DropPacket:
-            from traceback import print_exc
-            print_exc()
-            raise
-        except:
-            pass
+        if __debug__:
+            try:
+                decode(None, 0, result[0])
+
+            except DropPacket:
+                from traceback import print_exc
+                print_exc()
+                raise
+            except:
+                pass
         return result
 
     @staticmethod
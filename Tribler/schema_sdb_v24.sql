@@ -20,6 +20,10 @@ CREATE TABLE MetadataData (
   FOREIGN KEY (message_id) REFERENCES MetadataMessage(message_id) ON DELETE CASCADE
 );
 
+CREATE INDEX IF NOT EXISTS MetaMsgInfohashIndex ON MetadataMessage(infohash);
+CREATE INDEX IF NOT EXISTS MetaMsgRoothashIndex ON MetadataMessage(roothash);
+CREATE INDEX IF NOT EXISTS MetaMsgDispersyIndex ON MetadataMessage(dispersy_id);
+
 ----------------------------------------
 
 CREATE TABLE BarterCast (
@@ -331,6 +335,18 @@ CREATE TABLE IF NOT EXISTS MetaDataPlaylist (
 );
 CREATE INDEX IF NOT EXISTS MePlaylistIndex ON MetaDataPlaylist(playlist_id);
 
+CREATE TABLE IF NOT EXISTS ChannelMetaDataLatest (
+  channel_id            integer         NOT NULL,
+  channeltorrent_id     integer         NOT NULL DEFAULT (0),
+  playlist_id           integer         NOT NULL DEFAULT (0),
+  type_id               integer         NOT NULL,
+  dispersy_id           integer         NOT NULL,
+  prev_global_time      integer,
+  PRIMARY KEY (channel_id, channeltorrent_id, playlist_id, type_id),
+  FOREIGN KEY (type_id) REFERENCES MetaDataTypes(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS MeLatestDispersyIndex ON ChannelMetaDataLatest(dispersy_id);
+
 CREATE TABLE IF NOT EXISTS _ChannelVotes (
   channel_id            integer,
   voter_id              integer,
@@ -399,7 +415,7 @@ INSERT INTO TorrentStatus VALUES (2, 'dead', NULL);
 INSERT INTO TorrentSource VALUES (0, '', 'Unknown');
 INSERT INTO TorrentSource VALUES (1, 'BC', 'Received from other user');
 
-INSERT INTO MyInfo VALUES ('version', 22);
+INSERT INTO MyInfo VALUES ('version', 24);
 
 INSERT INTO MetaDataTypes ('name') VALUES ('name');
 INSERT INTO MetaDataTypes ('name') VALUES ('description');